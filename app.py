@@ -17,6 +17,7 @@ import os
 
 from flask import Flask
 from flask_cors import CORS
+from sqlalchemy import event
 
 from error_handling import register_error_handlers
 from models import db
@@ -43,6 +44,20 @@ app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
 CORS(app)
 db.init_app(app)
 
+
+# SQLite: WAL lets UI requests read while the scheduler writes, and busy_timeout
+# makes writers wait for the single write lock instead of failing immediately
+with app.app_context():
+    if db.engine.dialect.name == "sqlite":
+
+        @event.listens_for(db.engine, "connect")
+        def _set_sqlite_pragmas(dbapi_connection, _connection_record):
+            cursor = dbapi_connection.cursor()
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA busy_timeout=30000")
+            cursor.close()
+
+
 # Initialize sync scheduler (6 hours by default, configurable via SYNC_INTERVAL_HOURS env var)
 sync_interval = int(os.getenv("SYNC_INTERVAL_HOURS", "6"))
 sync_scheduler = SyncScheduler(app, interval_hours=sync_interval)
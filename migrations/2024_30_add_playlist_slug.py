@@ -0,0 +1,68 @@
+"""Add slug column to playlist_configs table.
+
+Stores the URL slug for each playlist configuration so that
+/playlist/config/<slug>.m3u and /epg/config/<slug>.xml resolve with a single
+indexed lookup instead of slugifying every playlist name per request.
+Playlists whose names slugify identically get a numeric suffix.
+"""
+
+import logging
+import re
+import sqlite3
+
+logger = logging.getLogger(__name__)
+
+
+def slugify(text: str) -> str:
+    """Convert text to URL-safe slug (same as models.slugify)."""
+    text = text.lower().strip()
+    text = re.sub(r"[^\w\s-]", "", text)
+    text = re.sub(r"[\s_]+", "-", text)
+    text = re.sub(r"-+", "-", text)
+    return text.strip("-")
+
+
+def migrate(db_path):
+    """Add slug column to playlist_configs and populate it."""
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute("PRAGMA table_info(playlist_configs)")
+        columns = [row[1] for row in cursor.fetchall()]
+
+        if not columns:
+            return True, "playlist_configs table does not exist, skipping"
+
+        if "slug" in columns:
+            logger.info("Column slug already exists in playlist_configs table")
+            return True, "Column slug already exists, skipping"
+
+        logger.info("Adding slug column to playlist_configs table")
+        cursor.execute("ALTER TABLE playlist_configs ADD COLUMN slug VARCHAR(200)")
+
+        # Populate slugs in id order so the oldest playlist keeps the unsuffixed slug
+        cursor.execute("SELECT id, name FROM playlist_configs ORDER BY id")
+        taken = set()
+        for config_id, name in cursor.fetchall():
+            base = slugify(name or "") or "playlist"
+            slug = base
+            suffix = 2
+            while slug in taken:
+                slug = f"{base}-{suffix}"
+                suffix += 1
+            taken.add(slug)
+            cursor.execute("UPDATE playlist_configs SET slug = ? WHERE id = ?", (slug, config_id))
+
+        cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_playlist_config_slug ON playlist_configs(slug)")
+
+        conn.commit()
+        logger.info(f"Added slug column and populated {len(taken)} playlist slugs")
+        return True, f"Added slug column to playlist_configs, populated {len(taken)} slugs"
+
+    except Exception as e:
+        conn.rollback()
+        logger.error(f"Migration failed: {e}")
+        return False, f"Migration failed: {str(e)}"
+    finally:
+        conn.close()
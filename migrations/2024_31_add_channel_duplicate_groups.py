@@ -0,0 +1,96 @@
+"""Add quality_score and duplicate_group columns to channels table.
+
+Pre-computes each channel's quality score (from its tags) and normalized
+duplicate group (from its cleaned name) so playlist generation can collapse
+duplicates in SQL instead of loading every channel's tags per request.
+"""
+
+import logging
+import sqlite3
+
+logger = logging.getLogger(__name__)
+
+# Same ranks as services.quality_service.QUALITY_RANKS
+QUALITY_RANKS = {
+    "4K": 100,
+    "UHD": 90,
+    "2160P": 90,
+    "FHD": 50,
+    "1080P": 50,
+    "HD": 40,
+    "720P": 30,
+    "SD": 10,
+    "480P": 10,
+    "RAW": 35,
+    "HEVC": 15,
+    "H265": 15,
+    "H264": 10,
+    "60FPS": 25,
+    "50FPS": 22,
+    "30FPS": 12,
+    "25FPS": 10,
+    "24FPS": 8,
+    "DOLBY": 5,
+    "ATMOS": 5,
+    "5.1": 3,
+    "STEREO": 1,
+    "HQ": 10,
+    "LQ": -10,
+}
+
+
+def migrate(db_path):
+    """Add quality_score and duplicate_group columns to channels and populate them."""
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute("PRAGMA table_info(channels)")
+        columns = [row[1] for row in cursor.fetchall()]
+
+        if not columns:
+            return True, "channels table does not exist, skipping"
+
+        if "duplicate_group" in columns:
+            logger.info("Column duplicate_group already exists in channels table")
+            return True, "Column duplicate_group already exists, skipping"
+
+        logger.info("Adding quality_score and duplicate_group columns to channels table")
+        if "quality_score" not in columns:
+            cursor.execute("ALTER TABLE channels ADD COLUMN quality_score INTEGER DEFAULT 0")
+        cursor.execute("ALTER TABLE channels ADD COLUMN duplicate_group VARCHAR(500)")
+
+        # Sum quality tag ranks per (account, stream)
+        scores = {}
+        cursor.execute(
+            """
+            SELECT ct.account_id, ct.stream_id, t.name
+            FROM channel_tags ct
+            JOIN tags t ON t.id = ct.tag_id
+            """
+        )
+        for account_id, stream_id, tag_name in cursor.fetchall():
+            rank = QUALITY_RANKS.get((tag_name or "").upper(), 0)
+            if rank:
+                key = (account_id, stream_id)
+                scores[key] = scores.get(key, 0) + rank
+
+        cursor.execute("SELECT id, account_id, stream_id, name, cleaned_name FROM channels")
+        updates = []
+        for channel_id, account_id, stream_id, name, cleaned_name in cursor.fetchall():
+            group = (cleaned_name or name or "unknown").strip().lower()
+            updates.append((scores.get((account_id, stream_id), 0), group, channel_id))
+
+        cursor.executemany("UPDATE channels SET quality_score = ?, duplicate_group = ? WHERE id = ?", updates)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_channel_duplicate_group ON channels(duplicate_group)")
+
+        conn.commit()
+        logger.info(f"Added duplicate group columns and populated {len(updates)} channels")
+        return True, f"Added quality_score and duplicate_group to channels, populated {len(updates)} channels"
+
+    except Exception as e:
+        conn.rollback()
+        logger.error(f"Migration failed: {e}")
+        return False, f"Migration failed: {str(e)}"
+    finally:
+        conn.close()
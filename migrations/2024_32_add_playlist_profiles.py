@@ -0,0 +1,54 @@
+"""Add playlist_profiles table.
+
+Stores named M3U output profiles (group-title format, icon proxying, stream URL
+style, duplicate collapsing and optional catchup/tvg-chno attributes) that
+clients select with ?profile=<name> on the playlist endpoints.
+"""
+
+import logging
+import sqlite3
+
+logger = logging.getLogger(__name__)
+
+
+def migrate(db_path):
+    """Create playlist_profiles table."""
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='playlist_profiles'")
+        if cursor.fetchone():
+            logger.info("Table playlist_profiles already exists")
+            return True, "Table playlist_profiles already exists, skipping"
+
+        logger.info("Creating playlist_profiles table")
+        cursor.execute(
+            """
+            CREATE TABLE playlist_profiles (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name VARCHAR(100) NOT NULL UNIQUE,
+                description TEXT,
+                group_title_format VARCHAR(200),
+                proxy_icons BOOLEAN DEFAULT 1,
+                url_style VARCHAR(20) DEFAULT 'auto',
+                collapse_duplicates BOOLEAN DEFAULT 0,
+                include_catchup BOOLEAN DEFAULT 0,
+                include_chno BOOLEAN DEFAULT 0,
+                chno_start INTEGER DEFAULT 1,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+            """
+        )
+
+        conn.commit()
+        logger.info("Created playlist_profiles table")
+        return True, "Created playlist_profiles table"
+
+    except Exception as e:
+        conn.rollback()
+        logger.error(f"Migration failed: {e}")
+        return False, f"Migration failed: {str(e)}"
+    finally:
+        conn.close()
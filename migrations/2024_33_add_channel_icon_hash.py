@@ -0,0 +1,66 @@
+"""Add icon_hash column to channels table.
+
+Stores the SHA-256 icon proxy hash of each channel's stream_icon so playlist
+rendering can emit /icon/<hash> URLs without parsing and hashing every icon URL
+per request. New and changed icons are hashed when stream_icon is set.
+"""
+
+import hashlib
+import logging
+import sqlite3
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+
+def get_icon_hash(url):
+    """Hash an icon URL (same as ImageCacheService.get_icon_hash)."""
+    if not url:
+        return None
+    try:
+        parsed = urlparse(url)
+        if parsed.scheme not in ("http", "https") or not parsed.netloc:
+            return None
+    except Exception:
+        return None
+    return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+
+def migrate(db_path):
+    """Add icon_hash column to channels and populate it."""
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute("PRAGMA table_info(channels)")
+        columns = [row[1] for row in cursor.fetchall()]
+
+        if not columns:
+            return True, "channels table does not exist, skipping"
+
+        if "icon_hash" in columns:
+            logger.info("Column icon_hash already exists in channels table")
+            return True, "Column icon_hash already exists, skipping"
+
+        logger.info("Adding icon_hash column to channels table")
+        cursor.execute("ALTER TABLE channels ADD COLUMN icon_hash VARCHAR(64)")
+
+        cursor.execute("SELECT id, stream_icon FROM channels WHERE stream_icon IS NOT NULL AND stream_icon != ''")
+        updates = []
+        for channel_id, stream_icon in cursor.fetchall():
+            icon_hash = get_icon_hash(stream_icon)
+            if icon_hash:
+                updates.append((icon_hash, channel_id))
+
+        cursor.executemany("UPDATE channels SET icon_hash = ? WHERE id = ?", updates)
+
+        conn.commit()
+        logger.info(f"Added icon_hash column and hashed {len(updates)} channel icons")
+        return True, f"Added icon_hash to channels, hashed {len(updates)} icons"
+
+    except Exception as e:
+        conn.rollback()
+        logger.error(f"Migration failed: {e}")
+        return False, f"Migration failed: {str(e)}"
+    finally:
+        conn.close()
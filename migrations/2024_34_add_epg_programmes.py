@@ -0,0 +1,54 @@
+"""Add epg_programmes table.
+
+Stores programme listings from every EPG source sync, indexed by
+(epg_channel_id, start_time), so guide output can be served for any mapped EPG
+channel with an indexed range scan instead of re-parsing provider XMLTV.
+Programmes are populated by the next sync of each source.
+"""
+
+import logging
+import sqlite3
+
+logger = logging.getLogger(__name__)
+
+
+def migrate(db_path):
+    """Create epg_programmes table."""
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='epg_programmes'")
+        if cursor.fetchone():
+            logger.info("Table epg_programmes already exists")
+            return True, "Table epg_programmes already exists, skipping"
+
+        logger.info("Creating epg_programmes table")
+        cursor.execute(
+            """
+            CREATE TABLE epg_programmes (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                epg_channel_id INTEGER NOT NULL REFERENCES epg_channels(id) ON DELETE CASCADE,
+                start_time DATETIME NOT NULL,
+                stop_time DATETIME,
+                start VARCHAR(32) NOT NULL,
+                stop VARCHAR(32),
+                title VARCHAR(500),
+                body TEXT
+            )
+            """
+        )
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_epg_programme_channel_start ON epg_programmes(epg_channel_id, start_time)"
+        )
+
+        conn.commit()
+        logger.info("Created epg_programmes table")
+        return True, "Created epg_programmes table"
+
+    except Exception as e:
+        conn.rollback()
+        logger.error(f"Migration failed: {e}")
+        return False, f"Migration failed: {str(e)}"
+    finally:
+        conn.close()
@@ -0,0 +1,45 @@
+"""Add epg_past_hours and epg_future_hours columns to playlist_configs table.
+
+Per-playlist defaults for the EPG time window: /epg/config/<id>.xml only
+returns programmes from epg_past_hours before now to epg_future_hours after
+now (NULL = no limit). The past_hours/future_hours query parameters override them.
+"""
+
+import logging
+import sqlite3
+
+logger = logging.getLogger(__name__)
+
+
+def migrate(db_path):
+    """Add EPG time window columns to playlist_configs."""
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute("PRAGMA table_info(playlist_configs)")
+        columns = [row[1] for row in cursor.fetchall()]
+
+        if not columns:
+            return True, "playlist_configs table does not exist, skipping"
+
+        if "epg_past_hours" in columns and "epg_future_hours" in columns:
+            logger.info("EPG window columns already exist in playlist_configs table")
+            return True, "Columns epg_past_hours/epg_future_hours already exist, skipping"
+
+        logger.info("Adding epg_past_hours and epg_future_hours columns to playlist_configs table")
+        if "epg_past_hours" not in columns:
+            cursor.execute("ALTER TABLE playlist_configs ADD COLUMN epg_past_hours INTEGER")
+        if "epg_future_hours" not in columns:
+            cursor.execute("ALTER TABLE playlist_configs ADD COLUMN epg_future_hours INTEGER")
+
+        conn.commit()
+        logger.info("Added EPG window columns to playlist_configs")
+        return True, "Added epg_past_hours and epg_future_hours to playlist_configs"
+
+    except Exception as e:
+        conn.rollback()
+        logger.error(f"Migration failed: {e}")
+        return False, f"Migration failed: {str(e)}"
+    finally:
+        conn.close()
@@ -0,0 +1,50 @@
+"""Add etag, last_modified and content_hash columns to epg_sources table.
+
+xmltv_url sources remember the validators and a SHA-256 hash of the last
+synced download. Refreshes send a conditional GET and skip parsing when the
+server answers 304 Not Modified or the body is byte-for-byte unchanged.
+"""
+
+import logging
+import sqlite3
+
+logger = logging.getLogger(__name__)
+
+NEW_COLUMNS = {
+    "etag": "VARCHAR(200)",
+    "last_modified": "VARCHAR(100)",
+    "content_hash": "VARCHAR(64)",
+}
+
+
+def migrate(db_path):
+    """Add download validator columns to epg_sources."""
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute("PRAGMA table_info(epg_sources)")
+        columns = [row[1] for row in cursor.fetchall()]
+
+        if not columns:
+            return True, "epg_sources table does not exist, skipping"
+
+        missing = [name for name in NEW_COLUMNS if name not in columns]
+        if not missing:
+            logger.info("Download validator columns already exist in epg_sources table")
+            return True, "Columns etag/last_modified/content_hash already exist, skipping"
+
+        logger.info(f"Adding {', '.join(missing)} column(s) to epg_sources table")
+        for name in missing:
+            cursor.execute(f"ALTER TABLE epg_sources ADD COLUMN {name} {NEW_COLUMNS[name]}")
+
+        conn.commit()
+        logger.info("Added download validator columns to epg_sources")
+        return True, "Added etag, last_modified and content_hash to epg_sources"
+
+    except Exception as e:
+        conn.rollback()
+        logger.error(f"Migration failed: {e}")
+        return False, f"Migration failed: {str(e)}"
+    finally:
+        conn.close()
@@ -0,0 +1,41 @@
+"""Add content_hash column to epg_channels table.
+
+EPG source syncs hash each channel's synced fields and only rewrite channels
+whose hash changed; unchanged channels just get last_seen bumped in bulk.
+"""
+
+import logging
+import sqlite3
+
+logger = logging.getLogger(__name__)
+
+
+def migrate(db_path):
+    """Add content_hash to epg_channels."""
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute("PRAGMA table_info(epg_channels)")
+        columns = [row[1] for row in cursor.fetchall()]
+
+        if not columns:
+            return True, "epg_channels table does not exist, skipping"
+
+        if "content_hash" in columns:
+            logger.info("content_hash column already exists in epg_channels table")
+            return True, "Column content_hash already exists, skipping"
+
+        logger.info("Adding content_hash column to epg_channels table")
+        cursor.execute("ALTER TABLE epg_channels ADD COLUMN content_hash VARCHAR(64)")
+
+        conn.commit()
+        logger.info("Added content_hash column to epg_channels")
+        return True, "Added content_hash to epg_channels"
+
+    except Exception as e:
+        conn.rollback()
+        logger.error(f"Migration failed: {e}")
+        return False, f"Migration failed: {str(e)}"
+    finally:
+        conn.close()
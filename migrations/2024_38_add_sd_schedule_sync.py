@@ -0,0 +1,75 @@
+"""Add sd_schedule_md5s and sd_programs tables.
+
+Schedules Direct syncs store the MD5 of every synced schedule per
+(source, station, date) and the programmes they reference with their MD5, so
+later syncs only download the station-days and programmes that changed.
+"""
+
+import logging
+import sqlite3
+
+logger = logging.getLogger(__name__)
+
+
+def migrate(db_path):
+    """Create sd_schedule_md5s and sd_programs tables."""
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+
+    try:
+        created = []
+
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='sd_schedule_md5s'")
+        if not cursor.fetchone():
+            logger.info("Creating sd_schedule_md5s table")
+            cursor.execute(
+                """
+                CREATE TABLE sd_schedule_md5s (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    epg_source_id INTEGER NOT NULL REFERENCES epg_sources(id),
+                    station_id VARCHAR(50) NOT NULL,
+                    date VARCHAR(10) NOT NULL,
+                    md5 VARCHAR(32) NOT NULL,
+                    last_modified VARCHAR(30),
+                    updated_at DATETIME,
+                    CONSTRAINT _sd_schedule_md5_uc UNIQUE (epg_source_id, station_id, date)
+                )
+                """
+            )
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS ix_sd_schedule_md5s_epg_source_id ON sd_schedule_md5s(epg_source_id)"
+            )
+            created.append("sd_schedule_md5s")
+
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='sd_programs'")
+        if not cursor.fetchone():
+            logger.info("Creating sd_programs table")
+            cursor.execute(
+                """
+                CREATE TABLE sd_programs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    program_id VARCHAR(14) NOT NULL UNIQUE,
+                    md5 VARCHAR(32) NOT NULL,
+                    title VARCHAR(500),
+                    body TEXT,
+                    last_seen DATETIME,
+                    updated_at DATETIME
+                )
+                """
+            )
+            created.append("sd_programs")
+
+        if not created:
+            logger.info("Schedules Direct sync tables already exist")
+            return True, "Tables sd_schedule_md5s and sd_programs already exist, skipping"
+
+        conn.commit()
+        logger.info(f"Created {', '.join(created)}")
+        return True, f"Created {', '.join(created)}"
+
+    except Exception as e:
+        conn.rollback()
+        logger.error(f"Migration failed: {e}")
+        return False, f"Migration failed: {str(e)}"
+    finally:
+        conn.close()
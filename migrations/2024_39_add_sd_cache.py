@@ -0,0 +1,70 @@
+"""Add sd_account_cache and sd_lineup_maps tables.
+
+Schedules Direct tokens and account status are cached per SD account, and
+lineup maps per lineup until its 'modified' timestamp changes, so browsing
+the Schedules Direct pages doesn't request a new token and lineup every time.
+"""
+
+import logging
+import sqlite3
+
+logger = logging.getLogger(__name__)
+
+
+def migrate(db_path):
+    """Create sd_account_cache and sd_lineup_maps tables."""
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+
+    try:
+        created = []
+
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='sd_account_cache'")
+        if not cursor.fetchone():
+            logger.info("Creating sd_account_cache table")
+            cursor.execute(
+                """
+                CREATE TABLE sd_account_cache (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    username VARCHAR(100) NOT NULL UNIQUE,
+                    password_hash VARCHAR(40),
+                    token VARCHAR(100),
+                    token_expires INTEGER,
+                    status TEXT,
+                    status_fetched_at DATETIME,
+                    updated_at DATETIME
+                )
+                """
+            )
+            created.append("sd_account_cache")
+
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='sd_lineup_maps'")
+        if not cursor.fetchone():
+            logger.info("Creating sd_lineup_maps table")
+            cursor.execute(
+                """
+                CREATE TABLE sd_lineup_maps (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    lineup_id VARCHAR(100) NOT NULL UNIQUE,
+                    modified VARCHAR(30),
+                    data TEXT,
+                    fetched_at DATETIME
+                )
+                """
+            )
+            created.append("sd_lineup_maps")
+
+        if not created:
+            logger.info("Schedules Direct cache tables already exist")
+            return True, "Tables sd_account_cache and sd_lineup_maps already exist, skipping"
+
+        conn.commit()
+        logger.info(f"Created {', '.join(created)}")
+        return True, f"Created {', '.join(created)}"
+
+    except Exception as e:
+        conn.rollback()
+        logger.error(f"Migration failed: {e}")
+        return False, f"Migration failed: {str(e)}"
+    finally:
+        conn.close()
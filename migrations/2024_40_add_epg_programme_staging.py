@@ -0,0 +1,52 @@
+"""Add epg_programme_staging table.
+
+EPG source syncs write the programmes they parse to this table, committing
+each batch, and swap them into epg_programmes in one short transaction at the
+end. The write lock is no longer held while a guide downloads and parses.
+"""
+
+import logging
+import sqlite3
+
+logger = logging.getLogger(__name__)
+
+
+def migrate(db_path):
+    """Create epg_programme_staging table."""
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='epg_programme_staging'")
+        if cursor.fetchone():
+            logger.info("epg_programme_staging table already exists")
+            return True, "Table epg_programme_staging already exists, skipping"
+
+        logger.info("Creating epg_programme_staging table")
+        cursor.execute(
+            """
+            CREATE TABLE epg_programme_staging (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                source_id INTEGER NOT NULL REFERENCES epg_sources(id),
+                channel_id VARCHAR(100) NOT NULL,
+                start_time DATETIME NOT NULL,
+                stop_time DATETIME,
+                start VARCHAR(32) NOT NULL,
+                stop VARCHAR(32),
+                title VARCHAR(500),
+                body TEXT
+            )
+            """
+        )
+        cursor.execute("CREATE INDEX ix_epg_programme_staging_source_id ON epg_programme_staging (source_id)")
+
+        conn.commit()
+        logger.info("Created epg_programme_staging table")
+        return True, "Created epg_programme_staging table"
+
+    except Exception as e:
+        conn.rollback()
+        logger.error(f"Migration failed: {e}")
+        return False, f"Migration failed: {str(e)}"
+    finally:
+        conn.close()
@@ -2,13 +2,25 @@
 Database models for IPTV Proxy
 """
 
+import re
 from datetime import datetime
 
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event, inspect
 
 db = SQLAlchemy()
 
 
+def slugify(text):
+    """Convert text to URL-safe slug."""
+    # Convert to lowercase and replace spaces/special chars with hyphens
+    text = text.lower().strip()
+    text = re.sub(r"[^\w\s-]", "", text)  # Remove non-word chars except hyphens
+    text = re.sub(r"[\s_]+", "-", text)  # Replace spaces/underscores with hyphens
+    text = re.sub(r"-+", "-", text)  # Collapse multiple hyphens
+    return text.strip("-")
+
+
 class SyncMetadata(db.Model):  # type: ignore[name-defined]
     """Stores scheduler sync state to persist across restarts"""
 
@@ -248,6 +260,7 @@ class Channel(db.Model):  # type: ignore[name-defined]
     category_id = db.Column(db.Integer, db.ForeignKey("categories.id"), nullable=True, index=True)
     stream_type = db.Column(db.String(20))  # live, movie, series
     stream_icon = db.Column(db.String(500))
+    icon_hash = db.Column(db.String(64))  # Icon proxy hash of stream_icon (kept in sync, see _update_icon_hash)
     epg_channel_id = db.Column(db.String(100))
     added = db.Column(db.String(50))
     custom_sid = db.Column(db.String(50))
@@ -260,6 +273,11 @@ class Channel(db.Model):  # type: ignore[name-defined]
     is_active = db.Column(db.Boolean, default=True)
     is_visible = db.Column(db.Boolean, default=True)  # Pre-computed filter result
     is_ppv = db.Column(db.Boolean, default=False, index=True)  # PPV channel (set at sync based on category)
+
+    # Pre-computed duplicate collapsing data (set after tag processing, see QualityService)
+    quality_score = db.Column(db.Integer, default=0)  # Sum of quality tag ranks
+    duplicate_group = db.Column(db.String(500))  # Normalized cleaned name shared by duplicates
+
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -272,12 +290,28 @@ class Channel(db.Model):  # type: ignore[name-defined]
         db.Index("idx_channel_account", "account_id"),
         db.Index("idx_channel_name", "name"),
         db.Index("idx_channel_category", "category_id"),
+        db.Index("idx_channel_duplicate_group", "duplicate_group"),
     )
 
     def __repr__(self):
         return f"<Channel {self.name} (account={self.account_id})>"
 
 
+@event.listens_for(Channel.stream_icon, "set")
+def _update_icon_hash(target, value, oldvalue, _initiator):
+    """Recompute the icon proxy hash whenever stream_icon changes.
+
+    Playlist rendering uses the stored hash for /icon/<hash> URLs instead of
+    hashing every icon URL per request.
+    """
+    if value == oldvalue:
+        return
+
+    from services.image_cache_service import ImageCacheService
+
+    target.icon_hash = ImageCacheService.get_icon_hash(value)
+
+
 class Tag(db.Model):  # type: ignore[name-defined]
     """Tags extracted from channels"""
 
@@ -411,6 +445,8 @@ class PlaylistConfig(db.Model):  # type: ignore[name-defined]
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
+    # URL slug derived from name (kept in sync on insert/update, see _assign_playlist_slug)
+    slug = db.Column(db.String(200))
     description = db.Column(db.Text)
 
     # Account filters (JSON array of account IDs to include/exclude)
@@ -424,14 +460,77 @@ class PlaylistConfig(db.Model):  # type: ignore[name-defined]
     # Combination mode: "all" (must have all include_tags) or "any" (must have at least one)
     tag_match_mode = db.Column(db.String(10), default="any")  # all, any
 
+    # Default EPG time window in hours around now (None = no limit; ?past_hours/?future_hours override)
+    epg_past_hours = db.Column(db.Integer)
+    epg_future_hours = db.Column(db.Integer)
+
     enabled = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    __table_args__ = (db.Index("idx_playlist_config_slug", "slug", unique=True),)
+
     def __repr__(self):
         return f"<PlaylistConfig {self.name}>"
 
 
+@event.listens_for(PlaylistConfig, "before_insert")
+@event.listens_for(PlaylistConfig, "before_update")
+def _assign_playlist_slug(_mapper, connection, target):
+    """Derive a unique slug from the playlist name whenever the name changes.
+
+    Names that slugify identically get a numeric suffix ("sports", "sports-2", ...)
+    so every playlist stays addressable via /playlist/config/<slug>.m3u.
+    """
+    if target.slug and not inspect(target).attrs.name.history.has_changes():
+        return
+
+    base = slugify(target.name or "") or "playlist"
+    table = PlaylistConfig.__table__
+    query = db.select(table.c.slug).where(table.c.slug.like(f"{base}%"))
+    if target.id is not None:
+        query = query.where(table.c.id != target.id)
+    taken = {row[0] for row in connection.execute(query)}
+
+    slug = base
+    suffix = 2
+    while slug in taken:
+        slug = f"{base}-{suffix}"
+        suffix += 1
+    target.slug = slug
+
+
+class PlaylistProfile(db.Model):  # type: ignore[name-defined]
+    """Named M3U output profile for a client/device (selected with ?profile=<name>)"""
+
+    __tablename__ = "playlist_profiles"
+
+    URL_STYLE_AUTO = "auto"  # Proxy only for accounts with multiple credentials
+    URL_STYLE_PROXY = "proxy"  # Always use /stream/ proxy URLs
+    URL_STYLE_DIRECT = "direct"  # Always use provider URLs
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False, unique=True)
+    description = db.Column(db.Text)
+
+    # group-title template, e.g. "{category}" or "{account} - {category}" (None = default grouping)
+    group_title_format = db.Column(db.String(200))
+    proxy_icons = db.Column(db.Boolean, default=True)
+    url_style = db.Column(db.String(20), default=URL_STYLE_AUTO)  # auto, proxy, direct
+    collapse_duplicates = db.Column(db.Boolean, default=False)
+
+    # Optional EXTINF attributes
+    include_catchup = db.Column(db.Boolean, default=False)  # catchup="xc" catchup-days="N" for archive channels
+    include_chno = db.Column(db.Boolean, default=False)  # tvg-chno numbered in playlist order
+    chno_start = db.Column(db.Integer, default=1)
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<PlaylistProfile {self.name}>"
+
+
 # ============================================================================
 # EPG (Electronic Program Guide) Models
 # ============================================================================
@@ -452,6 +551,10 @@ class EpgSource(db.Model):  # type: ignore[name-defined]
 
     # For external URL sources
     url = db.Column(db.String(500))
+    # Validators of the last synced download: unchanged guides are skipped
+    etag = db.Column(db.String(200))  # ETag response header (sent as If-None-Match)
+    last_modified = db.Column(db.String(100))  # Last-Modified response header (sent as If-Modified-Since)
+    content_hash = db.Column(db.String(64))  # SHA-256 of the downloaded body
 
     # For Schedules Direct
     sd_username = db.Column(db.String(100))
@@ -511,6 +614,9 @@ class EpgChannel(db.Model):  # type: ignore[name-defined]
     first_program = db.Column(db.DateTime)  # Earliest program start time
     last_program = db.Column(db.DateTime)  # Latest program end time
 
+    # SHA-256 of the synced fields above, to skip rewriting unchanged channels
+    content_hash = db.Column(db.String(64))
+
     last_seen = db.Column(db.DateTime, default=datetime.utcnow)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -525,6 +631,52 @@ class EpgChannel(db.Model):  # type: ignore[name-defined]
         return f"<EpgChannel {self.channel_id} ({self.display_name})>"
 
 
+class EpgProgramme(db.Model):  # type: ignore[name-defined]
+    """Programme listings stored from EPG source syncs"""
+
+    __tablename__ = "epg_programmes"
+
+    id = db.Column(db.Integer, primary_key=True)
+    epg_channel_id = db.Column(db.Integer, db.ForeignKey("epg_channels.id", ondelete="CASCADE"), nullable=False)
+
+    # Normalized UTC times for range queries
+    start_time = db.Column(db.DateTime, nullable=False)
+    stop_time = db.Column(db.DateTime)
+
+    # Original XMLTV start/stop attributes (with timezone offset), used for output
+    start = db.Column(db.String(32), nullable=False)
+    stop = db.Column(db.String(32))
+
+    title = db.Column(db.String(500))
+    # Serialized child elements of the XMLTV <programme> (title, desc, category, ...)
+    body = db.Column(db.Text)
+
+    __table_args__ = (db.Index("idx_epg_programme_channel_start", "epg_channel_id", "start_time"),)
+
+    def __repr__(self):
+        return f"<EpgProgramme {self.epg_channel_id} {self.start} ({self.title})>"
+
+
+class EpgProgrammeStaging(db.Model):  # type: ignore[name-defined]
+    """Programmes of an EPG source sync in progress, swapped into epg_programmes once the guide is complete"""
+
+    __tablename__ = "epg_programme_staging"
+
+    id = db.Column(db.Integer, primary_key=True)
+    source_id = db.Column(db.Integer, db.ForeignKey("epg_sources.id"), nullable=False, index=True)
+    channel_id = db.Column(db.String(100), nullable=False)  # XMLTV channel id (EpgChannel rows may not exist yet)
+
+    start_time = db.Column(db.DateTime, nullable=False)
+    stop_time = db.Column(db.DateTime)
+    start = db.Column(db.String(32), nullable=False)
+    stop = db.Column(db.String(32))
+    title = db.Column(db.String(500))
+    body = db.Column(db.Text)
+
+    def __repr__(self):
+        return f"<EpgProgrammeStaging {self.source_id} {self.channel_id} {self.start}>"
+
+
 class ChannelEpgMapping(db.Model):  # type: ignore[name-defined]
     """Manual or automatic mappings between our channels and EPG channels"""
 
@@ -626,6 +778,83 @@ class SdStation(db.Model):  # type: ignore[name-defined]
         return f"<SdStation {self.callsign} ({self.name})>"
 
 
+class SdScheduleMd5(db.Model):  # type: ignore[name-defined]
+    """Last synced Schedules Direct schedule MD5 per station and day"""
+
+    __tablename__ = "sd_schedule_md5s"
+
+    id = db.Column(db.Integer, primary_key=True)
+    epg_source_id = db.Column(db.Integer, db.ForeignKey("epg_sources.id"), nullable=False, index=True)
+    station_id = db.Column(db.String(50), nullable=False)  # SD station ID
+    date = db.Column(db.String(10), nullable=False)  # Schedule day (YYYY-MM-DD, UTC)
+    md5 = db.Column(db.String(32), nullable=False)
+    last_modified = db.Column(db.String(30))  # lastModified reported by SD
+
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (db.UniqueConstraint("epg_source_id", "station_id", "date", name="_sd_schedule_md5_uc"),)
+
+    def __repr__(self):
+        return f"<SdScheduleMd5 {self.station_id} {self.date}>"
+
+
+class SdProgram(db.Model):  # type: ignore[name-defined]
+    """Schedules Direct programme data, rendered for XMLTV output and shared by all SD sources"""
+
+    __tablename__ = "sd_programs"
+
+    id = db.Column(db.Integer, primary_key=True)
+    program_id = db.Column(db.String(14), unique=True, nullable=False)  # SD programID (e.g. "EP012345670001")
+    md5 = db.Column(db.String(32), nullable=False)  # SD programme MD5 the data was fetched at
+
+    title = db.Column(db.String(500))
+    # Serialized child elements of the XMLTV <programme> (title, sub-title, desc, ...)
+    body = db.Column(db.Text)
+
+    last_seen = db.Column(db.DateTime, default=datetime.utcnow)  # Last referenced by a synced schedule
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<SdProgram {self.program_id}>"
+
+
+class SdAccountCache(db.Model):  # type: ignore[name-defined]
+    """Cached Schedules Direct token and account status, shared by every client of an SD account"""
+
+    __tablename__ = "sd_account_cache"
+
+    id = db.Column(db.Integer, primary_key=True)
+    username = db.Column(db.String(100), unique=True, nullable=False)
+    password_hash = db.Column(db.String(40))  # SHA1 the token was issued for; a new password invalidates it
+
+    token = db.Column(db.String(100))
+    token_expires = db.Column(db.Integer)  # Unix epoch time
+
+    status = db.Column(db.Text)  # JSON response of the status endpoint (account info and lineups)
+    status_fetched_at = db.Column(db.DateTime)
+
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<SdAccountCache {self.username}>"
+
+
+class SdLineupMap(db.Model):  # type: ignore[name-defined]
+    """Cached Schedules Direct lineup map, valid while the lineup's modified timestamp is unchanged"""
+
+    __tablename__ = "sd_lineup_maps"
+
+    id = db.Column(db.Integer, primary_key=True)
+    lineup_id = db.Column(db.String(100), unique=True, nullable=False)  # SD lineup ID (e.g., "USA-NY12345-X")
+    modified = db.Column(db.String(30))  # Lineup 'modified' from the status endpoint when fetched
+    data = db.Column(db.Text)  # JSON response of lineups/<lineup_id>
+
+    fetched_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<SdLineupMap {self.lineup_id}>"
+
+
 class CachedImage(db.Model):  # type: ignore[name-defined]
     """Cached image metadata for icon/logo proxy
 
@@ -12,6 +12,7 @@ from services.cache_service import CacheService
 from services.connection_manager import ConnectionManager
 from services.iptv_service import IPTVService
 from services.tag_service import TagService
+from services.xmltv_cache_service import XmltvCacheService
 
 logger = logging.getLogger(__name__)
 
@@ -171,6 +172,7 @@ def delete_account(account_id):
 
     # Clear cache first
     cache_service.clear_account_cache(account_id)
+    XmltvCacheService.delete_account(account_id)
 
     # Delete account (cascade will handle filters, channels, credentials, etc.)
     db.session.delete(account)
@@ -375,6 +377,12 @@ def _process_tags_for_account(account_id, streams, categories):
                 db.session.add(channel_tag)
 
     db.session.commit()
+
+    # Refresh pre-computed quality scores used for duplicate collapsing
+    from services.quality_service import QualityService
+
+    QualityService.update_duplicate_groups(account_id)
+
     logger.info(f"Auto-processed tags for account {account_id}")
 
 
@@ -819,18 +827,24 @@ def preview_account_playlist(account_id):
     offset = request.args.get("offset", 0, type=int)
 
     if collapse_duplicates:
-        # For duplicate collapsing, we need to load ALL matching channels first
-        # to properly group and collapse them, then paginate the result
-        all_channels = base_query.all()
+        # Collapse in SQL using pre-computed quality scores and duplicate groups,
+        # then paginate the collapsed result
+        from services.quality_service import QualityService
+
+        collapsed_query = QualityService.collapse_query(base_query)
+        total = collapsed_query.count()
+        channels = collapsed_query.limit(limit).offset(offset).all()
 
-        # Get ALL channel IDs for batch tag loading
-        all_channel_ids = [ch.stream_id for ch in all_channels]
+        # Alternates are only needed for the channels on this page
+        alternates = QualityService.get_alternates(base_query, channels)
 
-        # Load tags for ALL channels in batches
+        # Load tags for page channels and their alternates in batch
+        channel_ids = [ch.stream_id for ch in channels]
+        channel_ids.extend(alt.stream_id for group in alternates.values() for alt in group)
         tags_map = {}
         batch_size = 500
-        for i in range(0, len(all_channel_ids), batch_size):
-            batch = all_channel_ids[i : i + batch_size]
+        for i in range(0, len(channel_ids), batch_size):
+            batch = channel_ids[i : i + batch_size]
             channel_tags_query = (
                 db.session.query(ChannelTag.stream_id, Tag.name)
                 .join(Tag)
@@ -841,33 +855,37 @@ def preview_account_playlist(account_id):
                     tags_map[stream_id] = []
                 tags_map[stream_id].append(tag_name)
 
-        # Build channel dictionaries for collapsing
-        channel_dicts = [
-            {
-                "id": ch.id,
-                "stream_id": ch.stream_id,
-                "account_id": ch.account_id,
-                "name": ch.name,
-                "cleaned_name": ch.cleaned_name if ch.cleaned_name is not None else ch.name,
-                "category": ch.category.category_name if ch.category else "Uncategorized",
-                "category_id": ch.category_id,
-                "icon": ch.stream_icon,
-                "is_visible": ch.is_visible,
-                "tags": tags_map.get(ch.stream_id, []),
-            }
-            for ch in all_channels
-        ]
-
-        # Collapse duplicates
-        from services.quality_service import QualityService
-
-        collapsed_channels = QualityService.collapse_duplicates(channel_dicts)
-
-        # Get total after collapsing
-        total = len(collapsed_channels)
-
-        # Apply pagination to collapsed results
-        paginated_channels = collapsed_channels[offset : offset + limit]
+        paginated_channels = []
+        for ch in channels:
+            group = alternates.get(ch.duplicate_group or QualityService.get_duplicate_group(ch.cleaned_name or ch.name))
+            paginated_channels.append(
+                {
+                    "id": ch.id,
+                    "stream_id": ch.stream_id,
+                    "account_id": ch.account_id,
+                    "name": ch.name,
+                    "cleaned_name": ch.cleaned_name if ch.cleaned_name is not None else ch.name,
+                    "category": ch.category.category_name if ch.category else "Uncategorized",
+                    "category_id": ch.category_id,
+                    "icon": ch.stream_icon,
+                    "is_visible": ch.is_visible,
+                    "tags": tags_map.get(ch.stream_id, []),
+                    "duplicate_count": len(group) if group else 0,
+                    "collapsed_from": (
+                        [
+                            {
+                                "stream_id": alt.stream_id,
+                                "name": alt.name,
+                                "tags": tags_map.get(alt.stream_id, []),
+                                "quality_score": alt.quality_score or 0,
+                            }
+                            for alt in group
+                        ]
+                        if group
+                        else None
+                    ),
+                }
+            )
 
         return jsonify(
             {
@@ -878,7 +896,7 @@ def preview_account_playlist(account_id):
                 "using_database": True,
                 "filter_tags": filter_tags,
                 "collapse_duplicates": True,
-                "duplicates_collapsed": len(all_channels) - total,
+                "duplicates_collapsed": base_query.count() - total,
             }
         )
     else:
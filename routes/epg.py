@@ -11,9 +11,12 @@ from flask import Blueprint, jsonify, request
 from error_handling import handle_errors
 from models import Account, ChannelEpgMapping, EpgChannel, EpgSource, SdLineup, SdStation, db
 from services.epg_match_rules_service import EpgMatchRulesService
-from services.epg_service import EpgService, make_sd_xmltv_id, normalize_xmltv_url
-from services.iptv_service import IPTVService
+from services.epg_service import EpgService, make_sd_xmltv_id
+from services.programme_service import ProgrammeService
 from services.schedules_direct import SchedulesDirectClient, SchedulesDirectError, validate_credentials
+from services.sd_cache_service import SdCacheService
+from services.sd_sync_service import SdSyncService
+from services.xmltv_cache_service import XmltvCacheService
 
 logger = logging.getLogger(__name__)
 
@@ -26,6 +29,20 @@ epg_bp = Blueprint("epg", __name__)
 # ============================================================================
 
 
+def _get_sd_client(source: EpgSource) -> SchedulesDirectClient:
+    """
+    Create an authenticated Schedules Direct client for a source.
+
+    Reuses the SD account's cached token, so most requests don't authenticate.
+
+    Raises:
+        SchedulesDirectError: If authentication fails
+    """
+    client = SchedulesDirectClient(source.sd_username, source.sd_password)
+    SdCacheService.authenticate(client, source.sd_username, source.sd_password)
+    return client
+
+
 def _sync_sd_channels_to_epg(source: EpgSource, channels: List[Dict]) -> Dict:
     """
     Sync Schedules Direct channels to EpgChannel records.
@@ -231,6 +248,9 @@ def update_epg_source(source_id):
     if "name" in data:
         source.name = data["name"]
     if "url" in data:
+        if data["url"] != source.url:
+            # A different URL must be downloaded and synced in full
+            source.etag = source.last_modified = source.content_hash = None
         source.url = data["url"]
     if "priority" in data:
         source.priority = data["priority"]
@@ -264,6 +284,9 @@ def delete_epg_source(source_id):
     """Delete an EPG source and all its channels"""
     source = EpgSource.query.get_or_404(source_id)
 
+    # Programmes are removed in bulk rather than loaded through the ORM cascade
+    ProgrammeService.delete_source_programmes(source.id)
+    SdSyncService.delete_source_state(source.id)
     db.session.delete(source)
     db.session.commit()
 
@@ -357,18 +380,14 @@ def sync_epg_source(source_id):
         if not source.account:
             return jsonify({"error": "Provider source has no associated account"}), 400
 
-        # Get XMLTV from provider
+        # Refresh the local XMLTV copy from the provider (conditional GET)
         account = source.account
-        cred = account.get_primary_credential()
-        if cred:
-            service = IPTVService(account.server, cred.username, cred.password, account.user_agent or "okhttp/3.14.9")
-        else:
-            service = IPTVService(
-                account.server, account.username, account.password, account.user_agent or "okhttp/3.14.9"
-            )
-
-        xml_content = service.get_xmltv()
-        stats = EpgService.sync_epg_source(source, xml_content)
+        XmltvCacheService.refresh_account(account)
+        cached = XmltvCacheService.open_account_xmltv(account)
+        if cached is None:
+            return jsonify({"error": "No cached XMLTV available for this account"}), 502
+        with cached:
+            stats = EpgService.sync_epg_source(source, cached)
 
         # Update PPV channel visibility for this account
         try:
@@ -389,26 +408,15 @@ def sync_epg_source(source_id):
         if not source.url:
             return jsonify({"error": "No URL configured for this source"}), 400
 
-        import requests
-
-        # Normalize URL (e.g., convert GitHub blob URLs to raw URLs)
-        url = normalize_xmltv_url(source.url)
-        if url != source.url:
-            logger.info(f"Normalized XMLTV URL: {source.url} -> {url}")
-
-        # Use 10 minute timeout for large XMLTV files from rate-limited servers
-        response = requests.get(url, timeout=600)
-        response.raise_for_status()
+        # ?force=true re-syncs even if the guide is unchanged since the last sync
+        force = request.args.get("force", "false").lower() == "true"
+        stats = EpgService.sync_xmltv_url_source(source, force=force)
 
-        stats = EpgService.sync_epg_source(source, response.content)
-
-        return jsonify(
-            {
-                "success": True,
-                "message": f"Synced {stats['channels_added'] + stats['channels_updated']} channels",
-                "stats": stats,
-            }
-        )
+        if stats.get("not_modified"):
+            message = "EPG source unchanged since last sync"
+        else:
+            message = f"Synced {stats['channels_added'] + stats['channels_updated']} channels"
+        return jsonify({"success": True, "message": message, "stats": stats})
 
     elif source.source_type == "schedules_direct":
         # Validate SD credentials are configured
@@ -420,11 +428,11 @@ def sync_epg_source(source_id):
 
         try:
             # Initialize SD client and authenticate
-            sd_client = SchedulesDirectClient(source.sd_username, source.sd_password)
-            sd_client.authenticate()
+            sd_client = _get_sd_client(source)
 
-            # Get channels from the configured lineup
-            channels = sd_client.get_lineup_channels(source.sd_lineup)
+            # Get channels from the configured lineup (map reused while the lineup is unmodified)
+            lineup_map = SdCacheService.get_lineup_map(sd_client, source.sd_username, source.sd_lineup)
+            channels = sd_client.get_lineup_channels(source.sd_lineup, lineup_map)
 
             if not channels:
                 source.last_sync = db.func.now()
@@ -436,12 +444,18 @@ def sync_epg_source(source_id):
             # Sync channels to EpgChannel records
             stats = _sync_sd_channels_to_epg(source, channels)
 
+            # Download only the schedules and programmes that changed since the last sync
+            station_ids = [channel["stationID"] for channel in channels if channel.get("stationID")]
+            stats.update(SdSyncService.sync_schedules(source, sd_client, station_ids))
+
             source.last_sync = db.func.now()
             source.last_sync_status = "success"
             source.last_sync_message = (
-                f"Synced {stats['channels_added'] + stats['channels_updated']} channels from Schedules Direct"
+                f"Synced {stats['channels_added'] + stats['channels_updated']} channels and "
+                f"{stats['programmes_stored']} programmes from Schedules Direct"
             )
             source.channel_count = stats["channels_added"] + stats["channels_updated"]
+            SdCacheService.save_token(sd_client, source.sd_username, source.sd_password)
             db.session.commit()
 
             return jsonify(
@@ -467,32 +481,22 @@ def sync_epg_source(source_id):
         if not source.xmltv_grabber:
             return jsonify({"error": "No XMLTV grabber configured for this source"}), 400
 
-        # Parse extra args if provided
-        extra_args = None
-        if source.xmltv_extra_args:
-            import json
-
-            try:
-                extra_args = json.loads(source.xmltv_extra_args)
-            except json.JSONDecodeError:
-                logger.warning(f"Invalid xmltv_extra_args for source {source_id}")
-
-        success, xml_content, error = XmltvGrabberService.run_grabber(
-            grabber_name=source.xmltv_grabber,
-            config_name=source.xmltv_config_name,
-            days=source.xmltv_days or 7,
-            offset=source.xmltv_offset or 0,
-            extra_args=extra_args,
+        # The grabber's output is written to the store while it runs, and only
+        # committed once the grabber has exited successfully
+        success, stats, error = XmltvGrabberService.run_grabber_streaming(
+            consume=lambda output: EpgService.sync_epg_source(source, output, commit=False),
+            **XmltvGrabberService.get_source_grabber_args(source),
         )
 
         if not success:
+            db.session.rollback()
             source.last_sync = db.func.now()
             source.last_sync_status = "error"
             source.last_sync_message = error
             db.session.commit()
             return jsonify({"error": f"XMLTV grabber failed: {error}"}), 500
 
-        stats = EpgService.sync_epg_source(source, xml_content)
+        db.session.commit()
 
         return jsonify(
             {
@@ -1049,16 +1053,12 @@ def create_account_epg_source(account_id):
     # Optionally sync immediately
     if request.args.get("sync", "false").lower() == "true":
         account = source.account
-        cred = account.get_primary_credential()
-        if cred:
-            service = IPTVService(account.server, cred.username, cred.password, account.user_agent or "okhttp/3.14.9")
-        else:
-            service = IPTVService(
-                account.server, account.username, account.password, account.user_agent or "okhttp/3.14.9"
-            )
-
-        xml_content = service.get_xmltv()
-        stats = EpgService.sync_epg_source(source, xml_content)
+        XmltvCacheService.refresh_account(account)
+        cached = XmltvCacheService.open_account_xmltv(account)
+        if cached is None:
+            return jsonify({"error": "No cached XMLTV available for this account"}), 502
+        with cached:
+            stats = EpgService.sync_epg_source(source, cached)
 
         return jsonify(
             {
@@ -1131,10 +1131,11 @@ def search_sd_lineups():
         return jsonify({"success": False, "error": "Source does not have SD credentials configured"}), 400
 
     try:
-        client = SchedulesDirectClient(source.sd_username, source.sd_password)
-        client.authenticate()
+        client = _get_sd_client(source)
 
         lineups = client.search_lineups(country=country, postalcode=postalcode)
+        SdCacheService.save_token(client, source.sd_username, source.sd_password)
+        db.session.commit()
 
         return jsonify(
             {
@@ -1179,9 +1180,10 @@ def get_sd_lineups():
     max_lineups = 4  # SD default limit
     try:
         if source.sd_username and source.sd_password:
-            client = SchedulesDirectClient(source.sd_username, source.sd_password)
-            client.authenticate()
-            status = client.get_status()
+            client = _get_sd_client(source)
+            status = SdCacheService.get_status(client, source.sd_username)
+            SdCacheService.save_token(client, source.sd_username, source.sd_password)
+            db.session.commit()
             account_lineups = len(status.get("lineups", []))
             account_info = status.get("account", {})
             max_lineups = account_info.get("maxLineups", 4)
@@ -1240,9 +1242,10 @@ def add_sd_lineup():
     # Check SD account lineup limit before adding
     try:
         if source.sd_username and source.sd_password:
-            client = SchedulesDirectClient(source.sd_username, source.sd_password)
-            client.authenticate()
-            status = client.get_status()
+            client = _get_sd_client(source)
+            status = SdCacheService.get_status(client, source.sd_username)
+            # Cached with the new lineup below
+            SdCacheService.save_token(client, source.sd_username, source.sd_password)
             account_lineups = status.get("lineups", [])
             account_info = status.get("account", {})
             max_lineups = account_info.get("maxLineups", 4)
@@ -1342,24 +1345,27 @@ def sync_sd_lineup_impl(source: EpgSource, lineup: SdLineup) -> dict:
     """Implementation of SD lineup sync"""
     from datetime import datetime
 
-    client = SchedulesDirectClient(source.sd_username, source.sd_password)
-    client.authenticate()
+    client = _get_sd_client(source)
 
-    # First, try to add the lineup to the SD account (if not already added)
+    # First, add the lineup to the SD account if it isn't on it yet
     # This is required before we can fetch channel data
-    try:
-        client.add_lineup(lineup.lineup_id)
-        logger.info(f"Added lineup {lineup.lineup_id} to SD account")
-    except SchedulesDirectError as e:
-        # Code 2100 = DUPLICATE_LINEUP means it's already added, which is fine
-        if e.code != 2100:
-            logger.warning(f"Could not add lineup to SD account: {e}")
-            # Re-raise if it's a more serious error
-            if e.code not in (2100, 2102):  # 2102 = UNKNOWN_LINEUP (might work anyway)
-                raise
-
-    # Get channels from SD
-    channels = client.get_lineup_channels(lineup.lineup_id)
+    if SdCacheService.get_lineup_modified(client, source.sd_username, lineup.lineup_id) is None:
+        try:
+            client.add_lineup(lineup.lineup_id)
+            logger.info(f"Added lineup {lineup.lineup_id} to SD account")
+        except SchedulesDirectError as e:
+            # Code 2100 = DUPLICATE_LINEUP means it's already added, which is fine
+            if e.code != 2100:
+                logger.warning(f"Could not add lineup to SD account: {e}")
+                # Re-raise if it's a more serious error
+                if e.code not in (2100, 2102):  # 2102 = UNKNOWN_LINEUP (might work anyway)
+                    raise
+        # The account's lineups changed
+        SdCacheService.invalidate_status(source.sd_username)
+
+    # Get channels from SD (map reused while the lineup is unmodified)
+    lineup_map = SdCacheService.get_lineup_map(client, source.sd_username, lineup.lineup_id)
+    channels = client.get_lineup_channels(lineup.lineup_id, lineup_map)
 
     channels_synced = 0
     channels_updated = 0
@@ -1399,6 +1405,7 @@ def sync_sd_lineup_impl(source: EpgSource, lineup: SdLineup) -> dict:
     lineup.channel_count = len(channels)
     lineup.last_sync = datetime.utcnow()
 
+    SdCacheService.save_token(client, source.sd_username, source.sd_password)
     db.session.commit()
 
     return {
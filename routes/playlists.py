@@ -3,16 +3,23 @@ Playlist configuration and M3U generation routes
 """
 import json
 import logging
-import re
 
-from flask import Blueprint, Response, jsonify, request
-
-from error_handling import ServiceUnavailableError, handle_errors
-from models import Account, Category, Channel, ChannelTag, PlaylistConfig, Settings, Tag, db
-from schemas import PlaylistConfigCreateSchema, validate_request_data
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+
+from error_handling import ServiceUnavailableError, ValidationError, handle_errors
+from models import Account, Category, Channel, PlaylistConfig, PlaylistProfile, Settings, db
+from schemas import (
+    MAX_EPG_WINDOW_HOURS,
+    PlaylistConfigCreateSchema,
+    PlaylistProfileCreateSchema,
+    PlaylistProfileUpdateSchema,
+    validate_request_data,
+)
 from services.cache_service import CacheService
-from services.image_cache_service import ImageCacheService
+from services.compression_service import CompressionService
+from services.epg_artifact_service import EpgArtifactService
 from services.iptv_service import IPTVService
+from services.playlist_service import PlaylistService, RenderOptions
 from services.tag_service import TagService
 
 logger = logging.getLogger(__name__)
@@ -21,16 +28,6 @@ logger = logging.getLogger(__name__)
 playlists_bp = Blueprint("playlists", __name__)
 
 
-def slugify(text):
-    """Convert text to URL-safe slug."""
-    # Convert to lowercase and replace spaces/special chars with hyphens
-    text = text.lower().strip()
-    text = re.sub(r"[^\w\s-]", "", text)  # Remove non-word chars except hyphens
-    text = re.sub(r"[\s_]+", "-", text)  # Replace spaces/underscores with hyphens
-    text = re.sub(r"-+", "-", text)  # Collapse multiple hyphens
-    return text.strip("-")
-
-
 def get_proxy_base_url():
     """Get the proxy base URL, using custom proxy hostname if configured."""
     proxy_hostname = Settings.get("proxy_hostname", "").strip()
@@ -57,13 +54,15 @@ def playlist_to_dict(c):
     return {
         "id": c.id,
         "name": c.name,
-        "slug": slugify(c.name),
+        "slug": c.slug,
         "description": c.description,
         "include_accounts": json.loads(c.include_accounts) if c.include_accounts else [],
         "exclude_accounts": json.loads(c.exclude_accounts) if c.exclude_accounts else [],
         "include_tags": json.loads(c.include_tags) if c.include_tags else [],
         "exclude_tags": json.loads(c.exclude_tags) if c.exclude_tags else [],
         "tag_match_mode": c.tag_match_mode,
+        "epg_past_hours": c.epg_past_hours,
+        "epg_future_hours": c.epg_future_hours,
         "enabled": c.enabled,
     }
 
@@ -89,6 +88,8 @@ def create_playlist_config():
         include_tags=json.dumps(data.get("include_tags", [])),
         exclude_tags=json.dumps(data.get("exclude_tags", [])),
         tag_match_mode=data.get("tag_match_mode", "any"),
+        epg_past_hours=data.get("epg_past_hours"),
+        epg_future_hours=data.get("epg_future_hours"),
         enabled=data.get("enabled", True),
     )
 
@@ -99,6 +100,7 @@ def create_playlist_config():
 
 
 @playlists_bp.route("/api/playlist-configs/<int:config_id>", methods=["PUT"])
+@handle_errors(return_json=True, default_message="Error updating playlist configuration")
 def update_playlist_config(config_id):
     """Update playlist configuration"""
     config = PlaylistConfig.query.get_or_404(config_id)
@@ -117,9 +119,13 @@ def update_playlist_config(config_id):
         config.exclude_tags = json.dumps(data["exclude_tags"])
 
     config.tag_match_mode = data.get("tag_match_mode", config.tag_match_mode)
+    for field in ("epg_past_hours", "epg_future_hours"):
+        if field in data:
+            setattr(config, field, _parse_window_hours(field, data[field]))
     config.enabled = data.get("enabled", config.enabled)
 
     db.session.commit()
+    EpgArtifactService.delete_config(config.id)
 
     return jsonify(playlist_to_dict(config))
 
@@ -131,6 +137,85 @@ def delete_playlist_config(config_id):
 
     db.session.delete(config)
     db.session.commit()
+    EpgArtifactService.delete_config(config_id)
+
+    return "", 204
+
+
+# ============================================================================
+# API Routes - Playlist Profiles CRUD
+# ============================================================================
+
+
+def profile_to_dict(p):
+    """Convert a PlaylistProfile to a dictionary."""
+    return {
+        "id": p.id,
+        "name": p.name,
+        "description": p.description,
+        "group_title_format": p.group_title_format,
+        "proxy_icons": p.proxy_icons,
+        "url_style": p.url_style,
+        "collapse_duplicates": p.collapse_duplicates,
+        "include_catchup": p.include_catchup,
+        "include_chno": p.include_chno,
+        "chno_start": p.chno_start,
+    }
+
+
+@playlists_bp.route("/api/playlist-profiles", methods=["GET"])
+def get_playlist_profiles():
+    """Get all playlist output profiles"""
+    profiles = PlaylistProfile.query.order_by(PlaylistProfile.name).all()
+    return jsonify([profile_to_dict(p) for p in profiles])
+
+
+@playlists_bp.route("/api/playlist-profiles", methods=["POST"])
+@validate_request_data(PlaylistProfileCreateSchema)
+def create_playlist_profile():
+    """Create new playlist output profile"""
+    data = request.validated_data
+
+    # Check for duplicate name
+    if PlaylistProfile.query.filter(db.func.lower(PlaylistProfile.name) == data["name"].lower()).first():
+        return jsonify({"error": f"Profile with name '{data['name']}' already exists"}), 409
+
+    profile = PlaylistProfile(**data)
+    db.session.add(profile)
+    db.session.commit()
+
+    return jsonify(profile_to_dict(profile)), 201
+
+
+@playlists_bp.route("/api/playlist-profiles/<int:profile_id>", methods=["PUT"])
+@validate_request_data(PlaylistProfileUpdateSchema)
+def update_playlist_profile(profile_id):
+    """Update playlist output profile"""
+    profile = PlaylistProfile.query.get_or_404(profile_id)
+    data = request.validated_data
+
+    if "name" in data:
+        existing = PlaylistProfile.query.filter(
+            db.func.lower(PlaylistProfile.name) == data["name"].lower(), PlaylistProfile.id != profile_id
+        ).first()
+        if existing:
+            return jsonify({"error": f"Profile with name '{data['name']}' already exists"}), 409
+
+    for field, value in data.items():
+        setattr(profile, field, value)
+
+    db.session.commit()
+
+    return jsonify(profile_to_dict(profile))
+
+
+@playlists_bp.route("/api/playlist-profiles/<int:profile_id>", methods=["DELETE"])
+def delete_playlist_profile(profile_id):
+    """Delete playlist output profile"""
+    profile = PlaylistProfile.query.get_or_404(profile_id)
+
+    db.session.delete(profile)
+    db.session.commit()
 
     return "", 204
 
@@ -267,7 +352,9 @@ def generate_playlist(account_id):
     Query Parameters:
     - proxy: "true" to use proxy URLs for streams
     - collapse_duplicates: "true" to collapse duplicate channels keeping highest quality
-    - proxy_icons: "true" to proxy icon URLs through local cache (default: false)
+    - proxy_icons: "true" to proxy icon URLs through local cache (default: true)
+    - profile: name of a playlist profile supplying the defaults for the options above
+      plus group-title format, URL style and catchup/tvg-chno attributes
     """
     account = Account.query.get_or_404(account_id)
 
@@ -279,113 +366,60 @@ def generate_playlist(account_id):
     if channel_count == 0:
         raise ServiceUnavailableError("Account not synced. Please sync channels first.")
 
-    # Determine if we should use proxied URLs
-    # Proxy is used when: explicit ?proxy=true OR account has multiple credentials
-    use_proxy = request.args.get("proxy", "").lower() == "true"
-    if not use_proxy and hasattr(account, "credentials") and len(account.credentials) > 1:
-        use_proxy = True
-
-    # Check if we should collapse duplicates
-    collapse_duplicates = request.args.get("collapse_duplicates", "").lower() == "true"
+    # Resolve output options (named profile and/or query parameters) to a compiled renderer
+    options = _get_render_options()
+    renderer = PlaylistService.get_renderer(options)
 
-    # Check if we should proxy icons through local cache (default: true)
-    proxy_icons = request.args.get("proxy_icons", "true").lower() == "true"
+    # Cached channel list - only re-queried when the account's channel data changes
+    playlist = PlaylistService.get_account_playlist(account_id, options.collapse_duplicates)
+    artifact = PlaylistService.render(playlist, renderer, [account], get_proxy_base_url())
 
-    # Get proxy base URL (uses custom proxy hostname if configured)
-    proxy_base = get_proxy_base_url()
+    logger.info(
+        f"Generated playlist for account {account_id}: {len(playlist.entries)} channels "
+        f"(proxied={renderer.uses_proxy([account])}, collapsed={options.collapse_duplicates})"
+    )
+    return _compressed_response(artifact, "application/x-mpegurl")
 
-    # Initialize image cache if proxying icons
-    image_cache = ImageCacheService.get_instance() if proxy_icons else None
 
-    # Build base query - use pre-computed is_visible
-    query = (
-        db.session.query(Channel)
-        .filter(Channel.account_id == account_id, Channel.is_active, Channel.is_visible)
-        .join(Category, Channel.category_id == Category.id, isouter=True)
-    )
+def _compressed_response(body, mimetype):
+    """Build a playlist/EPG response compressed per the request's Accept-Encoding."""
+    return CompressionService.make_response(body, mimetype, request.headers.get("Accept-Encoding"))
 
-    # Get all matching channels
-    channels = query.order_by(Channel.name).all()
 
-    # If collapsing duplicates, load tags and collapse
-    if collapse_duplicates:
-        from services.quality_service import QualityService
+def _streamed_response(chunks, mimetype):
+    """Stream a generated EPG response, compressed per the request's Accept-Encoding."""
+    return CompressionService.make_streaming_response(
+        stream_with_context(chunks), mimetype, request.headers.get("Accept-Encoding")
+    )
 
-        # Load tags for all channels
-        channel_ids = [ch.stream_id for ch in channels]
-        tags_map = {}
-        batch_size = 500
-        for i in range(0, len(channel_ids), batch_size):
-            batch = channel_ids[i : i + batch_size]
-            channel_tags_query = (
-                db.session.query(ChannelTag.stream_id, Tag.name)
-                .join(Tag)
-                .filter(ChannelTag.account_id == account_id, ChannelTag.stream_id.in_(batch))
-            )
-            for stream_id, tag_name in channel_tags_query:
-                if stream_id not in tags_map:
-                    tags_map[stream_id] = []
-                tags_map[stream_id].append(tag_name)
 
-        # Build channel dicts for collapsing
-        channel_dicts = [
-            {
-                "channel": ch,
-                "stream_id": ch.stream_id,
-                "cleaned_name": ch.cleaned_name or ch.name,
-                "tags": tags_map.get(ch.stream_id, []),
-            }
-            for ch in channels
-        ]
-
-        # Collapse duplicates
-        collapsed = QualityService.collapse_duplicates(channel_dicts)
-        channels = [d["channel"] for d in collapsed]
-        logger.info(f"Collapsed {len(channel_dicts)} channels to {len(channels)} unique channels")
-
-    # Get primary credential for direct URL mode
-    primary_cred = account.get_primary_credential() if not use_proxy else None
-
-    # Generate M3U
-    m3u_lines = ["#EXTM3U"]
-    for channel in channels:
-        # Use cleaned name (pre-computed during sync)
-        display_name = channel.cleaned_name or channel.name
-        category_name = channel.category.category_name if channel.category else "Unknown"
-
-        # Always use standardized EPG ID format to prevent collisions across providers
-        tvg_id = f"ch-{account_id}-{channel.stream_id}"
-        original_icon = channel.stream_icon or ""
-
-        # Proxy icon URL if enabled
-        if proxy_icons and image_cache and original_icon:
-            tvg_logo = image_cache.get_proxy_url(original_icon, proxy_base)
-        else:
-            tvg_logo = original_icon
+def _get_render_options():
+    """Resolve playlist output options for the current request.
 
-        extinf = f'#EXTINF:-1 tvg-id="{tvg_id}" tvg-name="{display_name}" tvg-logo="{tvg_logo}" group-title="{category_name}",{display_name}'
+    A named profile (?profile=<name>) supplies the defaults; explicit proxy,
+    proxy_icons and collapse_duplicates query parameters override it.
+    """
+    profile_name = request.args.get("profile", "").strip()
+    if profile_name:
+        profile = PlaylistProfile.query.filter(db.func.lower(PlaylistProfile.name) == profile_name.lower()).first()
+        if not profile:
+            from flask import abort
+
+            abort(404, description=f"Playlist profile '{profile_name}' not found")
+        options = PlaylistService.options_from_profile(profile)
+    else:
+        options = RenderOptions()
 
-        if use_proxy:
-            # Use proxy URL for multiplexed streaming
-            stream_url = f"{proxy_base}/stream/{account_id}/{channel.stream_id}.ts"
-        else:
-            # Direct URL to IPTV provider
-            cred = primary_cred
-            if cred:
-                stream_url = f"http://{account.server}/live/{cred.username}/{cred.password}/{channel.stream_id}.ts"
-            else:
-                # Fallback for legacy accounts without credentials
-                stream_url = (
-                    f"http://{account.server}/live/{account.username}/{account.password}/{channel.stream_id}.ts"
-                )
-
-        m3u_lines.append(extinf)
-        m3u_lines.append(stream_url)
+    overrides = {}
+    # Proxy is used when: explicit ?proxy=true OR (auto) account has multiple credentials
+    if request.args.get("proxy", "").lower() == "true":
+        overrides["url_style"] = PlaylistProfile.URL_STYLE_PROXY
+    if "collapse_duplicates" in request.args:
+        overrides["collapse_duplicates"] = request.args["collapse_duplicates"].lower() == "true"
+    if "proxy_icons" in request.args:
+        overrides["proxy_icons"] = request.args["proxy_icons"].lower() == "true"
 
-    logger.info(
-        f"Generated playlist for account {account_id}: {len(channels)} channels (proxied={use_proxy}, collapsed={collapse_duplicates})"
-    )
-    return Response("\n".join(m3u_lines), mimetype="application/x-mpegurl")
+    return options._replace(**overrides)
 
 
 # Keep old ID-based route for backward compatibility
@@ -402,22 +436,22 @@ def generate_playlist_from_config_by_id(config_id):
 def generate_playlist_from_config_by_name(slug):
     """Generate M3U playlist from config by name slug.
 
-    The slug is matched against the playlist name (case-insensitive, slugified).
+    The slug is matched case-insensitively against the stored playlist slug.
     """
-    # Find config by matching slugified name
-    configs = PlaylistConfig.query.all()
-    config = None
-    for c in configs:
-        if slugify(c.name) == slug.lower():
-            config = c
-            break
+    config = _get_config_by_slug(slug)
+    return _generate_playlist_from_config(config)
+
+
+def _get_config_by_slug(slug):
+    """Look up a playlist config by its persisted slug, aborting with 404 if missing."""
+    config = PlaylistConfig.query.filter_by(slug=slug.lower()).first()
 
     if not config:
         from flask import abort
 
         abort(404, description=f"Playlist '{slug}' not found")
 
-    return _generate_playlist_from_config(config)
+    return config
 
 
 def _generate_playlist_from_config(config):
@@ -430,26 +464,12 @@ def _generate_playlist_from_config(config):
     Query Parameters:
     - proxy: "true" to use proxy URLs for streams
     - collapse_duplicates: "true" to collapse duplicate channels keeping highest quality
-    - proxy_icons: "true" to proxy icon URLs through local cache (default: false)
+    - proxy_icons: "true" to proxy icon URLs through local cache (default: true)
+    - profile: name of a playlist profile supplying the defaults for the options above
     """
     if not config.enabled:
         raise PermissionError("Playlist configuration is disabled")
 
-    # Determine if we should use proxied URLs
-    use_proxy = request.args.get("proxy", "").lower() == "true"
-
-    # Check if we should collapse duplicates
-    collapse_duplicates = request.args.get("collapse_duplicates", "").lower() == "true"
-
-    # Check if we should proxy icons through local cache (default: true)
-    proxy_icons = request.args.get("proxy_icons", "true").lower() == "true"
-
-    # Get proxy base URL (uses custom proxy hostname if configured)
-    proxy_base = get_proxy_base_url()
-
-    # Initialize image cache if proxying icons
-    image_cache = ImageCacheService.get_instance() if proxy_icons else None
-
     # Parse config
     include_accounts = json.loads(config.include_accounts) if config.include_accounts else []
     exclude_accounts = json.loads(config.exclude_accounts) if config.exclude_accounts else []
@@ -473,158 +493,35 @@ def _generate_playlist_from_config(config):
         channel_count = Channel.query.filter_by(account_id=account.id, is_active=True).count()
         if channel_count == 0:
             unsynced_accounts.append(account.name)
-        # Auto-enable proxy for accounts with multiple credentials
-        if not use_proxy and hasattr(account, "credentials") and len(account.credentials) > 1:
-            use_proxy = True
 
     if unsynced_accounts:
         raise ServiceUnavailableError(
             f"The following accounts are not synced: {', '.join(unsynced_accounts)}. Please sync channels first."
         )
 
-    # Collect all channels from all accounts first (needed for cross-account collapsing)
-    all_channel_data = []
-
-    for account in accounts:
-        # Build query for channels from this account
-        # Use pre-computed is_visible (account-level filters already applied)
-        query = (
-            db.session.query(Channel)
-            .filter(Channel.account_id == account.id, Channel.is_active, Channel.is_visible)
-            .join(Category, Channel.category_id == Category.id, isouter=True)
-        )
-
-        # Apply tag filtering if specified
-        if include_tags or exclude_tags:
-            if include_tags:
-                tag_subquery = (
-                    db.session.query(ChannelTag.stream_id)
-                    .join(Tag, ChannelTag.tag_id == Tag.id)
-                    .filter(ChannelTag.account_id == account.id, Tag.name.in_(include_tags))
-                )
-
-                if config.tag_match_mode == "all":
-                    # Must have ALL include tags
-                    tag_counts = (
-                        db.session.query(
-                            ChannelTag.stream_id, db.func.count(db.func.distinct(Tag.id)).label("tag_count")
-                        )
-                        .join(Tag, ChannelTag.tag_id == Tag.id)
-                        .filter(ChannelTag.account_id == account.id, Tag.name.in_(include_tags))
-                        .group_by(ChannelTag.stream_id)
-                        .having(db.func.count(db.func.distinct(Tag.id)) == len(include_tags))
-                        .subquery()
-                    )
+    # Resolve output options (named profile and/or query parameters) to a compiled renderer
+    options = _get_render_options()
+    renderer = PlaylistService.get_renderer(options)
 
-                    query = query.filter(Channel.stream_id.in_(db.session.query(tag_counts.c.stream_id)))
-                else:  # 'any'
-                    query = query.filter(Channel.stream_id.in_(tag_subquery))
-
-            if exclude_tags:
-                # Must NOT have any exclude tags
-                exclude_subquery = (
-                    db.session.query(ChannelTag.stream_id)
-                    .join(Tag, ChannelTag.tag_id == Tag.id)
-                    .filter(ChannelTag.account_id == account.id, Tag.name.in_(exclude_tags))
-                )
-                query = query.filter(~Channel.stream_id.in_(exclude_subquery))
-
-        # Get all matching channels
-        channels = query.order_by(Channel.name).all()
-
-        # Load tags for these channels if collapsing is enabled
-        tags_map = {}
-        if collapse_duplicates:
-            channel_ids = [ch.stream_id for ch in channels]
-            batch_size = 500
-            for i in range(0, len(channel_ids), batch_size):
-                batch = channel_ids[i : i + batch_size]
-                channel_tags_query = (
-                    db.session.query(ChannelTag.stream_id, Tag.name)
-                    .join(Tag)
-                    .filter(ChannelTag.account_id == account.id, ChannelTag.stream_id.in_(batch))
-                )
-                for stream_id, tag_name in channel_tags_query:
-                    if stream_id not in tags_map:
-                        tags_map[stream_id] = []
-                    tags_map[stream_id].append(tag_name)
-
-        # Collect channel data with account info
-        for channel in channels:
-            all_channel_data.append(
-                {
-                    "channel": channel,
-                    "account": account,
-                    "stream_id": channel.stream_id,
-                    "cleaned_name": channel.cleaned_name or channel.name,
-                    "tags": tags_map.get(channel.stream_id, []),
-                }
-            )
-
-    # Apply duplicate collapsing across all accounts if enabled
-    if collapse_duplicates:
-        from services.quality_service import QualityService
-
-        original_count = len(all_channel_data)
-        all_channel_data = QualityService.collapse_duplicates(all_channel_data)
-        logger.info(f"Collapsed {original_count} channels to {len(all_channel_data)} unique channels")
+    # Cached channel list - only re-queried when channel, category or tag data changes
+    playlist = PlaylistService.get_config_playlist(
+        config, accounts, include_tags, exclude_tags, options.collapse_duplicates
+    )
 
-    # Generate M3U
-    m3u_lines = ["#EXTM3U"]
-    m3u_lines.append(f"# Playlist: {config.name}")
+    header_lines = [f"# Playlist: {config.name}"]
     if config.description:
-        m3u_lines.append(f"# {config.description}")
-
-    total_channels = 0
+        header_lines.append(f"# {config.description}")
 
-    for data in all_channel_data:
-        channel = data["channel"]
-        account = data["account"]
-
-        # Use cleaned name (pre-computed during sync/tag processing)
-        display_name = channel.cleaned_name or channel.name
-        category_name = channel.category.category_name if channel.category else "Unknown"
-
-        # Always use standardized EPG ID format to prevent collisions across providers
-        tvg_id = f"ch-{account.id}-{channel.stream_id}"
-        original_icon = channel.stream_icon or ""
-
-        # Proxy icon URL if enabled
-        if proxy_icons and image_cache and original_icon:
-            tvg_logo = image_cache.get_proxy_url(original_icon, proxy_base)
-        else:
-            tvg_logo = original_icon
-
-        # Add account name to group title for multi-account playlists
-        if len(accounts) > 1:
-            group_title = f"{category_name} ({account.name})"
-        else:
-            group_title = category_name
-
-        extinf = f'#EXTINF:-1 tvg-id="{tvg_id}" tvg-name="{display_name}" tvg-logo="{tvg_logo}" group-title="{group_title}",{display_name}'
-
-        if use_proxy:
-            # Use proxy URL for multiplexed streaming
-            stream_url = f"{proxy_base}/stream/{account.id}/{channel.stream_id}.ts"
-        else:
-            # Direct URL to IPTV provider
-            cred = account.get_primary_credential()
-            if cred:
-                stream_url = f"http://{account.server}/live/{cred.username}/{cred.password}/{channel.stream_id}.ts"
-            else:
-                # Fallback for legacy accounts
-                stream_url = (
-                    f"http://{account.server}/live/{account.username}/{account.password}/{channel.stream_id}.ts"
-                )
-
-        m3u_lines.append(extinf)
-        m3u_lines.append(stream_url)
-        total_channels += 1
+    # Auto proxy mode proxies all accounts if any account has multiple credentials
+    artifact = PlaylistService.render(
+        playlist, renderer, accounts, get_proxy_base_url(), header_lines=header_lines, multi_account=len(accounts) > 1
+    )
 
     logger.info(
-        f"Generated playlist from config {config.id} ({config.name}): {total_channels} channels from {len(accounts)} accounts (proxied={use_proxy}, collapsed={collapse_duplicates})"
+        f"Generated playlist from config {config.id} ({config.name}): {len(playlist.entries)} channels from {len(accounts)} accounts "
+        f"(proxied={renderer.uses_proxy(accounts)}, collapsed={options.collapse_duplicates})"
     )
-    return Response("\n".join(m3u_lines), mimetype="application/x-mpegurl")
+    return _compressed_response(artifact, "application/x-mpegurl")
 
 
 @playlists_bp.route("/epg/<int:account_id>.xml")
@@ -639,10 +536,13 @@ def proxy_epg(account_id):
     Query Parameters:
     - collapse_duplicates: "true" to collapse duplicate channels keeping highest quality
     - proxy_icons: "true" to proxy icon URLs through local cache
+    - past_hours: only include programmes that end after now minus this many hours
+    - future_hours: only include programmes that start before now plus this many hours
     """
     from services.epg_service import EpgService
 
     account = Account.query.get_or_404(account_id)
+    start, end = _get_epg_window()
 
     if not account.enabled:
         raise PermissionError("Account is disabled")
@@ -662,44 +562,14 @@ def proxy_epg(account_id):
         .join(Category, Channel.category_id == Category.id, isouter=True)
     )
 
-    # Get all matching channels
-    channels = query.order_by(Channel.name).all()
-
-    # If collapsing duplicates, load tags and collapse (same logic as M3U)
+    # Collapse duplicates using pre-computed quality scores (same logic as M3U)
     if collapse_duplicates:
         from services.quality_service import QualityService
 
-        # Load tags for all channels
-        channel_ids = [ch.stream_id for ch in channels]
-        tags_map = {}
-        batch_size = 500
-        for i in range(0, len(channel_ids), batch_size):
-            batch = channel_ids[i : i + batch_size]
-            channel_tags_query = (
-                db.session.query(ChannelTag.stream_id, Tag.name)
-                .join(Tag)
-                .filter(ChannelTag.account_id == account_id, ChannelTag.stream_id.in_(batch))
-            )
-            for stream_id, tag_name in channel_tags_query:
-                if stream_id not in tags_map:
-                    tags_map[stream_id] = []
-                tags_map[stream_id].append(tag_name)
+        query = QualityService.collapse_query(query)
 
-        # Build channel dicts for collapsing
-        channel_dicts = [
-            {
-                "channel": ch,
-                "stream_id": ch.stream_id,
-                "cleaned_name": ch.cleaned_name or ch.name,
-                "tags": tags_map.get(ch.stream_id, []),
-            }
-            for ch in channels
-        ]
-
-        # Collapse duplicates
-        collapsed = QualityService.collapse_duplicates(channel_dicts)
-        channels = [d["channel"] for d in collapsed]
-        logger.info(f"Collapsed {len(channel_dicts)} channels to {len(channels)} unique channels for EPG")
+    # Get all matching channels
+    channels = query.order_by(Channel.name).all()
 
     if not channels:
         # Return minimal valid XMLTV
@@ -708,14 +578,14 @@ def proxy_epg(account_id):
             mimetype="application/xml",
         )
 
-    # Generate filtered EPG for these channels
-    epg_xml = EpgService.generate_epg_for_channels(channels, use_channel_links=True)
+    # Stream filtered EPG for these channels
+    epg_chunks = EpgService.iter_epg_for_channels(channels, use_channel_links=True, start=start, end=end)
 
     logger.info(
-        f"Generated proxied EPG for account {account_id}: {len(channels)} channels (collapsed={collapse_duplicates})"
+        f"Generating proxied EPG for account {account_id}: {len(channels)} channels (collapsed={collapse_duplicates})"
     )
 
-    return Response(epg_xml, mimetype="application/xml")
+    return _streamed_response(epg_chunks, "application/xml")
 
 
 # ============================================================================
@@ -723,6 +593,40 @@ def proxy_epg(account_id):
 # ============================================================================
 
 
+def _parse_window_hours(name, value):
+    """Validate an EPG time window length in hours (None = no limit)."""
+    if value is None or value == "":
+        return None
+    try:
+        hours = int(value)
+    except (TypeError, ValueError):
+        raise ValidationError(f"{name} must be a whole number of hours")
+    if hours < 0 or hours > MAX_EPG_WINDOW_HOURS:
+        raise ValidationError(f"{name} must be between 0 and {MAX_EPG_WINDOW_HOURS}")
+    return hours
+
+
+def _get_epg_window(config=None):
+    """Resolve the EPG time window for the current request.
+
+    ?past_hours / ?future_hours override the playlist config's defaults.
+
+    Returns:
+        (start, end) naive UTC datetimes, each None when unlimited
+    """
+    from services.epg_service import EpgService
+
+    past_hours = _parse_window_hours("past_hours", request.args.get("past_hours"))
+    future_hours = _parse_window_hours("future_hours", request.args.get("future_hours"))
+    if config is not None:
+        if "past_hours" not in request.args:
+            past_hours = config.epg_past_hours
+        if "future_hours" not in request.args:
+            future_hours = config.epg_future_hours
+
+    return EpgService.get_time_window(past_hours, future_hours)
+
+
 @playlists_bp.route("/epg/config/<int:config_id>.xml")
 @handle_errors(return_json=False, default_message="Error generating EPG from config")
 def generate_epg_from_config(config_id):
@@ -733,6 +637,8 @@ def generate_epg_from_config(config_id):
 
     Query Parameters:
     - east_west_fallback: "false" to disable west EPG generation from east (default: true)
+    - past_hours / future_hours: time window around now (default: the config's epg_past_hours /
+      epg_future_hours)
     """
     config = PlaylistConfig.query.get_or_404(config_id)
     return _generate_epg_from_config(config)
@@ -743,21 +649,9 @@ def generate_epg_from_config(config_id):
 def generate_epg_from_config_by_name(slug):
     """Generate XMLTV EPG for playlist configuration by name slug.
 
-    The slug is matched against the playlist name (case-insensitive, slugified).
+    The slug is matched case-insensitively against the stored playlist slug.
     """
-    # Find config by matching slugified name
-    configs = PlaylistConfig.query.all()
-    config = None
-    for c in configs:
-        if slugify(c.name) == slug.lower():
-            config = c
-            break
-
-    if not config:
-        from flask import abort
-
-        abort(404, description=f"Playlist '{slug}' not found")
-
+    config = _get_config_by_slug(slug)
     return _generate_epg_from_config(config)
 
 
@@ -769,79 +663,27 @@ def _generate_epg_from_config(config):
 
     Query Parameters:
     - east_west_fallback: "false" to disable west EPG generation from east (default: true)
+    - past_hours / future_hours: time window around now (default: the config's epg_past_hours /
+      epg_future_hours)
     """
     from services.epg_service import EpgService
 
     if not config.enabled:
         raise PermissionError("Playlist configuration is disabled")
 
+    start, end = _get_epg_window(config)
+
     # Check if east/west fallback is enabled
     east_west_fallback = request.args.get("east_west_fallback", "true").lower() != "false"
 
-    # Parse config
-    include_accounts = json.loads(config.include_accounts) if config.include_accounts else []
-    exclude_accounts = json.loads(config.exclude_accounts) if config.exclude_accounts else []
-    include_tags = json.loads(config.include_tags) if config.include_tags else []
-    exclude_tags = json.loads(config.exclude_tags) if config.exclude_tags else []
-    # Normalize tags for case-insensitive matching
-    include_tags = TagService.normalize_filter_tags(include_tags)
-    exclude_tags = TagService.normalize_filter_tags(exclude_tags)
-
-    # Get accounts to process
-    if include_accounts:
-        accounts = Account.query.filter(Account.id.in_(include_accounts), Account.enabled.is_(True)).all()
-    else:
-        accounts = Account.query.filter(Account.enabled.is_(True)).all()
-        if exclude_accounts:
-            accounts = [a for a in accounts if a.id not in exclude_accounts]
-
-    # Collect all matching channels from all accounts
-    all_channels = []
-
-    for account in accounts:
-        # Build query for channels from this account
-        query = db.session.query(Channel).filter(
-            Channel.account_id == account.id, Channel.is_active, Channel.is_visible
-        )
-
-        # Apply tag filtering if specified
-        if include_tags or exclude_tags:
-            if include_tags:
-                tag_subquery = (
-                    db.session.query(ChannelTag.stream_id)
-                    .join(Tag, ChannelTag.tag_id == Tag.id)
-                    .filter(ChannelTag.account_id == account.id, Tag.name.in_(include_tags))
-                )
-
-                if config.tag_match_mode == "all":
-                    # Must have ALL include tags
-                    tag_counts = (
-                        db.session.query(
-                            ChannelTag.stream_id, db.func.count(db.func.distinct(Tag.id)).label("tag_count")
-                        )
-                        .join(Tag, ChannelTag.tag_id == Tag.id)
-                        .filter(ChannelTag.account_id == account.id, Tag.name.in_(include_tags))
-                        .group_by(ChannelTag.stream_id)
-                        .having(db.func.count(db.func.distinct(Tag.id)) == len(include_tags))
-                        .subquery()
-                    )
-
-                    query = query.filter(Channel.stream_id.in_(db.session.query(tag_counts.c.stream_id)))
-                else:  # 'any'
-                    query = query.filter(Channel.stream_id.in_(tag_subquery))
-
-            if exclude_tags:
-                # Must NOT have any exclude tags
-                exclude_subquery = (
-                    db.session.query(ChannelTag.stream_id)
-                    .join(Tag, ChannelTag.tag_id == Tag.id)
-                    .filter(ChannelTag.account_id == account.id, Tag.name.in_(exclude_tags))
-                )
-                query = query.filter(~Channel.stream_id.in_(exclude_subquery))
+    # Default options: send the guide prebuilt by the scheduler, when it is up to date
+    if east_west_fallback and "past_hours" not in request.args and "future_hours" not in request.args:
+        response = EpgArtifactService.make_response(config, request.headers.get("Accept-Encoding"))
+        if response is not None:
+            return response
 
-        # Get all matching channels
-        channels = query.all()
-        all_channels.extend(channels)
+    # Collect all matching channels (same filtering as M3U generation)
+    accounts, all_channels = PlaylistService.get_config_channels(config)
 
     if not all_channels:
         # Return minimal valid XMLTV
@@ -855,10 +697,9 @@ def _generate_epg_from_config(config):
         f"from {len(accounts)} accounts (east_west_fallback={east_west_fallback})"
     )
 
-    # Generate filtered EPG
-    epg_xml = EpgService.generate_epg_for_channels(
-        all_channels,
-        east_west_fallback=east_west_fallback,
+    # Stream filtered EPG (east/west fallback comes from channel links)
+    epg_chunks = EpgService.iter_epg_for_channels(
+        all_channels, use_channel_links=east_west_fallback, start=start, end=end
     )
 
-    return Response(epg_xml, mimetype="application/xml")
+    return _streamed_response(epg_chunks, "application/xml")
@@ -204,6 +204,9 @@ class AccountRuleSetAssignSchema(Schema):
 # PlaylistConfig Schemas
 # ============================================================================
 
+# Largest EPG time window (past or future) a playlist can default to, in hours
+MAX_EPG_WINDOW_HOURS = 24 * 30
+
 
 class PlaylistConfigCreateSchema(Schema):
     """Schema for creating a new playlist config"""
@@ -215,6 +218,8 @@ class PlaylistConfigCreateSchema(Schema):
     include_tags = fields.List(fields.Str(validate=lambda x: 1 <= len(x) <= 100), load_default=[])
     exclude_tags = fields.List(fields.Str(validate=lambda x: 1 <= len(x) <= 100), load_default=[])
     tag_match_mode = fields.Str(validate=lambda x: x in ("all", "any"), load_default="all")
+    epg_past_hours = fields.Int(validate=lambda x: 0 <= x <= MAX_EPG_WINDOW_HOURS, allow_none=True, load_default=None)
+    epg_future_hours = fields.Int(validate=lambda x: 0 <= x <= MAX_EPG_WINDOW_HOURS, allow_none=True, load_default=None)
 
     @validates_schema
     def validate_accounts(self, data, **kwargs):
@@ -247,6 +252,65 @@ class PlaylistConfigUpdateSchema(Schema):
     include_tags = fields.List(fields.Str(validate=lambda x: 1 <= len(x) <= 100))
     exclude_tags = fields.List(fields.Str(validate=lambda x: 1 <= len(x) <= 100))
     tag_match_mode = fields.Str(validate=lambda x: x in ("all", "any"))
+    epg_past_hours = fields.Int(validate=lambda x: 0 <= x <= MAX_EPG_WINDOW_HOURS, allow_none=True)
+    epg_future_hours = fields.Int(validate=lambda x: 0 <= x <= MAX_EPG_WINDOW_HOURS, allow_none=True)
+
+
+# ============================================================================
+# PlaylistProfile Schemas
+# ============================================================================
+
+PLAYLIST_URL_STYLES = ["auto", "proxy", "direct"]
+
+
+def _validate_group_title_format(value):
+    """Ensure a group-title template only uses supported placeholders"""
+    if value is None:
+        return
+    try:
+        value.format(category="", account="", account_id="")
+    except (KeyError, IndexError, ValueError) as e:
+        raise ValidationError(
+            f"Invalid group title format (supported placeholders: {{category}}, {{account}}, {{account_id}}): {e}"
+        )
+
+
+class PlaylistProfileCreateSchema(Schema):
+    """Schema for creating a new playlist output profile"""
+
+    name = fields.Str(required=True, validate=lambda x: 1 <= len(x) <= 100)
+    description = fields.Str(validate=lambda x: len(x) <= 500, load_default="")
+    group_title_format = fields.Str(allow_none=True, validate=lambda x: len(x) <= 200, load_default=None)
+    proxy_icons = fields.Bool(load_default=True)
+    url_style = fields.Str(validate=lambda x: x in PLAYLIST_URL_STYLES, load_default="auto")
+    collapse_duplicates = fields.Bool(load_default=False)
+    include_catchup = fields.Bool(load_default=False)
+    include_chno = fields.Bool(load_default=False)
+    chno_start = fields.Int(validate=lambda x: 0 <= x <= 100000, load_default=1)
+
+    @validates("group_title_format")
+    def validate_group_title_format(self, value):
+        """Validate group title template placeholders"""
+        _validate_group_title_format(value)
+
+
+class PlaylistProfileUpdateSchema(Schema):
+    """Schema for updating a playlist output profile"""
+
+    name = fields.Str(validate=lambda x: 1 <= len(x) <= 100)
+    description = fields.Str(validate=lambda x: len(x) <= 500)
+    group_title_format = fields.Str(allow_none=True, validate=lambda x: len(x) <= 200)
+    proxy_icons = fields.Bool()
+    url_style = fields.Str(validate=lambda x: x in PLAYLIST_URL_STYLES)
+    collapse_duplicates = fields.Bool()
+    include_catchup = fields.Bool()
+    include_chno = fields.Bool()
+    chno_start = fields.Int(validate=lambda x: 0 <= x <= 100000)
+
+    @validates("group_title_format")
+    def validate_group_title_format(self, value):
+        """Validate group title template placeholders"""
+        _validate_group_title_format(value)
 
 
 # ============================================================================
@@ -0,0 +1,224 @@
+"""
+Compression Service - Content negotiation and precompressed response bodies.
+
+Playlist (M3U) and guide (XMLTV) responses are large and highly compressible.
+This service negotiates Content-Encoding from the client's Accept-Encoding header
+and keeps compressed variants next to the rendered body (CompressedArtifact), so
+repeated fetches of a cached artifact serve precompressed bytes. Streamed bodies
+are compressed incrementally (StreamCompressor).
+
+gzip is always available; zstd and brotli are used when the optional
+`zstandard` / `brotli` packages are installed.
+"""
+
+import gzip
+import logging
+import zlib
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Union
+
+from flask import Response
+
+logger = logging.getLogger(__name__)
+
+try:
+    import zstandard
+except ImportError:  # Optional dependency
+    zstandard = None
+
+try:
+    import brotli
+except ImportError:  # Optional dependency
+    brotli = None
+
+# Bodies smaller than this are always sent uncompressed
+MIN_COMPRESS_SIZE = 1024
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+ZSTD_LEVEL = 10
+
+
+class CompressedArtifact:
+    """
+    A rendered response body plus its lazily created compressed variants.
+
+    Each encoding is compressed at most once per artifact; keep the artifact
+    in a cache alongside the rendered output to reuse the compressed bytes.
+    """
+
+    def __init__(self, body: Union[str, bytes]):
+        self.body = body.encode("utf-8") if isinstance(body, str) else body
+        self.variants: Dict[str, bytes] = {}
+
+    def get(self, encoding: Optional[str]) -> bytes:
+        """Get the body for an encoding (None = identity), compressing on first use."""
+        if not encoding:
+            return self.body
+        data = self.variants.get(encoding)
+        if data is None:
+            data = CompressionService.compress(self.body, encoding)
+            self.variants[encoding] = data
+        return data
+
+
+class StreamCompressor:
+    """Incremental compressor for streamed response bodies"""
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        # zlib, brotli and zstandard compressors have different interfaces (see compress/flush)
+        self._compressor: Any
+        if encoding == "gzip":
+            # wbits=31 writes a gzip header (mtime=0) and trailer
+            self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+        elif encoding == "br" and brotli is not None:
+            self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        elif encoding == "zstd" and zstandard is not None:
+            self._compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+        else:
+            raise ValueError(f"Unsupported content encoding: {encoding}")
+
+    def compress(self, data: bytes) -> bytes:
+        """Compress a chunk (may return b"" while the compressor buffers)."""
+        if self.encoding == "br":
+            return self._compressor.process(data)
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        """Finish the stream and return the remaining compressed bytes."""
+        if self.encoding == "br":
+            return self._compressor.finish()
+        return self._compressor.flush()
+
+
+class CompressionService:
+    """Service for Accept-Encoding negotiation and response compression"""
+
+    @staticmethod
+    def available_encodings() -> List[str]:
+        """Get supported content encodings in server preference order."""
+        encodings = []
+        if zstandard is not None:
+            encodings.append("zstd")
+        if brotli is not None:
+            encodings.append("br")
+        encodings.append("gzip")
+        return encodings
+
+    @staticmethod
+    def negotiate(accept_encoding: Optional[str], encodings: Optional[List[str]] = None) -> Optional[str]:
+        """
+        Pick the best supported encoding from an Accept-Encoding header.
+
+        Args:
+            accept_encoding: Raw Accept-Encoding header value
+            encodings: Candidate encodings in preference order (default: available_encodings())
+
+        Returns:
+            Encoding name ("zstd", "br", "gzip") or None for identity
+        """
+        if not accept_encoding:
+            return None
+
+        qualities: Dict[str, float] = {}
+        for part in accept_encoding.split(","):
+            token, _, params = part.partition(";")
+            token = token.strip().lower()
+            if not token:
+                continue
+            quality = 1.0
+            for param in params.split(";"):
+                name, _, value = param.partition("=")
+                if name.strip().lower() == "q":
+                    try:
+                        quality = float(value)
+                    except ValueError:
+                        quality = 0.0
+            qualities[token] = quality
+
+        best = None
+        best_quality = 0.0
+        for encoding in encodings if encodings is not None else CompressionService.available_encodings():
+            quality = qualities.get(encoding, qualities.get("*", 0.0))
+            if quality > best_quality:
+                best, best_quality = encoding, quality
+        return best
+
+    @staticmethod
+    def compress(data: bytes, encoding: str) -> bytes:
+        """
+        Compress data with the given content encoding.
+
+        Args:
+            data: Uncompressed bytes
+            encoding: "gzip", "br" or "zstd"
+
+        Returns:
+            Compressed bytes
+        """
+        if encoding == "gzip":
+            # mtime=0 keeps output deterministic for identical bodies
+            return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+        if encoding == "br" and brotli is not None:
+            return brotli.compress(data, quality=BROTLI_QUALITY)
+        if encoding == "zstd" and zstandard is not None:
+            return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+        raise ValueError(f"Unsupported content encoding: {encoding}")
+
+    @staticmethod
+    def make_response(
+        body: Union[str, bytes, CompressedArtifact], mimetype: str, accept_encoding: Optional[str]
+    ) -> Response:
+        """
+        Build a response, compressed according to the client's Accept-Encoding.
+
+        Args:
+            body: Response body, or a cached CompressedArtifact to reuse its variants
+            mimetype: Response mimetype
+            accept_encoding: Raw Accept-Encoding request header
+
+        Returns:
+            Flask Response with Content-Encoding and Vary headers set
+        """
+        artifact = body if isinstance(body, CompressedArtifact) else CompressedArtifact(body)
+
+        encoding = None
+        if len(artifact.body) >= MIN_COMPRESS_SIZE:
+            encoding = CompressionService.negotiate(accept_encoding)
+
+        response = Response(artifact.get(encoding), mimetype=mimetype)
+        response.headers["Vary"] = "Accept-Encoding"
+        if encoding:
+            response.headers["Content-Encoding"] = encoding
+        return response
+
+    @staticmethod
+    def make_streaming_response(chunks: Iterable[bytes], mimetype: str, accept_encoding: Optional[str]) -> Response:
+        """
+        Build a streamed response, compressed incrementally per the client's Accept-Encoding.
+
+        The body size isn't known up front, so MIN_COMPRESS_SIZE doesn't apply.
+
+        Args:
+            chunks: Iterable of uncompressed body chunks
+            mimetype: Response mimetype
+            accept_encoding: Raw Accept-Encoding request header
+
+        Returns:
+            Flask Response streaming the (compressed) chunks
+        """
+        encoding = CompressionService.negotiate(accept_encoding)
+
+        def compressed(compressor: StreamCompressor) -> Iterator[bytes]:
+            for chunk in chunks:
+                data = compressor.compress(chunk)
+                if data:
+                    yield data
+            yield compressor.flush()
+
+        body = compressed(StreamCompressor(encoding)) if encoding else chunks
+        response = Response(body, mimetype=mimetype)
+        response.headers["Vary"] = "Accept-Encoding"
+        if encoding:
+            response.headers["Content-Encoding"] = encoding
+        return response
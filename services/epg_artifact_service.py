@@ -0,0 +1,275 @@
+"""
+EPG Artifact Service - Precomputed XMLTV guides for playlist configurations.
+
+The scheduler renders each enabled playlist config's EPG (plus a gzip copy) to
+disk and re-renders it whenever its inputs change: channels, categories, tags,
+EPG mappings, channel links, EPG source syncs, the provider XMLTV cache or the
+config itself. Changes are detected with a cheap aggregate fingerprint, like
+PlaylistService does for M3U channel lists.
+
+/epg/config/<id>.xml then sends the stored file instead of generating the guide
+per request, so many clients refreshing at once don't multiply the work. The
+files are shared by all worker processes.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from flask import Response, send_file
+
+from services.compression_service import CompressionService, StreamCompressor
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ARTIFACT_DIR = "/app/data/epg_artifacts"
+
+
+class EpgArtifactService:
+    """Service for building and serving precomputed playlist EPG files"""
+
+    @staticmethod
+    def get_artifact_dir() -> str:
+        """Get the artifact directory (EPG_ARTIFACT_DIR env var or /app/data/epg_artifacts)."""
+        return os.getenv("EPG_ARTIFACT_DIR") or DEFAULT_ARTIFACT_DIR
+
+    @staticmethod
+    def get_artifact_path(config_id: int, gzipped: bool = False) -> str:
+        """Get the path of a playlist config's stored EPG (or its gzip copy)."""
+        suffix = ".xml.gz" if gzipped else ".xml"
+        return os.path.join(EpgArtifactService.get_artifact_dir(), f"playlist_{config_id}{suffix}")
+
+    @staticmethod
+    def _get_meta_path(config_id: int) -> str:
+        """Get the path of an artifact's metadata (fingerprint, build time, sizes)."""
+        return os.path.join(EpgArtifactService.get_artifact_dir(), f"playlist_{config_id}.json")
+
+    @staticmethod
+    def get_artifact_info(config_id: int) -> Optional[Dict]:
+        """
+        Get metadata for a playlist config's stored EPG.
+
+        Returns:
+            Dict with fingerprint, built_at, channels, size and gzip_size, or None if not built
+        """
+        try:
+            with open(EpgArtifactService._get_meta_path(config_id), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def get_fingerprint(config, account_ids: List[int]) -> str:
+        """
+        Get a fingerprint of everything a playlist config's EPG is built from.
+
+        Configs with a time window also change fingerprint every hour, so the
+        window moves along with the clock.
+
+        Args:
+            config: PlaylistConfig
+            account_ids: IDs of the accounts included in the playlist
+
+        Returns:
+            Hex digest that changes whenever the EPG output may change
+        """
+        from models import ChannelEpgMapping, ChannelLink, EpgSource, db
+        from services.playlist_service import PlaylistService
+        from services.xmltv_cache_service import XmltvCacheService
+
+        account_ids = sorted(account_ids)
+        parts: List[Any] = [
+            (
+                config.id,
+                config.updated_at,
+                config.include_accounts,
+                config.exclude_accounts,
+                config.include_tags,
+                config.exclude_tags,
+                config.tag_match_mode,
+                config.epg_past_hours,
+                config.epg_future_hours,
+            ),
+            PlaylistService._data_fingerprint(account_ids, include_tags=True),
+        ]
+        models: List[Any] = [ChannelEpgMapping, ChannelLink]
+        for model in models:
+            parts.append(tuple(db.session.query(db.func.count(model.id), db.func.max(model.updated_at)).one()))
+        parts.append(
+            tuple(
+                db.session.query(EpgSource.id, EpgSource.enabled, EpgSource.priority, EpgSource.last_sync)
+                .order_by(EpgSource.id)
+                .all()
+            )
+        )
+        parts.append(
+            tuple((info or {}).get("fetched_at") for info in map(XmltvCacheService.get_cache_info, account_ids))
+        )
+        if config.epg_past_hours is not None or config.epg_future_hours is not None:
+            parts.append(datetime.utcnow().strftime("%Y%m%d%H"))
+
+        return hashlib.sha256(repr(parts).encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def build_config(config, fingerprint: Optional[str] = None) -> Dict:
+        """
+        Render a playlist config's EPG and its gzip copy to disk.
+
+        Both files are written to temporary files and renamed into place, so
+        requests never see a partial guide.
+
+        Args:
+            config: PlaylistConfig to build
+            fingerprint: Input fingerprint, if already computed
+
+        Returns:
+            Dict with config_id, channels, size and gzip_size
+        """
+        from services.epg_service import EpgService
+        from services.playlist_service import PlaylistService
+
+        accounts, channels = PlaylistService.get_config_channels(config)
+        if fingerprint is None:
+            fingerprint = EpgArtifactService.get_fingerprint(config, [a.id for a in accounts])
+        start, end = EpgService.get_time_window(config.epg_past_hours, config.epg_future_hours)
+
+        artifact_dir = EpgArtifactService.get_artifact_dir()
+        os.makedirs(artifact_dir, exist_ok=True)
+
+        tmp_paths = []
+        try:
+            fd, xml_tmp = tempfile.mkstemp(dir=artifact_dir, prefix=f".playlist_{config.id}.", suffix=".tmp")
+            tmp_paths.append(xml_tmp)
+            gz_fd, gz_tmp = tempfile.mkstemp(dir=artifact_dir, prefix=f".playlist_{config.id}.", suffix=".gz.tmp")
+            tmp_paths.append(gz_tmp)
+
+            compressor = StreamCompressor("gzip")
+            with os.fdopen(fd, "wb") as xml_file, os.fdopen(gz_fd, "wb") as gz_file:
+                for chunk in EpgService.iter_epg_for_channels(channels, use_channel_links=True, start=start, end=end):
+                    xml_file.write(chunk)
+                    gz_file.write(compressor.compress(chunk))
+                gz_file.write(compressor.flush())
+
+            size = os.path.getsize(xml_tmp)
+            gzip_size = os.path.getsize(gz_tmp)
+            os.replace(xml_tmp, EpgArtifactService.get_artifact_path(config.id))
+            os.replace(gz_tmp, EpgArtifactService.get_artifact_path(config.id, gzipped=True))
+        finally:
+            for path in tmp_paths:
+                if os.path.exists(path):
+                    os.unlink(path)
+
+        meta = {
+            "fingerprint": fingerprint,
+            "built_at": datetime.now(timezone.utc).isoformat(),
+            "channels": len(channels),
+            "size": size,
+            "gzip_size": gzip_size,
+        }
+        with open(EpgArtifactService._get_meta_path(config.id), "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+
+        logger.info(f"Built EPG for playlist config {config.id} ({len(channels)} channels, {size} bytes)")
+        return {"config_id": config.id, "channels": len(channels), "size": size, "gzip_size": gzip_size}
+
+    @staticmethod
+    def refresh_all() -> Dict:
+        """
+        Rebuild the EPG of every enabled playlist config whose inputs changed.
+
+        Artifacts of disabled or deleted configs are removed.
+
+        Returns:
+            Dict with counts of built, unchanged, failed and removed artifacts
+        """
+        from models import PlaylistConfig, db
+        from services.playlist_service import PlaylistService
+
+        stats = {"built": 0, "unchanged": 0, "failed": 0, "removed": 0}
+        enabled_ids = set()
+
+        for config in PlaylistConfig.query.filter_by(enabled=True).all():
+            enabled_ids.add(config.id)
+            try:
+                account_ids = PlaylistService.get_config_account_ids(config)
+                fingerprint = EpgArtifactService.get_fingerprint(config, account_ids)
+                info = EpgArtifactService.get_artifact_info(config.id)
+                if (
+                    info
+                    and info.get("fingerprint") == fingerprint
+                    and os.path.exists(EpgArtifactService.get_artifact_path(config.id))
+                ):
+                    stats["unchanged"] += 1
+                    continue
+                EpgArtifactService.build_config(config, fingerprint)
+                stats["built"] += 1
+            except Exception as e:
+                logger.error(f"Error building EPG for playlist config {config.name}: {e}")
+                db.session.rollback()
+                stats["failed"] += 1
+
+        artifact_dir = EpgArtifactService.get_artifact_dir()
+        if os.path.isdir(artifact_dir):
+            for name in os.listdir(artifact_dir):
+                if not (name.startswith("playlist_") and name.endswith(".json")):
+                    continue
+                config_id = name[len("playlist_") : -len(".json")]
+                if config_id.isdigit() and int(config_id) not in enabled_ids:
+                    EpgArtifactService.delete_config(int(config_id))
+                    stats["removed"] += 1
+
+        return stats
+
+    @staticmethod
+    def make_response(config, accept_encoding: Optional[str]) -> Optional[Response]:
+        """
+        Build a response sending a playlist config's stored EPG.
+
+        The stored guide is only sent while its fingerprint matches the
+        config's current inputs, so mapping, link or channel changes are never
+        served stale until the scheduler rebuilds it. Sends the gzip copy
+        as-is when the client accepts gzip.
+
+        Args:
+            config: PlaylistConfig
+            accept_encoding: Raw Accept-Encoding request header
+
+        Returns:
+            Flask Response, or None if no up-to-date EPG has been built for the config
+        """
+        from services.playlist_service import PlaylistService
+
+        info = EpgArtifactService.get_artifact_info(config.id)
+        if not info or info.get("fingerprint") != EpgArtifactService.get_fingerprint(
+            config, PlaylistService.get_config_account_ids(config)
+        ):
+            return None
+
+        gzipped = CompressionService.negotiate(accept_encoding, ["gzip"]) == "gzip"
+        path = EpgArtifactService.get_artifact_path(config.id, gzipped=gzipped)
+        try:
+            response = send_file(path, mimetype="application/xml", conditional=True, etag=True)
+        except FileNotFoundError:
+            return None
+
+        response.headers["Vary"] = "Accept-Encoding"
+        if gzipped:
+            response.headers["Content-Encoding"] = "gzip"
+        return response
+
+    @staticmethod
+    def delete_config(config_id: int):
+        """Remove a playlist config's stored EPG, gzip copy and metadata."""
+        for path in (
+            EpgArtifactService.get_artifact_path(config_id),
+            EpgArtifactService.get_artifact_path(config_id, gzipped=True),
+            EpgArtifactService._get_meta_path(config_id),
+        ):
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,166 @@
+"""
+EPG Catalogue - Shared in-memory copy of the EPG channels used for matching.
+
+Matching an account looks every channel up against the whole guide by ID,
+display name and callsign. Instead of loading EpgChannel rows and parsing
+their display names again on every run, the matchers share one compact,
+read-only catalogue per source (and one for all sources), with the lookup
+indices built once per catalogue.
+
+A catalogue is rebuilt only after the EPG channels change: its version is
+each source's last_sync plus the number and highest ID of the EPG channels,
+read with one small query per lookup, so a sync in another worker process
+is picked up too.
+"""
+
+import json
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class EpgCatalogueEntry:
+    """An EPG channel as seen by the matchers (mappings use .id, the EpgChannel ID)"""
+
+    __slots__ = ("id", "source_id", "channel_id", "display_name", "icon_url", "names", "normalized_names")
+
+    def __init__(
+        self,
+        id: int,
+        source_id: int,
+        channel_id: str,
+        display_name: Optional[str],
+        display_names_json: Optional[str] = None,
+        icon_url: Optional[str] = None,
+    ):
+        from services.epg_service import EpgService
+
+        self.id = id
+        self.source_id = source_id
+        self.channel_id = channel_id
+        self.display_name = display_name
+        self.icon_url = icon_url
+
+        # Primary display name first, then the alternates from the guide
+        names = [display_name] if display_name else []
+        if display_names_json:
+            try:
+                names.extend(n for n in json.loads(display_names_json) if n and isinstance(n, str))
+            except (json.JSONDecodeError, TypeError):
+                pass
+        self.names: Tuple[str, ...] = tuple(dict.fromkeys(names))
+        normalized = (EpgService._normalize_name(name) for name in self.names)
+        self.normalized_names: Tuple[str, ...] = tuple(dict.fromkeys(n for n in normalized if n))
+
+    @classmethod
+    def from_channel(cls, channel) -> "EpgCatalogueEntry":
+        """Create an entry for an EpgChannel row."""
+        return cls(
+            channel.id,
+            channel.source_id,
+            channel.channel_id,
+            channel.display_name,
+            channel.display_names_json,
+            channel.icon_url,
+        )
+
+    def __repr__(self) -> str:
+        return f"<EpgCatalogueEntry {self.channel_id}>"
+
+
+class EpgCatalogue:
+    """Read-only EPG channels of one source (or all sources) with shared lookup indices"""
+
+    def __init__(self, version: Tuple, entries: List[EpgCatalogueEntry]):
+        self.version = version
+        self.entries = entries
+        self._indices: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get_index(self, name: str, build: Callable[[List[EpgCatalogueEntry]], Any]) -> Any:
+        """
+        Get a lookup index over the entries, built on first use.
+
+        Indices are shared by every matcher using this catalogue and must not be modified.
+
+        Args:
+            name: Index name (one per build function)
+            build: Function building the index from the entries
+
+        Returns:
+            The index returned by build
+        """
+        with self._lock:
+            if name not in self._indices:
+                self._indices[name] = build(self.entries)
+            return self._indices[name]
+
+
+# Catalogues by source ID (None = all sources), valid for _catalogue_version
+_catalogues: Dict[Optional[int], EpgCatalogue] = {}
+_catalogue_version: Optional[Tuple] = None
+_catalogue_lock = threading.Lock()
+
+
+def _get_catalogue_version() -> Tuple:
+    """Get the current version of the EPG channels (changes when a source syncs or channels are added/removed)."""
+    from models import EpgChannel, EpgSource, db
+
+    sources = db.session.execute(db.select(EpgSource.id, EpgSource.last_sync).order_by(EpgSource.id)).all()
+    count, max_id = db.session.execute(db.select(db.func.count(EpgChannel.id), db.func.max(EpgChannel.id))).one()
+    return tuple(tuple(row) for row in sources), count, max_id
+
+
+def _load_entries(source_id: Optional[int]) -> List[EpgCatalogueEntry]:
+    """Load the catalogue entries of a source (or all sources) from the database."""
+    from models import EpgChannel, db
+
+    query = db.select(
+        EpgChannel.id,
+        EpgChannel.source_id,
+        EpgChannel.channel_id,
+        EpgChannel.display_name,
+        EpgChannel.display_names_json,
+        EpgChannel.icon_url,
+    ).order_by(EpgChannel.id)
+    if source_id:
+        query = query.where(EpgChannel.source_id == source_id)
+    return [EpgCatalogueEntry(*row) for row in db.session.execute(query)]
+
+
+def get_epg_catalogue(source_id: Optional[int] = None) -> EpgCatalogue:
+    """
+    Get the EPG catalogue of a source, or of all sources.
+
+    Args:
+        source_id: Optional - limit to a specific EPG source
+
+    Returns:
+        The shared catalogue, rebuilt if the EPG channels changed since it was built
+    """
+    global _catalogue_version
+
+    version = _get_catalogue_version()
+    with _catalogue_lock:
+        if version != _catalogue_version:
+            _catalogues.clear()
+            _catalogue_version = version
+
+        catalogue = _catalogues.get(source_id)
+        if catalogue is None:
+            everything = _catalogues.get(None)
+            if source_id and everything is not None:
+                entries = [entry for entry in everything.entries if entry.source_id == source_id]
+            else:
+                entries = _load_entries(source_id)
+            catalogue = EpgCatalogue(version, entries)
+            _catalogues[source_id] = catalogue
+            logger.debug(
+                f"Built EPG catalogue with {len(entries)} channels{f' for source {source_id}' if source_id else ''}"
+            )
+        return catalogue
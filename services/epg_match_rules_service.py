@@ -30,7 +30,6 @@ from models import (
     ChannelEpgMapping,
     ChannelTag,
     CountryTag,
-    EpgChannel,
     EpgChannelNameMapping,
     EpgCountrySuffix,
     EpgExclusionPattern,
@@ -45,6 +44,7 @@ from models import (
     Tag,
     db,
 )
+from services.epg_catalogue import EpgCatalogueEntry, get_epg_catalogue
 from services.fcc_facility_service import FccFacilityService
 
 logger = logging.getLogger(__name__)
@@ -713,14 +713,14 @@ class EpgMatchRulesService:
     def match_channel_with_rules(
         channel: Channel,
         rules: List[EpgMatchRule],
-        epg_channels: List[EpgChannel],
-        epg_by_id: Dict[str, EpgChannel],
-        epg_by_name: Dict[str, EpgChannel],
-        epg_by_callsign: Dict[str, EpgChannel],
+        epg_channels: List[EpgCatalogueEntry],
+        epg_by_id: Dict[str, EpgCatalogueEntry],
+        epg_by_name: Dict[str, EpgCatalogueEntry],
+        epg_by_callsign: Dict[str, EpgCatalogueEntry],
         channel_tags: Set[str],
         country_tags: Set[str],
         name_mappings: Optional[List[CachedChannelNameMapping]] = None,
-    ) -> Optional[Tuple[EpgChannel, float, str]]:
+    ) -> Optional[Tuple[EpgCatalogueEntry, float, str]]:
         """
         Try to match a channel to EPG using the provided rules.
 
@@ -821,14 +821,14 @@ class EpgMatchRulesService:
     def _apply_match_rule(
         channel: Channel,
         rule: EpgMatchRule,
-        epg_channels: List[EpgChannel],
-        epg_by_id: Dict[str, EpgChannel],
-        epg_by_name: Dict[str, EpgChannel],
-        epg_by_callsign: Dict[str, EpgChannel],
+        epg_channels: List[EpgCatalogueEntry],
+        epg_by_id: Dict[str, EpgCatalogueEntry],
+        epg_by_name: Dict[str, EpgCatalogueEntry],
+        epg_by_callsign: Dict[str, EpgCatalogueEntry],
         channel_tags: Set[str],
         country_tags: Set[str],
         name_mappings: Optional[List[CachedChannelNameMapping]] = None,
-    ) -> Optional[Tuple[EpgChannel, float]]:
+    ) -> Optional[Tuple[EpgCatalogueEntry, float]]:
         """
         Apply a single match rule to find EPG for a channel.
 
@@ -1604,36 +1604,13 @@ class EpgMatchRulesService:
         total_channels = len(channels)
         logger.info(f"EPG matching: Found {len(channels)} channels for account {account_id}")
 
-        # Get EPG channels
-        epg_query = EpgChannel.query
-        if source_id:
-            epg_query = epg_query.filter_by(source_id=source_id)
-        epg_channels = epg_query.all()
+        # Get EPG channels (shared catalogue, rebuilt only after a source syncs)
+        catalogue = get_epg_catalogue(source_id)
+        epg_channels = catalogue.entries
         logger.info(f"EPG matching: Found {len(epg_channels)} EPG channels")
 
-        # Build indices
-        epg_by_id = {ec.channel_id.lower(): ec for ec in epg_channels}
-        epg_by_name = {}
-        epg_by_callsign = {}
-
-        for ec in epg_channels:
-            # Index by name
-            if ec.display_name:
-                normalized = EpgMatchRulesService._normalize_name(ec.display_name)
-                if normalized:
-                    epg_by_name[normalized] = ec
-
-            # Index by callsign (extracted from channel_id)
-            callsign = EpgMatchRulesService._extract_callsign(ec.channel_id)
-            if callsign:
-                callsign_upper = callsign.upper()
-                epg_by_callsign[callsign_upper] = ec
-                # Also index by normalized callsign (without -TV, -DT suffixes)
-                # This helps match FCC's KECI-TV to EPG's KECI-DT
-                base_callsign = EpgMatchRulesService._normalize_callsign(callsign_upper)
-                if base_callsign and base_callsign != callsign_upper:
-                    if base_callsign not in epg_by_callsign:
-                        epg_by_callsign[base_callsign] = ec
+        # Lookup indices
+        epg_by_id, epg_by_name, epg_by_callsign = catalogue.get_index("rules", EpgMatchRulesService._build_epg_indices)
 
         # Get existing mappings
         BATCH_SIZE = 500
@@ -1762,6 +1739,44 @@ class EpgMatchRulesService:
 
         return result_stats
 
+    @staticmethod
+    def _build_epg_indices(
+        epg_channels: List[EpgCatalogueEntry],
+    ) -> Tuple[Dict[str, EpgCatalogueEntry], Dict[str, EpgCatalogueEntry], Dict[str, EpgCatalogueEntry]]:
+        """
+        Build the lookup indices used by rule matching.
+
+        Args:
+            epg_channels: EPG channels to index
+
+        Returns:
+            Tuple of (by lowercase channel ID, by normalized display name, by callsign)
+        """
+        epg_by_id = {ec.channel_id.lower(): ec for ec in epg_channels}
+        epg_by_name: Dict[str, EpgCatalogueEntry] = {}
+        epg_by_callsign: Dict[str, EpgCatalogueEntry] = {}
+
+        for ec in epg_channels:
+            # Index by name
+            if ec.display_name:
+                normalized = EpgMatchRulesService._normalize_name(ec.display_name)
+                if normalized:
+                    epg_by_name[normalized] = ec
+
+            # Index by callsign (extracted from channel_id)
+            callsign = EpgMatchRulesService._extract_callsign(ec.channel_id)
+            if callsign:
+                callsign_upper = callsign.upper()
+                epg_by_callsign[callsign_upper] = ec
+                # Also index by normalized callsign (without -TV, -DT suffixes)
+                # This helps match FCC's KECI-TV to EPG's KECI-DT
+                base_callsign = EpgMatchRulesService._normalize_callsign(callsign_upper)
+                if base_callsign and base_callsign != callsign_upper:
+                    if base_callsign not in epg_by_callsign:
+                        epg_by_callsign[base_callsign] = ec
+
+        return epg_by_id, epg_by_name, epg_by_callsign
+
     @staticmethod
     def _extract_callsign(channel_id: str) -> Optional[str]:
         """Extract callsign from EPG channel ID"""
@@ -21,18 +21,32 @@ Many US channels have east and west coast feeds (e.g., "HBO East", "HBO West").
 EPG data often only contains listings for the east feed or without geographic identifier.
 West feed EPG is generated by shifting east feed times by -3 hours.
 """
+import copy
 import gzip
+import hashlib
 import io
 import json
 import logging
 import re
+import tempfile
 import xml.etree.ElementTree as ET
 from datetime import datetime, timedelta
 from difflib import SequenceMatcher
-from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+from functools import lru_cache
+from typing import IO, Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple, Union, cast
 
 from models import Channel, ChannelEpgMapping, ChannelTag, EpgChannel, EpgSource, FccFacility, Tag, db
+from services.epg_catalogue import EpgCatalogueEntry, get_epg_catalogue
 from services.epg_match_rules_service import EpgMatchRulesService
+from services.programme_service import (
+    PROGRAMME_INSERT_BATCH,
+    ProgrammeRow,
+    ProgrammeService,
+    in_time_window,
+    parse_xmltv_time_utc,
+)
+from services.xmltv_parser import element_to_string, iterparse_xmltv
+from services.xmltv_writer import EMPTY_XMLTV, XmltvWriter
 
 logger = logging.getLogger(__name__)
 
@@ -325,6 +339,70 @@ EAST_TAGS = {"EAST", "E", "ET", "EST", "EASTERN"}
 WEST_TAGS = {"WEST", "W", "PT", "PST", "PACIFIC", "WESTERN"}
 
 
+def _is_xmltv_time_key(time_str: str, key: str) -> bool:
+    """
+    Check whether an XMLTV time starts with a bare 14-digit timestamp (key = time_str[:14]).
+
+    Month, day and time fields are range-checked, so only impossible days
+    of a month (such as February 30th) pass without being a valid date.
+    """
+    return (
+        key.isascii()
+        and key.isdigit()
+        and len(key) == 14
+        and (len(time_str) == 14 or time_str[14].isspace())
+        and "01" <= key[4:6] <= "12"
+        and "01" <= key[6:8] <= "31"
+        and key[8:10] < "24"
+        and key[10:12] < "60"
+        and key[12:14] < "60"
+    )
+
+
+# strptime formats for the datetime prefixes XMLTV allows, by length
+XMLTV_TIME_FORMATS = {14: "%Y%m%d%H%M%S", 12: "%Y%m%d%H%M", 8: "%Y%m%d"}
+
+# Distinct (timestamp, offset) pairs remembered by the shifted-time cache
+SHIFT_CACHE_SIZE = 65536
+
+
+@lru_cache(maxsize=SHIFT_CACHE_SIZE)
+def _shift_xmltv_digits(digits: str, hours: int) -> Optional[str]:
+    """
+    Shift a 14, 12 or 8 digit XMLTV datetime prefix by a number of hours.
+
+    Guides repeat the same slot boundaries across channels and days, so
+    results are cached per (prefix, offset).
+
+    Returns:
+        Shifted YYYYMMDDHHmmss string, or None if the prefix is not a valid date
+    """
+    if digits.isascii() and digits.isdigit():
+        # Fixed-width fields: the same split strptime makes for all-digit input
+        try:
+            dt = datetime(
+                int(digits[0:4]),
+                int(digits[4:6]),
+                int(digits[6:8]),
+                int(digits[8:10] or 0),
+                int(digits[10:12] or 0),
+                int(digits[12:14] or 0),
+            )
+        except ValueError:
+            return None
+    else:
+        try:
+            dt = datetime.strptime(digits, XMLTV_TIME_FORMATS[len(digits)])
+        except ValueError:
+            return None
+
+    dt = dt + timedelta(hours=hours)
+    if dt.year < 1000:
+        # strftime doesn't zero-pad years before 1000
+        return dt.strftime("%Y%m%d%H%M%S")
+    return f"{dt.year}{dt.month:02d}{dt.day:02d}{dt.hour:02d}{dt.minute:02d}{dt.second:02d}"
+
+
 def shift_xmltv_time(time_str: str, hours: int) -> str:
     """
     Shift an XMLTV datetime string by a number of hours.
@@ -346,24 +424,28 @@ def shift_xmltv_time(time_str: str, hours: int) -> str:
     datetime_part = parts[0]
     tz_part = parts[1] if len(parts) > 1 else "+0000"
 
-    # Parse datetime
-    try:
-        if len(datetime_part) >= 14:
-            dt = datetime.strptime(datetime_part[:14], "%Y%m%d%H%M%S")
-        elif len(datetime_part) >= 12:
-            dt = datetime.strptime(datetime_part[:12], "%Y%m%d%H%M")
-        elif len(datetime_part) >= 8:
-            dt = datetime.strptime(datetime_part[:8], "%Y%m%d")
-        else:
-            return time_str
-    except ValueError:
+    if len(datetime_part) >= 14:
+        digits = datetime_part[:14]
+    elif len(datetime_part) >= 12:
+        digits = datetime_part[:12]
+    elif len(datetime_part) >= 8:
+        digits = datetime_part[:8]
+    else:
         return time_str
 
-    # Apply shift
-    dt = dt + timedelta(hours=hours)
+    shifted = _shift_xmltv_digits(digits, hours)
+    if shifted is None:
+        return time_str
 
     # Format back to XMLTV format
-    return f"{dt.strftime('%Y%m%d%H%M%S')} {tz_part}"
+    return f"{shifted} {tz_part}"
+
+
+# Read size when streaming XMLTV from a raw (unbuffered) source such as an HTTP body
+XMLTV_STREAM_BUFFER_SIZE = 256 * 1024
+
+# EPG channel IDs per bulk UPDATE statement during sync
+EPG_CHANNEL_UPDATE_BATCH = 500
 
 
 def decompress_content(content: bytes) -> bytes:
@@ -386,34 +468,61 @@ def decompress_content(content: bytes) -> bytes:
     return content
 
 
-def get_decompressing_stream(content: bytes) -> io.BufferedIOBase:
+def get_decompressing_stream(content: Union[bytes, IO[bytes]]) -> io.BufferedIOBase:
     """
     Get a file-like object for reading content, with streaming decompression if gzipped.
 
     Args:
-        content: Raw bytes that may be gzip-compressed
+        content: Raw bytes, or a binary stream (e.g. an HTTP response body), that
+            may be gzip-compressed. Streams are read incrementally, never buffered whole.
 
     Returns:
         A file-like object for reading the (decompressed) content
     """
+    stream: io.BufferedIOBase
+    if isinstance(content, (bytes, bytearray)):
+        stream = io.BytesIO(content)
+        magic = content[:2]
+    else:
+        # Peek at the magic bytes without consuming them; unbuffered streams get a buffer first
+        if hasattr(content, "peek"):
+            reader = cast(io.BufferedReader, content)
+        else:
+            reader = io.BufferedReader(cast(io.RawIOBase, content), XMLTV_STREAM_BUFFER_SIZE)
+        stream = reader
+        magic = reader.peek(2)[:2]
+
     # Check for gzip magic bytes
-    if content[:2] == b"\x1f\x8b":
+    if magic == b"\x1f\x8b":
         # Use streaming gzip decompression
-        return gzip.GzipFile(fileobj=io.BytesIO(content), mode="rb")
-    return io.BytesIO(content)
+        return gzip.GzipFile(fileobj=stream, mode="rb")
+    return stream
+
+
+class XmltvDownload(NamedTuple):
+    """Result of EpgService.download_xmltv_url"""
+
+    status: str  # "downloaded", "not_modified" (HTTP 304) or "same_content"
+    etag: Optional[str]
+    last_modified: Optional[str]
+    content_hash: Optional[str]
 
 
 class EpgService:
     """Service for managing EPG data and channel matching"""
 
     @staticmethod
-    def parse_xmltv_streaming(xml_content: bytes) -> Iterator[Tuple[str, Dict]]:
+    def parse_xmltv_streaming(
+        xml_content: Union[bytes, IO[bytes]], include_programme_body: bool = False
+    ) -> Iterator[Tuple[str, Dict]]:
         """
         Parse XMLTV content using streaming parser for memory efficiency.
         Yields channel and programme elements one at a time.
 
         Args:
-            xml_content: Raw XMLTV XML bytes (may be gzip-compressed)
+            xml_content: Raw XMLTV XML bytes or binary stream (may be gzip-compressed)
+            include_programme_body: Also yield each programme's title and its
+                serialized child elements ("title" and "body" keys)
 
         Yields:
             Tuples of (element_type, data) where element_type is 'channel' or 'programme'
@@ -421,10 +530,8 @@ class EpgService:
         stream = get_decompressing_stream(xml_content)
 
         try:
-            # Use iterparse for memory-efficient parsing
-            context = ET.iterparse(stream, events=("end",))
-
-            for event, elem in context:
+            # Stream top-level elements; each is cleared once processed
+            for elem in iterparse_xmltv(stream):
                 if elem.tag == "channel":
                     channel_id = elem.get("id")
                     if channel_id:
@@ -454,29 +561,18 @@ class EpgService:
                             },
                         )
 
-                    # Clear element to free memory
-                    elem.clear()
-
                 elif elem.tag == "programme":
                     channel_id = elem.get("channel")
                     if channel_id:
-                        yield (
-                            "programme",
-                            {
-                                "channel": channel_id,
-                                "start": elem.get("start"),
-                                "stop": elem.get("stop"),
-                            },
-                        )
-
-                    # Clear element to free memory
-                    elem.clear()
-
-                # Also clear any ancestors to prevent memory buildup
-                # This is needed because iterparse keeps a reference to parent elements
-                if elem.tag in ("channel", "programme"):
-                    # Clear the element's tail text
-                    elem.tail = None
+                        programme = {
+                            "channel": channel_id,
+                            "start": elem.get("start"),
+                            "stop": elem.get("stop"),
+                        }
+                        if include_programme_body:
+                            programme["title"] = elem.findtext("title")
+                            programme["body"] = _serialize_children(elem)
+                        yield ("programme", programme)
 
         except ET.ParseError as e:
             logger.error(f"Failed to parse XMLTV: {e}")
@@ -520,153 +616,472 @@ class EpgService:
         }
 
     @staticmethod
-    def sync_epg_source(source: EpgSource, xml_content: bytes) -> Dict:
+    def sync_epg_source(
+        source: EpgSource,
+        xml_content: Union[bytes, IO[bytes], Iterable[Tuple[str, Dict]]],
+        commit: bool = True,
+    ) -> Dict:
         """
         Sync EPG data from XMLTV content into the database.
 
-        Uses streaming parser for memory efficiency with large files.
+        The guide is parsed as a stream and its programmes are staged in
+        batches of PROGRAMME_INSERT_BATCH while parsing, each batch committed
+        on its own, so only per-channel data is held for the whole guide and
+        the write lock is never held while the guide downloads or parses.
+        Once the guide is complete, its channels are written and the staged
+        programmes replace the stored ones in one short transaction (not
+        committed with commit=False). A guide that can't be read leaves the
+        stored programmes as they were.
 
         Args:
             source: The EpgSource to sync
-            xml_content: Raw XMLTV XML bytes
+            xml_content: Raw XMLTV XML bytes, a binary stream such as an HTTP
+                response body (may be gzip-compressed), or (element_type, data)
+                events from parse_xmltv_streaming(include_programme_body=True)
+            commit: Commit the sync; with False the caller commits or rolls back the
+                final swap (an invalid guide is still rolled back and recorded as an
+                error, and staged programmes left by a rollback are cleared by the
+                source's next sync)
 
         Returns:
             Dict with sync statistics
         """
-        stats = {
-            "channels_added": 0,
-            "channels_updated": 0,
-            "channels_removed": 0,
-            "total_programs": 0,
-        }
-
-        now = datetime.utcnow()
-        seen_channel_ids: Set[str] = set()
-
-        # Track channel data and program stats as we stream
-        # We only keep essential info in memory, not all program details
-        channel_data_map: Dict[str, Dict] = {}
-        channel_program_stats: Dict[str, Dict] = {}  # channel_id -> {count, first_time, last_time}
+        events: Iterable[Tuple[str, Dict]]
+        if isinstance(xml_content, (bytes, bytearray)) or hasattr(xml_content, "read"):
+            events = EpgService.parse_xmltv_streaming(
+                cast(Union[bytes, IO[bytes]], xml_content), include_programme_body=True
+            )
+        else:
+            events = cast(Iterable[Tuple[str, Dict]], xml_content)
 
-        # Stream through the XMLTV content
         try:
-            for element_type, data in EpgService.parse_xmltv_streaming(xml_content):
-                if element_type == "channel":
-                    channel_id = data["channel_id"]
-                    if channel_id in channel_data_map:
-                        # Handle duplicate channel entries by merging display names
-                        existing = channel_data_map[channel_id]
-                        existing_names = existing.get("display_names", [])
-                        new_names = data.get("display_names", [])
-                        merged_names = list(dict.fromkeys(existing_names + new_names))
-                        existing["display_names"] = merged_names
-                        if not existing.get("icon_url") and data.get("icon_url"):
-                            existing["icon_url"] = data.get("icon_url")
-                        if not existing.get("url") and data.get("url"):
-                            existing["url"] = data.get("url")
-                        logger.debug(f"Merged duplicate channel ID '{channel_id}' in XMLTV data")
-                    else:
-                        channel_data_map[channel_id] = data
-                        channel_program_stats[channel_id] = {
-                            "count": 0,
-                            "first_time": None,
-                            "last_time": None,
-                        }
-                    seen_channel_ids.add(channel_id)
-
-                elif element_type == "programme":
-                    channel_id = data["channel"]
-                    if channel_id in channel_program_stats:
-                        prog_stats = channel_program_stats[channel_id]
-                        prog_stats["count"] += 1
-                        stats["total_programs"] += 1
-
-                        # Track time range without storing all times
-                        for time_field in ("start", "stop"):
-                            time_str = data.get(time_field)
-                            if time_str:
-                                try:
-                                    t = EpgService._parse_xmltv_time(time_str)
-                                    if t:
-                                        if prog_stats["first_time"] is None or t < prog_stats["first_time"]:
-                                            prog_stats["first_time"] = t
-                                        if prog_stats["last_time"] is None or t > prog_stats["last_time"]:
-                                            prog_stats["last_time"] = t
-                                except Exception:
-                                    pass
-
+            stats = EpgService._write_epg_events(source, events)
         except ValueError as e:
-            source.last_sync = datetime.utcnow()
-            source.last_sync_status = "error"
-            source.last_sync_message = str(e)
+            db.session.rollback()
+            ProgrammeService.clear_staged_programmes(source.id)
+            EpgService.mark_source_error(source, str(e))
+            raise
+        except Exception:
+            db.session.rollback()
+            ProgrammeService.clear_staged_programmes(source.id)
             db.session.commit()
             raise
 
-        # Track channels we've already processed in THIS sync
-        processed_in_this_sync: Dict[str, EpgChannel] = {}
+        if commit:
+            db.session.commit()
+
+        logger.info(
+            f"EPG sync for source {source.id} ({source.name}): "
+            f"added={stats['channels_added']}, updated={stats['channels_updated']}, "
+            f"unchanged={stats['channels_unchanged']}, programs={stats['total_programs']}"
+        )
+
+        return stats
 
-        # Get existing channels for this source
-        existing = {ec.channel_id: ec for ec in EpgChannel.query.filter_by(source_id=source.id).all()}
+    @staticmethod
+    def _write_epg_events(source: EpgSource, events: Iterable[Tuple[str, Dict]]) -> Dict:
+        """
+        Write a source's channels and programmes from XMLTV events.
 
-        # Now update the database with collected channel data
-        for channel_id, channel_data in channel_data_map.items():
-            prog_stats = channel_program_stats.get(channel_id, {"count": 0, "first_time": None, "last_time": None})
-            program_count = prog_stats["count"]
-            first_program = prog_stats["first_time"]
-            last_program = prog_stats["last_time"]
-
-            if channel_id in existing:
-                # Update existing channel from database
-                ec = existing[channel_id]
-                ec.display_name = channel_data["display_name"]
-                ec.display_names_json = json.dumps(channel_data["display_names"])
-                ec.icon_url = channel_data.get("icon_url")
-                ec.url = channel_data.get("url")
-                ec.program_count = program_count
-                ec.first_program = first_program
-                ec.last_program = last_program
-                ec.last_seen = now
-                ec.updated_at = now
-                stats["channels_updated"] += 1
-            else:
-                # Create new channel
-                ec = EpgChannel(
-                    source_id=source.id,
-                    channel_id=channel_id,
-                    display_name=channel_data["display_name"],
-                    display_names_json=json.dumps(channel_data["display_names"]),
-                    icon_url=channel_data.get("icon_url"),
-                    url=channel_data.get("url"),
-                    program_count=program_count,
-                    first_program=first_program,
-                    last_program=last_program,
-                    last_seen=now,
+        Programmes are staged (and committed) in batches while the events are
+        read; the channels and the swap of the staged programmes are not committed.
+
+        Args:
+            source: The EpgSource to sync
+            events: (element_type, data) events from parse_xmltv_streaming
+
+        Returns:
+            Dict with sync statistics
+
+        Raises:
+            ValueError: If the events come from content that is not valid XMLTV XML
+        """
+        now = datetime.utcnow()
+
+        # Existing channels as (id, content_hash), without loading ORM objects
+        existing: Dict[str, Tuple[int, Optional[str]]] = {
+            channel_id: (ec_id, content_hash)
+            for ec_id, channel_id, content_hash in db.session.execute(
+                db.select(EpgChannel.id, EpgChannel.channel_id, EpgChannel.content_hash).where(
+                    EpgChannel.source_id == source.id
+                )
+            )
+        }
+        epg_channel_ids = {channel_id: row[0] for channel_id, row in existing.items()}
+
+        # Staged programmes left over by a failed sync
+        ProgrammeService.clear_staged_programmes(source.id)
+
+        # Track channel data and program stats as we stream; programmes are
+        # only held until a batch of them is staged
+        channel_data_map: Dict[str, Dict] = {}
+        channel_program_stats: Dict[str, Dict] = {}  # channel_id -> {count, first/last key, first/last time}
+        new_channel_ids: List[str] = []  # Channels without an EpgChannel row yet
+        pending: Dict[str, List[ProgrammeRow]] = {}  # XMLTV channel id -> [(start, stop, title, body), ...]
+        pending_count = 0
+        total_programs = 0
+
+        for element_type, data in events:
+            if element_type == "channel":
+                channel_id = data["channel_id"]
+                if channel_id in channel_data_map:
+                    # Handle duplicate channel entries by merging display names
+                    merged = channel_data_map[channel_id]
+                    merged["display_names"] = list(
+                        dict.fromkeys(merged.get("display_names", []) + data.get("display_names", []))
+                    )
+                    if not merged.get("icon_url") and data.get("icon_url"):
+                        merged["icon_url"] = data.get("icon_url")
+                    if not merged.get("url") and data.get("url"):
+                        merged["url"] = data.get("url")
+                    logger.debug(f"Merged duplicate channel ID '{channel_id}' in XMLTV data")
+                else:
+                    channel_data_map[channel_id] = data
+                    channel_program_stats[channel_id] = {
+                        "count": 0,
+                        "first_key": None,
+                        "last_key": None,
+                        "first_time": None,
+                        "last_time": None,
+                    }
+                    if channel_id not in epg_channel_ids:
+                        new_channel_ids.append(channel_id)
+
+            elif element_type == "programme":
+                channel_id = data["channel"]
+                if channel_id not in channel_program_stats:
+                    continue
+                prog_stats = channel_program_stats[channel_id]
+                prog_stats["count"] += 1
+                total_programs += 1
+
+                pending.setdefault(channel_id, []).append(
+                    (data["start"], data.get("stop"), data.get("title"), data.get("body"))
                 )
-                db.session.add(ec)
-                processed_in_this_sync[channel_id] = ec
-                stats["channels_added"] += 1
+                pending_count += 1
+                if pending_count >= PROGRAMME_INSERT_BATCH:
+                    ProgrammeService.stage_programmes(source.id, pending)
+                    pending = {}
+                    pending_count = 0
+
+                # Track time range without parsing every time: 14-digit timestamps
+                # sort lexically, so only the final first/last keys are parsed
+                for time_field in ("start", "stop"):
+                    time_str = data.get(time_field)
+                    if not time_str:
+                        continue
+                    key = time_str[:14]
+                    if _is_xmltv_time_key(time_str, key):
+                        if prog_stats["first_key"] is None or key < prog_stats["first_key"]:
+                            prog_stats["first_key"] = key
+                        if prog_stats["last_key"] is None or key > prog_stats["last_key"]:
+                            prog_stats["last_key"] = key
+                        continue
+                    try:
+                        t = EpgService._parse_xmltv_time(time_str)
+                        if t:
+                            if prog_stats["first_time"] is None or t < prog_stats["first_time"]:
+                                prog_stats["first_time"] = t
+                            if prog_stats["last_time"] is None or t > prog_stats["last_time"]:
+                                prog_stats["last_time"] = t
+                    except Exception:
+                        pass
+
+        if pending:
+            ProgrammeService.stage_programmes(source.id, pending)
+
+        # The guide is complete: from here on everything is one short transaction
+        if new_channel_ids:
+            EpgService._insert_new_epg_channels(source, new_channel_ids, epg_channel_ids, now)
+        # Replace the source's stored programmes (removed channels keep none)
+        programmes_stored = ProgrammeService.swap_staged_programmes(source.id)
+
+        # Compare a hash of each channel's synced fields; only changed rows are
+        # serialized and written, all of them with executemany statements.
+        # Channels inserted above only have their IDs and get their values here.
+        updates: List[Dict] = []
+        unchanged_ids: List[int] = []
+        channels_added = 0
+        for channel_id, channel_data in channel_data_map.items():
+            prog_stats = channel_program_stats[channel_id]
+            epg_channel_id = epg_channel_ids[channel_id]
+            first_program, last_program = EpgService._get_program_time_range(prog_stats, epg_channel_id)
+            fields = (
+                channel_data["display_name"],
+                channel_data["display_names"],
+                channel_data.get("icon_url"),
+                channel_data.get("url"),
+                prog_stats["count"],
+                first_program,
+                last_program,
+            )
+            content_hash = hashlib.sha256(repr(fields).encode("utf-8")).hexdigest()
+
+            row = existing.get(channel_id)
+            if row is None:
+                channels_added += 1
+            elif row[1] == content_hash:
+                unchanged_ids.append(row[0])
+                continue
+
+            updates.append(
+                {
+                    "id": epg_channel_id,
+                    "display_name": fields[0],
+                    "display_names_json": json.dumps(fields[1]),
+                    "icon_url": fields[2],
+                    "url": fields[3],
+                    "program_count": fields[4],
+                    "first_program": first_program,
+                    "last_program": last_program,
+                    "content_hash": content_hash,
+                    "last_seen": now,
+                    "updated_at": now,
+                }
+            )
 
-        # Mark channels not seen as removed (but don't delete - they may come back)
-        for channel_id, ec in existing.items():
-            if channel_id not in seen_channel_ids:
-                stats["channels_removed"] += 1
+        for i in range(0, len(updates), EPG_CHANNEL_UPDATE_BATCH):
+            db.session.execute(db.update(EpgChannel), updates[i : i + EPG_CHANNEL_UPDATE_BATCH])
+        # Unchanged channels only need last_seen, set in bulk instead of per row
+        for i in range(0, len(unchanged_ids), EPG_CHANNEL_UPDATE_BATCH):
+            db.session.execute(
+                db.update(EpgChannel)
+                .where(EpgChannel.id.in_(unchanged_ids[i : i + EPG_CHANNEL_UPDATE_BATCH]))
+                .values(last_seen=now)
+                .execution_options(synchronize_session=False)
+            )
 
         # Update source stats
         source.last_sync = now
         source.last_sync_status = "success"
-        source.last_sync_message = f"Synced {len(seen_channel_ids)} channels, {stats['total_programs']} programs"
-        source.channel_count = len(seen_channel_ids)
+        source.last_sync_message = f"Synced {len(channel_data_map)} channels, {total_programs} programs"
+        source.channel_count = len(channel_data_map)
         source.updated_at = now
 
+        return {
+            "channels_added": channels_added,
+            "channels_updated": len(updates) - channels_added,
+            "channels_unchanged": len(unchanged_ids),
+            # Channels not seen keep their old last_seen (not deleted - they may come back)
+            "channels_removed": len(existing.keys() - channel_data_map.keys()),
+            "total_programs": total_programs,
+            "programmes_stored": programmes_stored,
+        }
+
+    @staticmethod
+    def _insert_new_epg_channels(
+        source: EpgSource, channel_ids: List[str], epg_channel_ids: Dict[str, int], now: datetime
+    ) -> None:
+        """Insert placeholder rows for new channels of a source and add their IDs to epg_channel_ids."""
+        for i in range(0, len(channel_ids), EPG_CHANNEL_UPDATE_BATCH):
+            batch = channel_ids[i : i + EPG_CHANNEL_UPDATE_BATCH]
+            db.session.execute(
+                db.insert(EpgChannel),
+                [
+                    {
+                        "source_id": source.id,
+                        "channel_id": channel_id,
+                        "program_count": 0,
+                        "last_seen": now,
+                        "created_at": now,
+                        "updated_at": now,
+                    }
+                    for channel_id in batch
+                ],
+            )
+            epg_channel_ids.update(
+                (row.channel_id, row.id)
+                for row in db.session.execute(
+                    db.select(EpgChannel.channel_id, EpgChannel.id).where(
+                        EpgChannel.source_id == source.id, EpgChannel.channel_id.in_(batch)
+                    )
+                )
+            )
+
+    @staticmethod
+    def sync_xmltv_url_source(source: EpgSource, force: bool = False) -> Dict:
+        """
+        Download an external XMLTV URL source and sync it if it changed.
+
+        Sends the ETag / Last-Modified of the last synced download as a
+        conditional GET, and compares a SHA-256 of the body with the last
+        synced one for servers without validators. An unchanged guide is
+        neither parsed nor written. The body is spooled to a temporary file
+        while hashing, so memory stays flat however large the guide is.
+
+        Args:
+            source: xmltv_url EpgSource with a URL
+            force: Ignore the stored validators and hash and always re-sync
+
+        Returns:
+            Dict with sync statistics ("not_modified" is True if the guide was unchanged)
+        """
+        # Normalize URL (e.g., convert GitHub blob URLs to raw URLs)
+        url = normalize_xmltv_url(source.url)
+        if url != source.url:
+            logger.info(f"Normalized XMLTV URL: {source.url} -> {url}")
+
+        with tempfile.TemporaryFile() as body:
+            if force:
+                download = EpgService.download_xmltv_url(url, body)
+            else:
+                download = EpgService.download_xmltv_url(
+                    url, body, source.etag, source.last_modified, source.content_hash
+                )
+            body.seek(0)
+            return EpgService.finish_xmltv_url_sync(source, download, body)
+
+    @staticmethod
+    def download_xmltv_url(
+        url: str,
+        body: IO[bytes],
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+        content_hash: Optional[str] = None,
+    ) -> XmltvDownload:
+        """
+        Conditionally download an XMLTV URL into a file, hashing it on the way.
+
+        Touches no database state, so downloads can run off the scheduler thread.
+
+        Args:
+            url: (Normalized) XMLTV URL
+            body: Binary file the body is written to
+            etag: ETag of the last synced download (sent as If-None-Match)
+            last_modified: Last-Modified of the last synced download (sent as If-Modified-Since)
+            content_hash: SHA-256 of the last synced download
+
+        Returns:
+            XmltvDownload ("not_modified" on HTTP 304, "same_content" if the
+            body hashes to content_hash, otherwise "downloaded")
+        """
+        import requests
+
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+
+        digest = hashlib.sha256()
+        # Use 10 minute timeout for large XMLTV files from rate-limited servers
+        response = requests.get(url, headers=headers, timeout=600, stream=True)
+        try:
+            if response.status_code == 304:
+                return XmltvDownload("not_modified", etag, last_modified, content_hash)
+            response.raise_for_status()
+
+            # iter_content undoes any Content-Encoding; .xml.gz bodies are handled by the parser
+            for chunk in response.iter_content(chunk_size=XMLTV_STREAM_BUFFER_SIZE):
+                body.write(chunk)
+                digest.update(chunk)
+            new_etag = response.headers.get("ETag")
+            new_last_modified = response.headers.get("Last-Modified")
+        finally:
+            response.close()
+
+        new_hash = digest.hexdigest()
+        status = "same_content" if new_hash == content_hash else "downloaded"
+        return XmltvDownload(status, new_etag, new_last_modified, new_hash)
+
+    @staticmethod
+    def finish_xmltv_url_sync(
+        source: EpgSource, download: XmltvDownload, content: Union[IO[bytes], Iterable[Tuple[str, Dict]], None]
+    ) -> Dict:
+        """
+        Record the outcome of download_xmltv_url for a source, syncing new content.
+
+        Validators are only stored once the guide is synced, so a failed sync is
+        retried in full next time.
+
+        Args:
+            source: The xmltv_url EpgSource that was downloaded
+            download: Result of download_xmltv_url
+            content: The downloaded body (or its parse_xmltv_streaming events), used when status is "downloaded"
+
+        Returns:
+            Dict with sync statistics ("not_modified" is True if the guide was unchanged)
+        """
+        if download.status == "not_modified":
+            return EpgService._mark_source_unchanged(source, "HTTP 304")
+
+        if download.status == "same_content":
+            source.etag = download.etag
+            source.last_modified = download.last_modified
+            return EpgService._mark_source_unchanged(source, "same content")
+
+        if content is None:
+            raise ValueError("Downloaded XMLTV content is missing")
+
+        # On failure the previous validators are kept, so the next run downloads again
+        stats = EpgService.sync_epg_source(source, content, commit=False)
+        source.etag = download.etag
+        source.last_modified = download.last_modified
+        source.content_hash = download.content_hash
         db.session.commit()
+        return stats
 
-        logger.info(
-            f"EPG sync for source {source.id} ({source.name}): "
-            f"added={stats['channels_added']}, updated={stats['channels_updated']}, "
-            f"programs={stats['total_programs']}"
+    @staticmethod
+    def mark_source_error(source: EpgSource, message: str):
+        """Record a failed sync of an EPG source."""
+        source.last_sync = datetime.utcnow()
+        source.last_sync_status = "error"
+        source.last_sync_message = message
+        db.session.commit()
+
+    @staticmethod
+    def _mark_source_unchanged(source: EpgSource, reason: str) -> Dict:
+        """Record an EPG source check that found the guide unchanged (last_sync keeps the last real sync)."""
+        source.last_sync_status = "success"
+        source.last_sync_message = (
+            f"Unchanged since last sync ({reason}, checked {datetime.utcnow().strftime('%Y-%m-%d %H:%M')} UTC)"
         )
+        db.session.commit()
+        logger.info(f"EPG source {source.id} ({source.name}) unchanged ({reason}), skipping sync")
+        return {
+            "channels_added": 0,
+            "channels_updated": 0,
+            "channels_removed": 0,
+            "total_programs": 0,
+            "not_modified": True,
+        }
 
-        return stats
+    @staticmethod
+    def _get_program_time_range(prog_stats: Dict, epg_channel_id: int) -> Tuple[Optional[datetime], Optional[datetime]]:
+        """
+        Resolve a channel's first/last programme time from sync_epg_source's tracking.
+
+        Combines the lexical first/last 14-digit keys with times that had to be
+        parsed individually. If a key turns out not to be a valid date (such as
+        February 30th), the channel's stored programmes are rescanned instead.
+
+        Args:
+            prog_stats: Per-channel stats with first_key/last_key and first_time/last_time
+            epg_channel_id: EpgChannel ID the channel's programmes were stored under
+
+        Returns:
+            (first_time, last_time), each None if no programme has a valid time
+        """
+        from models import EpgProgramme
+
+        first_time, last_time = prog_stats["first_time"], prog_stats["last_time"]
+        if prog_stats["first_key"] is None:
+            return first_time, last_time
+
+        first_key_time = EpgService._parse_xmltv_time(prog_stats["first_key"])
+        last_key_time = EpgService._parse_xmltv_time(prog_stats["last_key"])
+        if first_key_time is None or last_key_time is None:
+            programmes = db.session.execute(
+                db.select(EpgProgramme.start, EpgProgramme.stop).where(EpgProgramme.epg_channel_id == epg_channel_id)
+            )
+            times = [t for row in programmes for t in map(EpgService._parse_xmltv_time, filter(None, row)) if t]
+            return (min(times), max(times)) if times else (None, None)
+
+        if first_time is None or first_key_time < first_time:
+            first_time = first_key_time
+        if last_time is None or last_key_time > last_time:
+            last_time = last_key_time
+        return first_time, last_time
 
     @staticmethod
     def _parse_xmltv_time(time_str: str) -> Optional[datetime]:
@@ -685,7 +1100,21 @@ class EpgService:
                 return None
 
     @staticmethod
-    def _build_callsign_epg_index(epg_channels: List[EpgChannel]) -> Dict[str, EpgChannel]:
+    def _build_id_epg_index(epg_channels: List[EpgCatalogueEntry]) -> Dict[str, EpgCatalogueEntry]:
+        """Build an index of EPG channels by lowercase XMLTV channel ID."""
+        return {ec.channel_id.lower(): ec for ec in epg_channels}
+
+    @staticmethod
+    def _build_name_epg_index(epg_channels: List[EpgCatalogueEntry]) -> Dict[str, EpgCatalogueEntry]:
+        """Build an index of EPG channels by all their normalized display names (later channels win)."""
+        epg_by_name: Dict[str, EpgCatalogueEntry] = {}
+        for ec in epg_channels:
+            for normalized in ec.normalized_names:
+                epg_by_name[normalized] = ec
+        return epg_by_name
+
+    @staticmethod
+    def _build_callsign_epg_index(epg_channels: List[EpgCatalogueEntry]) -> Dict[str, EpgCatalogueEntry]:
         """
         Build an index of EPG channels by callsign for tag-based matching.
 
@@ -698,7 +1127,7 @@ class EpgService:
         Returns:
             Dict mapping uppercase callsigns to EPG channels
         """
-        epg_by_callsign: Dict[str, EpgChannel] = {}
+        epg_by_callsign: Dict[str, EpgCatalogueEntry] = {}
 
         for ec in epg_channels:
             # Extract callsign from channel_id
@@ -1115,34 +1544,20 @@ class EpgService:
             f"EPG matching: Found {len(channels)} active channels{filter_desc}{visibility_desc} for account {account_id}"
         )
 
-        # Get all EPG channels
-        epg_query = EpgChannel.query
-        if source_id:
-            epg_query = epg_query.filter_by(source_id=source_id)
-        epg_channels = epg_query.all()
+        # Get all EPG channels (shared catalogue, rebuilt only after a source syncs)
+        catalogue = get_epg_catalogue(source_id)
+        epg_channels = catalogue.entries
         logger.info(
             f"EPG matching: Found {len(epg_channels)} EPG channels{f' for source {source_id}' if source_id else ''}"
         )
 
-        # Build lookup indices
-        epg_by_id = {ec.channel_id.lower(): ec for ec in epg_channels}
+        # Lookup indices
+        epg_by_id = catalogue.get_index("id", EpgService._build_id_epg_index)
         logger.debug(f"EPG matching: Built index with {len(epg_by_id)} unique EPG channel IDs")
-        epg_by_name = {}
-        for ec in epg_channels:
-            # Index by all display names
-            names = [ec.display_name.lower()] if ec.display_name else []
-            if ec.display_names_json:
-                try:
-                    names.extend([n.lower() for n in json.loads(ec.display_names_json)])
-                except (json.JSONDecodeError, TypeError):
-                    pass
-            for name in names:
-                normalized = EpgService._normalize_name(name)
-                if normalized:
-                    epg_by_name[normalized] = ec
-
-        # Build callsign index for EPG channels (maps callsigns like "WCTI" to EPG channels)
-        epg_by_callsign = EpgService._build_callsign_epg_index(epg_channels)
+        epg_by_name = catalogue.get_index("name", EpgService._build_name_epg_index)
+
+        # Callsign index for EPG channels (maps callsigns like "WCTI" to EPG channels)
+        epg_by_callsign = catalogue.get_index("callsign", EpgService._build_callsign_epg_index)
         logger.debug(f"EPG matching: Built callsign index with {len(epg_by_callsign)} entries")
 
         # Get existing mappings to avoid duplicates
@@ -1754,10 +2169,10 @@ class EpgService:
     @staticmethod
     def _fuzzy_match(
         channel_name: str,
-        epg_channels: List[EpgChannel],
+        epg_channels: List[EpgCatalogueEntry],
         min_score: float = 0.75,
         country_tags: Optional[Set[str]] = None,
-    ) -> Tuple[Optional[EpgChannel], float]:
+    ) -> Tuple[Optional[EpgCatalogueEntry], float]:
         """
         Find the best fuzzy match for a channel name.
 
@@ -1773,16 +2188,19 @@ class EpgService:
 
         Args:
             channel_name: The channel name to match
-            epg_channels: List of EPG channels to search
+            epg_channels: List of EPG channels to search (EpgChannel rows are converted to catalogue entries)
             min_score: Minimum similarity score (0-1), default 0.65
             country_tags: Optional set of country codes (e.g., {"US", "UK"}) to prefer
 
         Returns:
-            Tuple of (best matching EpgChannel or None, score)
+            Tuple of (best matching EPG channel or None, score)
         """
         if not channel_name:
             return None, 0.0
 
+        if epg_channels and not isinstance(epg_channels[0], EpgCatalogueEntry):
+            epg_channels = [EpgCatalogueEntry.from_channel(ec) for ec in epg_channels]
+
         normalized_name = EpgService._normalize_name(channel_name)
         if not normalized_name:
             return None, 0.0
@@ -1806,16 +2224,9 @@ class EpgService:
                 logger.debug(f"    Filtered to {len(search_channels)} channels matching country tags {country_tags}")
 
         # Track all candidates with their scores
-        candidates: List[Tuple[EpgChannel, float, str, bool]] = []  # (epg, score, type, country_match)
+        candidates: List[Tuple[EpgCatalogueEntry, float, str, bool]] = []  # (epg, score, type, country_match)
 
         for ec in search_channels:
-            names_to_check = [ec.display_name] if ec.display_name else []
-            if ec.display_names_json:
-                try:
-                    names_to_check.extend(json.loads(ec.display_names_json))
-                except (json.JSONDecodeError, TypeError):
-                    pass
-
             # Check if this EPG channel's country matches our tags
             epg_country = EpgService._extract_country_from_epg_id(ec.channel_id)
             country_match = bool(country_tags and epg_country and epg_country in country_tags)
@@ -1823,10 +2234,7 @@ class EpgService:
             best_name_score = 0.0
             best_name_type = "none"
 
-            for epg_name in names_to_check:
-                if not epg_name:
-                    continue
-
+            for epg_name in ec.names:
                 score, match_type = EpgService._calculate_match_score(channel_name, epg_name)
 
                 if score > best_name_score:
@@ -1899,9 +2307,9 @@ class EpgService:
     @staticmethod
     def _match_by_fcc_callsign(
         channel: Channel,
-        epg_by_callsign: Dict[str, EpgChannel],
+        epg_by_callsign: Dict[str, EpgCatalogueEntry],
         facility: Optional[FccFacility] = None,
-    ) -> Optional[Tuple[EpgChannel, float, str]]:
+    ) -> Optional[Tuple[EpgCatalogueEntry, float, str]]:
         """
         Match a channel to EPG using FCC callsign data.
 
@@ -1914,7 +2322,7 @@ class EpgService:
             facility: Optional pre-looked-up FCC facility
 
         Returns:
-            Tuple of (EpgChannel, confidence, match_type) or None
+            Tuple of (EPG channel, confidence, match_type) or None
         """
         if facility is None:
             facility = EpgService._get_fcc_facility_for_channel(channel)
@@ -1943,9 +2351,9 @@ class EpgService:
     @staticmethod
     def _match_by_fcc_network(
         channel: Channel,
-        epg_by_name: Dict[str, EpgChannel],
+        epg_by_name: Dict[str, EpgCatalogueEntry],
         facility: Optional[FccFacility] = None,
-    ) -> Optional[Tuple[EpgChannel, float, str]]:
+    ) -> Optional[Tuple[EpgCatalogueEntry, float, str]]:
         """
         Match a channel to EPG using FCC network affiliation as fallback.
 
@@ -1959,7 +2367,7 @@ class EpgService:
             facility: Optional pre-looked-up FCC facility
 
         Returns:
-            Tuple of (EpgChannel, confidence, match_type) or None
+            Tuple of (EPG channel, confidence, match_type) or None
         """
         if facility is None:
             facility = EpgService._get_fcc_facility_for_channel(channel)
@@ -1983,8 +2391,8 @@ class EpgService:
 
     @staticmethod
     def _build_fcc_epg_indices(
-        epg_channels: List[EpgChannel],
-    ) -> Tuple[Dict[str, EpgChannel], Dict[str, List[EpgChannel]]]:
+        epg_channels: List[EpgCatalogueEntry],
+    ) -> Tuple[Dict[str, EpgCatalogueEntry], Dict[str, List[EpgCatalogueEntry]]]:
         """
         Build lookup indices for FCC-enhanced EPG matching.
 
@@ -1998,8 +2406,8 @@ class EpgService:
         Returns:
             Tuple of (callsign_dict, dma_dict)
         """
-        epg_by_callsign: Dict[str, EpgChannel] = {}
-        epg_by_dma: Dict[str, List[EpgChannel]] = {}
+        epg_by_callsign: Dict[str, EpgCatalogueEntry] = {}
+        epg_by_dma: Dict[str, List[EpgCatalogueEntry]] = {}
 
         for ec in epg_channels:
             # Extract callsign from channel_id (e.g., "KABC.us" -> "KABC")
@@ -2080,33 +2488,19 @@ class EpgService:
             f"for account {account_id}"
         )
 
-        # Get all EPG channels
-        epg_query = EpgChannel.query
-        if source_id:
-            epg_query = epg_query.filter_by(source_id=source_id)
-        epg_channels = epg_query.all()
+        # Get all EPG channels (shared catalogue, rebuilt only after a source syncs)
+        catalogue = get_epg_catalogue(source_id)
+        epg_channels = catalogue.entries
         logger.info(
             f"EPG matching: Found {len(epg_channels)} EPG channels" f"{f' for source {source_id}' if source_id else ''}"
         )
 
-        # Build lookup indices
-        epg_by_id = {ec.channel_id.lower(): ec for ec in epg_channels}
-        epg_by_name: Dict[str, EpgChannel] = {}
-        for ec in epg_channels:
-            # Index by all display names
-            names = [ec.display_name.lower()] if ec.display_name else []
-            if ec.display_names_json:
-                try:
-                    names.extend([n.lower() for n in json.loads(ec.display_names_json)])
-                except (json.JSONDecodeError, TypeError):
-                    pass
-            for name in names:
-                normalized = EpgService._normalize_name(name)
-                if normalized:
-                    epg_by_name[normalized] = ec
-
-        # Build FCC-specific indices
-        epg_by_callsign, epg_by_dma = EpgService._build_fcc_epg_indices(epg_channels)
+        # Lookup indices
+        epg_by_id = catalogue.get_index("id", EpgService._build_id_epg_index)
+        epg_by_name = catalogue.get_index("name", EpgService._build_name_epg_index)
+
+        # FCC-specific indices
+        epg_by_callsign, epg_by_dma = catalogue.get_index("fcc", EpgService._build_fcc_epg_indices)
         logger.debug(f"EPG matching: Built FCC callsign index with {len(epg_by_callsign)} entries")
 
         # Get existing mappings to avoid duplicates
@@ -2304,14 +2698,8 @@ class EpgService:
             .all()
         )
 
-        # Get EPG channels
-        epg_query = EpgChannel.query
-        if source_id:
-            epg_query = epg_query.filter_by(source_id=source_id)
-        epg_channels = epg_query.all()
-
-        # Build callsign index
-        epg_by_callsign, _ = EpgService._build_fcc_epg_indices(epg_channels)
+        # Callsign index of the EPG channels
+        epg_by_callsign, _ = get_epg_catalogue(source_id).get_index("fcc", EpgService._build_fcc_epg_indices)
 
         for channel in channels:
             if len(results) >= limit:
@@ -2485,138 +2873,6 @@ class EpgService:
 
         return source
 
-    @staticmethod
-    def generate_filtered_epg(
-        channel_epg_ids: List[str],
-        xml_content: bytes,
-        channel_link_map: Optional[Dict[str, Tuple[str, int]]] = None,
-        mapping_offset_map: Optional[Dict[str, int]] = None,
-    ) -> bytes:
-        """
-        Generate filtered EPG XML containing only specified channels.
-
-        Uses channel links for EPG fallback - if a channel has a link to a source
-        channel, programmes from the source are copied with the specified time offset.
-
-        Args:
-            channel_epg_ids: List of EPG channel IDs to include
-            xml_content: Source XMLTV XML content (may be gzipped)
-            channel_link_map: Optional mapping of channel_epg_id -> (source_epg_id, time_offset_hours)
-                              All EPG IDs should be lowercase.
-            mapping_offset_map: Optional mapping of epg_channel_id -> time_offset_hours
-                               for direct mappings with time offset (from ChannelEpgMapping)
-
-        Returns:
-            Filtered XMLTV XML as bytes
-        """
-        if not channel_epg_ids:
-            # Return minimal valid XMLTV
-            return b'<?xml version="1.0" encoding="UTF-8"?>\n<tv generator-info-name="iptv-proxy-v2"></tv>\n'
-
-        # Build lookup set for fast channel matching
-        requested_ids = set(epg_id.lower() for epg_id in channel_epg_ids if epg_id)
-
-        # Use provided channel_link_map or empty dict
-        if channel_link_map is None:
-            channel_link_map = {}
-
-        # Use provided mapping_offset_map or empty dict
-        if mapping_offset_map is None:
-            mapping_offset_map = {}
-
-        # Build reverse lookup: source_epg_id -> list of (target_epg_id, time_offset)
-        source_to_targets: Dict[str, List[Tuple[str, int]]] = {}
-        for target_id, (source_id, offset) in channel_link_map.items():
-            if source_id not in source_to_targets:
-                source_to_targets[source_id] = []
-            source_to_targets[source_id].append((target_id, offset))
-
-        # Decompress if needed
-        stream = get_decompressing_stream(xml_content)
-
-        try:
-            # Build result XML
-            root = ET.Element("tv")
-            root.set("generator-info-name", "iptv-proxy-v2")
-
-            # Track which channels we've found EPG for
-            found_channel_ids: Set[str] = set()
-            programmes_by_channel: Dict[str, List[ET.Element]] = {}
-
-            # Parse source XMLTV
-            context = ET.iterparse(stream, events=("end",))
-
-            for event, elem in context:
-                if elem.tag == "channel":
-                    channel_id = elem.get("id", "").lower()
-                    if channel_id in requested_ids:
-                        # Copy channel element
-                        new_channel = ET.SubElement(root, "channel")
-                        new_channel.set("id", elem.get("id", ""))
-                        for child in elem:
-                            new_channel.append(_copy_element(child))
-                        found_channel_ids.add(channel_id)
-
-                    elem.clear()
-
-                elif elem.tag == "programme":
-                    channel_id = elem.get("channel", "").lower()
-
-                    # Direct match
-                    if channel_id in requested_ids:
-                        if channel_id not in programmes_by_channel:
-                            programmes_by_channel[channel_id] = []
-                        prog_copy = _copy_element(elem)
-                        # Apply mapping offset if present
-                        mapping_offset = mapping_offset_map.get(channel_id, 0)
-                        if mapping_offset != 0:
-                            start = prog_copy.get("start")
-                            stop = prog_copy.get("stop")
-                            if start:
-                                prog_copy.set("start", shift_xmltv_time(start, mapping_offset))
-                            if stop:
-                                prog_copy.set("stop", shift_xmltv_time(stop, mapping_offset))
-                        programmes_by_channel[channel_id].append(prog_copy)
-
-                    # Check if this is a source channel for any linked channels
-                    if channel_id in source_to_targets:
-                        for target_id, time_offset in source_to_targets[channel_id]:
-                            if target_id not in programmes_by_channel:
-                                programmes_by_channel[target_id] = []
-                            shifted_prog = _copy_element(elem)
-                            # Apply time offset
-                            shifted_prog.set("channel", target_id)
-                            if time_offset != 0:
-                                start = shifted_prog.get("start")
-                                stop = shifted_prog.get("stop")
-                                if start:
-                                    shifted_prog.set("start", shift_xmltv_time(start, time_offset))
-                                if stop:
-                                    shifted_prog.set("stop", shift_xmltv_time(stop, time_offset))
-                            programmes_by_channel[target_id].append(shifted_prog)
-
-                    elem.clear()
-
-            # Add linked channels that weren't in original EPG but got programmes from source
-            for target_id in channel_link_map.keys():
-                if target_id not in found_channel_ids and target_id in programmes_by_channel:
-                    # Create a channel entry for this linked channel
-                    new_channel = ET.SubElement(root, "channel")
-                    new_channel.set("id", target_id)
-                    display_name = ET.SubElement(new_channel, "display-name")
-                    display_name.text = target_id  # Basic fallback name
-
-            # Add all programme elements
-            for channel_id in sorted(programmes_by_channel.keys()):
-                for prog in programmes_by_channel[channel_id]:
-                    root.append(prog)
-
-        finally:
-            stream.close()
-
-        # Generate XML output
-        return ET.tostring(root, encoding="unicode", xml_declaration=True).encode("utf-8")
-
     @staticmethod
     def _build_channel_link_map(channel_ids: List[int]) -> Dict[str, Tuple[str, int]]:
         """
@@ -2697,29 +2953,281 @@ class EpgService:
         return offset_map
 
     @staticmethod
-    def generate_epg_for_channels(
+    def _build_store_mapping(channel_ids: List[int]) -> Dict[int, Tuple[EpgChannel, int]]:
+        """
+        Pick the stored EPG channel to serve each channel's guide from.
+
+        Considers ChannelEpgMapping entries (any source type) whose EPG channel
+        has programmes in the programme store. Manual overrides win, then higher
+        confidence, then higher source priority (lower number).
+
+        Args:
+            channel_ids: List of channel IDs (db primary keys) to check
+
+        Returns:
+            Dict mapping channel ID -> (EpgChannel, time_offset_hours)
+        """
+        if not channel_ids:
+            return {}
+
+        mappings = (
+            ChannelEpgMapping.query.filter(ChannelEpgMapping.channel_id.in_(channel_ids))
+            .options(db.joinedload(ChannelEpgMapping.epg_channel).joinedload(EpgChannel.source))
+            .all()
+        )
+        stored = ProgrammeService.get_channels_with_programmes(m.epg_channel_id for m in mappings)
+
+        def rank(mapping: ChannelEpgMapping) -> Tuple:
+            priority = mapping.epg_channel.source.priority if mapping.epg_channel.source else None
+            return (
+                not mapping.is_override,
+                -(mapping.confidence or 0.0),
+                priority if priority is not None else 100,
+                mapping.id,
+            )
+
+        store_mapping: Dict[int, Tuple[EpgChannel, int]] = {}
+        best: Dict[int, ChannelEpgMapping] = {}
+        for mapping in mappings:
+            if mapping.epg_channel is None or mapping.epg_channel_id not in stored:
+                continue
+            current = best.get(mapping.channel_id)
+            if current is None or rank(mapping) < rank(current):
+                best[mapping.channel_id] = mapping
+
+        for channel_id, mapping in best.items():
+            store_mapping[channel_id] = (mapping.epg_channel, mapping.time_offset_hours or 0)
+        return store_mapping
+
+    @staticmethod
+    def _iter_stored_channels(channels: List[Channel], store_mapping: Dict[int, Tuple[EpgChannel, int]]):
+        """
+        Yield <channel> elements for channels served from the programme store.
+
+        Args:
+            channels: Channels to build EPG for
+            store_mapping: Result of _build_store_mapping()
+
+        Yields:
+            Channel elements using ch-<account>-<stream> IDs
+        """
+        for ch in channels:
+            if ch.id not in store_mapping:
+                continue
+            epg_channel, _ = store_mapping[ch.id]
+
+            channel_elem = ET.Element("channel", id=f"ch-{ch.account_id}-{ch.stream_id}")
+            display_names = json.loads(epg_channel.display_names_json) if epg_channel.display_names_json else []
+            for name in display_names or [epg_channel.display_name or ch.cleaned_name or ch.name]:
+                display_name_elem = ET.SubElement(channel_elem, "display-name")
+                display_name_elem.text = name
+            if epg_channel.icon_url:
+                ET.SubElement(channel_elem, "icon", src=epg_channel.icon_url)
+            yield channel_elem
+
+    @staticmethod
+    def _iter_stored_programmes(
+        channels: List[Channel],
+        store_mapping: Dict[int, Tuple[EpgChannel, int]],
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+    ):
+        """
+        Yield <programme> elements for channels served from the programme store.
+
+        The same element is re-yielded once per channel mapped to an EPG channel,
+        with its channel/start/stop attributes updated; serialize it before advancing.
+
+        Args:
+            channels: Channels to build EPG for
+            store_mapping: Result of _build_store_mapping()
+            start: Optional UTC lower bound of the output time window
+            end: Optional UTC upper bound of the output time window
+
+        Yields:
+            Programme elements using ch-<account>-<stream> channel IDs
+        """
+        # EpgChannel ID -> [(standardized_id, time_offset_hours), ...]
+        targets: Dict[int, List[Tuple[str, int]]] = {}
+        for ch in channels:
+            if ch.id in store_mapping:
+                epg_channel, offset = store_mapping[ch.id]
+                targets.setdefault(epg_channel.id, []).append((f"ch-{ch.account_id}-{ch.stream_id}", offset))
+
+        # Widen the range query by the mapping offsets; each output is checked below
+        offsets = [offset for outputs in targets.values() for _, offset in outputs] or [0]
+        query_start = start - timedelta(hours=max(offsets)) if start is not None else None
+        query_end = end - timedelta(hours=min(offsets)) if end is not None else None
+
+        for row in ProgrammeService.iter_programmes(targets.keys(), start=query_start, end=query_end):
+            outputs = targets[row.epg_channel_id]
+            if start is not None or end is not None:
+                outputs = [
+                    (standardized_id, offset)
+                    for standardized_id, offset in outputs
+                    if in_time_window(row.start_time, row.stop_time, start, end, offset)
+                ]
+                if not outputs:
+                    continue
+
+            try:
+                prog = ET.fromstring(f"<programme>{row.body or ''}</programme>")
+            except ET.ParseError as e:
+                logger.debug(f"Skipping stored programme for EPG channel {row.epg_channel_id}: {e}")
+                continue
+
+            children = list(prog)
+            for standardized_id, offset in outputs:
+                prog.clear()
+                prog.set("start", shift_xmltv_time(row.start, offset) if offset else row.start)
+                if row.stop:
+                    prog.set("stop", shift_xmltv_time(row.stop, offset) if offset else row.stop)
+                prog.set("channel", standardized_id)
+                prog.extend(children)
+                yield prog
+
+    @staticmethod
+    def _scan_xmltv_channels(xml_content: Union[bytes, IO[bytes]], requested_ids: Set[str]) -> Dict[str, ET.Element]:
+        """
+        Collect requested <channel> elements from XMLTV content.
+
+        XMLTV lists all channels before any programme, so the scan stops at the
+        first <programme> instead of parsing the whole guide.
+
+        Args:
+            xml_content: XMLTV XML bytes or binary stream (may be gzipped)
+            requested_ids: Lowercase channel IDs to collect
+
+        Returns:
+            Dict mapping lowercase channel ID -> copied channel element
+        """
+        found: Dict[str, ET.Element] = {}
+        stream = get_decompressing_stream(xml_content)
+        try:
+            for elem in iterparse_xmltv(stream):
+                if elem.tag == "channel":
+                    channel_id = elem.get("id", "").lower()
+                    if channel_id in requested_ids and channel_id not in found:
+                        found[channel_id] = copy.deepcopy(elem)
+                elif elem.tag == "programme":
+                    break
+        finally:
+            stream.close()
+        return found
+
+    @staticmethod
+    def _iter_provider_programmes(
+        xml_content: Union[bytes, IO[bytes]],
+        epg_id_mapping: Dict[str, List[Tuple[Channel, str]]],
+        channel_link_map: Dict[str, Tuple[str, int]],
+        mapping_offset_map: Dict[str, int],
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+    ) -> Iterator[ET.Element]:
+        """
+        Filter a provider's XMLTV programmes and remap them to standardized IDs in one pass.
+
+        Each parsed <programme> is re-yielded once per output channel with its
+        channel/start/stop attributes rewritten in place, so nothing is copied,
+        re-serialized or re-parsed; serialize it before advancing.
+
+        Args:
+            xml_content: Provider XMLTV XML bytes or binary stream (may be gzipped)
+            epg_id_mapping: Lowercase provider EPG ID -> [(channel, standardized_id), ...]
+            channel_link_map: channel_epg_id -> (source_epg_id, time_offset_hours), lowercase
+            mapping_offset_map: Lowercase EPG channel ID -> time_offset_hours
+            start: Optional UTC lower bound of the output time window
+            end: Optional UTC upper bound of the output time window
+
+        Yields:
+            Programme elements using ch-<account>-<stream> channel IDs
+        """
+        # Provider EPG ID -> [(standardized_id, time_offset_hours), ...] for every output
+        targets: Dict[str, List[Tuple[str, int]]] = {}
+        for provider_id, mapped in epg_id_mapping.items():
+            offset = mapping_offset_map.get(provider_id, 0)
+            targets.setdefault(provider_id, []).extend((standardized_id, offset) for _, standardized_id in mapped)
+        for target_id, (source_id, offset) in channel_link_map.items():
+            for _, standardized_id in epg_id_mapping.get(target_id, ()):
+                targets.setdefault(source_id, []).append((standardized_id, offset))
+
+        windowed = start is not None or end is not None
+        stream = get_decompressing_stream(xml_content)
+        try:
+            for elem in iterparse_xmltv(stream, tags=("programme",)):
+                outputs = targets.get(elem.get("channel", "").lower())
+                if outputs:
+                    prog_start = elem.get("start")
+                    prog_stop = elem.get("stop")
+                    if windowed:
+                        start_time = parse_xmltv_time_utc(prog_start)
+                        stop_time = parse_xmltv_time_utc(prog_stop)
+                    for standardized_id, offset in outputs:
+                        if windowed and not in_time_window(start_time, stop_time, start, end, offset):
+                            continue
+                        elem.set("channel", standardized_id)
+                        if prog_start:
+                            elem.set("start", shift_xmltv_time(prog_start, offset) if offset else prog_start)
+                        if prog_stop:
+                            elem.set("stop", shift_xmltv_time(prog_stop, offset) if offset else prog_stop)
+                        yield elem
+        finally:
+            stream.close()
+
+    @staticmethod
+    def get_time_window(
+        past_hours: Optional[int], future_hours: Optional[int]
+    ) -> Tuple[Optional[datetime], Optional[datetime]]:
+        """
+        Convert a time window around now into UTC bounds for EPG generation.
+
+        Args:
+            past_hours: Hours before now to include (None = no limit)
+            future_hours: Hours after now to include (None = no limit)
+
+        Returns:
+            (start, end) naive UTC datetimes, each None when unlimited
+        """
+        now = datetime.utcnow()
+        start = now - timedelta(hours=past_hours) if past_hours is not None else None
+        end = now + timedelta(hours=future_hours) if future_hours is not None else None
+        return start, end
+
+    @staticmethod
+    def iter_epg_for_channels(
         channels: List[Channel],
         account_xml_cache: Optional[Dict[int, bytes]] = None,
         use_channel_links: bool = True,
-    ) -> bytes:
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+    ) -> Iterator[bytes]:
         """
-        Generate EPG XML for a list of channels.
+        Generate EPG XML for a list of channels as a stream of chunks.
+
+        Channels with an EPG mapping whose programmes are in the programme store
+        are served from it (any source type). Other channels read XMLTV data from
+        the local provider cache, filtered to only include the specified channels.
+        Uses ChannelLink for fallback EPG sources.
 
-        Fetches XMLTV data from accounts and filters to only include
-        the specified channels. Uses ChannelLink for fallback EPG sources.
+        All <channel> elements are written first, then programmes account by
+        account, filtered and remapped while the provider guide is parsed.
+        Database lookups run before the first chunk is returned.
 
         Args:
             channels: List of Channel objects to generate EPG for
-            account_xml_cache: Optional pre-fetched XML content by account ID
+            account_xml_cache: Optional pre-loaded XML content by account ID
+                (defaults to the local XMLTV cache)
             use_channel_links: Whether to use ChannelLink for fallback EPG
+            start: Optional UTC start of the time window (programmes ending before it are dropped)
+            end: Optional UTC end of the time window (programmes starting after it are dropped)
 
         Returns:
-            XMLTV XML content as bytes
+            Iterator of XMLTV UTF-8 byte chunks
         """
-        from services.iptv_service import IPTVService
+        from services.xmltv_cache_service import XmltvCacheService
 
         if not channels:
-            return b'<?xml version="1.0" encoding="UTF-8"?>\n<tv generator-info-name="iptv-proxy-v2"></tv>\n'
+            return iter([EMPTY_XMLTV])
 
         channel_ids = [ch.id for ch in channels]
 
@@ -2731,156 +3239,177 @@ class EpgService:
         # Build mapping offset map for time shifts from ChannelEpgMapping
         mapping_offset_map = EpgService._build_mapping_offset_map(channel_ids)
 
-        # Group channels by account
+        # Channels mapped to an EPG channel with stored programmes are served from the store
+        store_mapping = EpgService._build_store_mapping(channel_ids)
+
+        # Group remaining channels by account for the provider XMLTV path
         channels_by_account: Dict[int, List[Channel]] = {}
         for ch in channels:
+            if ch.id in store_mapping:
+                continue
             if ch.account_id not in channels_by_account:
                 channels_by_account[ch.account_id] = []
             channels_by_account[ch.account_id].append(ch)
 
-        # Build combined EPG
-        root = ET.Element("tv")
-        root.set("generator-info-name", "iptv-proxy-v2")
-
-        all_channel_elements: List[ET.Element] = []
-        all_programme_elements: List[ET.Element] = []
-
+        # Per account, map provider_epg_id -> [(channel, standardized_id)]
+        # This allows us to read EPG using provider IDs but output our standardized IDs
+        epg_id_mappings: Dict[int, Dict[str, List[Tuple[Channel, str]]]] = {}
         for account_id, account_channels in channels_by_account.items():
-            # Build mapping: provider_epg_id -> (channel, standardized_id)
-            # This allows us to fetch EPG using provider IDs but output our standardized IDs
             epg_id_mapping: Dict[str, List[Tuple[Channel, str]]] = {}
-
             for ch in account_channels:
-                standardized_id = f"ch-{account_id}-{ch.stream_id}"
                 if ch.epg_channel_id:
                     # Channel has matched EPG data - map provider ID to our ID
-                    provider_id_lower = ch.epg_channel_id.lower()
-                    if provider_id_lower not in epg_id_mapping:
-                        epg_id_mapping[provider_id_lower] = []
-                    epg_id_mapping[provider_id_lower].append((ch, standardized_id))
+                    epg_id_mapping.setdefault(ch.epg_channel_id.lower(), []).append(
+                        (ch, f"ch-{account_id}-{ch.stream_id}")
+                    )
+            if epg_id_mapping:
+                epg_id_mappings[account_id] = epg_id_mapping
 
-            # Get unique provider EPG IDs that have actual EPG data
-            provider_epg_ids = list(epg_id_mapping.keys())
+        accounts = {}
+        if epg_id_mappings and not (account_xml_cache and all(a in account_xml_cache for a in epg_id_mappings)):
+            from models import Account
 
-            if not provider_epg_ids:
-                # No channels with EPG mappings, skip fetching XMLTV
-                continue
+            accounts = {a.id: a for a in Account.query.filter(Account.id.in_(list(epg_id_mappings))).all()}
 
-            # Get XMLTV content for this account
-            xml_content = None
-            if account_xml_cache and account_id in account_xml_cache:
-                xml_content = account_xml_cache[account_id]
-            else:
-                # Fetch from account
-                from models import Account
-
-                account = db.session.get(Account, account_id)
-                if account and account.enabled:
-                    try:
-                        cred = account.get_primary_credential()
-                        if cred:
-                            service = IPTVService(
-                                account.server,
-                                cred.username,
-                                cred.password,
-                                account.user_agent or "okhttp/3.14.9",
-                            )
-                        else:
-                            service = IPTVService(
-                                account.server,
-                                account.username,
-                                account.password,
-                                account.user_agent or "okhttp/3.14.9",
-                            )
-                        xml_content = service.get_xmltv()
-                    except Exception as e:
-                        logger.warning(f"Failed to fetch EPG for account {account_id}: {e}")
-                        continue
+        # Per account, lowercase source EPG IDs of linked channels (their programmes are copied)
+        link_sources: Dict[int, Set[str]] = {
+            account_id: {source_id for target_id, (source_id, _) in channel_link_map.items() if target_id in mapping}
+            for account_id, mapping in epg_id_mappings.items()
+        }
 
-            if not xml_content:
-                continue
+        def load_xml(account_id: int, programmes: bool) -> Optional[IO[bytes]]:
+            """
+            Open XMLTV content for an account's requested channels.
 
-            # Generate filtered EPG using provider IDs, then remap to standardized IDs
-            filtered_xml = EpgService.generate_filtered_epg(
-                provider_epg_ids, xml_content, channel_link_map=channel_link_map, mapping_offset_map=mapping_offset_map
-            )
-
-            # Parse and remap channel IDs to our standardized format
-            try:
-                filtered_root = ET.fromstring(filtered_xml)
-                for elem in filtered_root:
-                    if elem.tag == "channel":
-                        provider_id = elem.get("id", "").lower()
-                        if provider_id in epg_id_mapping:
-                            # Remap to first standardized ID (if multiple channels share provider ID, they share EPG)
-                            _, standardized_id = epg_id_mapping[provider_id][0]
-                            elem.set("id", standardized_id)
-                            all_channel_elements.append(elem)
-                    elif elem.tag == "programme":
-                        provider_id = elem.get("channel", "").lower()
-                        if provider_id in epg_id_mapping:
-                            # Create programme entries for each channel that maps to this provider ID
-                            for _, standardized_id in epg_id_mapping[provider_id]:
-                                prog_copy = _copy_element(elem)
-                                prog_copy.set("channel", standardized_id)
-                                all_programme_elements.append(prog_copy)
-            except ET.ParseError as e:
-                logger.warning(f"Failed to parse filtered EPG for account {account_id}: {e}")
-                continue
+            Uses the given cache if provided. Otherwise only the requested
+            <channel> (or <programme>) elements are copied out of the indexed
+            local XMLTV cache, falling back to streaming the whole cached guide
+            from its file. Close the result when done.
+            """
+            if account_xml_cache and account_id in account_xml_cache:
+                xml_content = account_xml_cache[account_id]
+                return io.BytesIO(xml_content) if xml_content else None
+            account = accounts.get(account_id)
+            if not account or not account.enabled:
+                return None
 
-        # Add synthetic channel elements for channels without epg_channel_id
-        # These use standardized IDs but have no program data
-        added_fallback_ids: Set[str] = set()
+            xmltv_index = XmltvCacheService.open_account_index(account)
+            if xmltv_index is None:
+                return XmltvCacheService.open_account_xmltv(account)
+            with xmltv_index:
+                extracted = xmltv_index.extract(set(epg_id_mappings[account_id]) | link_sources[account_id], programmes)
+            return io.BytesIO(extracted) if extracted else None
+
+        def generate() -> Iterator[bytes]:
+            writer = XmltvWriter()
+            yield writer.header()
+
+            # Channels served from the programme store
+            for elem in EpgService._iter_stored_channels(channels, store_mapping):
+                chunk = writer.write(elem)
+                if chunk:
+                    yield chunk
+
+            # Provider channels, remapped to standardized IDs
+            for account_id, epg_id_mapping in epg_id_mappings.items():
+                xml_stream = load_xml(account_id, programmes=False)
+                if xml_stream is None:
+                    continue
+                try:
+                    with xml_stream:
+                        found = EpgService._scan_xmltv_channels(
+                            xml_stream, set(epg_id_mapping.keys()) | link_sources[account_id]
+                        )
+                except ET.ParseError as e:
+                    logger.warning(f"Failed to parse EPG channels for account {account_id}: {e}")
+                    continue
 
-        for account_id, account_channels in channels_by_account.items():
-            for ch in account_channels:
-                if not ch.epg_channel_id:
-                    # Create synthetic channel element with fallback ID
+                for provider_id, elem in found.items():
+                    if provider_id not in epg_id_mapping:
+                        continue
+                    # Remap to first standardized ID (if multiple channels share provider ID, they share EPG)
+                    _, standardized_id = epg_id_mapping[provider_id][0]
+                    elem.set("id", standardized_id)
+                    chunk = writer.write(elem)
+                    if chunk:
+                        yield chunk
+
+                # Linked channels missing from the provider's channel list get a basic entry
+                for target_id, (source_id, _) in channel_link_map.items():
+                    if target_id in epg_id_mapping and target_id not in found and source_id in found:
+                        _, standardized_id = epg_id_mapping[target_id][0]
+                        elem = ET.Element("channel", id=standardized_id)
+                        ET.SubElement(elem, "display-name").text = target_id
+                        chunk = writer.write(elem)
+                        if chunk:
+                            yield chunk
+
+            # Synthetic channel elements for channels without epg_channel_id
+            # These use standardized IDs but have no program data
+            added_fallback_ids: Set[str] = set()
+            for account_id, account_channels in channels_by_account.items():
+                for ch in account_channels:
+                    if ch.epg_channel_id:
+                        continue
                     fallback_id = f"ch-{account_id}-{ch.stream_id}"
 
                     # Skip if we already added this ID
                     if fallback_id in added_fallback_ids:
                         continue
-
                     added_fallback_ids.add(fallback_id)
-                    channel_elem = ET.Element("channel", id=fallback_id)
 
-                    # Add display name
+                    channel_elem = ET.Element("channel", id=fallback_id)
                     display_name_elem = ET.SubElement(channel_elem, "display-name")
                     display_name_elem.text = ch.cleaned_name or ch.name
-
-                    # Add icon if available
                     if ch.stream_icon:
                         ET.SubElement(channel_elem, "icon", src=ch.stream_icon)
 
-                    all_channel_elements.append(channel_elem)
-                    logger.debug(f"Added synthetic EPG channel for {ch.name} with ID {fallback_id}")
+                    chunk = writer.write(channel_elem)
+                    if chunk:
+                        yield chunk
 
-        # Add all channel elements first, then programmes
-        for elem in all_channel_elements:
-            root.append(elem)
-        for elem in all_programme_elements:
-            root.append(elem)
+            # Programmes from the programme store
+            for elem in EpgService._iter_stored_programmes(channels, store_mapping, start=start, end=end):
+                chunk = writer.write(elem)
+                if chunk:
+                    yield chunk
 
-        return ET.tostring(root, encoding="unicode", xml_declaration=True).encode("utf-8")
+            # Provider programmes, one account at a time
+            for account_id, epg_id_mapping in epg_id_mappings.items():
+                xml_stream = load_xml(account_id, programmes=True)
+                if xml_stream is None:
+                    continue
+
+                with xml_stream:
+                    try:
+                        for elem in EpgService._iter_provider_programmes(
+                            xml_stream, epg_id_mapping, channel_link_map, mapping_offset_map, start=start, end=end
+                        ):
+                            chunk = writer.write(elem)
+                            if chunk:
+                                yield chunk
+                    except ET.ParseError as e:
+                        logger.warning(f"Failed to parse EPG programmes for account {account_id}: {e}")
+
+            yield writer.close()
+
+        return generate()
 
 
-def _copy_element(elem: ET.Element) -> ET.Element:
+def _serialize_children(elem: ET.Element) -> str:
     """
-    Deep copy an XML element.
+    Serialize an element's child elements (without the element itself).
 
     Args:
-        elem: Element to copy
+        elem: Element whose children to serialize
 
     Returns:
-        New element with all attributes and children copied
+        Concatenated XML of the children, with inter-element whitespace dropped
     """
-    new_elem = ET.Element(elem.tag, elem.attrib)
-    new_elem.text = elem.text
-    new_elem.tail = elem.tail
+    parts = []
     for child in elem:
-        new_elem.append(_copy_element(child))
-    return new_elem
+        parts.append(element_to_string(child))
+    return "".join(parts)
 
 
 def update_ppv_channel_visibility(account_id: Optional[int] = None) -> Dict[str, int]:
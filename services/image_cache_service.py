@@ -85,6 +85,17 @@ class ImageCacheService:
         """Generate SHA-256 hash of URL for content-addressable storage."""
         return hashlib.sha256(url.encode("utf-8")).hexdigest()
 
+    @staticmethod
+    def get_icon_hash(url: Optional[str]) -> Optional[str]:
+        """Get the proxy URL hash for an icon, or None if the URL can't be proxied.
+
+        Stored on Channel.icon_hash so playlist rendering can build /icon/<hash>
+        URLs without parsing and hashing every icon URL.
+        """
+        if not url or not ImageCacheService._is_valid_url(url):
+            return None
+        return ImageCacheService.hash_url(url)
+
     def get_file_path(self, url_hash: str, extension: str = "") -> Path:
         """Get file path for cached image.
 
@@ -278,7 +289,8 @@ class ImageCacheService:
             logger.error(f"Failed to fetch image from {url}: {e}")
             return None, None
 
-    def _is_valid_url(self, url: str) -> bool:
+    @staticmethod
+    def _is_valid_url(url: str) -> bool:
         """Check if URL is valid for caching."""
         if not url:
             return False
@@ -8,6 +8,9 @@ import requests
 
 logger = logging.getLogger(__name__)
 
+# Chunk size for streaming large downloads (XMLTV) to disk
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
 
 class IPTVService:
     """Service for interacting with Xtream Codes API"""
@@ -77,13 +80,37 @@ class IPTVService:
             params["category_id"] = category_id
         return self._make_request("get_series", params)
 
-    def get_xmltv(self):
-        """Get XMLTV EPG data"""
+    def download_xmltv(self, fileobj, etag=None, last_modified=None):
+        """
+        Stream XMLTV EPG data into a file object using a conditional GET.
+
+        Args:
+            fileobj: Binary file object to write the XMLTV content to
+            etag: ETag from the previous download (sent as If-None-Match)
+            last_modified: Last-Modified from the previous download (sent as If-Modified-Since)
+
+        Returns:
+            None if the provider answered 304 Not Modified, otherwise a dict with
+            the new "etag" and "last_modified" validators (values may be None)
+        """
         url = f"{self.base_url}/xmltv.php"
         params = {"username": self.username, "password": self.password}
         headers = {"User-Agent": "9XtreamPlayer"}
-
-        response = requests.get(url, params=params, headers=headers, timeout=120)
-        response.raise_for_status()
-
-        return response.content
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+
+        with requests.get(url, params=params, headers=headers, timeout=120, stream=True) as response:
+            if response.status_code == 304:
+                return None
+            response.raise_for_status()
+
+            for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                if chunk:
+                    fileobj.write(chunk)
+
+            return {
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+            }
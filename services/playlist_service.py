@@ -0,0 +1,528 @@
+"""
+Playlist Service - Cached M3U rendering with per-client output profiles.
+
+Playlist channel lists (account and config playlists) are cached in-process and
+reused until the underlying channel, category or tag rows change, which is
+detected with a cheap aggregate fingerprint query. Output options - from query
+parameters or a named PlaylistProfile - are compiled once into a PlaylistRenderer,
+so serving a playlist is only string emission over the cached channel list.
+Rendered playlists (and their compressed variants) are kept on the cached
+channel list, so repeated fetches with the same options reuse the bytes.
+"""
+
+import json
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, NamedTuple, Optional, Tuple
+
+from services.compression_service import CompressedArtifact
+
+logger = logging.getLogger(__name__)
+
+# Cached channel lists (one per account/config playlist and duplicate collapsing)
+PLAYLIST_CACHE_SIZE = 64
+
+# Compiled renderers (one per distinct set of output options)
+RENDERER_CACHE_SIZE = 64
+
+# Rendered outputs kept per cached channel list (options x proxy base URL x accounts)
+RENDER_CACHE_SIZE = 8
+
+
+class PlaylistEntry(NamedTuple):
+    """Pre-resolved channel data needed to emit one M3U entry"""
+
+    account_id: int
+    stream_id: str
+    name: str  # Display name (cleaned name, or original name)
+    category: str
+    icon: str
+    icon_hash: Optional[str]  # Pre-computed icon proxy hash (None if the icon can't be proxied)
+    archive_days: int  # Catchup days (0 if the channel has no archive)
+
+
+class RenderOptions(NamedTuple):
+    """Playlist output options (the fields of a PlaylistProfile)"""
+
+    group_title_format: Optional[str] = None
+    proxy_icons: bool = True
+    url_style: str = "auto"
+    collapse_duplicates: bool = False
+    include_catchup: bool = False
+    include_chno: bool = False
+    chno_start: int = 1
+
+
+class PlaylistRenderer:
+    """
+    M3U renderer compiled from a set of RenderOptions.
+
+    The EXTINF line template is built once with only the attributes the profile
+    needs; rendering fills it positionally for each cached PlaylistEntry.
+    """
+
+    def __init__(self, options: RenderOptions):
+        self.options = options
+
+        attributes = ['tvg-id="ch-{0}-{1}"']
+        if options.include_chno:
+            attributes.append('tvg-chno="{5}"')
+        attributes.extend(['tvg-name="{2}"', 'tvg-logo="{3}"', 'group-title="{4}"{6}'])
+        self._template = "#EXTINF:-1 " + " ".join(attributes) + ",{2}\n{7}{1}.ts"
+
+    def _group_title(self, category: str, account, multi_account: bool) -> str:
+        """Build the group-title for a category/account pair."""
+        if self.options.group_title_format is not None:
+            return self.options.group_title_format.format(
+                category=category, account=account.name, account_id=account.id
+            )
+        # Default: add account name to group title for multi-account playlists
+        if multi_account:
+            return f"{category} ({account.name})"
+        return category
+
+    @staticmethod
+    def _stream_url_prefix(account, use_proxy: bool, proxy_base: str) -> str:
+        """Get the stream URL up to the stream ID for an account."""
+        if use_proxy:
+            # Use proxy URL for multiplexed streaming
+            return f"{proxy_base}/stream/{account.id}/"
+
+        # Direct URL to IPTV provider
+        cred = account.get_primary_credential()
+        if cred:
+            return f"http://{account.server}/live/{cred.username}/{cred.password}/"
+        # Fallback for legacy accounts without credentials
+        return f"http://{account.server}/live/{account.username}/{account.password}/"
+
+    def uses_proxy(self, accounts: List[Any]) -> bool:
+        """Whether stream URLs are proxied for this set of accounts."""
+        if self.options.url_style == "proxy":
+            return True
+        if self.options.url_style == "direct":
+            return False
+        # Auto: proxy is needed when any account multiplexes multiple credentials
+        return any(hasattr(a, "credentials") and len(a.credentials) > 1 for a in accounts)
+
+    def render(
+        self,
+        entries: List[PlaylistEntry],
+        accounts: List[Any],
+        proxy_base: str,
+        header_lines: Optional[List[str]] = None,
+        multi_account: bool = False,
+    ) -> str:
+        """
+        Render an M3U playlist.
+
+        Args:
+            entries: Cached playlist entries in output order
+            accounts: Account objects referenced by the entries
+            proxy_base: Base URL for proxied streams and icons
+            header_lines: Extra comment lines after #EXTM3U
+            multi_account: Whether the playlist combines several accounts (default group titles)
+
+        Returns:
+            M3U playlist text
+        """
+        options = self.options
+        accounts_by_id = {a.id: a for a in accounts}
+        use_proxy = self.uses_proxy(accounts)
+        url_prefixes = {a.id: self._stream_url_prefix(a, use_proxy, proxy_base) for a in accounts}
+
+        icon_base = f"{proxy_base.rstrip('/')}/icon/"
+
+        group_titles: Dict[Tuple[str, int], str] = {}
+        template = self._template
+
+        lines = ["#EXTM3U"]
+        if header_lines:
+            lines.extend(header_lines)
+
+        for position, entry in enumerate(entries, start=options.chno_start):
+            group_key = (entry.category, entry.account_id)
+            group_title = group_titles.get(group_key)
+            if group_title is None:
+                group_title = self._group_title(entry.category, accounts_by_id[entry.account_id], multi_account)
+                group_titles[group_key] = group_title
+
+            # Proxy icon URL using the hash stored at sync time
+            if options.proxy_icons and entry.icon_hash:
+                logo = icon_base + entry.icon_hash
+            else:
+                logo = entry.icon
+
+            catchup = ""
+            if options.include_catchup and entry.archive_days:
+                catchup = f' catchup="xc" catchup-days="{entry.archive_days}"'
+
+            lines.append(
+                template.format(
+                    entry.account_id,
+                    entry.stream_id,
+                    entry.name,
+                    logo,
+                    group_title,
+                    position,
+                    catchup,
+                    url_prefixes[entry.account_id],
+                )
+            )
+
+        return "\n".join(lines)
+
+
+class LruCache:
+    """Thread-safe dict keeping at most max_size items, evicting the least recently used"""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._items: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def get(self, key: Hashable) -> Any:
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None:
+                self._items.move_to_end(key)
+            return item
+
+    def put(self, key: Hashable, item: Any) -> None:
+        with self._lock:
+            self._items[key] = item
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+
+class CachedPlaylist:
+    """A cached playlist channel list plus its rendered (and compressed) outputs"""
+
+    def __init__(self, fingerprint: Tuple, entries: List[PlaylistEntry]):
+        self.fingerprint = fingerprint
+        self.entries = entries
+        # Render key -> CompressedArtifact; dropped with the channel list when data changes
+        self.artifacts = LruCache(RENDER_CACHE_SIZE)
+
+
+# Compiled renderers keyed by options, and channel lists keyed by playlist. A cached
+# channel list is replaced when its fingerprint no longer matches the data.
+_renderers = LruCache(RENDERER_CACHE_SIZE)
+_playlist_cache = LruCache(PLAYLIST_CACHE_SIZE)
+
+
+class PlaylistService:
+    """Service for building cached playlist channel lists and compiled renderers"""
+
+    @staticmethod
+    def options_from_profile(profile) -> RenderOptions:
+        """Convert a PlaylistProfile into RenderOptions."""
+        return RenderOptions(
+            group_title_format=profile.group_title_format or None,
+            proxy_icons=bool(profile.proxy_icons),
+            url_style=profile.url_style or "auto",
+            collapse_duplicates=bool(profile.collapse_duplicates),
+            include_catchup=bool(profile.include_catchup),
+            include_chno=bool(profile.include_chno),
+            chno_start=profile.chno_start if profile.chno_start is not None else 1,
+        )
+
+    @staticmethod
+    def get_renderer(options: RenderOptions) -> PlaylistRenderer:
+        """Get the compiled renderer for a set of options (compiled once, then cached)."""
+        renderer = _renderers.get(options)
+        if renderer is None:
+            renderer = PlaylistRenderer(options)
+            _renderers.put(options, renderer)
+        return renderer
+
+    @staticmethod
+    def build_channel_query(
+        account_id: int,
+        include_tags: Optional[List[str]] = None,
+        exclude_tags: Optional[List[str]] = None,
+        tag_match_mode: str = "any",
+    ):
+        """
+        Build the query for an account's playlist channels.
+
+        Uses pre-computed is_visible (account-level filters already applied) and
+        optionally filters by normalized tag names.
+
+        Args:
+            account_id: Account to select channels from
+            include_tags: Tags a channel must have (any or all, per tag_match_mode)
+            exclude_tags: Tags a channel must not have
+            tag_match_mode: "all" or "any"
+
+        Returns:
+            SQLAlchemy query selecting Channel rows
+        """
+        from models import Category, Channel, ChannelTag, Tag, db
+
+        query = (
+            db.session.query(Channel)
+            .filter(Channel.account_id == account_id, Channel.is_active, Channel.is_visible)
+            .join(Category, Channel.category_id == Category.id, isouter=True)
+        )
+
+        if include_tags:
+            if tag_match_mode == "all":
+                # Must have ALL include tags
+                tag_counts = (
+                    db.session.query(ChannelTag.stream_id, db.func.count(db.func.distinct(Tag.id)).label("tag_count"))
+                    .join(Tag, ChannelTag.tag_id == Tag.id)
+                    .filter(ChannelTag.account_id == account_id, Tag.name.in_(include_tags))
+                    .group_by(ChannelTag.stream_id)
+                    .having(db.func.count(db.func.distinct(Tag.id)) == len(include_tags))
+                    .subquery()
+                )
+                query = query.filter(Channel.stream_id.in_(db.session.query(tag_counts.c.stream_id)))
+            else:  # 'any'
+                tag_subquery = (
+                    db.session.query(ChannelTag.stream_id)
+                    .join(Tag, ChannelTag.tag_id == Tag.id)
+                    .filter(ChannelTag.account_id == account_id, Tag.name.in_(include_tags))
+                )
+                query = query.filter(Channel.stream_id.in_(tag_subquery))
+
+        if exclude_tags:
+            # Must NOT have any exclude tags
+            exclude_subquery = (
+                db.session.query(ChannelTag.stream_id)
+                .join(Tag, ChannelTag.tag_id == Tag.id)
+                .filter(ChannelTag.account_id == account_id, Tag.name.in_(exclude_tags))
+            )
+            query = query.filter(~Channel.stream_id.in_(exclude_subquery))
+
+        return query
+
+    @staticmethod
+    def get_config_channels(config) -> Tuple[List[Any], List[Any]]:
+        """
+        Get the enabled accounts and visible channels selected by a playlist config.
+
+        Uses the same account and tag filtering as playlist generation.
+
+        Args:
+            config: PlaylistConfig
+
+        Returns:
+            (accounts, channels) with channels grouped by account in account order
+        """
+        from models import Account
+        from services.tag_service import TagService
+
+        include_accounts = json.loads(config.include_accounts) if config.include_accounts else []
+        exclude_accounts = json.loads(config.exclude_accounts) if config.exclude_accounts else []
+        include_tags = json.loads(config.include_tags) if config.include_tags else []
+        exclude_tags = json.loads(config.exclude_tags) if config.exclude_tags else []
+        # Normalize tags for case-insensitive matching
+        include_tags = TagService.normalize_filter_tags(include_tags)
+        exclude_tags = TagService.normalize_filter_tags(exclude_tags)
+
+        if include_accounts:
+            accounts = Account.query.filter(Account.id.in_(include_accounts), Account.enabled.is_(True)).all()
+        else:
+            accounts = Account.query.filter(Account.enabled.is_(True)).all()
+            if exclude_accounts:
+                accounts = [a for a in accounts if a.id not in exclude_accounts]
+
+        channels = []
+        for account in accounts:
+            query = PlaylistService.build_channel_query(account.id, include_tags, exclude_tags, config.tag_match_mode)
+            channels.extend(query.all())
+        return accounts, channels
+
+    @staticmethod
+    def get_config_account_ids(config) -> List[int]:
+        """
+        Get the IDs of the enabled accounts selected by a playlist config, without loading any rows.
+
+        Args:
+            config: PlaylistConfig
+
+        Returns:
+            Account IDs, ascending
+        """
+        from models import Account, db
+
+        include_accounts = json.loads(config.include_accounts) if config.include_accounts else []
+        exclude_accounts = json.loads(config.exclude_accounts) if config.exclude_accounts else []
+
+        query = db.select(Account.id).where(Account.enabled.is_(True)).order_by(Account.id)
+        if include_accounts:
+            query = query.where(Account.id.in_(include_accounts))
+        elif exclude_accounts:
+            query = query.where(Account.id.not_in(exclude_accounts))
+        return list(db.session.scalars(query))
+
+    @staticmethod
+    def _data_fingerprint(account_ids: List[int], include_tags: bool = False) -> Tuple:
+        """
+        Get a cheap fingerprint of the channel data behind a playlist.
+
+        Row counts and latest updated_at per account change whenever channels,
+        categories (or channel tags, for tag-filtered playlists) are synced,
+        renamed, hidden or removed.
+        """
+        from models import Category, Channel, ChannelTag, db
+
+        tables: List[Any] = [Channel, Category]
+        if include_tags:
+            tables.append(ChannelTag)
+
+        fingerprint = []
+        for model in tables:
+            rows = (
+                db.session.query(model.account_id, db.func.count(model.id), db.func.max(model.updated_at))
+                .filter(model.account_id.in_(account_ids))
+                .group_by(model.account_id)
+                .order_by(model.account_id)
+                .all()
+            )
+            fingerprint.append(tuple(tuple(row) for row in rows))
+        return tuple(fingerprint)
+
+    @staticmethod
+    def _to_entries(channels: List[Any]) -> List[PlaylistEntry]:
+        """Convert Channel rows into plain playlist entries."""
+        return [
+            PlaylistEntry(
+                account_id=ch.account_id,
+                stream_id=ch.stream_id,
+                # Use cleaned name (pre-computed during sync/tag processing)
+                name=ch.cleaned_name or ch.name,
+                category=ch.category.category_name if ch.category else "Unknown",
+                icon=ch.stream_icon or "",
+                icon_hash=ch.icon_hash,
+                archive_days=(ch.tv_archive_duration or 0) if ch.tv_archive else 0,
+            )
+            for ch in channels
+        ]
+
+    @staticmethod
+    def get_account_playlist(account_id: int, collapse_duplicates: bool = False) -> CachedPlaylist:
+        """
+        Get the (cached) channel list for an account playlist.
+
+        Args:
+            account_id: Account ID
+            collapse_duplicates: Keep only the best quality channel per duplicate group
+
+        Returns:
+            CachedPlaylist with entries ordered by channel name
+        """
+        from models import Channel
+
+        key = ("account", account_id, collapse_duplicates)
+        fingerprint = PlaylistService._data_fingerprint([account_id])
+        cached = _playlist_cache.get(key)
+        if cached and cached.fingerprint == fingerprint:
+            return cached
+
+        query = PlaylistService.build_channel_query(account_id)
+        if collapse_duplicates:
+            from services.quality_service import QualityService
+
+            query = QualityService.collapse_query(query)
+
+        cached = CachedPlaylist(fingerprint, PlaylistService._to_entries(query.order_by(Channel.name).all()))
+        _playlist_cache.put(key, cached)
+        logger.debug(
+            f"Cached {len(cached.entries)} playlist entries for account {account_id} (collapsed={collapse_duplicates})"
+        )
+        return cached
+
+    @staticmethod
+    def get_config_playlist(
+        config,
+        accounts: List[Any],
+        include_tags: List[str],
+        exclude_tags: List[str],
+        collapse_duplicates: bool = False,
+    ) -> CachedPlaylist:
+        """
+        Get the (cached) channel list for a playlist config spanning accounts.
+
+        Args:
+            config: PlaylistConfig
+            accounts: Accounts included in the playlist
+            include_tags: Normalized include tags
+            exclude_tags: Normalized exclude tags
+            collapse_duplicates: Collapse duplicates across all accounts
+
+        Returns:
+            CachedPlaylist with entries grouped by account in account order
+        """
+        from models import Channel
+
+        account_ids = [a.id for a in accounts]
+        key = ("config", config.id, collapse_duplicates)
+        # The selection is part of the fingerprint, so editing the config replaces its cached list
+        fingerprint = (
+            tuple(account_ids),
+            tuple(include_tags),
+            tuple(exclude_tags),
+            config.tag_match_mode,
+            PlaylistService._data_fingerprint(account_ids, include_tags=bool(include_tags or exclude_tags)),
+        )
+        cached = _playlist_cache.get(key)
+        if cached and cached.fingerprint == fingerprint:
+            return cached
+
+        # Collect all channels from all accounts first (needed for cross-account collapsing)
+        channels = []
+        for account_id in account_ids:
+            query = PlaylistService.build_channel_query(account_id, include_tags, exclude_tags, config.tag_match_mode)
+            channels.extend(query.order_by(Channel.name).all())
+
+        if collapse_duplicates:
+            from services.quality_service import QualityService
+
+            original_count = len(channels)
+            channels = QualityService.collapse_channels(channels)
+            logger.info(f"Collapsed {original_count} channels to {len(channels)} unique channels")
+
+        cached = CachedPlaylist(fingerprint, PlaylistService._to_entries(channels))
+        _playlist_cache.put(key, cached)
+        logger.debug(
+            f"Cached {len(cached.entries)} playlist entries for config {config.id} (collapsed={collapse_duplicates})"
+        )
+        return cached
+
+    @staticmethod
+    def render(
+        playlist: CachedPlaylist,
+        renderer: PlaylistRenderer,
+        accounts: List[Any],
+        proxy_base: str,
+        header_lines: Optional[List[str]] = None,
+        multi_account: bool = False,
+    ) -> CompressedArtifact:
+        """
+        Render a cached playlist, reusing a previous render with identical inputs.
+
+        The render key covers everything the output depends on besides the
+        channel list: renderer options, proxy base URL, per-account stream URL
+        prefixes (server/credentials) and header lines.
+
+        Returns:
+            CompressedArtifact holding the M3U text and its compressed variants
+        """
+        use_proxy = renderer.uses_proxy(accounts)
+        url_prefixes = tuple(
+            (a.id, PlaylistRenderer._stream_url_prefix(a, use_proxy, proxy_base), a.name) for a in accounts
+        )
+        key = (renderer.options, proxy_base, url_prefixes, tuple(header_lines or ()), multi_account)
+
+        artifact = playlist.artifacts.get(key)
+        if artifact is None:
+            body = renderer.render(playlist.entries, accounts, proxy_base, header_lines, multi_account)
+            artifact = CompressedArtifact(body)
+            playlist.artifacts.put(key, artifact)
+        return artifact
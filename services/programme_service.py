@@ -0,0 +1,312 @@
+"""
+Programme Service - Persistent programme store for EPG output.
+
+EPG source syncs store every programme in the epg_programmes table, keyed by
+EpgChannel and indexed by (epg_channel_id, start_time). Guide generation can
+then serve programmes for any mapped EPG channel - from any source type - with
+an indexed range scan instead of re-parsing a provider's raw XMLTV.
+
+Full-guide syncs stage their programmes in epg_programme_staging, committing
+each batch, and swap them in with one short transaction once the guide is
+complete: SQLite's single write lock is never held for the whole download and
+parse, and readers keep seeing the previous guide until then.
+"""
+
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple, cast
+
+from sqlalchemy.engine import CursorResult
+
+logger = logging.getLogger(__name__)
+
+# Rows per INSERT statement when storing programmes
+PROGRAMME_INSERT_BATCH = 5000
+
+# Stored programme: (start, stop, title, body) with start/stop as XMLTV attribute strings
+ProgrammeRow = Tuple[str, Optional[str], Optional[str], Optional[str]]
+
+
+def parse_xmltv_time_utc(time_str: Optional[str]) -> Optional[datetime]:
+    """
+    Parse an XMLTV datetime string into a naive UTC datetime.
+
+    Unlike EpgService._parse_xmltv_time, the timezone offset is applied.
+
+    Args:
+        time_str: XMLTV datetime (e.g., "20231215140000 +0100")
+
+    Returns:
+        Naive UTC datetime, or None if the value can't be parsed
+    """
+    if not time_str:
+        return None
+
+    time_str = time_str.strip()
+    digits = len(time_str)
+    for i, char in enumerate(time_str):
+        if not char.isdigit():
+            digits = i
+            break
+
+    datetime_part = time_str[: min(digits, 14)]
+    try:
+        if len(datetime_part) == 14:
+            dt = datetime.strptime(datetime_part, "%Y%m%d%H%M%S")
+        elif len(datetime_part) >= 12:
+            dt = datetime.strptime(datetime_part[:12], "%Y%m%d%H%M")
+        elif len(datetime_part) >= 8:
+            dt = datetime.strptime(datetime_part[:8], "%Y%m%d")
+        else:
+            return None
+    except ValueError:
+        return None
+
+    tz_part = time_str[digits:].strip()
+    if len(tz_part) == 5 and tz_part[0] in "+-" and tz_part[1:].isdigit():
+        offset = timedelta(hours=int(tz_part[1:3]), minutes=int(tz_part[3:5]))
+        dt = dt - offset if tz_part[0] == "+" else dt + offset
+
+    return dt
+
+
+def in_time_window(
+    start_time: Optional[datetime],
+    stop_time: Optional[datetime],
+    window_start: Optional[datetime],
+    window_end: Optional[datetime],
+    offset_hours: int = 0,
+) -> bool:
+    """
+    Check whether a programme overlaps a UTC time window.
+
+    Programmes with an unknown start time are kept; programmes without a
+    stop time are kept unless they start after the window.
+
+    Args:
+        start_time: Programme start (naive UTC), as from parse_xmltv_time_utc()
+        stop_time: Programme stop (naive UTC) or None
+        window_start: Optional lower bound; programmes ending at or before it are excluded
+        window_end: Optional upper bound; programmes starting at or after it are excluded
+        offset_hours: Time shift applied to the programme before comparing
+
+    Returns:
+        True if the (shifted) programme overlaps the window
+    """
+    if start_time is None:
+        return True
+    shift = timedelta(hours=offset_hours)
+    if window_end is not None and start_time + shift >= window_end:
+        return False
+    if window_start is not None and stop_time is not None and stop_time + shift <= window_start:
+        return False
+    return True
+
+
+def _programme_values(programmes: Dict[Any, List[ProgrammeRow]], key: str, **extra) -> Iterator[Dict]:
+    """Yield insert values of programmes grouped under a key column, skipping unparseable start times."""
+    for key_value, rows in programmes.items():
+        for start, stop, title, body in rows:
+            start_time = parse_xmltv_time_utc(start)
+            if start_time is None:
+                continue
+            yield {
+                key: key_value,
+                "start_time": start_time,
+                "stop_time": parse_xmltv_time_utc(stop),
+                "start": start,
+                "stop": stop,
+                "title": title[:500] if title else title,
+                "body": body,
+                **extra,
+            }
+
+
+def _insert_batches(model, values: Iterable[Dict]) -> int:
+    """Insert rows in PROGRAMME_INSERT_BATCH executemany statements and return how many were inserted."""
+    from models import db
+
+    inserted = 0
+    batch: List[Dict] = []
+    for row in values:
+        batch.append(row)
+        if len(batch) >= PROGRAMME_INSERT_BATCH:
+            db.session.execute(db.insert(model), batch)
+            inserted += len(batch)
+            batch = []
+    if batch:
+        db.session.execute(db.insert(model), batch)
+        inserted += len(batch)
+    return inserted
+
+
+class ProgrammeService:
+    """Service for storing and querying EPG programmes"""
+
+    @staticmethod
+    def delete_source_programmes(source_id: int) -> int:
+        """
+        Delete all stored programmes of an EPG source, and any it has staged.
+
+        Args:
+            source_id: EpgSource ID
+
+        Returns:
+            Number of programmes deleted
+        """
+        from models import EpgChannel, EpgProgramme, db
+
+        ProgrammeService.clear_staged_programmes(source_id)
+        channel_ids = db.select(EpgChannel.id).where(EpgChannel.source_id == source_id)
+        result = cast(
+            CursorResult,
+            db.session.execute(db.delete(EpgProgramme).where(EpgProgramme.epg_channel_id.in_(channel_ids))),
+        )
+        return result.rowcount or 0
+
+    @staticmethod
+    def store_programmes(programmes: Dict[int, List[ProgrammeRow]]) -> int:
+        """
+        Insert programmes for EPG channels.
+
+        Programmes whose start time can't be parsed are skipped. Does not
+        delete existing rows and does not commit; callers replace a source's
+        programmes with delete_source_programmes() first, in the same transaction.
+
+        Args:
+            programmes: Dict mapping EpgChannel.id -> list of (start, stop, title, body)
+
+        Returns:
+            Number of programmes stored
+        """
+        from models import EpgProgramme
+
+        return _insert_batches(EpgProgramme, _programme_values(programmes, "epg_channel_id"))
+
+    @staticmethod
+    def stage_programmes(source_id: int, programmes: Dict[str, List[ProgrammeRow]]) -> int:
+        """
+        Stage programmes of a source sync in progress, and commit the session.
+
+        Staged programmes are keyed by XMLTV channel ID, so the source's
+        EpgChannel rows are only written by the final swap. Each call is its
+        own short write transaction.
+
+        Args:
+            source_id: EpgSource ID
+            programmes: Dict mapping XMLTV channel ID -> list of (start, stop, title, body)
+
+        Returns:
+            Number of programmes staged
+        """
+        from models import EpgProgrammeStaging, db
+
+        staged = _insert_batches(EpgProgrammeStaging, _programme_values(programmes, "channel_id", source_id=source_id))
+        db.session.commit()
+        return staged
+
+    @staticmethod
+    def swap_staged_programmes(source_id: int) -> int:
+        """
+        Replace a source's stored programmes with the ones it staged (does not commit).
+
+        Staged programmes of XMLTV channels without an EpgChannel row of the
+        source are dropped.
+
+        Args:
+            source_id: EpgSource ID
+
+        Returns:
+            Number of programmes stored
+        """
+        from models import EpgChannel, EpgProgramme, EpgProgrammeStaging, db
+
+        channel_ids = db.select(EpgChannel.id).where(EpgChannel.source_id == source_id)
+        db.session.execute(db.delete(EpgProgramme).where(EpgProgramme.epg_channel_id.in_(channel_ids)))
+
+        columns = ["start_time", "stop_time", "start", "stop", "title", "body"]
+        staged = (
+            db.select(EpgChannel.id, *(getattr(EpgProgrammeStaging, column) for column in columns))
+            .join(
+                EpgChannel,
+                db.and_(
+                    EpgChannel.source_id == EpgProgrammeStaging.source_id,
+                    EpgChannel.channel_id == EpgProgrammeStaging.channel_id,
+                ),
+            )
+            .where(EpgProgrammeStaging.source_id == source_id)
+        )
+        result = cast(
+            CursorResult,
+            db.session.execute(db.insert(EpgProgramme).from_select(["epg_channel_id", *columns], staged)),
+        )
+        ProgrammeService.clear_staged_programmes(source_id)
+        return result.rowcount or 0
+
+    @staticmethod
+    def clear_staged_programmes(source_id: int) -> None:
+        """Delete the programmes a source has staged, e.g. left over by a failed sync (does not commit)."""
+        from models import EpgProgrammeStaging, db
+
+        db.session.execute(db.delete(EpgProgrammeStaging).where(EpgProgrammeStaging.source_id == source_id))
+
+    @staticmethod
+    def get_channels_with_programmes(epg_channel_ids: Iterable[int]) -> Set[int]:
+        """
+        Get which EPG channels have stored programmes.
+
+        Args:
+            epg_channel_ids: EpgChannel IDs to check
+
+        Returns:
+            Set of EpgChannel IDs with at least one stored programme
+        """
+        from models import EpgProgramme, db
+
+        ids = list(set(epg_channel_ids))
+        if not ids:
+            return set()
+
+        rows = db.session.execute(
+            db.select(EpgProgramme.epg_channel_id).where(EpgProgramme.epg_channel_id.in_(ids)).distinct()
+        )
+        return {row[0] for row in rows}
+
+    @staticmethod
+    def iter_programmes(
+        epg_channel_ids: Iterable[int],
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+    ) -> Iterator:
+        """
+        Iterate stored programmes for EPG channels, ordered by channel and start time.
+
+        Args:
+            epg_channel_ids: EpgChannel IDs to include
+            start: Optional UTC lower bound; programmes ending before it are skipped
+            end: Optional UTC upper bound; programmes starting at or after it are skipped
+
+        Yields:
+            Rows with epg_channel_id, start, stop, body, start_time and stop_time
+        """
+        from models import EpgProgramme, db
+
+        ids = list(set(epg_channel_ids))
+        if not ids:
+            return
+
+        query = db.select(
+            EpgProgramme.epg_channel_id,
+            EpgProgramme.start,
+            EpgProgramme.stop,
+            EpgProgramme.body,
+            EpgProgramme.start_time,
+            EpgProgramme.stop_time,
+        ).where(EpgProgramme.epg_channel_id.in_(ids))
+        if start is not None:
+            query = query.where(db.or_(EpgProgramme.stop_time.is_(None), EpgProgramme.stop_time > start))
+        if end is not None:
+            query = query.where(EpgProgramme.start_time < end)
+        query = query.order_by(EpgProgramme.epg_channel_id, EpgProgramme.start_time)
+
+        yield from db.session.execute(query)
@@ -5,10 +5,14 @@ This service provides functionality to:
 1. Rank channels by quality based on their tags (4K, UHD, RAW, 60FPS, HD, etc.)
 2. Collapse duplicate channels that differ only by format/quality
 3. Keep the highest quality version when collapsing duplicates
+
+Quality scores and duplicate groups are pre-computed onto Channel rows after
+sync/tag processing (update_duplicate_groups), so playlist and EPG generation
+can collapse duplicates with a filtered query instead of loading tags.
 """
 
 import logging
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
 logger = logging.getLogger(__name__)
 
@@ -165,6 +169,184 @@ class QualityService:
 
         return result
 
+    @staticmethod
+    def get_duplicate_group(name: Optional[str]) -> str:
+        """
+        Get the normalized duplicate group key for a channel name.
+
+        Uses the same normalization as collapse_duplicates so pre-computed
+        groups match the in-memory grouping.
+
+        Args:
+            name: Cleaned channel name (or original name if not cleaned)
+
+        Returns:
+            Normalized group key
+        """
+        return (name or "unknown").strip().lower()
+
+    @staticmethod
+    def update_duplicate_groups(account_id: int) -> Dict[str, int]:
+        """
+        Pre-compute quality scores and duplicate groups for an account's channels.
+
+        Should be called after channel sync and tag processing, since the score
+        depends on the channel's tags and the group on its cleaned name.
+        Only rows whose values changed are written.
+
+        Args:
+            account_id: ID of the account to process
+
+        Returns:
+            Dict with processing statistics
+        """
+        from models import Channel, ChannelTag, Tag, db
+
+        tags_map: Dict[str, List[str]] = {}
+        tag_rows = (
+            db.session.query(ChannelTag.stream_id, Tag.name)
+            .join(Tag, ChannelTag.tag_id == Tag.id)
+            .filter(ChannelTag.account_id == account_id)
+        )
+        for stream_id, tag_name in tag_rows:
+            tags_map.setdefault(stream_id, []).append(tag_name)
+
+        rows = (
+            db.session.query(
+                Channel.id,
+                Channel.stream_id,
+                Channel.name,
+                Channel.cleaned_name,
+                Channel.quality_score,
+                Channel.duplicate_group,
+            )
+            .filter(Channel.account_id == account_id)
+            .all()
+        )
+
+        changes = []
+        for row in rows:
+            score = QualityService.get_quality_score(tags_map.get(row.stream_id, []))
+            group = QualityService.get_duplicate_group(row.cleaned_name or row.name)
+            if score != row.quality_score or group != row.duplicate_group:
+                changes.append({"id": row.id, "quality_score": score, "duplicate_group": group})
+
+        if changes:
+            db.session.execute(db.update(Channel), changes)
+            db.session.commit()
+
+        logger.info(
+            f"Updated duplicate groups for account {account_id}: {len(changes)} of {len(rows)} channels changed"
+        )
+
+        return {"channels_total": len(rows), "channels_updated": len(changes)}
+
+    @staticmethod
+    def _duplicate_group_expr():
+        """SQL expression for a channel's duplicate group (falls back to its name if not yet computed)."""
+        from models import Channel, db
+
+        return db.func.coalesce(
+            Channel.duplicate_group,
+            db.func.lower(db.func.trim(db.func.coalesce(Channel.cleaned_name, Channel.name))),
+        )
+
+    @staticmethod
+    def collapse_query(query):
+        """
+        Restrict a Channel query to the best channel of each duplicate group.
+
+        Uses the pre-computed quality_score and duplicate_group columns, ranking
+        each group's members with a window function. Ties are broken by account,
+        then name, matching the iteration order used by collapse_duplicates.
+
+        Args:
+            query: SQLAlchemy query selecting Channel rows (filters/joins are preserved)
+
+        Returns:
+            Query selecting only the winning channel of each duplicate group
+        """
+        from models import Channel, db
+
+        ranked = (
+            query.order_by(None)
+            .with_entities(
+                Channel.id.label("channel_id"),
+                db.func.row_number()
+                .over(
+                    partition_by=QualityService._duplicate_group_expr(),
+                    order_by=(
+                        db.func.coalesce(Channel.quality_score, 0).desc(),
+                        Channel.account_id,
+                        Channel.name,
+                        Channel.id,
+                    ),
+                )
+                .label("collapse_rank"),
+            )
+            .subquery()
+        )
+        winner_ids = db.select(ranked.c.channel_id).where(ranked.c.collapse_rank == 1)
+        return query.filter(Channel.id.in_(winner_ids))
+
+    @staticmethod
+    def get_alternates(query, winners: List[Any]) -> Dict[str, List[Any]]:
+        """
+        Get the collapsed alternates for a set of winning channels.
+
+        Args:
+            query: The uncollapsed Channel query the winners were selected from
+            winners: Winning Channel objects (e.g. one page of collapse_query results)
+
+        Returns:
+            Dict mapping duplicate group -> list of alternate Channel objects, best first
+        """
+        from models import Channel, db
+
+        if not winners:
+            return {}
+
+        groups = {
+            QualityService.get_duplicate_group(ch.duplicate_group or ch.cleaned_name or ch.name) for ch in winners
+        }
+        winner_ids = [ch.id for ch in winners]
+
+        alternates = (
+            query.order_by(None)
+            .filter(QualityService._duplicate_group_expr().in_(groups), Channel.id.notin_(winner_ids))
+            .order_by(db.func.coalesce(Channel.quality_score, 0).desc(), Channel.account_id, Channel.name, Channel.id)
+            .all()
+        )
+
+        result: Dict[str, List[Any]] = {}
+        for ch in alternates:
+            group = QualityService.get_duplicate_group(ch.duplicate_group or ch.cleaned_name or ch.name)
+            result.setdefault(group, []).append(ch)
+        return result
+
+    @staticmethod
+    def collapse_channels(channels: List[Any]) -> List[Any]:
+        """
+        Collapse already-loaded Channel objects using their pre-computed columns.
+
+        Used where channels are gathered from several queries (e.g. config playlists
+        spanning accounts). Keeps the first channel of each group in iteration order,
+        replaced by a later one only if it has a strictly higher quality score.
+
+        Args:
+            channels: Channel objects in output order
+
+        Returns:
+            One Channel per duplicate group, in order of each group's first appearance
+        """
+        best: Dict[str, Any] = {}
+        for ch in channels:
+            group = ch.duplicate_group or QualityService.get_duplicate_group(ch.cleaned_name or ch.name)
+            current = best.get(group)
+            if current is None or (ch.quality_score or 0) > (current.quality_score or 0):
+                best[group] = ch
+        return list(best.values())
+
     @staticmethod
     def sort_by_quality(channels: List[Dict[str, Any]], tags_field: str = "tags") -> List[Dict[str, Any]]:
         """
@@ -3,18 +3,23 @@ Background scheduler for periodic channel synchronization
 """
 
 import logging
+import os
+import shutil
+import tempfile
 import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
-from typing import Optional
+from queue import Empty, Queue
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import urlparse
 
-import requests
-
-from models import Account, EpgSource, SyncMetadata
+from models import Account, EpgSource, SyncMetadata, db
 from services.epg_service import EpgService, normalize_xmltv_url
-from services.iptv_service import IPTVService
 from services.sync_service import ChannelSyncService
 from services.tag_service import TagService
+from services.xmltv_cache_service import XmltvCacheService
+from services.xmltv_grabber_service import XmltvGrabberService
 
 logger = logging.getLogger(__name__)
 
@@ -23,6 +28,14 @@ DEFAULT_ACCOUNT_INTERVAL_HOURS = 6
 DEFAULT_EPG_INTERVAL_HOURS = 12
 DEFAULT_FCC_INTERVAL_HOURS = 168  # Weekly
 
+# EPG refresh pipeline: concurrent downloads/parses, and downloads per host
+EPG_SYNC_WORKERS = 4
+EPG_SYNC_PER_HOST = 2
+
+# Parsed XMLTV elements per batch handed to the writer, and batches a worker may parse ahead of it
+EPG_FEED_BATCH = 1000
+EPG_FEED_DEPTH = 2
+
 # Metadata keys for persistent sync state
 SYNC_KEY_LAST_ACCOUNT_SYNC = "last_account_sync"
 SYNC_KEY_LAST_EPG_SYNC = "last_epg_sync"
@@ -34,6 +47,56 @@ SYNC_KEY_EPG_INTERVAL = "epg_sync_interval_hours"
 SYNC_KEY_FCC_INTERVAL = "fcc_sync_interval_hours"
 
 
+class _EpgFeed:
+    """Parsed XMLTV events of one guide, passed from a sync worker to the writer in bounded batches"""
+
+    def __init__(self):
+        # Lists of events; None marks the end and an exception a failed parse
+        self._batches: "Queue[Any]" = Queue(maxsize=EPG_FEED_DEPTH)
+        self._abandoned = threading.Event()
+
+    def fill(self, events: Iterable[Tuple[str, Dict]]) -> None:
+        """Worker: pass on events in batches, waiting while the writer is EPG_FEED_DEPTH batches behind."""
+        batch: List[Tuple[str, Dict]] = []
+        try:
+            for event in events:
+                batch.append(event)
+                if len(batch) >= EPG_FEED_BATCH:
+                    if not self._put(batch):
+                        return
+                    batch = []
+        except Exception as e:
+            self._put(e)
+            return
+        if self._put(batch):
+            self._put(None)
+
+    def _put(self, item) -> bool:
+        # abandon() empties the queue, so at most one put can block after it
+        if self._abandoned.is_set():
+            return False
+        self._batches.put(item)
+        return True
+
+    def abandon(self) -> None:
+        """Writer: stop reading; the worker stops parsing at its next batch."""
+        self._abandoned.set()
+        try:
+            while True:
+                self._batches.get_nowait()
+        except Empty:
+            pass
+
+    def __iter__(self) -> Iterator[Tuple[str, Dict]]:
+        while True:
+            item = self._batches.get()
+            if item is None:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield from item
+
+
 class SyncScheduler:
     """Scheduler for periodic channel sync with persistent timing and separate intervals"""
 
@@ -249,6 +312,9 @@ class SyncScheduler:
                 self._sync_fcc_data()
                 self._set_last_sync_time(SYNC_KEY_LAST_FCC_SYNC)
 
+            # Rebuild precomputed playlist EPGs whose inputs changed (cheap when nothing did)
+            self._refresh_epg_artifacts()
+
             # Run channel health scanning (runs continuously when idle)
             self._scan_channel_health()
 
@@ -352,6 +418,23 @@ class SyncScheduler:
         except Exception as e:
             logger.error(f"Error in channel health scanning: {e}")
 
+    def _refresh_epg_artifacts(self):
+        """Rebuild the stored EPG of playlist configs whose channels, mappings or guides changed"""
+        try:
+            from services.epg_artifact_service import EpgArtifactService
+
+            stats = EpgArtifactService.refresh_all()
+            if stats["built"] or stats["failed"] or stats["removed"]:
+                logger.info(
+                    f"Playlist EPGs refreshed: "
+                    f"{stats['built']} built, "
+                    f"{stats['unchanged']} unchanged, "
+                    f"{stats['failed']} failed, "
+                    f"{stats['removed']} removed"
+                )
+        except Exception as e:
+            logger.error(f"Error refreshing playlist EPGs: {e}")
+
     def _sync_fcc_data(self):
         """Sync FCC facility data (runs weekly)"""
         try:
@@ -394,88 +477,323 @@ class SyncScheduler:
             logger.error(f"Error applying FCC enrichment for account {account.name}: {e}")
 
     def _sync_epg_sources(self):
-        """Sync all enabled EPG sources"""
-        from services.epg_service import update_ppv_channel_visibility
+        """
+        Sync all enabled EPG sources.
+
+        Provider XMLTV refreshes, XMLTV URL downloads and XMLTV grabber runs
+        execute concurrently on a small worker pool (at most EPG_SYNC_PER_HOST
+        downloads per host) and are parsed on the workers. The scheduler thread
+        is the only database writer: it syncs each guide as soon as it is
+        handed over, reading parsed events in batches while the worker parses
+        on. Workers whose guide is not being written wait once they are
+        EPG_FEED_DEPTH batches ahead, so memory stays bounded however many
+        and however large the guides are, and a run takes roughly as long as
+        its slowest source.
+        """
+        from services.sync_service import get_iptv_service_for_account
 
         sources = EpgSource.query.filter_by(enabled=True).all()
         logger.info(f"Syncing {len(sources)} EPG source(s)")
 
+        # Build plain-data jobs here; workers never touch the database session.
+        # Every enabled account's XMLTV cache is refreshed, provider sources of
+        # disabled accounts only fetch a missing cache.
+        account_jobs: Dict[int, Dict] = {}
+        for account in Account.query.filter_by(enabled=True).all():
+            account_jobs[account.id] = {"account_id": account.id, "account": account, "refresh": True, "sources": []}
+        url_jobs = []
+        grabber_jobs = []
         for source in sources:
-            try:
-                logger.info(f"Syncing EPG source: {source.name} ({source.source_type})")
-                stats = self._sync_single_epg_source(source)
-                if stats:
-                    logger.info(
-                        f"EPG source {source.name} synced: "
-                        f"{stats.get('channels_added', 0)} added, "
-                        f"{stats.get('channels_updated', 0)} updated"
-                    )
-
-                    # Update PPV visibility for provider sources
-                    if source.source_type == "provider" and source.account:
-                        try:
-                            ppv_stats = update_ppv_channel_visibility(source.account.id)
-                            logger.info(
-                                f"PPV visibility updated for {source.account.name}: "
-                                f"{ppv_stats['events_detected']} events detected, "
-                                f"{ppv_stats['channels_shown']} shown, "
-                                f"{ppv_stats['channels_hidden']} hidden"
-                            )
-                        except Exception as e:
-                            logger.warning(f"Failed to update PPV visibility: {e}")
+            if source.source_type == "provider":
+                if not source.account:
+                    logger.warning(f"EPG source {source.name} has no associated account")
+                    continue
+                job = account_jobs.setdefault(
+                    source.account.id,
+                    {"account_id": source.account.id, "account": source.account, "refresh": False, "sources": []},
+                )
+                job["sources"].append(source.id)
+            elif source.source_type == "xmltv_url":
+                if not source.url:
+                    logger.warning(f"EPG source {source.name} has no URL configured")
+                    continue
+                url = normalize_xmltv_url(source.url)
+                if url != source.url:
+                    logger.info(f"Normalized XMLTV URL: {source.url} -> {url}")
+                url_jobs.append(
+                    {
+                        "source_id": source.id,
+                        "url": url,
+                        "etag": source.etag,
+                        "last_modified": source.last_modified,
+                        "content_hash": source.content_hash,
+                    }
+                )
+            elif source.source_type == "xmltv_grabber":
+                if not source.xmltv_grabber:
+                    logger.warning(f"EPG source {source.name} has no XMLTV grabber configured")
+                    continue
+                grabber_jobs.append(
+                    {"source_id": source.id, "grabber": XmltvGrabberService.get_source_grabber_args(source)}
+                )
+            elif source.source_type == "schedules_direct":
+                # Schedules Direct sync is handled separately via the SD service
+                logger.debug(f"Skipping Schedules Direct source {source.name} - handled separately")
+            else:
+                logger.warning(f"Unknown EPG source type: {source.source_type}")
 
+        for job in account_jobs.values():
+            account = job.pop("account")
+            # IPTVService talks to http://<server>
+            job["host"] = urlparse(f"http://{account.server}").hostname
+            try:
+                job["service"] = get_iptv_service_for_account(account)
             except Exception as e:
-                logger.error(f"Error syncing EPG source {source.name}: {e}")
+                job["error"] = e
+        for job in url_jobs:
+            job["host"] = urlparse(job["url"]).hostname
+
+        host_limits = {
+            job.get("host"): threading.BoundedSemaphore(EPG_SYNC_PER_HOST)
+            for job in list(account_jobs.values()) + url_jobs
+        }
+
+        # Jobs are handed to the writer as (job, result or exception), exactly once each
+        ready: "Queue[Tuple[Dict, Any]]" = Queue()
+        cache_stats = {"updated": 0, "not_modified": 0, "failed": 0}
+        with ThreadPoolExecutor(max_workers=EPG_SYNC_WORKERS, thread_name_prefix="epg-sync") as pool:
+            for job in account_jobs.values():
+                job["feeds"] = []
+                if "error" in job:
+                    ready.put((job, job["error"]))
+                else:
+                    pool.submit(self._run_epg_fetch, ready, self._fetch_provider_xmltv, job, host_limits[job["host"]])
+            for job in url_jobs:
+                job["feeds"] = []
+                pool.submit(self._run_epg_fetch, ready, self._fetch_xmltv_url, job, host_limits[job["host"]])
+            # Grabbers go last: they can run for minutes and beyond GRABBER_MAX_CONCURRENT
+            # they wait for a slot, so downloads get the workers first
+            for job in grabber_jobs:
+                job["feeds"] = []
+                pool.submit(self._run_epg_fetch, ready, self._fetch_grabber_xmltv, job)
+
+            for _ in range(len(account_jobs) + len(url_jobs) + len(grabber_jobs)):
+                job, result = ready.get()
+                try:
+                    if "grabber" in job:
+                        self._write_grabber_result(job, result)
+                    elif "source_id" in job:
+                        self._write_xmltv_url_result(job, result)
+                    else:
+                        self._write_provider_result(job, result, cache_stats)
+                finally:
+                    # Release a worker still parsing a guide that was not read to the end
+                    for feed in job["feeds"]:
+                        feed.abandon()
+
+        logger.info(
+            f"Provider XMLTV cache refreshed: "
+            f"{cache_stats['updated']} updated, "
+            f"{cache_stats['not_modified']} not modified, "
+            f"{cache_stats['failed']} failed"
+        )
+
+    @staticmethod
+    def _run_epg_fetch(ready: "Queue[Tuple[Dict, Any]]", fetch: Callable, job: Dict, *args):
+        """
+        Worker: run fetch(job, hand_over, *args), which hands its result to the writer once.
 
-    def _sync_single_epg_source(self, source: EpgSource):
+        An exception raised before the hand-over is handed over instead; guides
+        are parsed after it, through the feeds in job["feeds"].
         """
-        Sync a single EPG source.
+        handed_over = threading.Event()
 
-        Args:
-            source: The EpgSource to sync
+        def hand_over(result):
+            handed_over.set()
+            ready.put((job, result))
 
-        Returns:
-            Dict with sync stats or None if sync failed/skipped
-        """
-        if source.source_type == "provider":
-            if not source.account:
-                logger.warning(f"EPG source {source.name} has no associated account")
-                return None
-
-            account = source.account
-            cred = account.get_primary_credential()
-            if cred:
-                service = IPTVService(
-                    account.server, cred.username, cred.password, account.user_agent or "okhttp/3.14.9"
-                )
+        try:
+            fetch(job, hand_over, *args)
+        except Exception as e:
+            if not handed_over.is_set():
+                hand_over(e)
             else:
-                service = IPTVService(
-                    account.server, account.username, account.password, account.user_agent or "okhttp/3.14.9"
-                )
+                logger.error(f"EPG sync worker failed after handing over its result: {e}")
+
+    @staticmethod
+    def _fetch_provider_xmltv(job: Dict, hand_over: Callable, host_limit: threading.BoundedSemaphore):
+        """
+        Worker: refresh an account's XMLTV cache and parse it for each of its EPG sources.
 
-            xml_content = service.get_xmltv()
-            return EpgService.sync_epg_source(source, xml_content)
+        Hands over (cache refresh result, refresh error), then feeds one parse
+        of the cache per source into job["feeds"] (left empty without a cache).
+        """
+        refresh_result = None
+        refresh_error = None
+        if job["refresh"] or not os.path.exists(XmltvCacheService.get_cache_path(job["account_id"])):
+            try:
+                with host_limit:
+                    refresh_result = XmltvCacheService.refresh_with_service(job["account_id"], job["service"])
+            except Exception as e:
+                refresh_error = e
 
-        elif source.source_type == "xmltv_url":
-            if not source.url:
-                logger.warning(f"EPG source {source.name} has no URL configured")
-                return None
+        cache_path = XmltvCacheService.get_cache_path(job["account_id"])
+        if not job["sources"] or not os.path.exists(cache_path):
+            hand_over((refresh_result, refresh_error))
+            return
 
-            # Normalize URL (e.g., convert GitHub blob URLs to raw URLs)
-            url = normalize_xmltv_url(source.url)
-            if url != source.url:
-                logger.info(f"Normalized XMLTV URL: {source.url} -> {url}")
+        job["feeds"] = [_EpgFeed() for _ in job["sources"]]
+        hand_over((refresh_result, refresh_error))
+        # The writer syncs the sources in order, so each feed is read while the next waits
+        for feed in job["feeds"]:
+            with open(cache_path, "rb") as f:
+                feed.fill(EpgService.parse_xmltv_streaming(f, include_programme_body=True))
 
-            # Use 10 minute timeout for large XMLTV files from rate-limited servers
-            response = requests.get(url, timeout=600)
-            response.raise_for_status()
-            return EpgService.sync_epg_source(source, response.content)
+    @staticmethod
+    def _fetch_xmltv_url(job: Dict, hand_over: Callable, host_limit: threading.BoundedSemaphore):
+        """
+        Worker: conditionally download an XMLTV URL and parse it if it changed.
 
-        elif source.source_type == "schedules_direct":
-            # Schedules Direct sync is handled separately via the SD service
-            logger.debug(f"Skipping Schedules Direct source {source.name} - handled separately")
-            return None
+        Hands over the XmltvDownload; a downloaded guide is then fed into job["feeds"].
+        """
+        with tempfile.TemporaryFile() as body:
+            with host_limit:
+                download = EpgService.download_xmltv_url(
+                    job["url"], body, job["etag"], job["last_modified"], job["content_hash"]
+                )
+            if download.status != "downloaded":
+                hand_over(download)
+                return
+            body.seek(0)
+            feed = _EpgFeed()
+            job["feeds"] = [feed]
+            hand_over(download)
+            feed.fill(EpgService.parse_xmltv_streaming(body, include_programme_body=True))
+
+    @staticmethod
+    def _fetch_grabber_xmltv(job: Dict, hand_over: Callable):
+        """
+        Worker: run an XMLTV grabber and parse its output.
 
+        The output is spooled to a temporary file while the grabber runs and
+        only handed over once it exits, so a slow grabber never holds up the
+        writer. Raises RuntimeError if the grabber fails.
+        """
+        with tempfile.TemporaryFile() as spool:
+            success, _, error = XmltvGrabberService.run_grabber_streaming(
+                consume=lambda output: shutil.copyfileobj(output, spool), **job["grabber"]
+            )
+            if not success:
+                raise RuntimeError(f"XMLTV grabber failed: {error}")
+            spool.seek(0)
+            feed = _EpgFeed()
+            job["feeds"] = [feed]
+            hand_over(None)
+            feed.fill(EpgService.parse_xmltv_streaming(spool, include_programme_body=True))
+
+    def _write_grabber_result(self, job: Dict, result):
+        """Write the outcome of _fetch_grabber_xmltv for an XMLTV grabber source."""
+        source = db.session.get(EpgSource, job["source_id"])
+        if source is None:
+            return
+        try:
+            if isinstance(result, Exception):
+                raise result
+            logger.info(f"Syncing EPG source: {source.name} ({source.source_type})")
+            stats = EpgService.sync_epg_source(source, job["feeds"][0])
+        except Exception as e:
+            self._mark_epg_source_error(source, e)
+            return
+        self._log_epg_source_synced(source, stats)
+
+    def _write_provider_result(self, job: Dict, result, cache_stats: Dict):
+        """Write the outcome of _fetch_provider_xmltv for an account's EPG sources."""
+        job_error = None
+        if isinstance(result, Exception):
+            refresh_result, refresh_error = None, result
+            job_error = result
         else:
-            logger.warning(f"Unknown EPG source type: {source.source_type}")
-            return None
+            refresh_result, refresh_error = result
+
+        if refresh_error is not None:
+            logger.error(f"Error refreshing XMLTV for account {job['account_id']}: {refresh_error}")
+            cache_stats["failed"] += 1
+        elif refresh_result is not None:
+            cache_stats[refresh_result["status"]] += 1
+
+        for i, source_id in enumerate(job["sources"]):
+            feed = job["feeds"][i] if job["feeds"] else None
+            try:
+                self._write_provider_source(source_id, job["account_id"], feed, job_error)
+            finally:
+                # The worker parses the next source's guide once this one is released
+                if feed is not None:
+                    feed.abandon()
+
+    def _write_provider_source(self, source_id: int, account_id: int, feed, job_error: Optional[Exception]):
+        """Sync one provider EPG source from its feed of the account's cached XMLTV."""
+        from services.epg_service import update_ppv_channel_visibility
+
+        source = db.session.get(EpgSource, source_id)
+        if source is None:
+            return
+        if job_error is not None:
+            self._mark_epg_source_error(source, job_error)
+            return
+        if feed is None:
+            logger.warning(f"No cached XMLTV available for EPG source {source.name}")
+            return
+
+        try:
+            logger.info(f"Syncing EPG source: {source.name} ({source.source_type})")
+            stats = EpgService.sync_epg_source(source, feed)
+        except Exception as e:
+            self._mark_epg_source_error(source, e)
+            return
+        self._log_epg_source_synced(source, stats)
+
+        # Update PPV visibility for provider sources
+        try:
+            ppv_stats = update_ppv_channel_visibility(account_id)
+            logger.info(
+                f"PPV visibility updated for {source.account.name}: "
+                f"{ppv_stats['events_detected']} events detected, "
+                f"{ppv_stats['channels_shown']} shown, "
+                f"{ppv_stats['channels_hidden']} hidden"
+            )
+        except Exception as e:
+            logger.warning(f"Failed to update PPV visibility: {e}")
+
+    def _write_xmltv_url_result(self, job: Dict, result):
+        """Write the outcome of _fetch_xmltv_url for an XMLTV URL source."""
+        source = db.session.get(EpgSource, job["source_id"])
+        if source is None:
+            return
+        try:
+            if isinstance(result, Exception):
+                raise result
+            logger.info(f"Syncing EPG source: {source.name} ({source.source_type})")
+            stats = EpgService.finish_xmltv_url_sync(source, result, job["feeds"][0] if job["feeds"] else None)
+        except Exception as e:
+            self._mark_epg_source_error(source, e)
+            return
+        self._log_epg_source_synced(source, stats)
+
+    @staticmethod
+    def _mark_epg_source_error(source: EpgSource, error: Exception):
+        logger.error(f"Error syncing EPG source {source.name}: {error}")
+        try:
+            db.session.rollback()
+            EpgService.mark_source_error(source, str(error))
+        except Exception as e:
+            db.session.rollback()
+            logger.warning(f"Failed to record sync error for EPG source {source.name}: {e}")
+
+    @staticmethod
+    def _log_epg_source_synced(source: EpgSource, stats: Dict):
+        if stats:
+            logger.info(
+                f"EPG source {source.name} synced: "
+                f"{stats.get('channels_added', 0)} added, "
+                f"{stats.get('channels_updated', 0)} updated"
+            )
@@ -61,7 +61,8 @@ CLIENT_VERSION = "2.0"
 USER_AGENT = f"{CLIENT_NAME}/{CLIENT_VERSION}"
 
 # Rate limiting settings
-MIN_REQUEST_INTERVAL = 0.5  # Minimum seconds between requests
+MIN_REQUEST_INTERVAL = 0.5  # Average seconds between requests (token refill interval)
+REQUEST_BURST = 4  # Requests that may start back-to-back before throttling kicks in
 IMAGE_REQUEST_INTERVAL = 0.2  # Seconds between image requests
 MAX_IMAGES_PER_SESSION = 100  # Stop after this many images to avoid hitting daily limits
 
@@ -465,11 +466,43 @@ class RetryableError(SchedulesDirectError):
         self.retry_after = retry_after
 
 
+class TokenBucket:
+    """
+    Thread-safe token bucket rate limiter.
+
+    Tokens refill at one per interval up to burst. Each acquire() takes a
+    token, sleeping (outside the lock) until it is due, so concurrent callers
+    are spread out at the permitted rate instead of being serialized.
+    """
+
+    def __init__(self, interval: float, burst: int):
+        self.interval = interval
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Take a token, waiting until one is available."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(float(self.burst), self._tokens + (now - self._updated) / self.interval)
+            self._updated = now
+            # Reserve the token now; a negative balance is the queue of callers waiting for refills
+            self._tokens -= 1
+            wait = -self._tokens * self.interval if self._tokens < 0 else 0.0
+
+        if wait > 0:
+            time.sleep(wait)
+
+
 class SchedulesDirectClient:
     """
     Client for interacting with the Schedules Direct API.
 
-    Includes built-in rate limiting to avoid getting blocked.
+    Includes built-in rate limiting to avoid getting blocked. The limiter is
+    shared by all instances and threads, so callers may issue requests
+    concurrently (see SdSyncService) without exceeding the permitted rate.
 
     Usage:
         client = SchedulesDirectClient(username, password)
@@ -486,7 +519,7 @@ class SchedulesDirectClient:
     """
 
     # Class-level rate limiting (shared across instances)
-    _last_request_time: float = 0
+    _request_bucket = TokenBucket(MIN_REQUEST_INTERVAL, REQUEST_BURST)
     _last_image_request_time: float = 0
     _image_count_today: int = 0
     _image_count_reset: Optional[datetime] = None
@@ -497,58 +530,73 @@ class SchedulesDirectClient:
         self.password = password
         self.token: Optional[str] = None
         self.token_expires: Optional[int] = None  # Unix epoch time
-        self.session = requests.Session()
-        self.session.headers.update(
-            {
-                "User-Agent": USER_AGENT,
-                "Accept": "application/json",
-                "Content-Type": "application/json",
-            }
-        )
+        self._token_lock = threading.Lock()
+        self._local = threading.local()
+
+    @property
+    def session(self) -> requests.Session:
+        """
+        HTTP session of the calling thread.
+
+        Sync workers share one client, but requests.Session is not
+        thread-safe, so each thread gets its own connection pool.
+        """
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            session.headers.update(
+                {
+                    "User-Agent": USER_AGENT,
+                    "Accept": "application/json",
+                    "Accept-Encoding": "deflate, gzip",
+                    "Content-Type": "application/json",
+                }
+            )
+            self._local.session = session
+        return session
 
     def _throttle(self, is_image: bool = False) -> None:
         """
         Implement rate limiting between requests.
 
+        Regular API requests take a token from the shared bucket; image
+        downloads keep their own stricter interval and session cap.
+
         Args:
             is_image: True if this is an image download request
         """
+        if not is_image:
+            SchedulesDirectClient._request_bucket.acquire()
+            return
+
         with SchedulesDirectClient._rate_limit_lock:
             now = time.time()
 
-            if is_image:
-                # Check if we should reset the daily counter
-                reset_time = SchedulesDirectClient._image_count_reset
-                if reset_time is None or datetime.now() > reset_time:
-                    SchedulesDirectClient._image_count_today = 0
-                    SchedulesDirectClient._image_count_reset = datetime.now() + timedelta(hours=24)
-
-                # Check if we've hit our self-imposed limit
-                if SchedulesDirectClient._image_count_today >= MAX_IMAGES_PER_SESSION:
-                    logger.warning(
-                        f"Self-imposed image limit reached ({MAX_IMAGES_PER_SESSION}). "
-                        "Skipping further image downloads this session."
-                    )
-                    raise RateLimitError(
-                        f"Session image limit reached ({MAX_IMAGES_PER_SESSION})",
-                        code=5999,  # Our internal code
-                        retry_after=3600,
-                    )
+            # Check if we should reset the daily counter
+            reset_time = SchedulesDirectClient._image_count_reset
+            if reset_time is None or datetime.now() > reset_time:
+                SchedulesDirectClient._image_count_today = 0
+                SchedulesDirectClient._image_count_reset = datetime.now() + timedelta(hours=24)
 
-                # Throttle image requests more aggressively
-                elapsed = now - SchedulesDirectClient._last_image_request_time
-                if elapsed < IMAGE_REQUEST_INTERVAL:
-                    time.sleep(IMAGE_REQUEST_INTERVAL - elapsed)
+            # Check if we've hit our self-imposed limit
+            if SchedulesDirectClient._image_count_today >= MAX_IMAGES_PER_SESSION:
+                logger.warning(
+                    f"Self-imposed image limit reached ({MAX_IMAGES_PER_SESSION}). "
+                    "Skipping further image downloads this session."
+                )
+                raise RateLimitError(
+                    f"Session image limit reached ({MAX_IMAGES_PER_SESSION})",
+                    code=5999,  # Our internal code
+                    retry_after=3600,
+                )
 
-                SchedulesDirectClient._last_image_request_time = time.time()
-                SchedulesDirectClient._image_count_today += 1
-            else:
-                # Regular API request throttling
-                elapsed = now - SchedulesDirectClient._last_request_time
-                if elapsed < MIN_REQUEST_INTERVAL:
-                    time.sleep(MIN_REQUEST_INTERVAL - elapsed)
+            # Throttle image requests more aggressively
+            elapsed = now - SchedulesDirectClient._last_image_request_time
+            if elapsed < IMAGE_REQUEST_INTERVAL:
+                time.sleep(IMAGE_REQUEST_INTERVAL - elapsed)
 
-                SchedulesDirectClient._last_request_time = time.time()
+            SchedulesDirectClient._last_image_request_time = time.time()
+            SchedulesDirectClient._image_count_today += 1
 
     def _check_rate_limit_error(self, result: dict) -> None:
         """
@@ -666,22 +714,14 @@ class SchedulesDirectClient:
 
         headers = {}
         if authenticated:
-            # Check token validity before request
-            if not self._is_token_valid():
-                self.authenticate()
+            # Check token validity before request; concurrent callers share one re-authentication
+            with self._token_lock:
+                if not self._is_token_valid():
+                    self.authenticate()
             headers["token"] = self.token
 
         try:
-            if method == "GET":
-                response = self.session.get(url, headers=headers, timeout=30, allow_redirects=allow_redirects)
-            elif method == "POST":
-                response = self.session.post(url, headers=headers, json=data, timeout=30)
-            elif method == "PUT":
-                response = self.session.put(url, headers=headers, json=data, timeout=30)
-            elif method == "DELETE":
-                response = self.session.delete(url, headers=headers, timeout=30)
-            else:
-                raise ValueError(f"Unsupported HTTP method: {method}")
+            response = self._send(method, url, headers, data, allow_redirects)
 
             # Handle HTTP 429 (rate limit) if SD starts using it
             if response.status_code == 429:
@@ -707,18 +747,16 @@ class SchedulesDirectClient:
 
             # Check for token expiration and retry once
             if isinstance(result, dict) and result.get("code") == 4006:
-                logger.info("Token expired, re-authenticating...")
-                self.authenticate()
+                expired_token = headers.get("token")
+                with self._token_lock:
+                    # Another worker may already have replaced the expired token
+                    if self.token == expired_token:
+                        logger.info("Token expired, re-authenticating...")
+                        self.authenticate()
                 headers["token"] = self.token
                 # Retry the request
-                if method == "GET":
-                    response = self.session.get(url, headers=headers, timeout=30)
-                elif method == "POST":
-                    response = self.session.post(url, headers=headers, json=data, timeout=30)
-                elif method == "PUT":
-                    response = self.session.put(url, headers=headers, json=data, timeout=30)
-                elif method == "DELETE":
-                    response = self.session.delete(url, headers=headers, timeout=30)
+                self._throttle(is_image=is_image)
+                response = self._send(method, url, headers, data, allow_redirects)
                 result = response.json()
 
             # Check for API-level errors
@@ -730,6 +768,25 @@ class SchedulesDirectClient:
             logger.error(f"Schedules Direct API request failed: {e}")
             raise SchedulesDirectError(f"API request failed: {e}")
 
+    def _send(
+        self,
+        method: str,
+        url: str,
+        headers: Dict[str, Any],
+        data: Optional[Union[Dict[str, Any], List[Any]]],
+        allow_redirects: bool,
+    ) -> requests.Response:
+        """Send one HTTP request on the calling thread's session."""
+        if method == "GET":
+            return self.session.get(url, headers=headers, timeout=30, allow_redirects=allow_redirects)
+        elif method == "POST":
+            return self.session.post(url, headers=headers, json=data, timeout=30)
+        elif method == "PUT":
+            return self.session.put(url, headers=headers, json=data, timeout=30)
+        elif method == "DELETE":
+            return self.session.delete(url, headers=headers, timeout=30)
+        raise ValueError(f"Unsupported HTTP method: {method}")
+
     def authenticate(self, new_token: bool = False) -> Dict:
         """
         Authenticate with Schedules Direct and get a token.
@@ -953,7 +1010,7 @@ class SchedulesDirectClient:
         """
         return self._make_request("GET", f"lineups/{lineup_id}")
 
-    def get_lineup_channels(self, lineup_id: str) -> List[Dict]:
+    def get_lineup_channels(self, lineup_id: str, lineup_map: Optional[Dict] = None) -> List[Dict]:
         """
         Get detailed channel information for a lineup.
 
@@ -962,6 +1019,7 @@ class SchedulesDirectClient:
 
         Args:
             lineup_id: The lineup identifier
+            lineup_map: Lineup map to use instead of fetching it (e.g. from SdCacheService)
 
         Returns:
             List of channel dicts with:
@@ -973,7 +1031,7 @@ class SchedulesDirectClient:
                 - broadcastLanguage: Languages
                 - logo: Logo URL info
         """
-        lineup = self.get_lineup_map(lineup_id)
+        lineup = lineup_map if lineup_map is not None else self.get_lineup_map(lineup_id)
 
         # Build station lookup
         stations_by_id = {}
@@ -1040,6 +1098,21 @@ class SchedulesDirectClient:
 
         return self._make_request("POST", "schedules", request_data)
 
+    def get_schedules_by_station(self, station_dates: Dict[str, List[str]]) -> List[Dict]:
+        """
+        Get program schedules for different dates per station in one request.
+
+        Note: Maximum 5000 stations per request.
+
+        Args:
+            station_dates: Dict mapping station ID -> dates in YYYY-MM-DD format
+
+        Returns:
+            List of schedule dicts, one per station and date
+        """
+        request_data = [{"stationID": sid, "date": dates} for sid, dates in station_dates.items()]
+        return self._make_request("POST", "schedules", request_data)
+
     def get_programs(
         self,
         program_ids: List[str],
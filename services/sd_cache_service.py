@@ -0,0 +1,185 @@
+"""
+Schedules Direct Cache - Persistent token, account status and lineup map cache.
+
+Routes build a new SchedulesDirectClient per request. Without a cache every
+UI action requests a token (and often the account status and a lineup map),
+which counts against Schedules Direct's limits. Tokens are stored per SD
+account until shortly before they expire, the account status for
+SD_STATUS_TTL, and lineup maps until the lineup's 'modified' timestamp in the
+account status changes.
+
+Nothing here commits: cache rows are written to the caller's session and
+committed together with the caller's own changes.
+"""
+
+import hashlib
+import json
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Seconds a cached account status (lineups and their modified timestamps) is reused
+SD_STATUS_TTL = 900
+
+# Cached tokens are not reused within this many seconds of their expiry
+SD_TOKEN_EXPIRY_MARGIN = 300
+
+
+class SdCacheService:
+    """Service for caching Schedules Direct tokens, account status and lineup maps in the database"""
+
+    @staticmethod
+    def _get_account(username: str, create: bool = False):
+        from models import SdAccountCache, db
+
+        account = SdAccountCache.query.filter_by(username=username).first()
+        if account is None and create:
+            account = SdAccountCache(username=username)
+            db.session.add(account)
+        return account
+
+    @staticmethod
+    def authenticate(client, username: str, password: str) -> None:
+        """
+        Give a client a valid token, reusing the account's cached token when possible.
+
+        Only requests a new token (client.authenticate()) when none is cached
+        for these credentials or it is about to expire. A new token is stored
+        with save_token() (does not commit).
+
+        Args:
+            client: SchedulesDirectClient for the account
+            username: SD username
+            password: SD password (plain text, as stored on the EPG source)
+
+        Raises:
+            SchedulesDirectError: If authentication is needed and fails
+        """
+        password_hash = hashlib.sha1(password.encode()).hexdigest().lower()
+        account = SdCacheService._get_account(username)
+        if (
+            account is not None
+            and account.password_hash == password_hash
+            and account.token
+            and account.token_expires
+            and time.time() < account.token_expires - SD_TOKEN_EXPIRY_MARGIN
+        ):
+            client.token = account.token
+            client.token_expires = account.token_expires
+            return
+
+        client.authenticate()
+        SdCacheService.save_token(client, username, password)
+
+    @staticmethod
+    def save_token(client, username: str, password: str) -> None:
+        """
+        Store a client's current token for the account, if it changed (does not commit).
+
+        Clients re-authenticate by themselves when Schedules Direct rejects an
+        expired token, so callers save the token again after using a client;
+        otherwise the cache keeps handing out the rejected one.
+
+        Args:
+            client: SchedulesDirectClient for the account
+            username: SD username
+            password: SD password (plain text, as stored on the EPG source)
+        """
+        # Only store a well-formed token
+        if not isinstance(client.token, str) or not isinstance(client.token_expires, int):
+            return
+
+        account = SdCacheService._get_account(username, create=True)
+        if account.token != client.token:
+            account.password_hash = hashlib.sha1(password.encode()).hexdigest().lower()
+            account.token = client.token
+            account.token_expires = client.token_expires
+
+    @staticmethod
+    def get_status(client, username: str, force: bool = False) -> Any:
+        """
+        Get the account status (account info and lineups), cached for SD_STATUS_TTL (does not commit).
+
+        Args:
+            client: Authenticated SchedulesDirectClient for the account
+            username: SD username
+            force: Fetch from Schedules Direct even if a cached status is fresh
+
+        Returns:
+            Status response dict
+        """
+        account = SdCacheService._get_account(username)
+        if (
+            not force
+            and account is not None
+            and account.status
+            and account.status_fetched_at
+            and account.status_fetched_at > datetime.utcnow() - timedelta(seconds=SD_STATUS_TTL)
+        ):
+            return json.loads(account.status)
+
+        status = client.get_status()
+        if isinstance(status, dict):
+            account = SdCacheService._get_account(username, create=True)
+            account.status = json.dumps(status)
+            account.status_fetched_at = datetime.utcnow()
+        return status
+
+    @staticmethod
+    def invalidate_status(username: str) -> None:
+        """Drop the cached account status, e.g. after adding or removing a lineup (does not commit)."""
+        account = SdCacheService._get_account(username)
+        if account is not None:
+            account.status = None
+            account.status_fetched_at = None
+
+    @staticmethod
+    def get_lineup_modified(client, username: str, lineup_id: str) -> Optional[str]:
+        """
+        Get a lineup's 'modified' timestamp from the (cached) account status.
+
+        Returns:
+            Timestamp string, or None if the lineup is not on the account
+        """
+        status = SdCacheService.get_status(client, username)
+        for lineup in status.get("lineups", []):
+            if isinstance(lineup, dict) and lineup.get("lineup") == lineup_id:
+                return lineup.get("modified")
+        return None
+
+    @staticmethod
+    def get_lineup_map(client, username: str, lineup_id: str) -> Dict:
+        """
+        Get a lineup map, reusing the cached one while the lineup is unmodified.
+
+        Lineups not on the account have no 'modified' timestamp and are always
+        fetched. Does not commit.
+
+        Args:
+            client: Authenticated SchedulesDirectClient for the account
+            username: SD username
+            lineup_id: SD lineup ID
+
+        Returns:
+            Lineup map response (see SchedulesDirectClient.get_lineup_map())
+        """
+        from models import SdLineupMap, db
+
+        modified = SdCacheService.get_lineup_modified(client, username, lineup_id)
+        cached = SdLineupMap.query.filter_by(lineup_id=lineup_id).first()
+        if modified and cached is not None and cached.modified == modified and cached.data:
+            logger.debug(f"Using cached Schedules Direct lineup map for {lineup_id}")
+            return json.loads(cached.data)
+
+        lineup_map = client.get_lineup_map(lineup_id)
+        if modified and isinstance(lineup_map, dict):
+            if cached is None:
+                cached = SdLineupMap(lineup_id=lineup_id)
+                db.session.add(cached)
+            cached.modified = modified
+            cached.data = json.dumps(lineup_map)
+            cached.fetched_at = datetime.utcnow()
+        return lineup_map
@@ -0,0 +1,442 @@
+"""
+Schedules Direct Sync - Incremental schedule and programme sync.
+
+Schedules Direct publishes an MD5 for each station's schedule per day
+(schedules/md5). The MD5s of the last synced schedules are stored per
+(source, station, date), so a sync downloads only the station-days that
+changed, and of the programmes those reference only the ones whose own MD5
+is new. Programmes are rendered once into XMLTV <programme> children and the
+airings written to the programme store, like every other EPG source.
+
+Requests are issued from a small thread pool and paced by the client's shared
+token bucket; response decoding and programme rendering happen in the workers,
+while all database work stays on the calling thread.
+"""
+
+import logging
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+from services.epg_service import make_sd_xmltv_id
+from services.programme_service import ProgrammeRow, ProgrammeService
+from services.schedules_direct import MAX_PROGRAMS_PER_REQUEST, MAX_SCHEDULES_PER_REQUEST, Program
+
+logger = logging.getLogger(__name__)
+
+# Days of guide kept locally, starting today (UTC)
+SD_SCHEDULE_DAYS = 14
+
+# Stored programmes not referenced by a synced schedule for this long are dropped
+SD_PROGRAM_RETENTION_DAYS = 14
+
+# IDs per IN (...) clause when reading or writing stored programmes
+SD_QUERY_BATCH = 500
+
+# Concurrent Schedules Direct requests (the client's token bucket sets the actual rate)
+SD_FETCH_WORKERS = 4
+
+# Programs per programs request; below the API maximum so large fetches run in parallel
+SD_PROGRAMS_PER_FETCH = 1000
+
+XMLTV_TIME_FORMAT = "%Y%m%d%H%M%S +0000"
+
+
+def _chunks(items: List, size: int) -> Iterator[List]:
+    for i in range(0, len(items), size):
+        yield items[i : i + size]
+
+
+def render_program(program: Program) -> Tuple[str, str]:
+    """
+    Render a Schedules Direct programme as XMLTV <programme> child elements.
+
+    Airing-specific elements (e.g. <new />) are added per airing by the caller.
+
+    Args:
+        program: Parsed SD programme
+
+    Returns:
+        Tuple of (title, serialized child elements)
+    """
+    elems = []
+
+    lang = program.titles[0].title_language if program.titles and program.titles[0].title_language else "en"
+    title = ET.Element("title", lang=lang)
+    title.text = program.title
+    elems.append(title)
+
+    if program.episode_title:
+        sub_title = ET.Element("sub-title", lang=lang)
+        sub_title.text = program.episode_title
+        elems.append(sub_title)
+
+    descriptions = program.descriptions_long or program.descriptions_short
+    if descriptions and descriptions[0].description:
+        desc = ET.Element("desc", lang=descriptions[0].description_language or lang)
+        desc.text = descriptions[0].description
+        elems.append(desc)
+
+    date = None
+    if program.movie and program.movie.year:
+        date = program.movie.year
+    elif program.original_air_date:
+        date = program.original_air_date.replace("-", "")
+    if date:
+        date_elem = ET.Element("date")
+        date_elem.text = date
+        elems.append(date_elem)
+
+    for genre in program.genres or []:
+        category = ET.Element("category", lang="en")
+        category.text = genre
+        elems.append(category)
+
+    season_episode = program.season_episode
+    if season_episode and season_episode[0]:
+        season, episode = season_episode
+        episode_num = ET.Element("episode-num", system="xmltv_ns")
+        episode_num.text = f"{season - 1}.{episode - 1 if episode else ''}."
+        elems.append(episode_num)
+    if len(program.program_id) == 14:
+        episode_num = ET.Element("episode-num", system="dd_progid")
+        episode_num.text = f"{program.program_id[:10]}.{program.program_id[10:]}"
+        elems.append(episode_num)
+
+    return program.title, "".join(ET.tostring(elem, encoding="unicode") for elem in elems)
+
+
+def _fetch_programs(client, program_ids: List[str]) -> List[Tuple[Program, str, str]]:
+    """
+    Download and render programmes (runs in a worker thread; no database access).
+
+    Returns:
+        List of (program, title, body) for the programmes that are available
+    """
+    rendered = []
+    for item in client.get_programs(program_ids):
+        if item.get("code", 0) != 0:
+            # e.g. 6001 PROGRAMID_QUEUED: airings without it are retried by the next sync
+            continue
+        try:
+            program = Program.from_api_response(item)
+            title, body = render_program(program)
+        except Exception as e:
+            logger.warning(f"Failed to render program {item.get('programID', 'unknown')}: {e}")
+            continue
+        rendered.append((program, title, body))
+    return rendered
+
+
+def _airing_row(airing: Dict, title: Optional[str], body: str) -> Optional[ProgrammeRow]:
+    """Build a programme store row for a schedule airing, or None if its time is invalid."""
+    try:
+        start = datetime.strptime(airing["airDateTime"], "%Y-%m-%dT%H:%M:%SZ")
+    except (KeyError, TypeError, ValueError):
+        return None
+    stop = start + timedelta(seconds=int(airing.get("duration") or 0))
+
+    if str(airing.get("isPremiereOrFinale", "")).endswith("Premiere"):
+        body += "<premiere />"
+    if airing.get("new"):
+        body += "<new />"
+    return start.strftime(XMLTV_TIME_FORMAT), stop.strftime(XMLTV_TIME_FORMAT), title, body
+
+
+class SdSyncService:
+    """Service for incrementally syncing Schedules Direct schedules into the programme store"""
+
+    @staticmethod
+    def sync_schedules(source, client, station_ids: List[str], days: int = SD_SCHEDULE_DAYS) -> Dict:
+        """
+        Sync the next days of schedules for a Schedules Direct source's stations.
+
+        Only station-days whose schedule MD5 changed since the last sync are
+        downloaded, and only programmes whose MD5 is not stored yet. A
+        station-day's MD5 is recorded once all of its programmes are stored,
+        so queued (not yet available) data is retried by the next sync.
+        Commits the session.
+
+        Args:
+            source: The schedules_direct EpgSource (its lineup channels already synced)
+            client: Authenticated SchedulesDirectClient
+            station_ids: SD station IDs to sync
+            days: Number of days to keep, starting today (UTC)
+
+        Returns:
+            Dict with sync statistics
+        """
+        from models import EpgChannel, SdScheduleMd5, db
+
+        stats = {
+            "station_days": 0,
+            "station_days_changed": 0,
+            "programs_fetched": 0,
+            "programmes_stored": 0,
+        }
+
+        today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+        dates = [(today + timedelta(days=i)).strftime("%Y-%m-%d") for i in range(days)]
+        wanted_dates = set(dates)
+        station_ids = list(dict.fromkeys(station_ids))
+        stored = SdSyncService._stored_md5s(source.id)
+
+        with ThreadPoolExecutor(max_workers=SD_FETCH_WORKERS, thread_name_prefix="sd-fetch") as pool:
+            # Current schedule MD5s per (station, date)
+            current: Dict[Tuple[str, str], Tuple[str, Optional[str]]] = {}
+            md5_chunks = pool.map(
+                lambda chunk: client.get_schedule_md5s(chunk, dates), _chunks(station_ids, MAX_SCHEDULES_PER_REQUEST)
+            )
+            for md5s in md5_chunks:
+                for station_id, by_date in md5s.items():
+                    for date, info in by_date.items():
+                        if date in wanted_dates and info.get("code", 0) == 0 and info.get("md5"):
+                            current[(station_id, date)] = (info["md5"], info.get("lastModified"))
+
+            airings, programs, stats["station_days_changed"], stats["programs_fetched"] = SdSyncService._fetch_changed(
+                pool, client, current, stored
+            )
+        stats["station_days"] = len(current)
+
+        # Replace the programme store rows of each downloaded station-day
+        epg_channel_ids: Dict[str, int] = {
+            row.channel_id: row.id
+            for row in db.session.execute(
+                db.select(EpgChannel.channel_id, EpgChannel.id).where(EpgChannel.source_id == source.id)
+            )
+        }
+        synced: List[Tuple[str, str]] = []
+        for (station_id, date), schedule in airings.items():
+            epg_channel_id = epg_channel_ids.get(make_sd_xmltv_id(station_id))
+            if epg_channel_id is None:
+                continue
+
+            rows: List[ProgrammeRow] = []
+            complete = True
+            for airing in schedule:
+                program_id = airing.get("programID")
+                program = programs.get(program_id) if program_id else None
+                row = _airing_row(airing, *program) if program else None
+                if row is None:
+                    complete = False
+                    continue
+                rows.append(row)
+
+            day_start = datetime.strptime(date, "%Y-%m-%d")
+            SdSyncService._delete_programmes(epg_channel_id, day_start, day_start + timedelta(days=1))
+            stats["programmes_stored"] += ProgrammeService.store_programmes({epg_channel_id: rows})
+            if complete:
+                synced.append((station_id, date))
+
+        # Record the MD5s of the fully synced station-days
+        now = datetime.utcnow()
+        inserts: List[Dict] = []
+        updates: List[Dict] = []
+        for key in synced:
+            md5, last_modified = current[key]
+            values: Dict[str, Any] = {"md5": md5, "last_modified": last_modified, "updated_at": now}
+            if key in stored:
+                values["id"] = stored[key][0]
+                updates.append(values)
+            else:
+                values.update(epg_source_id=source.id, station_id=key[0], date=key[1])
+                inserts.append(values)
+        for batch in _chunks(inserts, SD_QUERY_BATCH):
+            db.session.execute(db.insert(SdScheduleMd5), batch)
+        for batch in _chunks(updates, SD_QUERY_BATCH):
+            db.session.execute(db.update(SdScheduleMd5), batch)
+
+        SdSyncService._prune(source.id, today, set(epg_channel_ids.values()))
+        SdSyncService._update_channel_stats(source.id)
+        db.session.commit()
+
+        logger.info(
+            f"Schedules Direct sync for source {source.id} ({source.name}): "
+            f"{stats['station_days_changed']}/{stats['station_days']} station-days changed, "
+            f"{stats['programs_fetched']} programs fetched, {stats['programmes_stored']} programmes stored"
+        )
+        return stats
+
+    @staticmethod
+    def _stored_md5s(source_id: int) -> Dict[Tuple[str, str], Tuple[int, str]]:
+        """Get the recorded schedule MD5s of a source as (station, date) -> (row id, md5)."""
+        from models import SdScheduleMd5, db
+
+        return {
+            (station_id, date): (row_id, md5)
+            for row_id, station_id, date, md5 in db.session.execute(
+                db.select(SdScheduleMd5.id, SdScheduleMd5.station_id, SdScheduleMd5.date, SdScheduleMd5.md5).where(
+                    SdScheduleMd5.epg_source_id == source_id
+                )
+            )
+        }
+
+    @staticmethod
+    def _fetch_changed(
+        pool: ThreadPoolExecutor,
+        client,
+        current: Dict[Tuple[str, str], Tuple[str, Optional[str]]],
+        stored: Dict[Tuple[str, str], Tuple[int, str]],
+    ) -> Tuple[Dict[Tuple[str, str], List[Dict]], Dict[str, Tuple[Optional[str], str]], int, int]:
+        """
+        Download the station-days whose MD5 changed and the programmes they need.
+
+        Returns:
+            Tuple of (airings per (station, date), program ID -> (title, body),
+            station-days changed, programmes fetched)
+        """
+        changed: Dict[str, List[str]] = {}
+        for (station_id, date), (md5, _) in current.items():
+            if stored.get((station_id, date), (None, None))[1] != md5:
+                changed.setdefault(station_id, []).append(date)
+
+        station_chunks = [dict(chunk) for chunk in _chunks(list(changed.items()), MAX_SCHEDULES_PER_REQUEST)]
+        airings: Dict[Tuple[str, str], List[Dict]] = {}
+        for schedules in pool.map(client.get_schedules_by_station, station_chunks):
+            for schedule in schedules:
+                if schedule.get("code", 0) != 0:
+                    # e.g. 7100 SCHEDULE_QUEUED: its MD5 is not recorded, so the next sync retries
+                    logger.debug(
+                        f"Schedule for station {schedule.get('stationID')} unavailable: {schedule.get('code')}"
+                    )
+                    continue
+                key = (schedule.get("stationID"), schedule.get("metadata", {}).get("startDate"))
+                if key in current:
+                    airings[key] = schedule.get("programs", [])
+
+        programs, fetched = SdSyncService._update_programs(pool, client, airings)
+        return airings, programs, sum(len(dates) for dates in changed.values()), fetched
+
+    @staticmethod
+    def _update_programs(
+        pool: ThreadPoolExecutor, client, airings: Dict[Tuple[str, str], List[Dict]]
+    ) -> Tuple[Dict[str, Tuple[Optional[str], str]], int]:
+        """
+        Make sure every programme referenced by the airings is stored at its current MD5.
+
+        Returns:
+            Tuple of (program ID -> (title, body) of the available programmes, programmes fetched)
+        """
+        from models import SdProgram, db
+
+        wanted: Dict[str, str] = {}
+        for schedule in airings.values():
+            for airing in schedule:
+                if airing.get("programID"):
+                    wanted[airing["programID"]] = airing.get("md5") or ""
+        if not wanted:
+            return {}, 0
+
+        program_ids = list(wanted)
+        programs: Dict[str, Tuple[Optional[str], str]] = {}
+        now = datetime.utcnow()
+        for chunk in _chunks(program_ids, SD_QUERY_BATCH):
+            rows = db.session.execute(
+                db.select(SdProgram.program_id, SdProgram.md5, SdProgram.title, SdProgram.body).where(
+                    SdProgram.program_id.in_(chunk)
+                )
+            )
+            for program_id, md5, title, body in rows:
+                if md5 == wanted[program_id]:
+                    programs[program_id] = (title, body or "")
+            db.session.execute(
+                db.update(SdProgram)
+                .where(SdProgram.program_id.in_(chunk))
+                .values(last_seen=now)
+                .execution_options(synchronize_session=False)
+            )
+
+        to_fetch = [program_id for program_id in program_ids if program_id not in programs]
+        fetched = 0
+        fetches = pool.map(
+            lambda chunk: _fetch_programs(client, chunk),
+            _chunks(to_fetch, min(SD_PROGRAMS_PER_FETCH, MAX_PROGRAMS_PER_REQUEST)),
+        )
+        for rendered in fetches:
+            new_rows: List[Dict] = []
+            for program, title, body in rendered:
+                programs[program.program_id] = (title, body)
+                new_rows.append(
+                    {
+                        "program_id": program.program_id,
+                        "md5": program.md5,
+                        "title": title[:500] if title else title,
+                        "body": body,
+                        "last_seen": now,
+                        "updated_at": now,
+                    }
+                )
+            fetched += len(new_rows)
+
+            # Replace changed programmes: delete the old rows, then insert in bulk
+            for batch in _chunks([row["program_id"] for row in new_rows], SD_QUERY_BATCH):
+                db.session.execute(db.delete(SdProgram).where(SdProgram.program_id.in_(batch)))
+            for batch in _chunks(new_rows, SD_QUERY_BATCH):
+                db.session.execute(db.insert(SdProgram), batch)
+
+        return programs, fetched
+
+    @staticmethod
+    def _delete_programmes(epg_channel_id: int, start: datetime, end: Optional[datetime]):
+        """Delete an EPG channel's stored programmes starting in [start, end)."""
+        from models import EpgProgramme, db
+
+        query = db.delete(EpgProgramme).where(
+            EpgProgramme.epg_channel_id == epg_channel_id, EpgProgramme.start_time >= start
+        )
+        if end is not None:
+            query = query.where(EpgProgramme.start_time < end)
+        db.session.execute(query)
+
+    @staticmethod
+    def _prune(source_id: int, today: datetime, epg_channel_ids: Set[int]):
+        """Drop schedule MD5s and programmes before today, and programmes no longer referenced."""
+        from models import EpgProgramme, SdProgram, SdScheduleMd5, db
+
+        db.session.execute(
+            db.delete(SdScheduleMd5).where(
+                SdScheduleMd5.epg_source_id == source_id, SdScheduleMd5.date < today.strftime("%Y-%m-%d")
+            )
+        )
+        if epg_channel_ids:
+            db.session.execute(
+                db.delete(EpgProgramme).where(
+                    EpgProgramme.epg_channel_id.in_(epg_channel_ids), EpgProgramme.stop_time < today
+                )
+            )
+        db.session.execute(
+            db.delete(SdProgram).where(
+                SdProgram.last_seen < datetime.utcnow() - timedelta(days=SD_PROGRAM_RETENTION_DAYS)
+            )
+        )
+
+    @staticmethod
+    def _update_channel_stats(source_id: int):
+        """Set program_count and the first/last programme times of a source's EPG channels."""
+        from models import EpgChannel, EpgProgramme, db
+
+        rows = db.session.execute(
+            db.select(
+                EpgProgramme.epg_channel_id,
+                db.func.count(EpgProgramme.id),
+                db.func.min(EpgProgramme.start_time),
+                db.func.max(EpgProgramme.stop_time),
+            )
+            .join(EpgChannel, EpgChannel.id == EpgProgramme.epg_channel_id)
+            .where(EpgChannel.source_id == source_id)
+            .group_by(EpgProgramme.epg_channel_id)
+        ).all()
+        updates = [
+            {"id": epg_channel_id, "program_count": count, "first_program": first, "last_program": last}
+            for epg_channel_id, count, first, last in rows
+        ]
+        for batch in _chunks(updates, SD_QUERY_BATCH):
+            db.session.execute(db.update(EpgChannel), batch)
+
+    @staticmethod
+    def delete_source_state(source_id: int):
+        """Delete the stored schedule MD5s of a Schedules Direct source (does not commit)."""
+        from models import SdScheduleMd5, db
+
+        db.session.execute(db.delete(SdScheduleMd5).where(SdScheduleMd5.epg_source_id == source_id))
@@ -105,6 +105,15 @@ class ChannelSyncService:
                     logger.error(f"Error computing filter visibility after sync: {e}")
                     stats["errors"].append(f"Filter visibility error: {str(e)}")
 
+                # Refresh duplicate groups for new/renamed channels
+                try:
+                    from services.quality_service import QualityService
+
+                    QualityService.update_duplicate_groups(account_id)
+                except Exception as e:
+                    logger.error(f"Error updating duplicate groups after sync: {e}")
+                    stats["errors"].append(f"Duplicate group error: {str(e)}")
+
             logger.info(
                 f"Sync completed for account {account.name}: "
                 f"{stats['channels_added']} added, {stats['channels_updated']} updated, "
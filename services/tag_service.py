@@ -755,6 +755,11 @@ class TagService:
 
         db.session.commit()
 
+        # Refresh pre-computed quality scores/duplicate groups (depend on tags and cleaned names)
+        from services.quality_service import QualityService
+
+        QualityService.update_duplicate_groups(account_id)
+
         logger.info(
             f"Processed tags for {processed_count} channels in account {account_id}: "
             f"{tags_created} created, {tags_updated} updated, {tags_removed} removed"
@@ -0,0 +1,286 @@
+"""
+XMLTV Cache Service - Disk-backed copy of each provider account's XMLTV guide.
+
+Provider guides are large (often 50-200MB), so EPG endpoints never download
+them per request. The scheduler refreshes the local copy on the EPG interval
+using conditional GET (ETag / Last-Modified), and EPG generation reads only
+from disk. The file on disk is shared by all worker processes.
+
+Guides are stored uncompressed with a byte-offset index sidecar (see
+services.xmltv_index), so EPG generation can copy the requested channels
+out of a memory-mapped file instead of parsing the whole guide.
+"""
+
+import gzip
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+from datetime import datetime, timezone
+from typing import IO, Dict, Optional
+
+from services.xmltv_index import XmltvIndex, build_xmltv_index, load_xmltv_index, save_xmltv_index
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = "/app/data/xmltv_cache"
+
+
+class XmltvCacheService:
+    """Service for storing and refreshing provider XMLTV files on disk"""
+
+    # Per-account locks so concurrent refreshes in one process download once
+    _locks: Dict[int, threading.Lock] = {}
+    _locks_guard = threading.Lock()
+
+    @staticmethod
+    def get_cache_dir() -> str:
+        """Get the cache directory (XMLTV_CACHE_DIR env var or /app/data/xmltv_cache)."""
+        return os.getenv("XMLTV_CACHE_DIR") or DEFAULT_CACHE_DIR
+
+    @staticmethod
+    def get_cache_path(account_id: int) -> str:
+        """Get the path of an account's cached XMLTV file."""
+        return os.path.join(XmltvCacheService.get_cache_dir(), f"provider_{account_id}.xml")
+
+    @staticmethod
+    def _get_meta_path(account_id: int) -> str:
+        """Get the path of an account's cache metadata (validators, fetch time)."""
+        return os.path.join(XmltvCacheService.get_cache_dir(), f"provider_{account_id}.json")
+
+    @staticmethod
+    def _get_index_path(account_id: int) -> str:
+        """Get the path of an account's byte-offset index."""
+        return os.path.join(XmltvCacheService.get_cache_dir(), f"provider_{account_id}.idx.json")
+
+    @staticmethod
+    def _get_lock(account_id: int) -> threading.Lock:
+        with XmltvCacheService._locks_guard:
+            lock = XmltvCacheService._locks.get(account_id)
+            if lock is None:
+                lock = threading.Lock()
+                XmltvCacheService._locks[account_id] = lock
+            return lock
+
+    @staticmethod
+    def get_cache_info(account_id: int) -> Optional[Dict]:
+        """
+        Get metadata for an account's cached XMLTV file.
+
+        Returns:
+            Dict with etag, last_modified, fetched_at and size, or None if not cached
+        """
+        if not os.path.exists(XmltvCacheService.get_cache_path(account_id)):
+            return None
+        try:
+            with open(XmltvCacheService._get_meta_path(account_id), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            # XML without metadata is still usable, it just can't be revalidated
+            return {}
+
+    @staticmethod
+    def refresh_account(account) -> Dict:
+        """
+        Refresh an account's cached XMLTV file from the provider.
+
+        Sends the stored ETag / Last-Modified so unchanged guides are not
+        downloaded again. New content is written to a temporary file and
+        renamed into place, so readers never see a partial file.
+
+        Args:
+            account: Account to refresh
+
+        Returns:
+            Dict with account_id, status ("updated" or "not_modified") and size in bytes
+        """
+        from services.sync_service import get_iptv_service_for_account
+
+        return XmltvCacheService.refresh_with_service(account.id, get_iptv_service_for_account(account))
+
+    @staticmethod
+    def refresh_with_service(account_id: int, service) -> Dict:
+        """
+        Refresh an account's cached XMLTV file using an already built IPTVService.
+
+        Touches no database state, so it can run off the scheduler thread.
+
+        Args:
+            account_id: Account whose cache to refresh
+            service: IPTVService for the account
+
+        Returns:
+            Dict with account_id, status ("updated" or "not_modified") and size in bytes
+        """
+        with XmltvCacheService._get_lock(account_id):
+            return XmltvCacheService._refresh_locked(account_id, service)
+
+    @staticmethod
+    def _refresh_locked(account_id: int, service) -> Dict:
+        cache_dir = XmltvCacheService.get_cache_dir()
+        os.makedirs(cache_dir, exist_ok=True)
+
+        cache_path = XmltvCacheService.get_cache_path(account_id)
+        info = XmltvCacheService.get_cache_info(account_id) or {}
+
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir, prefix=f".provider_{account_id}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                validators = service.download_xmltv(f, etag=info.get("etag"), last_modified=info.get("last_modified"))
+
+            if validators is None:
+                os.unlink(tmp_path)
+                logger.info(f"XMLTV for account {account_id} not modified")
+                return {"account_id": account_id, "status": "not_modified", "size": info.get("size", 0)}
+
+            XmltvCacheService._decompress_in_place(tmp_path)
+            size = os.path.getsize(tmp_path)
+            os.replace(tmp_path, cache_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+        XmltvCacheService._build_index(account_id)
+
+        meta = {
+            "etag": validators.get("etag"),
+            "last_modified": validators.get("last_modified"),
+            "fetched_at": datetime.now(timezone.utc).isoformat(),
+            "size": size,
+        }
+        with open(XmltvCacheService._get_meta_path(account_id), "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+
+        logger.info(f"Cached XMLTV for account {account_id} ({size} bytes)")
+        return {"account_id": account_id, "status": "updated", "size": size}
+
+    @staticmethod
+    def _decompress_in_place(path: str):
+        """Replace a gzip-compressed download with its decompressed content."""
+        with open(path, "rb") as f:
+            if f.read(2) != b"\x1f\x8b":
+                return
+
+        fd, plain_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".xmltv.", suffix=".tmp")
+        try:
+            with gzip.open(path, "rb") as src, os.fdopen(fd, "wb") as dst:
+                shutil.copyfileobj(src, dst)
+            os.replace(plain_path, path)
+        except BaseException:
+            if os.path.exists(plain_path):
+                os.unlink(plain_path)
+            raise
+
+    @staticmethod
+    def _build_index(account_id: int) -> Optional[Dict]:
+        """
+        Build and save the byte-offset index of an account's cached XMLTV file.
+
+        Returns:
+            Index dict, or None if the file can't be indexed
+        """
+        index_path = XmltvCacheService._get_index_path(account_id)
+        try:
+            index = build_xmltv_index(XmltvCacheService.get_cache_path(account_id))
+        except Exception as e:
+            logger.warning(f"Failed to index XMLTV for account {account_id}: {e}")
+            index = None
+
+        if index is None:
+            if os.path.exists(index_path):
+                os.unlink(index_path)
+            return None
+
+        save_xmltv_index(index, index_path)
+        logger.info(f"Indexed XMLTV for account {account_id} ({len(index['channels'])} channels)")
+        return index
+
+    @staticmethod
+    def open_account_index(account) -> Optional[XmltvIndex]:
+        """
+        Open an account's cached XMLTV file with its byte-offset index.
+
+        Fetches the guide on a cold cache (see open_account_xmltv) and
+        rebuilds a missing or stale index. Close the result when done.
+
+        Args:
+            account: Account to read
+
+        Returns:
+            XmltvIndex, or None if the guide isn't cached or can't be indexed
+        """
+        cache_path = XmltvCacheService.get_cache_path(account.id)
+        index_path = XmltvCacheService._get_index_path(account.id)
+
+        index = load_xmltv_index(index_path, cache_path)
+        if index is None:
+            if not XmltvCacheService._fetch_if_missing(account):
+                return None
+            with XmltvCacheService._get_lock(account.id):
+                index = load_xmltv_index(index_path, cache_path) or XmltvCacheService._build_index(account.id)
+            if index is None:
+                return None
+
+        try:
+            return XmltvIndex(cache_path, index)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Failed to open XMLTV for account {account.id}: {e}")
+            return None
+
+    @staticmethod
+    def open_account_xmltv(account) -> Optional[IO[bytes]]:
+        """
+        Open an account's cached XMLTV file for streaming, fetching it once if nothing is cached yet.
+
+        This only downloads on a cold cache (e.g. a new account before the
+        scheduler's first EPG run); afterwards the scheduler keeps it fresh.
+        The guide is never read into memory. Close the result when done.
+
+        Args:
+            account: Account to read
+
+        Returns:
+            Binary file object, or None if the fetch failed
+        """
+        if not XmltvCacheService._fetch_if_missing(account):
+            return None
+        try:
+            return open(XmltvCacheService.get_cache_path(account.id), "rb")
+        except FileNotFoundError:
+            return None
+
+    @staticmethod
+    def _fetch_if_missing(account) -> bool:
+        """Fetch an account's XMLTV on a cold cache; returns whether the guide is cached."""
+        cache_path = XmltvCacheService.get_cache_path(account.id)
+        if os.path.exists(cache_path):
+            return True
+
+        from services.sync_service import get_iptv_service_for_account
+
+        with XmltvCacheService._get_lock(account.id):
+            # Another request may have fetched it while we waited
+            if not os.path.exists(cache_path):
+                try:
+                    XmltvCacheService._refresh_locked(account.id, get_iptv_service_for_account(account))
+                except Exception as e:
+                    logger.warning(f"Failed to fetch XMLTV for account {account.id}: {e}")
+                    return False
+
+        return os.path.exists(cache_path)
+
+    @staticmethod
+    def delete_account(account_id: int):
+        """Remove an account's cached XMLTV file, metadata and index."""
+        for path in (
+            XmltvCacheService.get_cache_path(account_id),
+            XmltvCacheService._get_meta_path(account_id),
+            XmltvCacheService._get_index_path(account_id),
+        ):
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
@@ -10,19 +10,33 @@ The XMLTV project provides grabbers for many regions:
 - tv_grab_uk_tvguide - UK TV Guide
 - And many more region-specific grabbers
 """
+import io
+import json
 import logging
 import os
 import subprocess
+import tempfile
+import threading
 from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import IO, Any, Callable, Dict, List, Optional, Tuple, cast
 
 logger = logging.getLogger(__name__)
 
 # Directory to store grabber configurations
 GRABBER_CONFIG_DIR = Path("/app/data/xmltv_configs")
 
+# Grabber runs: timeout, how many may run at once (process-wide), and how
+# often streamed runs log their progress
+GRABBER_TIMEOUT = 600  # 10 minutes
+GRABBER_MAX_CONCURRENT = 2
+GRABBER_PROGRESS_INTERVAL = 8 * 1024 * 1024
+# How long a grabber whose output failed to parse may take to exit on its own
+GRABBER_EXIT_GRACE = 5
+
+_grabber_slots = threading.BoundedSemaphore(GRABBER_MAX_CONCURRENT)
+
 
 @dataclass
 class XmltvGrabber:
@@ -44,6 +58,31 @@ class GrabberConfig:
     options: Dict  # Additional grabber options
 
 
+class _GrabberOutput(io.RawIOBase):
+    """A running grabber's stdout as a readable stream that reports progress"""
+
+    def __init__(self, pipe: io.BufferedReader, name: str, progress: Optional[Callable[[int], None]]):
+        self._pipe = pipe
+        self._name = name
+        self._progress = progress
+        self._next_report = GRABBER_PROGRESS_INTERVAL
+        self.bytes_read = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        n = self._pipe.readinto(b)
+        if n:
+            self.bytes_read += n
+            if self.bytes_read >= self._next_report:
+                self._next_report += GRABBER_PROGRESS_INTERVAL
+                logger.info(f"Grabber {self._name}: {self.bytes_read // (1024 * 1024)} MB received")
+            if self._progress:
+                self._progress(self.bytes_read)
+        return n
+
+
 class XmltvGrabberService:
     """Service for managing and running XMLTV grabbers"""
 
@@ -281,26 +320,7 @@ class XmltvGrabberService:
         if not grabber:
             return False, b"", f"Grabber '{grabber_name}' not found"
 
-        cmd = [grabber.path]
-
-        # Add configuration file if specified
-        if config_name:
-            config_path = XmltvGrabberService.get_grabber_config_path(config_name)
-            if config_path.exists():
-                cmd.extend(["--config-file", str(config_path)])
-            else:
-                logger.warning(f"Config file not found: {config_path}")
-
-        # Add days parameter if supported
-        cmd.extend(["--days", str(days)])
-
-        # Add offset if specified
-        if offset > 0:
-            cmd.extend(["--offset", str(offset)])
-
-        # Add any extra arguments
-        if extra_args:
-            cmd.extend(extra_args)
+        cmd = XmltvGrabberService._build_command(grabber, config_name, days, offset, extra_args)
 
         # Add output file if specified
         if output_file:
@@ -312,7 +332,7 @@ class XmltvGrabberService:
             result = subprocess.run(
                 cmd,
                 capture_output=True,
-                timeout=600,  # 10 minute timeout
+                timeout=GRABBER_TIMEOUT,
             )
 
             if result.returncode == 0:
@@ -332,6 +352,155 @@ class XmltvGrabberService:
         except subprocess.SubprocessError as e:
             return False, b"", f"Failed to run grabber: {e}"
 
+    @staticmethod
+    def _build_command(
+        grabber: XmltvGrabber,
+        config_name: Optional[str],
+        days: int,
+        offset: int,
+        extra_args: Optional[List[str]],
+    ) -> List[str]:
+        """Build the command line for a grabber run (without --output)."""
+        cmd = [grabber.path]
+
+        # Add configuration file if specified
+        if config_name:
+            config_path = XmltvGrabberService.get_grabber_config_path(config_name)
+            if config_path.exists():
+                cmd.extend(["--config-file", str(config_path)])
+            else:
+                logger.warning(f"Config file not found: {config_path}")
+
+        # Add days parameter if supported
+        cmd.extend(["--days", str(days)])
+
+        # Add offset if specified
+        if offset > 0:
+            cmd.extend(["--offset", str(offset)])
+
+        # Add any extra arguments
+        if extra_args:
+            cmd.extend(extra_args)
+
+        return cmd
+
+    @staticmethod
+    def run_grabber_streaming(
+        grabber_name: str,
+        consume: Callable[[IO[bytes]], Any],
+        config_name: Optional[str] = None,
+        days: int = 7,
+        offset: int = 0,
+        extra_args: Optional[List[str]] = None,
+        progress: Optional[Callable[[int], None]] = None,
+        timeout: int = GRABBER_TIMEOUT,
+    ) -> Tuple[bool, Any, str]:
+        """
+        Run a grabber and pipe its output into a consumer while it runs.
+
+        Unlike run_grabber, the output is never held in memory: consume reads
+        the grabber's stdout as a binary stream (e.g. EpgService.sync_epg_source),
+        so parsing overlaps the grab. At most GRABBER_MAX_CONCURRENT grabbers run
+        at once across the process; further runs wait for a free slot.
+
+        Args:
+            grabber_name: Name of the grabber to run
+            consume: Called with the grabber's stdout stream; its return value is returned
+            config_name: Name of the configuration to use (if any)
+            days: Number of days of EPG data to fetch
+            offset: Day offset to start from
+            extra_args: Additional command-line arguments
+            progress: Optional callback with the number of bytes received so far
+            timeout: Seconds before the grabber is killed
+
+        Returns:
+            Tuple of (success, consume result, error_message)
+        """
+        grabber = XmltvGrabberService.get_grabber_by_name(grabber_name)
+        if not grabber:
+            return False, None, f"Grabber '{grabber_name}' not found"
+
+        cmd = XmltvGrabberService._build_command(grabber, config_name, days, offset, extra_args)
+
+        with _grabber_slots, tempfile.TemporaryFile() as stderr:
+            logger.info(f"Running grabber command: {' '.join(cmd)}")
+            try:
+                # stderr goes to a file so a chatty grabber can't block on a full pipe
+                proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=stderr)
+            except (OSError, subprocess.SubprocessError) as e:
+                return False, None, f"Failed to run grabber: {e}"
+
+            timed_out = threading.Event()
+
+            def kill_on_timeout():
+                timed_out.set()
+                proc.kill()
+
+            timer = threading.Timer(timeout, kill_on_timeout)
+            timer.daemon = True
+            timer.start()
+
+            # stdout=PIPE always gives a buffered pipe; the consumer reads it through its own buffer
+            stdout = cast(io.BufferedReader, proc.stdout)
+            received = _GrabberOutput(stdout, grabber_name, progress)
+            result = None
+            consume_error: Optional[Exception] = None
+            killed = False
+            try:
+                result = consume(io.BufferedReader(received))
+            except Exception as e:
+                consume_error = e
+                try:
+                    proc.wait(timeout=GRABBER_EXIT_GRACE)
+                except subprocess.TimeoutExpired:
+                    proc.kill()
+                    killed = True
+            finally:
+                stdout.close()
+                proc.wait()
+                timer.cancel()
+
+            if timed_out.is_set():
+                return False, None, f"Grabber timed out after {timeout // 60} minutes"
+            if proc.returncode != 0 and not killed:
+                stderr.seek(0)
+                error_msg = stderr.read().decode("utf-8", errors="replace").strip()
+                logger.error(f"Grabber failed: {error_msg}")
+                return False, None, error_msg or f"Grabber exited with status {proc.returncode}"
+            if consume_error is not None:
+                logger.error(f"Failed to process grabber output: {consume_error}")
+                return False, None, f"Invalid grabber output: {consume_error}"
+
+        logger.info(f"Grabber completed successfully, {received.bytes_read} bytes")
+        return True, result, ""
+
+    @staticmethod
+    def get_source_grabber_args(source) -> Dict:
+        """
+        Get the run_grabber / run_grabber_streaming arguments of an xmltv_grabber EPG source.
+
+        Args:
+            source: EpgSource with an XMLTV grabber configured
+
+        Returns:
+            Dict with grabber_name, config_name, days, offset and extra_args
+        """
+        # Parse extra args if provided
+        extra_args = None
+        if source.xmltv_extra_args:
+            try:
+                extra_args = json.loads(source.xmltv_extra_args)
+            except json.JSONDecodeError:
+                logger.warning(f"Invalid xmltv_extra_args for source {source.id}")
+
+        return {
+            "grabber_name": source.xmltv_grabber,
+            "config_name": source.xmltv_config_name,
+            "days": source.xmltv_days or 7,
+            "offset": source.xmltv_offset or 0,
+            "extra_args": extra_args,
+        }
+
     @staticmethod
     def get_grabber_channels(
         grabber_name: str,
@@ -0,0 +1,215 @@
+"""
+XMLTV Index - Byte-offset index over a cached XMLTV file.
+
+A provider guide is indexed once per download: the byte ranges of each
+<channel> element and of each channel's <programme> elements are recorded in
+a JSON sidecar. Filtered EPG generation then memory-maps the file and copies
+only the ranges of the requested channels into a small XMLTV document, so
+per-request work scales with the output instead of the provider's guide.
+"""
+
+import json
+import mmap
+import os
+import xml.parsers.expat
+from typing import Dict, Iterable, List, Optional
+
+# Bump when the sidecar format changes so old indexes are rebuilt
+INDEX_VERSION = 1
+
+# Bytes fed to the parser per call while building an index
+INDEX_READ_SIZE = 1024 * 1024
+
+
+def build_xmltv_index(path: str) -> Optional[Dict]:
+    """
+    Build a byte-offset index for an uncompressed XMLTV file.
+
+    Consecutive <programme> elements of the same channel are merged into one
+    range, so a guide grouped by channel yields about one range per channel.
+
+    Args:
+        path: Path of the XMLTV file
+
+    Returns:
+        Index dict (version, size, mtime_ns, encoding, channels, programmes),
+        or None if the file can't be indexed (empty, gzipped, UTF-16 or using
+        an internal DTD subset)
+
+    Raises:
+        xml.parsers.expat.ExpatError: If the file is not well-formed XML
+    """
+    stat = os.stat(path)
+    if stat.st_size == 0:
+        return None
+
+    channels: Dict[str, List[int]] = {}
+    programmes: Dict[str, List[List[int]]] = {}
+    state = {"depth": 0, "start": 0, "key": None, "last": None, "encoding": "UTF-8", "ok": True}
+
+    with open(path, "rb") as f:
+        if f.read(2) in (b"\x1f\x8b", b"\xff\xfe", b"\xfe\xff"):
+            return None
+        f.seek(0)
+
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            parser = xml.parsers.expat.ParserCreate()
+
+            def xml_decl(_version, encoding, _standalone):
+                if encoding:
+                    state["encoding"] = encoding
+                    if encoding.lower().replace("_", "-").startswith("utf-16"):
+                        state["ok"] = False
+
+            def doctype(_name, _sysid, _pubid, has_internal_subset):
+                # Entities declared in the document can't be resolved in extracted ranges
+                if has_internal_subset:
+                    state["ok"] = False
+
+            def start_element(name, attrs):
+                state["depth"] += 1
+                if state["depth"] == 2:
+                    state["start"] = parser.CurrentByteIndex
+                    key = attrs.get("id") if name == "channel" else attrs.get("channel")
+                    state["key"] = key.lower() if key else None
+
+            def end_element(name):
+                state["depth"] -= 1
+                if state["depth"] != 1 or not state["key"]:
+                    return
+
+                # The index points at the end tag, or just past "/>" for empty elements
+                pos = parser.CurrentByteIndex
+                closing = b"</" + name.encode("utf-8")
+                if mm[pos : pos + len(closing)] == closing:
+                    end = mm.find(b">", pos) + 1
+                else:
+                    end = pos
+
+                key = state["key"]
+                if name == "channel":
+                    channels.setdefault(key, [state["start"], end])
+                    state["last"] = None
+                elif name == "programme":
+                    ranges = programmes.setdefault(key, [])
+                    if state["last"] == key and ranges:
+                        ranges[-1][1] = end
+                    else:
+                        ranges.append([state["start"], end])
+                    state["last"] = key
+
+            parser.XmlDeclHandler = xml_decl
+            parser.StartDoctypeDeclHandler = doctype
+            parser.StartElementHandler = start_element
+            parser.EndElementHandler = end_element
+
+            while True:
+                data = f.read(INDEX_READ_SIZE)
+                parser.Parse(data, not data)
+                if not data or not state["ok"]:
+                    break
+
+    if not state["ok"]:
+        return None
+
+    return {
+        "version": INDEX_VERSION,
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "encoding": state["encoding"],
+        "channels": channels,
+        "programmes": programmes,
+    }
+
+
+def save_xmltv_index(index: Dict, index_path: str):
+    """Write an index sidecar atomically."""
+    tmp_path = f"{index_path}.tmp.{os.getpid()}"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(index, f, separators=(",", ":"))
+    os.replace(tmp_path, index_path)
+
+
+def load_xmltv_index(index_path: str, xml_path: str) -> Optional[Dict]:
+    """
+    Load an index sidecar if it still matches the XMLTV file.
+
+    Args:
+        index_path: Path of the JSON sidecar
+        xml_path: Path of the indexed XMLTV file
+
+    Returns:
+        Index dict, or None if missing, unreadable or stale
+    """
+    try:
+        with open(index_path, "r", encoding="utf-8") as f:
+            index = json.load(f)
+        stat = os.stat(xml_path)
+    except (OSError, ValueError):
+        return None
+
+    if (
+        index.get("version") != INDEX_VERSION
+        or index.get("size") != stat.st_size
+        or index.get("mtime_ns") != stat.st_mtime_ns
+    ):
+        return None
+    return index
+
+
+class XmltvIndex:
+    """
+    Memory-mapped XMLTV file with its byte-offset index.
+
+    Usage:
+        with XmltvIndex(path, index) as xmltv_index:
+            xml_content = xmltv_index.extract(["espn.us"], programmes=True)
+    """
+
+    def __init__(self, path: str, index: Dict):
+        self.index = index
+        self._file = open(path, "rb")
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except BaseException:
+            self._file.close()
+            raise
+
+    def close(self):
+        self._mm.close()
+        self._file.close()
+
+    def __enter__(self) -> "XmltvIndex":
+        return self
+
+    def __exit__(self, *_exc_info):
+        self.close()
+
+    def extract(self, channel_ids: Iterable[str], programmes: bool = False) -> bytes:
+        """
+        Copy the elements of the given channels into a standalone XMLTV document.
+
+        Elements keep their order in the source file.
+
+        Args:
+            channel_ids: Lowercase XMLTV channel IDs
+            programmes: Extract <programme> elements instead of <channel> elements
+
+        Returns:
+            XMLTV XML bytes in the source file's encoding
+        """
+        ranges = []
+        if programmes:
+            for channel_id in set(channel_ids):
+                ranges.extend(self.index["programmes"].get(channel_id, ()))
+        else:
+            for channel_id in set(channel_ids):
+                channel_range = self.index["channels"].get(channel_id)
+                if channel_range:
+                    ranges.append(channel_range)
+        ranges.sort()
+
+        parts = [f'<?xml version="1.0" encoding="{self.index["encoding"]}"?>\n<tv>'.encode("ascii")]
+        parts.extend(self._mm[start:end] for start, end in ranges)
+        parts.append(b"</tv>\n")
+        return b"".join(parts)
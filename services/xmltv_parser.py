@@ -0,0 +1,110 @@
+"""
+XMLTV Parser - Streaming iteration over XMLTV <channel> and <programme> elements.
+
+Uses lxml's iterparse with tag filtering (lxml is in requirements.txt),
+falling back to the standard library where it is not installed. Both backends
+clear each element and its already-processed siblings once the caller moves
+on, so memory stays flat regardless of the guide's size.
+
+Parse errors from either backend are raised as xml.etree.ElementTree.ParseError.
+"""
+
+import io
+import xml.etree.ElementTree as ET
+from typing import IO, Iterator, Tuple, Union
+
+try:
+    from lxml import etree as lxml_etree
+except ImportError:  # Standard library fallback
+    lxml_etree = None
+
+XMLTV_TAGS = ("channel", "programme")
+
+# Binary streams accepted by the parsers: files, pipes and (decompressing) buffered readers
+XmltvSource = Union[IO[bytes], io.BufferedIOBase]
+
+
+def iterparse_xmltv(source: XmltvSource, tags: Tuple[str, ...] = XMLTV_TAGS) -> Iterator:
+    """
+    Iterate the top-level elements of an XMLTV document.
+
+    Each element is complete when yielded and is cleared when the caller
+    advances, so copy or serialize anything that must outlive the iteration.
+
+    Args:
+        source: Binary file-like object with (decompressed) XMLTV XML
+        tags: Element tags to yield
+
+    Yields:
+        Elements with a tag in tags (lxml or ElementTree elements, by backend)
+
+    Raises:
+        xml.etree.ElementTree.ParseError: If the document is not well-formed XML
+    """
+    if lxml_etree is not None:
+        yield from _iterparse_lxml(source, tags)
+    else:
+        yield from _iterparse_stdlib(source, tags)
+
+
+def _iterparse_lxml(source: XmltvSource, tags: Tuple[str, ...]) -> Iterator:
+    context = lxml_etree.iterparse(
+        source,
+        events=("end",),
+        tag=tags,
+        huge_tree=True,
+        remove_comments=True,
+        remove_pis=True,
+    )
+    try:
+        for _, elem in context:
+            parent = elem.getparent()
+            # The tag filter also matches nested elements; only top-level ones are wanted
+            if parent is None or parent.getparent() is not None:
+                continue
+            yield elem
+            elem.clear(keep_tail=True)
+            # Drop processed siblings so the root doesn't accumulate empty elements
+            while elem.getprevious() is not None:
+                del parent[0]
+    except lxml_etree.XMLSyntaxError as e:
+        raise ET.ParseError(str(e)) from e
+    finally:
+        del context
+
+
+def _iterparse_stdlib(source: XmltvSource, tags: Tuple[str, ...]) -> Iterator:
+    root = None
+    depth = 0
+    for event, elem in ET.iterparse(source, events=("start", "end")):
+        if event == "start":
+            if root is None:
+                root = elem
+            depth += 1
+            continue
+
+        depth -= 1
+        if depth != 1:
+            continue
+        if elem.tag in tags:
+            yield elem
+            elem.clear()
+        # Top-level element done: drop it (and anything before it) from the root
+        if root is not None:
+            root.clear()
+
+
+def element_to_string(elem) -> str:
+    """
+    Serialize an element from either backend, without its tail.
+
+    Args:
+        elem: lxml or ElementTree element
+
+    Returns:
+        XML string
+    """
+    if lxml_etree is not None and isinstance(elem, lxml_etree._Element):
+        return lxml_etree.tostring(elem, encoding="unicode", with_tail=False)
+    elem.tail = None
+    return ET.tostring(elem, encoding="unicode")
@@ -0,0 +1,80 @@
+"""
+XMLTV Writer - Incremental XMLTV serialization.
+
+Serializes <channel> and <programme> elements one at a time and hands the
+output back in chunks, so guides can be streamed to the client as they are
+generated instead of building (and serializing) one document tree in memory.
+"""
+
+import xml.etree.ElementTree as ET
+from typing import Optional
+
+from services.xmltv_parser import element_to_string
+
+GENERATOR_NAME = "iptv-proxy-v2"
+
+XMLTV_HEADER = f'<?xml version="1.0" encoding="UTF-8"?>\n<tv generator-info-name="{GENERATOR_NAME}">'
+XMLTV_FOOTER = "</tv>\n"
+
+# Minimal valid XMLTV document (no channels)
+EMPTY_XMLTV = (XMLTV_HEADER + XMLTV_FOOTER).encode("utf-8")
+
+# Buffered output size before a chunk is handed back
+WRITE_CHUNK_SIZE = 64 * 1024
+
+
+class XmltvWriter:
+    """
+    Buffers serialized XMLTV elements and emits UTF-8 chunks.
+
+    Usage:
+        writer = XmltvWriter()
+        yield writer.header()
+        for elem in elements:
+            chunk = writer.write(elem)
+            if chunk:
+                yield chunk
+        yield writer.close()
+
+    Elements are serialized immediately, so callers may mutate and re-write
+    the same element (e.g. to emit one programme under several channel IDs).
+    """
+
+    def __init__(self, chunk_size: int = WRITE_CHUNK_SIZE):
+        self.chunk_size = chunk_size
+        self._parts: list = []
+        self._size = 0
+
+    def header(self) -> bytes:
+        """Get the XML declaration and opening <tv> tag."""
+        return XMLTV_HEADER.encode("utf-8")
+
+    def write(self, elem: ET.Element) -> Optional[bytes]:
+        """
+        Serialize an element into the buffer.
+
+        Args:
+            elem: <channel> or <programme> element from either parser backend
+                (its tail is ignored)
+
+        Returns:
+            A chunk of output once the buffer exceeds chunk_size, otherwise None
+        """
+        text = element_to_string(elem)
+        self._parts.append(text)
+        self._size += len(text)
+        if self._size >= self.chunk_size:
+            return self.flush()
+        return None
+
+    def flush(self) -> bytes:
+        """Get and clear the buffered output."""
+        data = "".join(self._parts).encode("utf-8")
+        self._parts = []
+        self._size = 0
+        return data
+
+    def close(self) -> bytes:
+        """Get the remaining buffered output and the closing </tv> tag."""
+        self._parts.append(XMLTV_FOOTER)
+        return self.flush()
@@ -60,3 +60,46 @@ def db(app):
     """
     with app.app_context():
         yield _db
+
+
+@pytest.fixture(autouse=True)
+def xmltv_cache_dir(tmp_path, monkeypatch):
+    """
+    Isolated provider XMLTV cache directory for each test
+
+    Keeps cached guides from leaking between tests (account IDs are reused).
+    """
+    cache_dir = tmp_path / "xmltv_cache"
+    monkeypatch.setenv("XMLTV_CACHE_DIR", str(cache_dir))
+    return cache_dir
+
+
+@pytest.fixture(autouse=True)
+def epg_artifact_dir(tmp_path, monkeypatch):
+    """
+    Isolated precomputed playlist EPG directory for each test
+
+    Keeps built guides from leaking between tests (config IDs are reused).
+    """
+    artifact_dir = tmp_path / "epg_artifacts"
+    monkeypatch.setenv("EPG_ARTIFACT_DIR", str(artifact_dir))
+    return artifact_dir
+
+
+@pytest.fixture(autouse=True)
+def epg_catalogue():
+    """
+    Empty EPG matching catalogue for each test
+
+    Keeps catalogues from leaking between tests (source and channel IDs are reused).
+    """
+    from services import epg_catalogue as catalogue_module
+
+    def reset():
+        with catalogue_module._catalogue_lock:
+            catalogue_module._catalogues.clear()
+            catalogue_module._catalogue_version = None
+
+    reset()
+    yield
+    reset()
@@ -4,6 +4,7 @@ Tests for collapse duplicates feature in the preview endpoint.
 import pytest
 
 from models import Account, Category, Channel, ChannelTag, Tag, db
+from services.quality_service import QualityService
 
 
 @pytest.fixture
@@ -109,6 +110,9 @@ def account_with_duplicate_channels(app):
         db.session.add(us_tag_cnn)
 
         db.session.commit()
+
+        # Pre-compute quality scores/duplicate groups (normally done after tag processing)
+        QualityService.update_duplicate_groups(account.id)
         yield account.id
 
 
@@ -263,6 +267,7 @@ class TestCollapseDuplicatesIntegration:
                     db.session.add(ct)
 
             db.session.commit()
+            QualityService.update_duplicate_groups(account.id)
 
             # Test with client
             from app import app as flask_app
@@ -0,0 +1,111 @@
+"""
+Tests for the CompressionService - Accept-Encoding negotiation and precompressed bodies.
+"""
+import gzip
+from unittest.mock import patch
+
+from services.compression_service import MIN_COMPRESS_SIZE, CompressedArtifact, CompressionService, StreamCompressor
+
+
+class TestNegotiate:
+    """Tests for Accept-Encoding negotiation"""
+
+    def test_no_header(self):
+        """Missing header means identity"""
+        assert CompressionService.negotiate(None) is None
+        assert CompressionService.negotiate("") is None
+
+    def test_gzip(self):
+        """gzip is always supported"""
+        assert CompressionService.negotiate("gzip, deflate") == "gzip"
+
+    def test_unsupported_only(self):
+        """Unsupported encodings fall back to identity"""
+        assert CompressionService.negotiate("deflate, compress") is None
+
+    def test_quality_zero_rejects(self):
+        """q=0 disables an encoding"""
+        assert CompressionService.negotiate("gzip;q=0") is None
+
+    def test_wildcard(self):
+        """Wildcard accepts the server's preferred encoding"""
+        assert CompressionService.negotiate("*") == CompressionService.available_encodings()[0]
+
+    def test_quality_preference(self):
+        """Higher client quality wins over server preference"""
+        with patch("services.compression_service.brotli", object()):
+            assert CompressionService.negotiate("br;q=0.5, gzip;q=0.8") == "gzip"
+            assert CompressionService.negotiate("br, gzip") == "br"
+
+
+class TestCompressedArtifact:
+    """Tests for precompressed artifact variants"""
+
+    def test_identity(self):
+        """No encoding returns the raw body"""
+        artifact = CompressedArtifact("#EXTM3U")
+        assert artifact.get(None) == b"#EXTM3U"
+
+    def test_gzip_variant_cached(self):
+        """Each encoding is compressed once and reused"""
+        artifact = CompressedArtifact(b"x" * 5000)
+        with patch.object(CompressionService, "compress", wraps=CompressionService.compress) as mock_compress:
+            first = artifact.get("gzip")
+            second = artifact.get("gzip")
+        assert first is second
+        assert mock_compress.call_count == 1
+        assert gzip.decompress(first) == b"x" * 5000
+
+
+class TestMakeResponse:
+    """Tests for compressed response building"""
+
+    def test_compresses_large_body(self, app):
+        """Large bodies are compressed when the client accepts gzip"""
+        body = "#EXTINF:-1,Channel\n" * 200
+        response = CompressionService.make_response(body, "application/x-mpegurl", "gzip")
+        assert response.headers["Content-Encoding"] == "gzip"
+        assert response.headers["Vary"] == "Accept-Encoding"
+        assert gzip.decompress(response.get_data()) == body.encode("utf-8")
+
+    def test_small_body_not_compressed(self, app):
+        """Bodies below the minimum size are sent as-is"""
+        body = "x" * (MIN_COMPRESS_SIZE - 1)
+        response = CompressionService.make_response(body, "application/xml", "gzip")
+        assert "Content-Encoding" not in response.headers
+        assert response.get_data() == body.encode("utf-8")
+
+
+class TestStreaming:
+    """Tests for incrementally compressed streamed responses"""
+
+    def test_stream_compressor_gzip(self):
+        """Chunks compressed incrementally form one gzip stream"""
+        compressor = StreamCompressor("gzip")
+        chunks = [b"<tv>", b"x" * 5000, b"</tv>"]
+        data = b"".join(compressor.compress(chunk) for chunk in chunks) + compressor.flush()
+        assert gzip.decompress(data) == b"".join(chunks)
+
+    def test_stream_compressor_unsupported(self):
+        """Unknown encodings are rejected"""
+        try:
+            StreamCompressor("deflate")
+            assert False, "Expected ValueError"
+        except ValueError:
+            pass
+
+    def test_streaming_response_gzip(self, app):
+        """Streamed responses are compressed regardless of size when accepted"""
+        with app.test_request_context():
+            response = CompressionService.make_streaming_response(iter([b"<tv>", b"</tv>"]), "application/xml", "gzip")
+            assert response.is_streamed
+            assert response.headers["Content-Encoding"] == "gzip"
+            assert response.headers["Vary"] == "Accept-Encoding"
+            assert gzip.decompress(b"".join(response.response)) == b"<tv></tv>"
+
+    def test_streaming_response_identity(self, app):
+        """Without Accept-Encoding the chunks are passed through"""
+        with app.test_request_context():
+            response = CompressionService.make_streaming_response(iter([b"<tv>", b"</tv>"]), "application/xml", None)
+            assert "Content-Encoding" not in response.headers
+            assert b"".join(response.response) == b"<tv></tv>"
@@ -23,11 +23,20 @@ from models import (
     ChannelTag,
     Credential,
     EpgChannel,
+    EpgProgramme,
     EpgSource,
     PlaylistConfig,
     Tag,
     db,
 )
+from services.epg_service import EpgService
+
+
+def _write_xmltv(fileobj, etag=None, last_modified=None):
+    """Stand-in for IPTVService.download_xmltv that writes an empty guide"""
+    fileobj.write(b"<tv></tv>")
+    return {"etag": None, "last_modified": None}
+
 
 # ============================================================================
 # Fixtures
@@ -199,14 +208,14 @@ class TestSchedulerEpgSync:
     """Tests for scheduler EPG source sync methods"""
 
     @patch("services.scheduler.EpgService.sync_epg_source")
-    @patch("services.scheduler.IPTVService")
+    @patch("services.sync_service.IPTVService")
     def test_sync_epg_sources_provider(self, MockIPTV, mock_sync, app, test_account):
         """Test scheduler syncs provider EPG sources"""
         from services.scheduler import SyncScheduler
 
         mock_sync.return_value = {"channels_added": 10, "channels_updated": 5}
         mock_service = MagicMock()
-        mock_service.get_xmltv.return_value = b"<tv></tv>"
+        mock_service.download_xmltv.side_effect = _write_xmltv
         MockIPTV.return_value = mock_service
 
         with app.app_context():
@@ -225,13 +234,13 @@ class TestSchedulerEpgSync:
             mock_sync.assert_called_once()
 
     @patch("services.scheduler.EpgService.sync_epg_source")
-    @patch("services.scheduler.requests.get")
+    @patch("requests.get")
     def test_sync_epg_sources_xmltv_url(self, mock_get, mock_sync, app):
         """Test scheduler syncs XMLTV URL EPG sources"""
         from services.scheduler import SyncScheduler
 
-        mock_response = MagicMock()
-        mock_response.content = b"<tv></tv>"
+        mock_response = MagicMock(status_code=200, headers={})
+        mock_response.iter_content.return_value = [b"<tv>", b"</tv>"]
         mock_response.raise_for_status = MagicMock()
         mock_get.return_value = mock_response
         mock_sync.return_value = {"channels_added": 5, "channels_updated": 2}
@@ -250,7 +259,9 @@ class TestSchedulerEpgSync:
             scheduler._sync_epg_sources()
 
             mock_get.assert_called()
+            assert mock_get.call_args.kwargs["stream"] is True
             mock_sync.assert_called_once()
+            mock_response.close.assert_called_once()
 
     def test_sync_epg_sources_skips_schedules_direct(self, app, sd_epg_source):
         """Test scheduler skips Schedules Direct sources"""
@@ -261,71 +272,160 @@ class TestSchedulerEpgSync:
             # Should not raise any errors
             scheduler._sync_epg_sources()
 
-    def test_sync_single_epg_source_no_account(self, app):
-        """Test syncing provider source without associated account"""
-        from services.scheduler import SyncScheduler
+    def test_sync_epg_sources_concurrent_per_host_limit(self, app):
+        """URL sources download concurrently, at most EPG_SYNC_PER_HOST per host"""
+        import threading
+        import time
+
+        from services.scheduler import EPG_SYNC_PER_HOST, SyncScheduler
+
+        lock = threading.Lock()
+        active = {"total": 0}
+        peak = {"total": 0}
+
+        def fake_get(url, **kwargs):
+            host = url.split("/")[2]
+            with lock:
+                for key in (host, "total"):
+                    active[key] = active.get(key, 0) + 1
+                    peak[key] = max(peak.get(key, 0), active[key])
+            time.sleep(0.05)
+            with lock:
+                active[host] -= 1
+                active["total"] -= 1
+            response = MagicMock(status_code=200, headers={})
+            response.iter_content.return_value = [
+                f'<tv><channel id="{url}"><display-name>Ch</display-name></channel></tv>'.encode()
+            ]
+            return response
 
         with app.app_context():
-            source = EpgSource(
-                name="Provider No Account",
-                source_type="provider",
-                account_id=None,
-                enabled=True,
-            )
-            db.session.add(source)
+            urls = [f"https://a.example.com/{i}.xml" for i in range(3)] + ["https://b.example.com/epg.xml"]
+            for i, url in enumerate(urls):
+                db.session.add(EpgSource(name=f"URL Source {i}", source_type="xmltv_url", url=url, enabled=True))
             db.session.commit()
 
-            scheduler = SyncScheduler(app, interval_hours=1)
-            result = scheduler._sync_single_epg_source(source)
+            with patch("requests.get", side_effect=fake_get):
+                SyncScheduler(app, interval_hours=1)._sync_epg_sources()
 
-            assert result is None
+            assert peak["a.example.com"] <= EPG_SYNC_PER_HOST
+            assert peak["total"] > 1
+            for source in EpgSource.query.filter_by(source_type="xmltv_url").all():
+                assert source.last_sync_status == "success"
+                assert source.channel_count == 1
 
-    def test_sync_single_epg_source_no_url(self, app):
-        """Test syncing XMLTV URL source without URL configured"""
+    def test_sync_epg_sources_parse_error_isolated(self, app):
+        """A guide that fails to parse marks only its own source as failed"""
         from services.scheduler import SyncScheduler
 
-        with app.app_context():
-            source = EpgSource(
-                name="XMLTV No URL",
-                source_type="xmltv_url",
-                url=None,
-                enabled=True,
+        def fake_get(url, **kwargs):
+            response = MagicMock(status_code=200, headers={})
+            body = (
+                b"<tv><broken" if "bad" in url else b'<tv><channel id="x"><display-name>X</display-name></channel></tv>'
             )
-            db.session.add(source)
+            response.iter_content.return_value = [body]
+            return response
+
+        with app.app_context():
+            bad = EpgSource(name="Bad", source_type="xmltv_url", url="https://example.com/bad.xml", enabled=True)
+            good = EpgSource(name="Good", source_type="xmltv_url", url="https://example.com/good.xml", enabled=True)
+            db.session.add_all([bad, good])
             db.session.commit()
 
-            scheduler = SyncScheduler(app, interval_hours=1)
-            result = scheduler._sync_single_epg_source(source)
+            with patch("requests.get", side_effect=fake_get):
+                SyncScheduler(app, interval_hours=1)._sync_epg_sources()
 
-            assert result is None
+            assert bad.last_sync_status == "error"
+            assert bad.content_hash is None
+            assert good.last_sync_status == "success"
+            assert good.content_hash is not None
 
-    def test_sync_single_epg_source_unknown_type(self, app):
-        """Test syncing EPG source with unknown type"""
+    def test_sync_epg_sources_streams_guides_in_batches(self, app):
+        """Guides reach the writer in small batches, and a guide it stops reading releases its worker"""
         from services.scheduler import SyncScheduler
 
+        channels = "".join(f'<channel id="ch{i}"><display-name>Ch {i}</display-name></channel>' for i in range(5))
+        programmes = "".join(
+            f'<programme start="2025122118000{i} +0000" channel="ch{i}"><title>Show</title></programme>'
+            for i in range(5)
+        )
+
+        def fake_get(url, **kwargs):
+            response = MagicMock(status_code=200, headers={})
+            response.iter_content.return_value = [f"<tv>{channels}{programmes}</tv>".encode()]
+            return response
+
+        real_sync = EpgService.sync_epg_source
+
+        def sync(source, events, **kwargs):
+            if source.name == "Unread":
+                raise RuntimeError("Write failed")
+            return real_sync(source, events, **kwargs)
+
         with app.app_context():
-            source = EpgSource(
-                name="Unknown Type",
-                source_type="unknown",
-                enabled=True,
-            )
-            db.session.add(source)
+            for name in ("Unread", "Good"):
+                db.session.add(
+                    EpgSource(name=name, source_type="xmltv_url", url=f"https://{name}.example.com/e.xml", enabled=True)
+                )
             db.session.commit()
 
+            with patch("requests.get", side_effect=fake_get), patch("services.scheduler.EPG_FEED_BATCH", 1), patch(
+                "services.scheduler.EPG_FEED_DEPTH", 1
+            ), patch("services.scheduler.EpgService.sync_epg_source", side_effect=sync):
+                SyncScheduler(app, interval_hours=1)._sync_epg_sources()
+
+            unread = EpgSource.query.filter_by(name="Unread").first()
+            good = EpgSource.query.filter_by(name="Good").first()
+            assert unread.last_sync_status == "error"
+            assert good.last_sync_status == "success"
+            assert good.channel_count == 5
+            assert EpgProgramme.query.count() == 5
+
+    @patch("services.scheduler.EpgService.sync_epg_source")
+    @patch("services.xmltv_grabber_service.XmltvGrabberService.run_grabber_streaming")
+    def test_sync_epg_sources_xmltv_grabber(self, mock_grabber, mock_sync, app, xmltv_grabber_source):
+        """Test scheduler runs XMLTV grabber sources and syncs their parsed output"""
+        import io
+
+        from services.scheduler import SyncScheduler
+
+        output = b'<tv><channel id="ch1"><display-name>One</display-name></channel></tv>'
+        mock_grabber.side_effect = lambda consume, **kwargs: (True, consume(io.BytesIO(output)), "")
+        synced = []
+        mock_sync.side_effect = lambda source, events: synced.extend(events) or {"channels_added": 1}
+
+        with app.app_context():
             scheduler = SyncScheduler(app, interval_hours=1)
-            result = scheduler._sync_single_epg_source(source)
+            scheduler._sync_epg_sources()
 
-            assert result is None
+            assert mock_grabber.call_args.kwargs["grabber_name"] == "tv_grab_test"
+            assert mock_grabber.call_args.kwargs["days"] == 7
+            mock_sync.assert_called_once()
+            assert [data["channel_id"] for _, data in synced] == ["ch1"]
+
+    @patch("services.xmltv_grabber_service.XmltvGrabberService.run_grabber_streaming")
+    def test_sync_epg_sources_xmltv_grabber_failure(self, mock_grabber, app, xmltv_grabber_source):
+        """Test a failed grabber run marks its source as failed"""
+        from services.scheduler import SyncScheduler
+
+        mock_grabber.return_value = (False, None, "Error: invalid configuration")
+
+        with app.app_context():
+            SyncScheduler(app, interval_hours=1)._sync_epg_sources()
+
+            source = db.session.get(EpgSource, xmltv_grabber_source)
+            assert source.last_sync_status == "error"
+            assert "invalid configuration" in source.last_sync_message
 
     @patch("services.scheduler.EpgService.sync_epg_source")
-    @patch("services.scheduler.IPTVService")
-    def test_sync_single_epg_source_with_credential(self, MockIPTV, mock_sync, app, test_account_with_credential):
+    @patch("services.sync_service.IPTVService")
+    def test_sync_epg_sources_provider_with_credential(self, MockIPTV, mock_sync, app, test_account_with_credential):
         """Test syncing provider source uses credential when available"""
         from services.scheduler import SyncScheduler
 
         mock_sync.return_value = {"channels_added": 1, "channels_updated": 0}
         mock_service = MagicMock()
-        mock_service.get_xmltv.return_value = b"<tv></tv>"
+        mock_service.download_xmltv.side_effect = _write_xmltv
         MockIPTV.return_value = mock_service
 
         with app.app_context():
@@ -339,7 +439,7 @@ class TestSchedulerEpgSync:
             db.session.commit()
 
             scheduler = SyncScheduler(app, interval_hours=1)
-            scheduler._sync_single_epg_source(source)
+            scheduler._sync_epg_sources()
 
             # Verify IPTVService was called with credential username/password
             MockIPTV.assert_called_once()
@@ -360,19 +460,27 @@ class TestEpgSourceSync:
         response = client.post("/api/epg/sources/99999/sync")
         assert response.status_code == 404
 
-    @patch("routes.epg.IPTVService")
+    @patch("services.sync_service.IPTVService")
     @patch("routes.epg.EpgService.sync_epg_source")
     def test_sync_provider_source_success(self, mock_sync, MockIPTV, app, client, provider_epg_source):
         """Test successfully syncing a provider source"""
         mock_sync.return_value = {"channels_added": 10, "channels_updated": 5}
         mock_service = MagicMock()
-        mock_service.get_xmltv.return_value = b"<tv></tv>"
+        mock_service.download_xmltv.side_effect = _write_xmltv
         MockIPTV.return_value = mock_service
 
         response = client.post(f"/api/epg/sources/{provider_epg_source}/sync")
         assert response.status_code == 200
         assert response.json["success"] is True
 
+    @patch("routes.epg.XmltvCacheService.open_account_xmltv", return_value=None)
+    @patch("routes.epg.XmltvCacheService.refresh_account")
+    def test_sync_provider_source_not_cached(self, _mock_refresh, _mock_open, app, client, provider_epg_source):
+        """Test syncing a provider source whose guide couldn't be cached returns an error"""
+        response = client.post(f"/api/epg/sources/{provider_epg_source}/sync")
+        assert response.status_code == 502
+        assert "cached xmltv" in response.json["error"].lower()
+
     def test_sync_provider_source_no_account(self, app, client):
         """Test syncing provider source without account returns error"""
         with app.app_context():
@@ -394,8 +502,8 @@ class TestEpgSourceSync:
     @patch("requests.get")
     def test_sync_xmltv_url_source_success(self, mock_get, mock_sync, app, client, xmltv_url_source):
         """Test successfully syncing XMLTV URL source"""
-        mock_response = MagicMock()
-        mock_response.content = b"<tv></tv>"
+        mock_response = MagicMock(status_code=200, headers={})
+        mock_response.iter_content.return_value = [b"<tv></tv>"]
         mock_response.raise_for_status = MagicMock()
         mock_get.return_value = mock_response
         mock_sync.return_value = {"channels_added": 5, "channels_updated": 2}
@@ -482,17 +590,22 @@ class TestEpgSourceSync:
         assert "no channels" in response.json["error"].lower()
 
     @patch("services.epg_service.EpgService.sync_epg_source")
-    @patch("services.xmltv_grabber_service.XmltvGrabberService.run_grabber")
+    @patch("services.xmltv_grabber_service.XmltvGrabberService.run_grabber_streaming")
     def test_sync_xmltv_grabber_success(self, mock_grabber, mock_sync, app, client, xmltv_grabber_source):
         """Test successfully syncing XMLTV grabber source"""
-        mock_grabber.return_value = (True, b"<tv></tv>", None)
+        output = MagicMock()
+        mock_grabber.side_effect = lambda consume, **kwargs: (True, consume(output), "")
         mock_sync.return_value = {"channels_added": 5, "channels_updated": 0}
 
         response = client.post(f"/api/epg/sources/{xmltv_grabber_source}/sync")
         assert response.status_code == 200
         assert response.json["success"] is True
+        assert response.json["stats"]["channels_added"] == 5
+        assert mock_grabber.call_args.kwargs["grabber_name"] == "tv_grab_test"
+        assert mock_sync.call_args.args[1] is output
+        assert mock_sync.call_args.kwargs["commit"] is False
 
-    @patch("services.xmltv_grabber_service.XmltvGrabberService.run_grabber")
+    @patch("services.xmltv_grabber_service.XmltvGrabberService.run_grabber_streaming")
     def test_sync_xmltv_grabber_failure(self, mock_grabber, app, client, xmltv_grabber_source):
         """Test failed XMLTV grabber sync"""
         mock_grabber.return_value = (False, None, "Grabber failed")
@@ -615,7 +728,7 @@ class TestPlaylistGeneration:
         content = response.data.decode("utf-8")
         assert "/stream/" in content
 
-    @patch("routes.playlists.ImageCacheService.get_instance")
+    @patch("services.image_cache_service.ImageCacheService.get_instance")
     def test_generate_playlist_with_proxy_icons(self, mock_cache, app, client, synced_account):
         """Test playlist generation with icon proxying"""
         mock_instance = MagicMock()
@@ -1687,11 +1800,10 @@ class TestXmltvGrabberExtraArgs:
     """Test XMLTV grabber with extra arguments"""
 
     @patch("services.epg_service.EpgService.sync_epg_source")
-    @patch("services.xmltv_grabber_service.XmltvGrabberService.run_grabber")
+    @patch("services.xmltv_grabber_service.XmltvGrabberService.run_grabber_streaming")
     def test_sync_xmltv_grabber_with_extra_args(self, mock_grabber, mock_sync, app, client):
         """Test syncing XMLTV grabber source with extra args"""
-        mock_grabber.return_value = (True, b"<tv></tv>", None)
-        mock_sync.return_value = {"channels_added": 3, "channels_updated": 0}
+        mock_grabber.return_value = (True, {"channels_added": 3, "channels_updated": 0}, "")
 
         with app.app_context():
             source = EpgSource(
@@ -1710,6 +1822,7 @@ class TestXmltvGrabberExtraArgs:
 
         response = client.post(f"/api/epg/sources/{source_id}/sync")
         assert response.status_code == 200
+        assert mock_grabber.call_args.kwargs["extra_args"] == {"fast": True, "quality": "high"}
 
 
 # ============================================================================
@@ -0,0 +1,159 @@
+"""
+Tests for the EpgArtifactService - precomputed playlist EPG files.
+"""
+import gzip
+import json
+import os
+
+import pytest
+
+from models import Account, Category, Channel, PlaylistConfig, db
+from services.epg_artifact_service import EpgArtifactService
+
+
+@pytest.fixture
+def test_config(app):
+    """Create an account with one visible channel and a playlist config including it"""
+    with app.app_context():
+        account = Account(name="Artifact Account", username="u", password="p", server="example.com", enabled=True)
+        db.session.add(account)
+        db.session.flush()
+        category = Category(account_id=account.id, category_id="1", category_name="News")
+        db.session.add(category)
+        db.session.flush()
+        db.session.add(
+            Channel(
+                account_id=account.id,
+                stream_id="100",
+                name="News One",
+                cleaned_name="News One",
+                category_id=category.id,
+                is_active=True,
+                is_visible=True,
+            )
+        )
+        config = PlaylistConfig(
+            name="Artifact Playlist",
+            include_accounts=json.dumps([account.id]),
+            exclude_accounts=json.dumps([]),
+            include_tags=json.dumps([]),
+            exclude_tags=json.dumps([]),
+            tag_match_mode="any",
+            enabled=True,
+        )
+        db.session.add(config)
+        db.session.commit()
+        yield config.id
+
+
+class TestBuild:
+    """Tests for building and refreshing artifacts"""
+
+    def test_build_writes_xml_and_gzip(self, app, test_config):
+        """The guide and its gzip copy are written with matching metadata"""
+        with app.app_context():
+            stats = EpgArtifactService.build_config(db.session.get(PlaylistConfig, test_config))
+
+            with open(EpgArtifactService.get_artifact_path(test_config), "rb") as f:
+                xml = f.read()
+            with open(EpgArtifactService.get_artifact_path(test_config, gzipped=True), "rb") as f:
+                assert gzip.decompress(f.read()) == xml
+
+            assert b"<display-name>News One</display-name>" in xml
+            assert stats["channels"] == 1
+            info = EpgArtifactService.get_artifact_info(test_config)
+            assert info["size"] == len(xml)
+            assert info["fingerprint"]
+
+    def test_refresh_skips_unchanged(self, app, test_config):
+        """Artifacts are only rebuilt when the config's inputs change"""
+        with app.app_context():
+            assert EpgArtifactService.refresh_all()["built"] == 1
+            assert EpgArtifactService.refresh_all() == {"built": 0, "unchanged": 1, "failed": 0, "removed": 0}
+
+            channel = Channel.query.filter_by(stream_id="100").one()
+            channel.cleaned_name = "News One HD"
+            db.session.commit()
+
+            assert EpgArtifactService.refresh_all()["built"] == 1
+            with open(EpgArtifactService.get_artifact_path(test_config), "rb") as f:
+                assert b"News One HD" in f.read()
+
+    def test_refresh_removes_disabled(self, app, test_config):
+        """Artifacts of disabled configs are removed"""
+        with app.app_context():
+            EpgArtifactService.refresh_all()
+            db.session.get(PlaylistConfig, test_config).enabled = False
+            db.session.commit()
+
+            assert EpgArtifactService.refresh_all()["removed"] == 1
+            assert not os.path.exists(EpgArtifactService.get_artifact_path(test_config))
+            assert EpgArtifactService.get_artifact_info(test_config) is None
+
+
+class TestServe:
+    """Tests for serving artifacts from /epg/config/<id>.xml"""
+
+    def test_serves_artifact(self, app, client, test_config):
+        """The stored guide is sent as-is, gzipped when accepted"""
+        with app.app_context():
+            EpgArtifactService.build_config(db.session.get(PlaylistConfig, test_config))
+            with open(EpgArtifactService.get_artifact_path(test_config), "rb") as f:
+                xml = f.read()
+
+        response = client.get(f"/epg/config/{test_config}.xml")
+        assert response.status_code == 200
+        assert response.headers["Content-Length"] == str(len(xml))
+        assert response.data == xml
+        assert "ETag" in response.headers
+        assert "Content-Encoding" not in response.headers
+
+        response = client.get(f"/epg/config/{test_config}.xml", headers={"Accept-Encoding": "gzip"})
+        assert response.headers["Content-Encoding"] == "gzip"
+        assert response.headers["Vary"] == "Accept-Encoding"
+        assert gzip.decompress(response.data) == xml
+
+    def test_overrides_generate_live(self, app, client, test_config):
+        """Query overrides bypass the stored guide"""
+        with app.app_context():
+            EpgArtifactService.build_config(db.session.get(PlaylistConfig, test_config))
+
+        response = client.get(f"/epg/config/{test_config}.xml?future_hours=6")
+        assert response.status_code == 200
+        assert "ETag" not in response.headers
+        assert b"News One" in response.data
+
+        response = client.get(f"/epg/config/{test_config}.xml?east_west_fallback=false")
+        assert "ETag" not in response.headers
+        assert b"News One" in response.data
+
+    def test_config_update_discards_artifact(self, app, client, test_config):
+        """Editing or deleting a config removes its stored guide immediately"""
+        with app.app_context():
+            EpgArtifactService.build_config(db.session.get(PlaylistConfig, test_config))
+
+        response = client.put(f"/api/playlist-configs/{test_config}", json={"epg_future_hours": 12})
+        assert response.status_code == 200
+        assert not os.path.exists(EpgArtifactService.get_artifact_path(test_config))
+        response = client.get(f"/epg/config/{test_config}.xml")
+        assert "ETag" not in response.headers
+        assert b"News One" in response.data
+
+        with app.app_context():
+            EpgArtifactService.build_config(db.session.get(PlaylistConfig, test_config))
+
+        assert client.delete(f"/api/playlist-configs/{test_config}").status_code == 204
+        assert not os.path.exists(EpgArtifactService.get_artifact_path(test_config, gzipped=True))
+
+    def test_stale_artifact_generates_live(self, app, client, test_config):
+        """A stored guide whose inputs changed since it was built is not sent"""
+        with app.app_context():
+            EpgArtifactService.build_config(db.session.get(PlaylistConfig, test_config))
+            channel = Channel.query.filter_by(stream_id="100").one()
+            channel.cleaned_name = "News One HD"
+            db.session.commit()
+
+        response = client.get(f"/epg/config/{test_config}.xml")
+        assert response.status_code == 200
+        assert "ETag" not in response.headers
+        assert b"News One HD" in response.data
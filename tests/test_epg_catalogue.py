@@ -0,0 +1,93 @@
+"""
+Tests for the EPG catalogue - shared in-memory EPG channels for matching.
+"""
+import json
+from datetime import datetime
+from unittest.mock import patch
+
+import pytest
+
+from models import EpgChannel, EpgSource, db
+from services.epg_catalogue import EpgCatalogueEntry, get_epg_catalogue
+from services.epg_service import EpgService
+
+
+@pytest.fixture
+def epg_sources(app):
+    """Two EPG sources with one channel each"""
+    with app.app_context():
+        first = EpgSource(name="First", source_type="xmltv", url="http://test.com/1.xml", enabled=True)
+        second = EpgSource(name="Second", source_type="xmltv", url="http://test.com/2.xml", enabled=True)
+        db.session.add_all([first, second])
+        db.session.flush()
+        db.session.add_all(
+            [
+                EpgChannel(
+                    source_id=first.id,
+                    channel_id="ESPN.us",
+                    display_name="ESPN",
+                    display_names_json=json.dumps(["ESPN", "ESPN HD", "E.S.P.N."]),
+                ),
+                EpgChannel(source_id=second.id, channel_id="CNN.us", display_name="CNN"),
+            ]
+        )
+        db.session.commit()
+        yield first.id, second.id
+
+
+class TestEpgCatalogueEntry:
+    """Tests for catalogue entries"""
+
+    def test_display_names_parsed_once(self):
+        """Alternate names follow the primary one, without duplicates, and are pre-normalized"""
+        entry = EpgCatalogueEntry(1, 1, "ESPN.us", "ESPN", json.dumps(["ESPN", "ESPN HD", "E.S.P.N."]))
+
+        assert entry.names == ("ESPN", "ESPN HD", "E.S.P.N.")
+        assert entry.normalized_names == ("espn", "espn hd")
+
+    def test_invalid_display_names_json(self):
+        """Unparseable alternate names are ignored"""
+        entry = EpgCatalogueEntry(1, 1, "ESPN.us", "ESPN", "not json")
+
+        assert entry.names == ("ESPN",)
+        assert not hasattr(entry, "__dict__")
+
+
+class TestGetEpgCatalogue:
+    """Tests for catalogue caching"""
+
+    def test_reused_until_source_syncs(self, app, epg_sources):
+        """The catalogue and its indices are shared until a source's last_sync changes"""
+        with app.app_context():
+            catalogue = get_epg_catalogue()
+            index = catalogue.get_index("name", EpgService._build_name_epg_index)
+
+            assert get_epg_catalogue() is catalogue
+            assert catalogue.get_index("name", EpgService._build_name_epg_index) is index
+            assert index["espn hd"].channel_id == "ESPN.us"
+
+            source = db.session.get(EpgSource, epg_sources[0])
+            source.last_sync = datetime.utcnow()
+            db.session.commit()
+
+            assert get_epg_catalogue() is not catalogue
+
+    def test_rebuilt_when_channels_added(self, app, epg_sources):
+        """New EPG channels are picked up without a sync"""
+        with app.app_context():
+            assert len(get_epg_catalogue()) == 2
+
+            db.session.add(EpgChannel(source_id=epg_sources[1], channel_id="BBC1.uk", display_name="BBC One"))
+            db.session.commit()
+
+            assert len(get_epg_catalogue()) == 3
+
+    def test_source_catalogue_from_full_catalogue(self, app, epg_sources):
+        """A source's catalogue is filtered from the full one without querying the channels again"""
+        with app.app_context():
+            get_epg_catalogue()
+            with patch("services.epg_catalogue._load_entries") as load_entries:
+                catalogue = get_epg_catalogue(epg_sources[1])
+
+            load_entries.assert_not_called()
+            assert [entry.channel_id for entry in catalogue.entries] == ["CNN.us"]
@@ -8,6 +8,12 @@ import pytest
 from models import Account, Category, Channel, ChannelEpgMapping, EpgChannel, EpgSource, db
 
 
+def _write_xmltv(fileobj, etag=None, last_modified=None):
+    """Stand-in for IPTVService.download_xmltv that writes an empty guide"""
+    fileobj.write(b"<tv></tv>")
+    return {"etag": None, "last_modified": None}
+
+
 @pytest.fixture
 def test_account(app):
     """Create a test account"""
@@ -860,11 +866,13 @@ class TestEpgSourceSync:
         assert response.status_code == 400
         assert "url" in response.json["error"].lower()
 
-    @patch("services.iptv_service.IPTVService.get_xmltv")
+    @patch("services.iptv_service.IPTVService.download_xmltv")
     @patch("services.epg_service.EpgService.sync_epg_source")
-    def test_sync_provider_source_success(self, mock_sync, mock_get_xmltv, app, client, test_epg_source, test_account):
+    def test_sync_provider_source_success(
+        self, mock_sync, mock_download_xmltv, app, client, test_epg_source, test_account
+    ):
         """Test successful provider source sync"""
-        mock_get_xmltv.return_value = b"<tv></tv>"
+        mock_download_xmltv.side_effect = _write_xmltv
         mock_sync.return_value = {"channels_added": 10, "channels_updated": 5}
 
         response = client.post(f"/api/epg/sources/{test_epg_source}/sync")
@@ -888,8 +896,8 @@ class TestEpgSourceSync:
             source_id = source.id
 
         # Mock the requests response
-        mock_response = MagicMock()
-        mock_response.content = b"<tv></tv>"
+        mock_response = MagicMock(status_code=200, headers={})
+        mock_response.iter_content.return_value = [b"<tv></tv>"]
         mock_requests.return_value = mock_response
 
         mock_sync.return_value = {"channels_added": 5, "channels_updated": 2}
@@ -1217,7 +1225,7 @@ class TestAccountEpgSource:
         assert response.json["success"] is True
         assert response.json["source_id"] == 1
 
-    @patch("routes.epg.IPTVService")
+    @patch("services.sync_service.IPTVService")
     @patch("services.epg_service.EpgService.sync_epg_source")
     @patch("services.epg_service.EpgService.create_provider_epg_source")
     def test_create_account_epg_source_with_sync(
@@ -1226,6 +1234,7 @@ class TestAccountEpgSource:
         """Test creating account EPG source with immediate sync"""
         # Create a mock source with a mock account that has proper attributes
         mock_account = MagicMock()
+        mock_account.id = test_account
         mock_account.server = "example.com"
         mock_account.user_agent = "test"
         mock_account.get_primary_credential.return_value = None
@@ -1238,7 +1247,7 @@ class TestAccountEpgSource:
         mock_create.return_value = mock_source
 
         mock_service = MagicMock()
-        mock_service.get_xmltv.return_value = b"<tv></tv>"
+        mock_service.download_xmltv.side_effect = _write_xmltv
         MockIPTVService.return_value = mock_service
 
         mock_sync.return_value = {"channels_added": 10, "channels_updated": 5}
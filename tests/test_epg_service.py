@@ -2,6 +2,9 @@
 Tests for EPG service - parsing, syncing, and matching
 """
 import gzip
+import json
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock, patch
 
 import pytest
 
@@ -13,6 +16,8 @@ from models import (
     ChannelLink,
     ChannelTag,
     EpgChannel,
+    EpgProgramme,
+    EpgProgrammeStaging,
     EpgSource,
     Tag,
     db,
@@ -27,6 +32,7 @@ from services.epg_service import (
     normalize_xmltv_url,
     shift_xmltv_time,
 )
+from services.programme_service import ProgrammeService
 
 # ============================================================================
 # Utility Function Tests
@@ -467,6 +473,130 @@ class TestSyncEpgSource:
 
             channel = EpgChannel.query.filter_by(source_id=source.id, channel_id="ESPN.us").first()
             assert channel.program_count == 2
+            assert channel.first_program == datetime(2025, 12, 21, 18, 0)
+            assert channel.last_program == datetime(2025, 12, 21, 20, 0)
+
+    def test_resync_writes_only_changed_channels(self, app, test_epg_source):
+        """Channels whose data is unchanged are not rewritten on a re-sync"""
+        xml_content = b"""<?xml version="1.0" encoding="UTF-8"?>
+        <tv>
+            <channel id="ESPN.us"><display-name>ESPN</display-name></channel>
+            <channel id="CNN.us"><display-name>CNN</display-name></channel>
+        </tv>
+        """
+
+        with app.app_context():
+            source = db.session.get(EpgSource, test_epg_source.id)
+            EpgService.sync_epg_source(source, xml_content)
+
+            stats = EpgService.sync_epg_source(source, xml_content)
+            assert stats["channels_updated"] == 0
+            assert stats["channels_unchanged"] == 2
+
+            stats = EpgService.sync_epg_source(source, xml_content.replace(b">CNN<", b">CNN HD<"))
+            assert stats["channels_updated"] == 1
+            assert stats["channels_unchanged"] == 1
+            cnn = EpgChannel.query.filter_by(source_id=source.id, channel_id="CNN.us").first()
+            assert cnn.display_name == "CNN HD"
+
+    def test_resync_rewrites_unhashed_and_counts_removed(self, app, test_epg_source):
+        """Rows without a content hash are rewritten once; missing channels are counted as removed"""
+        xml_content = b"""<?xml version="1.0" encoding="UTF-8"?>
+        <tv>
+            <channel id="ESPN.us"><display-name>ESPN</display-name></channel>
+            <programme start="20251221180000 +0000" stop="20251221190000 +0000" channel="ESPN.us">
+                <title>Show 1</title>
+            </programme>
+        </tv>
+        """
+
+        with app.app_context():
+            source = db.session.get(EpgSource, test_epg_source.id)
+            db.session.add(EpgChannel(source_id=source.id, channel_id="ESPN.us", display_name="ESPN"))
+            db.session.add(EpgChannel(source_id=source.id, channel_id="Gone.us", display_name="Gone"))
+            db.session.commit()
+
+            stats = EpgService.sync_epg_source(source, xml_content)
+            assert stats["channels_added"] == 0
+            assert stats["channels_updated"] == 1
+            assert stats["channels_removed"] == 1
+            assert stats["programmes_stored"] == 1
+
+            espn = EpgChannel.query.filter_by(source_id=source.id, channel_id="ESPN.us").first()
+            assert espn.content_hash is not None
+            assert espn.program_count == 1
+            assert json.loads(espn.display_names_json) == ["ESPN"]
+
+            stats = EpgService.sync_epg_source(source, xml_content)
+            assert stats["channels_unchanged"] == 1
+            assert stats["channels_removed"] == 1
+
+    def test_sync_from_gzipped_stream(self, app, test_epg_source):
+        """A gzipped, unseekable body is decompressed and parsed incrementally"""
+        import io
+
+        xml_content = b"""<?xml version="1.0" encoding="UTF-8"?>
+        <tv>
+            <channel id="ESPN.us"><display-name>ESPN</display-name></channel>
+            <programme start="20251221180000 +0000" stop="20251221190000 +0000" channel="ESPN.us">
+                <title>Show 1</title>
+            </programme>
+        </tv>
+        """
+
+        class ChunkedBody(io.RawIOBase):
+            """Raw HTTP-like body: no seek, at most 16 bytes per read"""
+
+            def __init__(self, data):
+                self.data = data
+                self.reads = 0
+
+            def readable(self):
+                return True
+
+            def readinto(self, buffer):
+                self.reads += 1
+                chunk, self.data = self.data[:16], self.data[16:]
+                buffer[: len(chunk)] = chunk
+                return len(chunk)
+
+        body = ChunkedBody(gzip.compress(xml_content))
+
+        with app.app_context():
+            source = db.session.get(EpgSource, test_epg_source.id)
+            stats = EpgService.sync_epg_source(source, body)
+
+            assert stats["channels_added"] == 1
+            assert stats["total_programs"] == 1
+            assert body.reads > 1
+
+    def test_sync_program_time_range_mixed_formats(self, app, test_epg_source):
+        """First/last program times cover short-form times and ignore invalid ones"""
+        xml_content = b"""<?xml version="1.0" encoding="UTF-8"?>
+        <tv>
+            <channel id="ESPN.us"><display-name>ESPN</display-name></channel>
+            <channel id="CNN.us"><display-name>CNN</display-name></channel>
+            <programme start="20251221180000 +0000" stop="20251221190000 +0000" channel="ESPN.us">
+                <title>Show 1</title>
+            </programme>
+            <programme start="202512211700 +0000" stop="20251299000000 +0000" channel="ESPN.us">
+                <title>Show 2</title>
+            </programme>
+            <programme start="20251399000000" stop="20251221060000" channel="CNN.us">
+                <title>Show 3</title>
+            </programme>
+        </tv>
+        """
+
+        with app.app_context():
+            source = db.session.get(EpgSource, test_epg_source.id)
+            EpgService.sync_epg_source(source, xml_content)
+
+            espn = EpgChannel.query.filter_by(source_id=source.id, channel_id="ESPN.us").first()
+            assert espn.first_program == datetime(2025, 12, 21, 17, 0)
+            assert espn.last_program == datetime(2025, 12, 21, 19, 0)
+            cnn = EpgChannel.query.filter_by(source_id=source.id, channel_id="CNN.us").first()
+            assert cnn.first_program == cnn.last_program == datetime(2025, 12, 21, 6, 0)
 
     def test_sync_updates_source_status(self, app, test_epg_source):
         """Test that sync updates source status"""
@@ -500,6 +630,66 @@ class TestSyncEpgSource:
             source = db.session.get(EpgSource, test_epg_source.id)
             assert source.last_sync_status == "error"
 
+    def test_sync_stages_programmes_in_batches(self, app, test_epg_source):
+        """Programmes are staged and committed in batches while parsing, then swapped in with the channels"""
+        programmes = "".join(
+            f'<programme start="202512211{i}0000 +0000" stop="202512211{i + 1}0000 +0000" channel="ESPN.us">'
+            f"<title>Show {i}</title></programme>"
+            for i in range(5)
+        )
+        xml_content = (
+            '<?xml version="1.0" encoding="UTF-8"?><tv>'
+            '<channel id="ESPN.us"><display-name>ESPN</display-name></channel>'
+            f"{programmes}</tv>"
+        ).encode()
+        stage_programmes = ProgrammeService.stage_programmes
+        staged = []
+
+        def stage(source_id, pending):
+            # Nothing of the new guide is visible before the swap
+            assert EpgChannel.query.filter_by(source_id=source_id).count() == 0
+            staged.append(sum(len(rows) for rows in pending.values()))
+            return stage_programmes(source_id, pending)
+
+        with app.app_context():
+            source = db.session.get(EpgSource, test_epg_source.id)
+            with patch("services.epg_service.PROGRAMME_INSERT_BATCH", 2), patch.object(
+                ProgrammeService, "stage_programmes", side_effect=stage
+            ):
+                stats = EpgService.sync_epg_source(source, xml_content)
+
+            assert staged == [2, 2, 1]
+            assert stats["channels_added"] == 1
+            assert stats["programmes_stored"] == 5
+            espn = EpgChannel.query.filter_by(source_id=source.id, channel_id="ESPN.us").first()
+            assert espn.program_count == 5
+            assert espn.display_name == "ESPN"
+            assert EpgProgramme.query.filter_by(epg_channel_id=espn.id).count() == 5
+            assert EpgProgrammeStaging.query.count() == 0
+
+    def test_sync_error_keeps_previous_programmes(self, app, test_epg_source):
+        """A guide that fails part-way is rolled back, keeping the programmes of the last sync"""
+        xml_content = b"""<?xml version="1.0" encoding="UTF-8"?>
+        <tv>
+            <channel id="ESPN.us"><display-name>ESPN</display-name></channel>
+            <programme start="20251221180000 +0000" stop="20251221190000 +0000" channel="ESPN.us">
+                <title>Show 1</title>
+            </programme>
+        </tv>
+        """
+
+        with app.app_context():
+            source = db.session.get(EpgSource, test_epg_source.id)
+            EpgService.sync_epg_source(source, xml_content)
+
+            with pytest.raises(ValueError):
+                EpgService.sync_epg_source(source, xml_content.replace(b"</tv>", b"<programme"))
+
+            assert source.last_sync_status == "error"
+            assert EpgProgramme.query.count() == 1
+            assert EpgChannel.query.filter_by(source_id=source.id).count() == 1
+            assert EpgProgrammeStaging.query.count() == 0
+
     def test_sync_handles_duplicate_channel_ids(self, app, test_epg_source):
         """Test that sync handles duplicate channel IDs in XMLTV data.
 
@@ -1054,19 +1244,32 @@ class TestChannelLinkHandling:
             assert "hbo-east.us" not in result
 
 
-class TestGenerateFilteredEpg:
-    """Tests for filtered EPG generation with channel link handling"""
+class TestIterEpgForChannels:
+    """Tests for streamed EPG generation"""
+
+    @staticmethod
+    def _add_channels(db, *epg_ids):
+        """Create an account with one channel per provider EPG ID"""
+        account = Account(name="Provider", username="u", password="p", server="x.com", enabled=True)
+        db.session.add(account)
+        db.session.flush()
+        db.session.add(Category(account_id=account.id, category_id="1", category_name="Movies"))
+        channels = [
+            Channel(account_id=account.id, stream_id=str(i), name=epg_id, category_id="1", epg_channel_id=epg_id)
+            for i, epg_id in enumerate(epg_ids, start=1)
+        ]
+        db.session.add_all(channels)
+        db.session.commit()
+        return account, channels
+
+    def test_filters_to_requested_channels(self, app, db):
+        """Only the requested channels and their programmes are written"""
+        import xml.etree.ElementTree as ET
 
-    def test_generate_filtered_epg_basic(self):
-        """Test basic EPG filtering by channel IDs"""
         xml_content = b"""<?xml version="1.0" encoding="UTF-8"?>
         <tv>
-            <channel id="ESPN.us">
-                <display-name>ESPN</display-name>
-            </channel>
-            <channel id="CNN.us">
-                <display-name>CNN</display-name>
-            </channel>
+            <channel id="ESPN.us"><display-name>ESPN</display-name></channel>
+            <channel id="CNN.us"><display-name>CNN</display-name></channel>
             <programme start="20251221180000 +0000" stop="20251221190000 +0000" channel="ESPN.us">
                 <title>SportCenter</title>
             </programme>
@@ -1076,173 +1279,176 @@ class TestGenerateFilteredEpg:
         </tv>
         """
 
-        # Request only ESPN
-        result = EpgService.generate_filtered_epg(["ESPN.us"], xml_content)
-
-        # Parse result
-        import xml.etree.ElementTree as ET
+        with app.app_context():
+            account, channels = self._add_channels(db, "ESPN.us")
+            result = b"".join(EpgService.iter_epg_for_channels(channels, account_xml_cache={account.id: xml_content}))
 
-        root = ET.fromstring(result)
+            root = ET.fromstring(result)
+            assert [c.get("id") for c in root.findall("channel")] == [f"ch-{account.id}-1"]
+            assert [p.find("title").text for p in root.findall("programme")] == ["SportCenter"]
 
-        channels = root.findall("channel")
-        assert len(channels) == 1
-        assert channels[0].get("id") == "ESPN.us"
-
-        programmes = root.findall("programme")
-        assert len(programmes) == 1
-        assert programmes[0].get("channel") == "ESPN.us"
+    def test_gzipped_input(self, app, db):
+        """Gzipped provider guides are decompressed while streaming"""
+        import xml.etree.ElementTree as ET
 
-    def test_generate_filtered_epg_channel_link_fallback(self):
-        """Test that linked channel EPG is generated from source with time offset"""
-        xml_content = b"""<?xml version="1.0" encoding="UTF-8"?>
-        <tv>
-            <channel id="HBO East">
-                <display-name>HBO East</display-name>
-            </channel>
-            <programme start="20251221180000 +0000" stop="20251221190000 +0000" channel="HBO East">
-                <title>Movie</title>
-            </programme>
-            <programme start="20251221190000 +0000" stop="20251221200000 +0000" channel="HBO East">
-                <title>Documentary</title>
+        xml_content = b"""<tv>
+            <channel id="ESPN.us"><display-name>ESPN</display-name></channel>
+            <programme start="20251221180000 +0000" stop="20251221190000 +0000" channel="ESPN.us">
+                <title>SportCenter</title>
             </programme>
-        </tv>
-        """
+        </tv>"""
 
-        # Create channel link map: west -> (east, -3 hours)
-        channel_link_map = {"hbo west": ("hbo east", -3)}
+        with app.app_context():
+            account, channels = self._add_channels(db, "ESPN.us")
+            cache = {account.id: gzip.compress(xml_content)}
+            root = ET.fromstring(b"".join(EpgService.iter_epg_for_channels(channels, account_xml_cache=cache)))
 
-        # Request both east and west - west doesn't exist in source
-        result = EpgService.generate_filtered_epg(
-            ["HBO East", "HBO West"], xml_content, channel_link_map=channel_link_map
-        )
+            assert len(root.findall("channel")) == 1
+            assert len(root.findall("programme")) == 1
 
+    def test_empty_channels(self, app):
+        """An empty channel list yields a minimal valid document"""
         import xml.etree.ElementTree as ET
 
-        root = ET.fromstring(result)
-
-        # Should have both channels
-        channels = root.findall("channel")
-        channel_ids = [c.get("id") for c in channels]
-        assert "HBO East" in channel_ids
-        assert "hbo west" in channel_ids  # Generated west channel
-
-        # Should have programmes for both channels
-        programmes = root.findall("programme")
-        east_progs = [p for p in programmes if p.get("channel") == "HBO East"]
-        west_progs = [p for p in programmes if p.get("channel") == "hbo west"]
+        with app.app_context():
+            root = ET.fromstring(b"".join(EpgService.iter_epg_for_channels([])))
 
-        assert len(east_progs) == 2
-        assert len(west_progs) == 2  # Same programmes, time-shifted
+        assert root.tag == "tv"
+        assert len(root) == 0
 
-        # West times should be 3 hours earlier
-        # East: 18:00 -> West: 15:00
-        assert west_progs[0].get("start") == "20251221150000 +0000"
-        assert west_progs[0].get("stop") == "20251221160000 +0000"
+    def test_channel_link_fallback(self, app, db):
+        """A linked channel missing from the guide gets the source's programmes, time-shifted"""
+        import xml.etree.ElementTree as ET
 
-    def test_generate_filtered_epg_no_link_map(self):
-        """Test that no fallback when channel_link_map not provided"""
-        xml_content = b"""<?xml version="1.0" encoding="UTF-8"?>
-        <tv>
-            <channel id="HBO East">
-                <display-name>HBO East</display-name>
-            </channel>
-            <programme start="20251221180000 +0000" stop="20251221190000 +0000" channel="HBO East">
+        xml_content = b"""<tv>
+            <channel id="HBO-East.us"><display-name>HBO East</display-name></channel>
+            <programme start="20251221180000 +0000" stop="20251221190000 +0000" channel="HBO-East.us">
                 <title>Movie</title>
             </programme>
-        </tv>
-        """
-
-        # No channel_link_map provided
-        result = EpgService.generate_filtered_epg(["HBO East", "HBO West"], xml_content)
-
-        import xml.etree.ElementTree as ET
-
-        root = ET.fromstring(result)
-
-        # Should only have east channel
-        channels = root.findall("channel")
-        assert len(channels) == 1
-        assert channels[0].get("id") == "HBO East"
-
-    def test_generate_filtered_epg_different_offsets(self):
-        """Test channel links with different time offsets"""
-        xml_content = b"""<?xml version="1.0" encoding="UTF-8"?>
-        <tv>
-            <channel id="Source">
-                <display-name>Source</display-name>
-            </channel>
-            <programme start="20251221120000 +0000" stop="20251221130000 +0000" channel="Source">
-                <title>Show</title>
+            <programme start="20251221190000 +0000" stop="20251221200000 +0000" channel="HBO-East.us">
+                <title>Documentary</title>
             </programme>
-        </tv>
-        """
-
-        # Two linked channels with different offsets
-        channel_link_map = {
-            "target_minus2": ("source", -2),
-            "target_plus1": ("source", 1),
-        }
-
-        result = EpgService.generate_filtered_epg(
-            ["Source", "target_minus2", "target_plus1"],
-            xml_content,
-            channel_link_map=channel_link_map,
-        )
-
-        import xml.etree.ElementTree as ET
-
-        root = ET.fromstring(result)
-
-        programmes = root.findall("programme")
-        progs_by_channel = {}
-        for p in programmes:
-            ch = p.get("channel")
-            if ch not in progs_by_channel:
-                progs_by_channel[ch] = []
-            progs_by_channel[ch].append(p)
-
-        # Source: 12:00
-        assert progs_by_channel["Source"][0].get("start") == "20251221120000 +0000"
-        # target_minus2: 12:00 - 2 = 10:00
-        assert progs_by_channel["target_minus2"][0].get("start") == "20251221100000 +0000"
-        # target_plus1: 12:00 + 1 = 13:00
-        assert progs_by_channel["target_plus1"][0].get("start") == "20251221130000 +0000"
-
-    def test_generate_filtered_epg_empty_channels(self):
-        """Test with empty channel list returns minimal valid XML"""
-        xml_content = b"""<?xml version="1.0" encoding="UTF-8"?>
-        <tv>
-            <channel id="ESPN.us"><display-name>ESPN</display-name></channel>
-        </tv>
-        """
+        </tv>"""
 
-        result = EpgService.generate_filtered_epg([], xml_content)
+        with app.app_context():
+            account, (east, west) = self._add_channels(db, "HBO-East.us", "HBO-West.us")
+            db.session.add(
+                ChannelLink(
+                    channel_id=west.id,
+                    source_channel_id=east.id,
+                    time_offset_hours=-3,
+                    link_type="time_shifted",
+                    auto_detected=False,
+                )
+            )
+            db.session.commit()
+            cache = {account.id: xml_content}
+
+            root = ET.fromstring(b"".join(EpgService.iter_epg_for_channels([east, west], account_xml_cache=cache)))
+            east_id, west_id = f"ch-{account.id}-1", f"ch-{account.id}-2"
+            assert [c.get("id") for c in root.findall("channel")] == [east_id, west_id]
+            west_progs = [p for p in root.findall("programme") if p.get("channel") == west_id]
+            assert [p.get("start") for p in west_progs] == ["20251221150000 +0000", "20251221160000 +0000"]
+            assert west_progs[0].get("stop") == "20251221160000 +0000"
+
+            # Without channel links the west channel has no guide data
+            root = ET.fromstring(
+                b"".join(
+                    EpgService.iter_epg_for_channels([east, west], account_xml_cache=cache, use_channel_links=False)
+                )
+            )
+            assert [c.get("id") for c in root.findall("channel")] == [east_id]
+            assert {p.get("channel") for p in root.findall("programme")} == {east_id}
 
+    def test_channels_before_programmes(self, app, db):
+        """All channel elements precede programmes across accounts and synthetic channels"""
         import xml.etree.ElementTree as ET
 
-        root = ET.fromstring(result)
-        assert root.tag == "tv"
-        assert len(root.findall("channel")) == 0
+        with app.app_context():
+            accounts = []
+            for i in range(2):
+                account = Account(name=f"Stream {i}", username="u", password="p", server="x.com", enabled=True)
+                db.session.add(account)
+                db.session.flush()
+                db.session.add(Category(account_id=account.id, category_id="1", category_name="News"))
+                accounts.append(account)
+            channels = [
+                Channel(account_id=accounts[0].id, stream_id="1", name="CNN", category_id="1", epg_channel_id="cnn.us"),
+                Channel(account_id=accounts[1].id, stream_id="2", name="BBC", category_id="1", epg_channel_id="bbc.uk"),
+                Channel(account_id=accounts[1].id, stream_id="3", name="Local", category_id="1"),
+            ]
+            db.session.add_all(channels)
+            db.session.commit()
 
-    def test_generate_filtered_epg_gzipped_input(self):
-        """Test filtering gzipped XMLTV content"""
-        xml_content = b"""<?xml version="1.0" encoding="UTF-8"?>
-        <tv>
+            def guide(epg_id, title):
+                return (
+                    f'<tv><channel id="{epg_id}"><display-name>{epg_id}</display-name></channel>'
+                    f'<programme start="20240101120000 +0000" channel="{epg_id}"><title>{title}</title></programme>'
+                    "</tv>"
+                ).encode()
+
+            cache = {accounts[0].id: guide("cnn.us", "Newsroom"), accounts[1].id: guide("bbc.uk", "Panorama")}
+            chunks = list(EpgService.iter_epg_for_channels(channels, account_xml_cache=cache))
+
+            root = ET.fromstring(b"".join(chunks))
+            tags = [child.tag for child in root]
+            assert tags == ["channel", "channel", "channel", "programme", "programme"]
+            assert [p.find("title").text for p in root.findall("programme")] == ["Newsroom", "Panorama"]
+            assert root.findall("programme")[1].get("channel") == f"ch-{accounts[1].id}-2"
+
+    def test_provider_programmes_remapped_in_one_pass(self):
+        """Programmes are filtered, shifted and remapped to every target without copying"""
+        xml_content = b"""<tv>
             <channel id="ESPN.us"><display-name>ESPN</display-name></channel>
-            <programme start="20251221180000 +0000" stop="20251221190000 +0000" channel="ESPN.us">
-                <title>SportCenter</title>
+            <programme start="20240101120000 +0000" stop="20240101130000 +0000" channel="ESPN.us">
+                <title>SportsCenter</title>
             </programme>
-        </tv>
-        """
-        compressed = gzip.compress(xml_content)
-
-        result = EpgService.generate_filtered_epg(["ESPN.us"], compressed)
+            <programme start="20240101120000 +0000" channel="CNN.us"><title>Ignored</title></programme>
+        </tv>"""
+        epg_id_mapping = {
+            "espn.us": [(None, "ch-1-10"), (None, "ch-1-11")],
+            "espn.west": [(None, "ch-1-12")],
+        }
 
-        import xml.etree.ElementTree as ET
+        results = [
+            (elem.get("channel"), elem.get("start"), elem.get("stop"), elem.find("title").text)
+            for elem in EpgService._iter_provider_programmes(
+                gzip.compress(xml_content),
+                epg_id_mapping,
+                channel_link_map={"espn.west": ("espn.us", 3)},
+                mapping_offset_map={"espn.us": -1},
+            )
+        ]
+
+        assert results == [
+            ("ch-1-10", "20240101110000 +0000", "20240101120000 +0000", "SportsCenter"),
+            ("ch-1-11", "20240101110000 +0000", "20240101120000 +0000", "SportsCenter"),
+            ("ch-1-12", "20240101150000 +0000", "20240101160000 +0000", "SportsCenter"),
+        ]
+
+    def test_provider_programmes_time_window(self):
+        """Only programmes overlapping the window are written"""
+        from datetime import datetime
+
+        xml_content = b"""<tv>
+            <programme start="20240101100000 +0000" stop="20240101110000 +0000" channel="espn.us"><title>A</title></programme>
+            <programme start="20240101110000 +0100" stop="20240101130000 +0100" channel="espn.us"><title>B</title></programme>
+            <programme start="20240101130000 +0000" stop="20240101140000 +0000" channel="espn.us"><title>C</title></programme>
+        </tv>"""
+
+        titles = [
+            elem.find("title").text
+            for elem in EpgService._iter_provider_programmes(
+                xml_content,
+                {"espn.us": [(None, "ch-1-10")]},
+                channel_link_map={},
+                mapping_offset_map={},
+                start=datetime(2024, 1, 1, 11, 0),
+                end=datetime(2024, 1, 1, 13, 0),
+            )
+        ]
 
-        root = ET.fromstring(result)
-        channels = root.findall("channel")
-        assert len(channels) == 1
+        assert titles == ["B"]
 
 
 # ============================================================================
@@ -2036,6 +2242,81 @@ class TestFccEnhancedEpgMatching:
                 db.session.commit()
 
 
+class TestSyncXmltvUrlSource:
+    """Tests for conditional refresh of external XMLTV URL sources"""
+
+    XMLTV = b"""<?xml version="1.0" encoding="UTF-8"?>
+<tv><channel id="ESPN.us"><display-name>ESPN</display-name></channel></tv>
+"""
+
+    @pytest.fixture
+    def url_source(self, app):
+        """Create an xmltv_url EPG source"""
+        with app.app_context():
+            source = EpgSource(name="URL Guide", source_type="xmltv_url", url="http://example.com/epg.xml")
+            db.session.add(source)
+            db.session.commit()
+            yield source.id
+
+    @staticmethod
+    def _response(status_code=200, body=b"", headers=None):
+        response = MagicMock(status_code=status_code, headers=headers or {})
+        response.iter_content.return_value = [body[:20], body[20:]]
+        return response
+
+    def test_validators_sent_and_304_skips(self, app, url_source):
+        """The stored ETag/Last-Modified are sent and a 304 skips the sync"""
+        validators = {"ETag": '"v1"', "Last-Modified": "Mon, 01 Jan 2024 00:00:00 GMT"}
+        with app.app_context():
+            source = db.session.get(EpgSource, url_source)
+            with patch("requests.get", return_value=self._response(body=self.XMLTV, headers=validators)):
+                stats = EpgService.sync_xmltv_url_source(source)
+            assert stats["channels_added"] == 1
+            assert source.etag == '"v1"'
+            assert source.content_hash
+
+            with patch("requests.get", return_value=self._response(304)) as mock_get:
+                with patch.object(EpgService, "sync_epg_source") as mock_sync:
+                    stats = EpgService.sync_xmltv_url_source(source)
+
+            assert stats["not_modified"] is True
+            mock_sync.assert_not_called()
+            headers = mock_get.call_args.kwargs["headers"]
+            assert headers == {"If-None-Match": '"v1"', "If-Modified-Since": "Mon, 01 Jan 2024 00:00:00 GMT"}
+
+    def test_same_content_skips(self, app, url_source):
+        """Without validators, an identical body is detected by its hash and not parsed"""
+        with app.app_context():
+            source = db.session.get(EpgSource, url_source)
+            with patch("requests.get", return_value=self._response(body=self.XMLTV)):
+                EpgService.sync_xmltv_url_source(source)
+            last_sync = source.last_sync
+
+            with patch("requests.get", return_value=self._response(body=self.XMLTV)):
+                with patch.object(EpgService, "sync_epg_source") as mock_sync:
+                    stats = EpgService.sync_xmltv_url_source(source)
+                    assert stats["not_modified"] is True
+                    mock_sync.assert_not_called()
+
+                    EpgService.sync_xmltv_url_source(source, force=True)
+                    mock_sync.assert_called_once()
+
+            assert source.last_sync == last_sync
+            assert "Unchanged" in source.last_sync_message
+
+    def test_failed_sync_keeps_old_validators(self, app, url_source):
+        """Validators are only stored once a download has been synced"""
+        with app.app_context():
+            source = db.session.get(EpgSource, url_source)
+            response = self._response(body=b"<tv><broken", headers={"ETag": '"bad"'})
+            with patch("requests.get", return_value=response):
+                with pytest.raises(ValueError):
+                    EpgService.sync_xmltv_url_source(source)
+
+            assert source.etag is None
+            assert source.content_hash is None
+
+
 class TestShiftXmltvTime:
     """Tests for shift_xmltv_time utility function"""
 
@@ -2070,6 +2351,31 @@ class TestShiftXmltvTime:
         result = shift_xmltv_time("", 2)
         assert result == ""
 
+    def test_shift_short_forms(self):
+        """12 and 8 digit times are expanded to 14 digits with the default timezone"""
+        assert shift_xmltv_time("202401011230", 1) == "20240101133000 +0000"
+        assert shift_xmltv_time("20240101", -1) == "20231231230000 +0000"
+
+    def test_shift_calendar_rollover(self):
+        """Month, leap day and year boundaries roll over like datetime arithmetic"""
+        assert shift_xmltv_time("20240228230000 +0100", 1) == "20240229000000 +0100"
+        assert shift_xmltv_time("20230228230000 +0100", 1) == "20230301000000 +0100"
+        assert shift_xmltv_time("20231231220000 -0500", 3) == "20240101010000 -0500"
+
+    def test_shift_invalid_dates_unchanged(self):
+        """Out-of-range fields and non-digit prefixes return the input"""
+        assert shift_xmltv_time("20241301120000 +0000", 2) == "20241301120000 +0000"
+        assert shift_xmltv_time("20240230120000 +0000", 2) == "20240230120000 +0000"
+        assert shift_xmltv_time("2024-01-01T12:00 +0000", 2) == "2024-01-01T12:00 +0000"
+
+    def test_shift_matches_strptime(self):
+        """The fast path gives the same result as strptime/strftime"""
+        for time_str in ("20240101000000", "20240615123456 +0200", "19991231235959 -0800"):
+            for hours in (-27, -3, 0, 3, 27):
+                expected = datetime.strptime(time_str[:14], "%Y%m%d%H%M%S") + timedelta(hours=hours)
+                tz_part = time_str[15:] or "+0000"
+                assert shift_xmltv_time(time_str, hours) == f"{expected.strftime('%Y%m%d%H%M%S')} {tz_part}"
+
 
 class TestDecompressContentExtended:
     """Extended tests for decompress_content utility function"""
@@ -140,6 +140,42 @@ class TestImageCacheService:
         assert service.get_proxy_url("", "http://localhost:8000") == ""
         assert service.get_proxy_url("not-a-url", "http://localhost:8000") == "not-a-url"
 
+    def test_get_icon_hash(self):
+        """Test icon hash matches the proxy URL hash and skips invalid URLs"""
+        from services.image_cache_service import ImageCacheService
+
+        url = "https://example.com/icon.png"
+        assert ImageCacheService.get_icon_hash(url) == ImageCacheService.hash_url(url)
+        assert ImageCacheService.get_icon_hash("not-a-url") is None
+        assert ImageCacheService.get_icon_hash(None) is None
+
+
+class TestChannelIconHash:
+    """Tests for the icon hash stored on Channel"""
+
+    def test_icon_hash_set_and_updated(self, app):
+        """Icon hash follows stream_icon changes"""
+        from models import Account, Channel, db
+        from services.image_cache_service import ImageCacheService
+
+        with app.app_context():
+            account = Account(name="Test", server="s.com")
+            db.session.add(account)
+            db.session.flush()
+
+            channel = Channel(account_id=account.id, stream_id="1", name="Ch", stream_icon="https://a.com/1.png")
+            db.session.add(channel)
+            db.session.commit()
+            assert channel.icon_hash == ImageCacheService.hash_url("https://a.com/1.png")
+
+            channel.stream_icon = "https://a.com/2.png"
+            db.session.commit()
+            assert channel.icon_hash == ImageCacheService.hash_url("https://a.com/2.png")
+
+            channel.stream_icon = None
+            db.session.commit()
+            assert channel.icon_hash is None
+
 
 class TestImageCacheServiceWithDB:
     """Tests for ImageCacheService that require database"""
@@ -2,7 +2,8 @@
 Tests for IPTV Service
 """
 
-from unittest.mock import Mock, patch
+import io
+from unittest.mock import MagicMock, Mock, patch
 
 import pytest
 import requests
@@ -149,17 +150,36 @@ class TestIPTVService:
         assert streams[0]["name"] == "Die Hard"
 
     @patch("requests.get")
-    def test_get_xmltv(self, mock_get):
-        """Test fetching XMLTV/EPG data"""
-        mock_response = Mock()
-        mock_response.content = b'<?xml version="1.0"?><tv></tv>'
-        mock_get.return_value = mock_response
+    def test_download_xmltv(self, mock_get):
+        """Test streaming XMLTV to a file with conditional request headers"""
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.headers = {"ETag": '"abc"', "Last-Modified": "Mon, 01 Jan 2024 00:00:00 GMT"}
+        mock_response.iter_content.return_value = [b"<tv>", b"</tv>"]
+        mock_get.return_value.__enter__.return_value = mock_response
+
+        service = IPTVService("example.com:8080", "testuser", "testpass")
+        buffer = io.BytesIO()
+        validators = service.download_xmltv(buffer, etag='"old"', last_modified="Sun, 31 Dec 2023 00:00:00 GMT")
+
+        assert buffer.getvalue() == b"<tv></tv>"
+        assert validators == {"etag": '"abc"', "last_modified": "Mon, 01 Jan 2024 00:00:00 GMT"}
+        headers = mock_get.call_args[1]["headers"]
+        assert headers["If-None-Match"] == '"old"'
+        assert headers["If-Modified-Since"] == "Sun, 31 Dec 2023 00:00:00 GMT"
+
+    @patch("requests.get")
+    def test_download_xmltv_not_modified(self, mock_get):
+        """Test 304 Not Modified returns None and writes nothing"""
+        mock_response = MagicMock()
+        mock_response.status_code = 304
+        mock_get.return_value.__enter__.return_value = mock_response
 
         service = IPTVService("example.com:8080", "testuser", "testpass")
-        xmltv = service.get_xmltv()
+        buffer = io.BytesIO()
 
-        assert b'<?xml version="1.0"?>' in xmltv
-        assert b"<tv></tv>" in xmltv
+        assert service.download_xmltv(buffer, etag='"abc"') is None
+        assert buffer.getvalue() == b""
 
     @patch("requests.get")
     def test_make_request_includes_auth(self, mock_get):
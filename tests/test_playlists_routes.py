@@ -169,6 +169,20 @@ class TestPlaylistConfigCRUD:
         assert data["include_tags"] == ["HD", "4K"]
         assert data["tag_match_mode"] == "all"
 
+    def test_playlist_config_epg_window(self, app, client, test_playlist_config):
+        """EPG window defaults can be set, cleared and are validated"""
+        response = client.put(
+            f"/api/playlist-configs/{test_playlist_config}", json={"epg_past_hours": 2, "epg_future_hours": 48}
+        )
+        assert response.status_code == 200
+        assert (response.json["epg_past_hours"], response.json["epg_future_hours"]) == (2, 48)
+
+        response = client.put(f"/api/playlist-configs/{test_playlist_config}", json={"epg_future_hours": None})
+        assert response.json["epg_future_hours"] is None
+
+        response = client.put(f"/api/playlist-configs/{test_playlist_config}", json={"epg_past_hours": -1})
+        assert response.status_code == 400
+
     def test_update_playlist_config_not_found(self, app, client):
         """Test updating non-existent playlist config"""
         response = client.put(
@@ -272,6 +286,42 @@ class TestSlugify:
         assert len(data) == 1
         assert data[0]["slug"] == "test-playlist"  # "Test Playlist" -> "test-playlist"
 
+    def test_slug_persisted_on_create(self, app, client, test_playlist_config):
+        """Test that the slug is stored on the config row"""
+        with app.app_context():
+            config = db.session.get(PlaylistConfig, test_playlist_config)
+            assert config.slug == "test-playlist"
+
+    def test_slug_updated_on_rename(self, app, client, test_playlist_config):
+        """Test that renaming a config regenerates its slug"""
+        response = client.put(f"/api/playlist-configs/{test_playlist_config}", json={"name": "Sports & Movies"})
+        assert response.status_code == 200
+        assert response.json["slug"] == "sports-movies"
+
+        with app.app_context():
+            config = db.session.get(PlaylistConfig, test_playlist_config)
+            assert config.slug == "sports-movies"
+
+    def test_colliding_names_get_unique_slugs(self, app, client, test_playlist_config):
+        """Test that names slugifying to the same value get a numeric suffix"""
+        with app.app_context():
+            config = PlaylistConfig(name="Test  Playlist!", enabled=True)
+            db.session.add(config)
+            db.session.commit()
+            assert config.slug == "test-playlist-2"
+
+    def test_lookup_by_slug(self, app, client, test_playlist_config):
+        """Test that slug routes resolve through the stored slug"""
+        with app.app_context():
+            config = db.session.get(PlaylistConfig, test_playlist_config)
+            config.enabled = False
+            db.session.commit()
+
+        # Disabled config is found by slug (403), unknown slug is not (404)
+        assert client.get("/playlist/config/Test-Playlist.m3u").status_code == 403
+        assert client.get("/epg/config/test-playlist.xml").status_code == 403
+        assert client.get("/playlist/config/other-playlist.m3u").status_code == 404
+
 
 # ============================================================================
 # Tag Filter Tests
@@ -417,6 +467,166 @@ class TestPlaylistConfigM3U:
         assert response.status_code == 403
 
 
+# ============================================================================
+# Playlist Profile Tests
+# ============================================================================
+
+
+class TestPlaylistProfiles:
+    """Tests for named playlist output profiles"""
+
+    def test_create_and_list_profiles(self, app, client):
+        """Test creating a profile and listing it"""
+        response = client.post(
+            "/api/playlist-profiles",
+            json={"name": "TiviMate", "include_chno": True, "url_style": "direct"},
+        )
+        assert response.status_code == 201
+        data = response.json
+        assert data["name"] == "TiviMate"
+        assert data["include_chno"] is True
+        assert data["proxy_icons"] is True
+
+        response = client.get("/api/playlist-profiles")
+        assert [p["name"] for p in response.json] == ["TiviMate"]
+
+    def test_create_profile_duplicate_name(self, app, client):
+        """Test profile names are unique (case-insensitive)"""
+        client.post("/api/playlist-profiles", json={"name": "Kodi"})
+        response = client.post("/api/playlist-profiles", json={"name": "kodi"})
+        assert response.status_code == 409
+
+    def test_create_profile_invalid_group_title_format(self, app, client):
+        """Test unknown group title placeholders are rejected"""
+        response = client.post("/api/playlist-profiles", json={"name": "Bad", "group_title_format": "{genre}"})
+        assert response.status_code == 400
+
+    def test_update_and_delete_profile(self, app, client):
+        """Test updating and deleting a profile"""
+        profile_id = client.post("/api/playlist-profiles", json={"name": "Kodi"}).json["id"]
+
+        response = client.put(f"/api/playlist-profiles/{profile_id}", json={"collapse_duplicates": True})
+        assert response.status_code == 200
+        assert response.json["collapse_duplicates"] is True
+
+        assert client.delete(f"/api/playlist-profiles/{profile_id}").status_code == 204
+        assert client.delete(f"/api/playlist-profiles/{profile_id}").status_code == 404
+
+    def test_playlist_with_profile(self, app, client, test_account, test_channel_with_tag):
+        """Test a profile controls group title, URL style, tvg-chno and catchup attributes"""
+        with app.app_context():
+            channel = db.session.get(Channel, test_channel_with_tag)
+            channel.tv_archive = 1
+            channel.tv_archive_duration = 3
+            db.session.commit()
+
+        client.post(
+            "/api/playlist-profiles",
+            json={
+                "name": "TiviMate",
+                "group_title_format": "{account} - {category}",
+                "proxy_icons": False,
+                "url_style": "proxy",
+                "include_catchup": True,
+                "include_chno": True,
+                "chno_start": 100,
+            },
+        )
+
+        response = client.get(f"/playlist/{test_account}.m3u?profile=tivimate")
+        assert response.status_code == 200
+        content = response.data.decode("utf-8")
+        assert 'tvg-chno="100"' in content
+        assert 'group-title="Test Account - Movies"' in content
+        assert 'catchup="xc" catchup-days="3"' in content
+        assert f"/stream/{test_account}/ch1.ts" in content
+
+    def test_query_parameters_override_profile(self, app, client, test_account, test_channel_with_tag):
+        """Test explicit query parameters override profile defaults"""
+        client.post("/api/playlist-profiles", json={"name": "Direct", "url_style": "direct", "proxy_icons": False})
+
+        response = client.get(f"/playlist/{test_account}.m3u?profile=Direct&proxy=true")
+        assert response.status_code == 200
+        assert f"/stream/{test_account}/ch1.ts" in response.data.decode("utf-8")
+
+    def test_playlist_unknown_profile(self, app, client, test_account, test_channel_with_tag):
+        """Test requesting an unknown profile returns 404"""
+        response = client.get(f"/playlist/{test_account}.m3u?profile=missing")
+        assert response.status_code == 404
+
+    def test_cached_channel_list_refreshes_on_change(self, app, client, test_account, test_channel_with_tag):
+        """Test the cached channel list is rebuilt when channel data changes"""
+        response = client.get(f"/playlist/{test_account}.m3u?proxy_icons=false")
+        assert 'tvg-name="Movie Channel"' in response.data.decode("utf-8")
+
+        with app.app_context():
+            channel = db.session.get(Channel, test_channel_with_tag)
+            channel.cleaned_name = "Renamed Channel"
+            db.session.commit()
+
+        response = client.get(f"/playlist/{test_account}.m3u?proxy_icons=false")
+        content = response.data.decode("utf-8")
+        assert 'tvg-name="Renamed Channel"' in content
+        assert 'tvg-name="Movie Channel"' not in content
+
+    def test_render_caches_bounded(self, app):
+        """Test the playlist and renderer caches evict the least recently used entries"""
+        from services.playlist_service import LruCache
+
+        cache = LruCache(2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        assert cache.get("a") == 1
+        cache.put("c", 3)
+
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert len(cache) == 2
+
+
+class TestPlaylistCompression:
+    """Tests for compressed playlist responses"""
+
+    def test_playlist_gzip(self, app, client, test_account, test_channel_with_tag):
+        """Playlist is gzip-compressed when accepted and large enough"""
+        import gzip
+
+        with app.app_context():
+            category_id = db.session.get(Channel, test_channel_with_tag).category_id
+            for i in range(50):
+                db.session.add(
+                    Channel(
+                        account_id=test_account,
+                        stream_id=f"extra{i}",
+                        name=f"Extra Channel {i}",
+                        category_id=category_id,
+                        is_active=True,
+                        is_visible=True,
+                    )
+                )
+            db.session.commit()
+
+        plain = client.get(f"/playlist/{test_account}.m3u?proxy_icons=false")
+        assert "Content-Encoding" not in plain.headers
+
+        response = client.get(f"/playlist/{test_account}.m3u?proxy_icons=false", headers={"Accept-Encoding": "gzip"})
+        assert response.status_code == 200
+        assert response.headers["Content-Encoding"] == "gzip"
+        assert gzip.decompress(response.data) == plain.data
+
+    def test_epg_streamed_gzip(self, app, client, test_account, test_channel_with_tag):
+        """EPG is streamed and gzip-compressed incrementally when accepted"""
+        import gzip
+
+        plain = client.get(f"/epg/{test_account}.xml")
+        assert plain.is_streamed
+
+        response = client.get(f"/epg/{test_account}.xml", headers={"Accept-Encoding": "gzip"})
+        assert response.status_code == 200
+        assert response.headers["Content-Encoding"] == "gzip"
+        assert gzip.decompress(response.data) == plain.data
+
+
 # ============================================================================
 # EPG Proxy Tests
 # ============================================================================
@@ -442,6 +652,41 @@ class TestEPGProxy:
         response = client.get(f"/epg/{test_account}.xml")
         assert response.status_code == 403
 
+    def test_generate_epg_config_with_channels(self, app, client, test_playlist_config, test_channel_with_tag):
+        """Test config EPG streams channel entries for matching channels"""
+        response = client.get(f"/epg/config/{test_playlist_config}.xml")
+        assert response.status_code == 200
+        assert b'<channel id="ch-' in response.data
+        assert b"<display-name>Movie Channel</display-name>" in response.data
+
+    def test_epg_time_window(self, app, client, test_account, test_playlist_config, test_channel_with_tag):
+        """past_hours/future_hours become a UTC window; config defaults apply unless overridden"""
+        from datetime import datetime, timedelta
+        from unittest.mock import patch
+
+        from services.epg_service import EpgService
+
+        with app.app_context():
+            config = db.session.get(PlaylistConfig, test_playlist_config)
+            config.epg_past_hours = 1
+            config.epg_future_hours = 24
+            db.session.commit()
+
+        with patch.object(EpgService, "iter_epg_for_channels", wraps=EpgService.iter_epg_for_channels) as mock_iter:
+            now = datetime.utcnow()
+            client.get(f"/epg/{test_account}.xml?future_hours=6")
+            _, kwargs = mock_iter.call_args
+            assert kwargs["start"] is None
+            assert abs(kwargs["end"] - (now + timedelta(hours=6))) < timedelta(minutes=1)
+
+            client.get(f"/epg/config/{test_playlist_config}.xml?future_hours=")
+            _, kwargs = mock_iter.call_args
+            assert abs(kwargs["start"] - (now - timedelta(hours=1))) < timedelta(minutes=1)
+            assert kwargs["end"] is None
+
+        response = client.get(f"/epg/{test_account}.xml?past_hours=abc")
+        assert response.status_code == 400
+
     def test_generate_epg_config_not_found(self, app, client):
         """Test generating EPG for non-existent config"""
         response = client.get("/epg/config/99999.xml")
@@ -0,0 +1,262 @@
+"""
+Tests for the ProgrammeService - persistent programme store for EPG output.
+"""
+from datetime import datetime
+
+import pytest
+
+from models import Account, Category, Channel, ChannelEpgMapping, EpgChannel, EpgProgramme, EpgSource, db
+from services.epg_service import EpgService
+from services.programme_service import ProgrammeService, in_time_window, parse_xmltv_time_utc
+
+SOURCE_XMLTV = b"""<?xml version="1.0" encoding="UTF-8"?>
+<tv>
+  <channel id="bbc1.uk"><display-name>BBC One</display-name><icon src="http://example.com/bbc1.png"/></channel>
+  <channel id="bbc2.uk"><display-name>BBC Two</display-name></channel>
+  <programme start="20240101120000 +0100" stop="20240101130000 +0100" channel="bbc1.uk">
+    <title>News at Noon</title>
+    <desc>The latest headlines.</desc>
+  </programme>
+  <programme start="20240101130000 +0100" stop="20240101140000 +0100" channel="bbc1.uk">
+    <title>Doctors</title>
+  </programme>
+  <programme start="20240101120000 +0000" stop="20240101123000 +0000" channel="bbc2.uk">
+    <title>Quiz</title>
+  </programme>
+  <programme start="20240101120000 +0000" stop="20240101123000 +0000" channel="unknown.uk">
+    <title>Orphan</title>
+  </programme>
+</tv>
+"""
+
+
+@pytest.fixture
+def xmltv_source(app):
+    """Create an external XMLTV URL source"""
+    with app.app_context():
+        source = EpgSource(name="UK Guide", source_type="xmltv_url", url="http://example.com/uk.xml", enabled=True)
+        db.session.add(source)
+        db.session.commit()
+        yield source.id
+
+
+@pytest.fixture
+def test_channel(app):
+    """Create an account with one channel that has no provider EPG ID"""
+    with app.app_context():
+        account = Account(name="Store Account", username="u", password="p", server="example.com", enabled=True)
+        db.session.add(account)
+        db.session.flush()
+        db.session.add(Category(account_id=account.id, category_id="1", category_name="UK"))
+        channel = Channel(account_id=account.id, stream_id="500", name="UK: BBC One", category_id="1")
+        db.session.add(channel)
+        db.session.commit()
+        yield channel.id
+
+
+class TestParseXmltvTimeUtc:
+    """Tests for timezone-aware XMLTV time parsing"""
+
+    def test_offsets_applied(self):
+        """Positive and negative offsets are normalized to UTC"""
+        assert parse_xmltv_time_utc("20240101120000 +0100") == datetime(2024, 1, 1, 11, 0)
+        assert parse_xmltv_time_utc("20240101120000 -0530") == datetime(2024, 1, 1, 17, 30)
+        assert parse_xmltv_time_utc("20240101120000+0000") == datetime(2024, 1, 1, 12, 0)
+
+    def test_no_offset_and_short_forms(self):
+        """Missing offsets are treated as UTC; shorter formats are accepted"""
+        assert parse_xmltv_time_utc("20240101120000") == datetime(2024, 1, 1, 12, 0)
+        assert parse_xmltv_time_utc("202401011200") == datetime(2024, 1, 1, 12, 0)
+        assert parse_xmltv_time_utc("20240101") == datetime(2024, 1, 1)
+
+    def test_invalid(self):
+        """Invalid values return None"""
+        assert parse_xmltv_time_utc(None) is None
+        assert parse_xmltv_time_utc("") is None
+        assert parse_xmltv_time_utc("2024") is None
+        assert parse_xmltv_time_utc("20241399120000 +0000") is None
+
+
+class TestInTimeWindow:
+    """Tests for the programme time window predicate"""
+
+    def test_overlap(self):
+        """Programmes overlapping the window are kept, others dropped"""
+        start, end = datetime(2024, 1, 1, 12, 0), datetime(2024, 1, 1, 18, 0)
+        assert in_time_window(datetime(2024, 1, 1, 11, 0), datetime(2024, 1, 1, 13, 0), start, end)
+        assert not in_time_window(datetime(2024, 1, 1, 11, 0), datetime(2024, 1, 1, 12, 0), start, end)
+        assert not in_time_window(datetime(2024, 1, 1, 18, 0), None, start, end)
+        assert in_time_window(datetime(2024, 1, 1, 9, 0), None, start, None)
+        assert in_time_window(None, None, start, end)
+
+    def test_offset(self):
+        """The programme is shifted before comparing"""
+        start = datetime(2024, 1, 1, 12, 0)
+        assert not in_time_window(datetime(2024, 1, 1, 11, 0), datetime(2024, 1, 1, 12, 0), start, None)
+        assert in_time_window(datetime(2024, 1, 1, 11, 0), datetime(2024, 1, 1, 12, 0), start, None, offset_hours=3)
+
+
+class TestSyncStoresProgrammes:
+    """sync_epg_source populates the programme store"""
+
+    def test_programmes_stored(self, app, xmltv_source):
+        """Programmes for declared channels are stored with their body and UTC times"""
+        with app.app_context():
+            source = db.session.get(EpgSource, xmltv_source)
+            stats = EpgService.sync_epg_source(source, SOURCE_XMLTV)
+
+            assert stats["programmes_stored"] == 3
+            bbc1 = EpgChannel.query.filter_by(source_id=xmltv_source, channel_id="bbc1.uk").one()
+            programmes = EpgProgramme.query.filter_by(epg_channel_id=bbc1.id).order_by(EpgProgramme.start_time).all()
+
+            assert [p.title for p in programmes] == ["News at Noon", "Doctors"]
+            assert programmes[0].start == "20240101120000 +0100"
+            assert programmes[0].start_time == datetime(2024, 1, 1, 11, 0)
+            assert "<desc>The latest headlines.</desc>" in programmes[0].body
+
+    def test_resync_replaces_programmes(self, app, xmltv_source):
+        """A second sync replaces the source's programmes instead of appending"""
+        with app.app_context():
+            source = db.session.get(EpgSource, xmltv_source)
+            EpgService.sync_epg_source(source, SOURCE_XMLTV)
+            EpgService.sync_epg_source(source, SOURCE_XMLTV)
+
+            assert EpgProgramme.query.count() == 3
+
+    def test_delete_source_programmes(self, app, xmltv_source, client):
+        """Deleting an EPG source removes its programmes"""
+        with app.app_context():
+            EpgService.sync_epg_source(db.session.get(EpgSource, xmltv_source), SOURCE_XMLTV)
+
+        response = client.delete(f"/api/epg/sources/{xmltv_source}")
+        assert response.status_code == 200
+
+        with app.app_context():
+            assert EpgProgramme.query.count() == 0
+
+
+class TestIterProgrammes:
+    """Tests for range queries over stored programmes"""
+
+    def test_time_window(self, app, xmltv_source):
+        """start/end bounds select overlapping programmes only"""
+        with app.app_context():
+            EpgService.sync_epg_source(db.session.get(EpgSource, xmltv_source), SOURCE_XMLTV)
+            bbc1 = EpgChannel.query.filter_by(channel_id="bbc1.uk").one()
+
+            rows = list(ProgrammeService.iter_programmes([bbc1.id]))
+            assert [r.start for r in rows] == ["20240101120000 +0100", "20240101130000 +0100"]
+
+            rows = list(ProgrammeService.iter_programmes([bbc1.id], start=datetime(2024, 1, 1, 12, 30)))
+            assert [r.start for r in rows] == ["20240101130000 +0100"]
+
+            rows = list(ProgrammeService.iter_programmes([bbc1.id], end=datetime(2024, 1, 1, 12, 0)))
+            assert [r.start for r in rows] == ["20240101120000 +0100"]
+
+    def test_channels_with_programmes(self, app, xmltv_source):
+        """Only EPG channels with stored programmes are reported"""
+        with app.app_context():
+            source = db.session.get(EpgSource, xmltv_source)
+            EpgService.sync_epg_source(source, SOURCE_XMLTV)
+            ids = [ec.id for ec in EpgChannel.query.filter_by(source_id=xmltv_source).all()]
+
+            assert ProgrammeService.get_channels_with_programmes(ids) == set(ids)
+            assert ProgrammeService.get_channels_with_programmes([]) == set()
+
+
+class TestEpgFromStore:
+    """EPG generation serves mapped channels from the programme store"""
+
+    def test_mapped_channel_from_other_source(self, app, xmltv_source, test_channel):
+        """A channel mapped to an external source gets its programmes, shifted by the mapping offset"""
+        with app.app_context():
+            EpgService.sync_epg_source(db.session.get(EpgSource, xmltv_source), SOURCE_XMLTV)
+            bbc1 = EpgChannel.query.filter_by(channel_id="bbc1.uk").one()
+            db.session.add(
+                ChannelEpgMapping(
+                    channel_id=test_channel,
+                    epg_channel_id=bbc1.id,
+                    mapping_type="manual",
+                    time_offset_hours=-1,
+                    is_override=True,
+                )
+            )
+            db.session.commit()
+
+            channel = db.session.get(Channel, test_channel)
+            xml = b"".join(EpgService.iter_epg_for_channels([channel])).decode("utf-8")
+
+            standardized_id = f"ch-{channel.account_id}-500"
+            assert f'<channel id="{standardized_id}"><display-name>BBC One</display-name>' in xml
+            assert '<icon src="http://example.com/bbc1.png" />' in xml
+            assert (
+                f'<programme start="20240101110000 +0100" stop="20240101120000 +0100" channel="{standardized_id}">'
+                in xml
+            )
+            assert "<desc>The latest headlines.</desc>" in xml
+            assert "Quiz" not in xml
+
+    def test_time_window_uses_shifted_times(self, app, xmltv_source, test_channel):
+        """The output window applies to programme times after the mapping offset"""
+        with app.app_context():
+            EpgService.sync_epg_source(db.session.get(EpgSource, xmltv_source), SOURCE_XMLTV)
+            bbc1 = EpgChannel.query.filter_by(channel_id="bbc1.uk").one()
+            db.session.add(
+                ChannelEpgMapping(
+                    channel_id=test_channel, epg_channel_id=bbc1.id, mapping_type="manual", time_offset_hours=2
+                )
+            )
+            db.session.commit()
+
+            # Stored UTC: News 11:00-12:00, Doctors 12:00-13:00; shifted +2h: 13:00-14:00, 14:00-15:00
+            channel = db.session.get(Channel, test_channel)
+            xml = b"".join(
+                EpgService.iter_epg_for_channels(
+                    [channel], start=datetime(2024, 1, 1, 14, 0), end=datetime(2024, 1, 1, 16, 0)
+                )
+            )
+
+            assert b"Doctors" in xml
+            assert b"News at Noon" not in xml
+
+    def test_mapping_without_programmes_falls_back(self, app, test_channel):
+        """Mappings to EPG channels without stored programmes use the provider path"""
+        with app.app_context():
+            source = EpgSource(name="Empty", source_type="xmltv_url", enabled=True)
+            db.session.add(source)
+            db.session.flush()
+            epg_channel = EpgChannel(source_id=source.id, channel_id="empty.uk", display_name="Empty")
+            db.session.add(epg_channel)
+            db.session.flush()
+            db.session.add(
+                ChannelEpgMapping(channel_id=test_channel, epg_channel_id=epg_channel.id, mapping_type="manual")
+            )
+            db.session.commit()
+
+            assert EpgService._build_store_mapping([test_channel]) == {}
+
+    def test_override_preferred(self, app, xmltv_source, test_channel):
+        """Manual overrides win over higher-confidence automatic mappings"""
+        with app.app_context():
+            EpgService.sync_epg_source(db.session.get(EpgSource, xmltv_source), SOURCE_XMLTV)
+            bbc1 = EpgChannel.query.filter_by(channel_id="bbc1.uk").one()
+            bbc2 = EpgChannel.query.filter_by(channel_id="bbc2.uk").one()
+            db.session.add(
+                ChannelEpgMapping(
+                    channel_id=test_channel, epg_channel_id=bbc1.id, mapping_type="auto_exact", confidence=1
+                )
+            )
+            db.session.add(
+                ChannelEpgMapping(
+                    channel_id=test_channel,
+                    epg_channel_id=bbc2.id,
+                    mapping_type="manual",
+                    confidence=0.5,
+                    is_override=True,
+                )
+            )
+            db.session.commit()
+
+            epg_channel, offset = EpgService._build_store_mapping([test_channel])[test_channel]
+            assert epg_channel.id == bbc2.id
+            assert offset == 0
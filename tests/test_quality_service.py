@@ -269,3 +269,98 @@ class TestGetDuplicatesInfo:
         # Best should be marked
         best = next(ch for ch in group["channels"] if ch["is_best"])
         assert best["tags"] == ["4K"]
+
+
+class TestUpdateDuplicateGroups:
+    """Tests for pre-computed quality scores and duplicate groups"""
+
+    def _create_channels(self, channels_data):
+        from models import Account, Channel, ChannelTag, Tag, db
+
+        account = Account(name="Test", username="u", password="p", server="s.com")
+        db.session.add(account)
+        db.session.flush()
+
+        tags = {}
+        for stream_id, name, cleaned_name, tag_names in channels_data:
+            db.session.add(
+                Channel(
+                    account_id=account.id,
+                    stream_id=stream_id,
+                    name=name,
+                    cleaned_name=cleaned_name,
+                    is_active=True,
+                    is_visible=True,
+                )
+            )
+            for tag_name in tag_names:
+                if tag_name not in tags:
+                    tags[tag_name] = Tag(name=tag_name)
+                    db.session.add(tags[tag_name])
+                    db.session.flush()
+                db.session.add(ChannelTag(account_id=account.id, stream_id=stream_id, tag_id=tags[tag_name].id))
+        db.session.commit()
+        return account.id
+
+    def test_scores_and_groups_computed(self, app):
+        """Channels get the summed tag score and normalized cleaned name"""
+        from models import Channel
+
+        with app.app_context():
+            account_id = self._create_channels(
+                [
+                    ("1", "ESPN RAW 60FPS", " ESPN ", ["RAW", "60FPS"]),
+                    ("2", "CNN", None, []),
+                ]
+            )
+
+            stats = QualityService.update_duplicate_groups(account_id)
+            assert stats == {"channels_total": 2, "channels_updated": 2}
+
+            espn = Channel.query.filter_by(stream_id="1").first()
+            assert espn.quality_score == 60
+            assert espn.duplicate_group == "espn"
+
+            cnn = Channel.query.filter_by(stream_id="2").first()
+            assert cnn.quality_score == 0
+            assert cnn.duplicate_group == "cnn"
+
+            # Unchanged channels are not rewritten
+            assert QualityService.update_duplicate_groups(account_id)["channels_updated"] == 0
+
+    def test_collapse_query_keeps_best(self, app):
+        """collapse_query keeps the highest scoring channel of each group"""
+        from models import Channel, db
+
+        with app.app_context():
+            account_id = self._create_channels(
+                [
+                    ("1", "ESPN HD", "ESPN", ["HD"]),
+                    ("2", "ESPN 4K", "ESPN", ["4K"]),
+                    ("3", "ESPN SD", "ESPN", ["SD"]),
+                    ("4", "CNN", "CNN", ["HD"]),
+                ]
+            )
+            QualityService.update_duplicate_groups(account_id)
+
+            query = db.session.query(Channel).filter(Channel.account_id == account_id)
+            collapsed = QualityService.collapse_query(query).order_by(Channel.name).all()
+            assert [ch.stream_id for ch in collapsed] == ["4", "2"]
+
+            alternates = QualityService.get_alternates(query, collapsed)
+            assert [ch.stream_id for ch in alternates["espn"]] == ["1", "3"]
+            assert "cnn" not in alternates
+
+    def test_collapse_channels_keeps_first_on_tie(self):
+        """collapse_channels keeps first appearance order and first channel on equal scores"""
+
+        class Ch:
+            def __init__(self, name, score):
+                self.name = name
+                self.cleaned_name = name
+                self.duplicate_group = None
+                self.quality_score = score
+
+        a, b, c, d = Ch("ESPN", 40), Ch("CNN", 0), Ch("ESPN", 40), Ch("espn", 100)
+        assert QualityService.collapse_channels([a, b, c]) == [a, b]
+        assert QualityService.collapse_channels([a, b, c, d]) == [d, b]
@@ -1,6 +1,7 @@
 """
 Tests for Schedules Direct API client
 """
+import threading
 import time
 from datetime import UTC, datetime, timedelta
 from unittest.mock import MagicMock, patch
@@ -20,6 +21,7 @@ from services.schedules_direct import (
     RateLimitError,
     SchedulesDirectClient,
     SchedulesDirectError,
+    TokenBucket,
     validate_credentials,
 )
 
@@ -179,6 +181,24 @@ class TestRateLimiting:
         # Should have waited some time (may be 0 if enough time passed)
         assert elapsed >= 0
 
+    def test_token_bucket_burst_then_paced(self):
+        """Token bucket allows a burst, then spaces concurrent callers by the interval"""
+        bucket = TokenBucket(interval=0.05, burst=2)
+
+        start = time.monotonic()
+        bucket.acquire()
+        bucket.acquire()
+        assert time.monotonic() - start < 0.04
+
+        threads = [threading.Thread(target=bucket.acquire) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # Three more tokens at one per 50ms after the burst was spent
+        assert time.monotonic() - start >= 0.14
+
     def test_check_rate_limit_error_5002(self):
         """Test detection of subscriber rate limit error"""
         client = SchedulesDirectClient("testuser", "testpass")
@@ -346,6 +366,48 @@ class TestMakeRequest:
         mock_auth.assert_called_once()
         assert result["data"] == "test"
 
+    def test_make_request_4006_reuses_refreshed_token(self):
+        """A token already replaced by another worker is reused, and the retry is throttled"""
+        import time
+
+        client = SchedulesDirectClient("testuser", "testpass")
+        client.token = "old-token"
+        client.token_expires = int(time.time()) + 86400
+
+        expired = MagicMock(status_code=200)
+        expired.json.return_value = {"code": 4006, "message": "Token expired"}
+        ok = MagicMock(status_code=200)
+        ok.json.return_value = {"code": 0, "data": "test"}
+
+        def get(url, headers, **kwargs):
+            if headers["token"] == "old-token":
+                client.token = "new-token"
+                return expired
+            return ok
+
+        with patch.object(client.session, "get", side_effect=get) as mock_get:
+            with patch.object(client, "_throttle") as mock_throttle:
+                with patch.object(client, "authenticate") as mock_auth:
+                    result = client._make_request("GET", "test/endpoint")
+
+        mock_auth.assert_not_called()
+        assert mock_throttle.call_count == 2
+        assert mock_get.call_args.kwargs["headers"]["token"] == "new-token"
+        assert result["data"] == "test"
+
+    def test_session_per_thread(self):
+        """Each thread using a client gets its own HTTP session"""
+        import threading
+
+        client = SchedulesDirectClient("testuser", "testpass")
+        sessions = []
+        worker = threading.Thread(target=lambda: sessions.append(client.session))
+        worker.start()
+        worker.join()
+
+        assert client.session is client.session
+        assert sessions[0] is not client.session
+
     def test_make_request_api_error(self):
         """Test API-level error handling"""
         import time
@@ -0,0 +1,139 @@
+"""
+Tests for the SdCacheService - persistent Schedules Direct token and lineup cache.
+"""
+import time
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock, patch
+
+from models import SdAccountCache, SdLineupMap, db
+from services.schedules_direct import SchedulesDirectClient
+from services.sd_cache_service import SdCacheService
+
+LINEUP_MAP = {
+    "map": [{"stationID": "10001", "channel": "2"}],
+    "stations": [{"stationID": "10001", "callsign": "WABC", "name": "ABC 7"}],
+}
+
+
+def make_client(username="user", password="pass", expires_in=86400):
+    """Create a client whose token endpoint is mocked"""
+    client = SchedulesDirectClient(username, password)
+    response = MagicMock()
+    response.json.return_value = {"code": 0, "token": "token-1", "tokenExpires": int(time.time()) + expires_in}
+    client.session.post = MagicMock(return_value=response)
+    return client
+
+
+def status_with(modified):
+    return {"account": {"maxLineups": 4}, "lineups": [{"lineup": "USA-NY12345-X", "modified": modified}]}
+
+
+class TestSdCacheAuthenticate:
+    """Tests for token caching"""
+
+    def test_token_reused_across_clients(self, app):
+        """A second client for the same account uses the stored token without authenticating"""
+        with app.app_context():
+            first = make_client()
+            SdCacheService.authenticate(first, "user", "pass")
+            assert first.session.post.call_count == 1
+
+            second = make_client()
+            SdCacheService.authenticate(second, "user", "pass")
+
+            second.session.post.assert_not_called()
+            assert second.token == "token-1"
+            assert SdAccountCache.query.count() == 1
+
+    def test_expiring_token_renewed(self, app):
+        """A token close to its expiry is not reused"""
+        with app.app_context():
+            SdCacheService.authenticate(make_client(expires_in=60), "user", "pass")
+
+            client = make_client()
+            SdCacheService.authenticate(client, "user", "pass")
+
+            assert client.session.post.call_count == 1
+
+    def test_changed_password_reauthenticates(self, app):
+        """A cached token isn't used for different credentials"""
+        with app.app_context():
+            SdCacheService.authenticate(make_client(), "user", "pass")
+
+            client = make_client(password="new-pass")
+            SdCacheService.authenticate(client, "user", "new-pass")
+
+            assert client.session.post.call_count == 1
+
+    def test_refreshed_token_saved(self, app):
+        """A token the client renewed by itself replaces the rejected cached one"""
+        with app.app_context():
+            client = make_client()
+            SdCacheService.authenticate(client, "user", "pass")
+
+            client.token = "token-2"
+            SdCacheService.save_token(client, "user", "pass")
+
+            assert SdAccountCache.query.filter_by(username="user").one().token == "token-2"
+
+    def test_authenticate_leaves_commit_to_caller(self, app):
+        """Stored tokens are only written to the caller's session"""
+        with app.app_context():
+            SdCacheService.authenticate(make_client(), "user", "pass")
+            db.session.rollback()
+
+            assert SdAccountCache.query.count() == 0
+
+
+class TestSdCacheLineups:
+    """Tests for account status and lineup map caching"""
+
+    def test_status_cached_until_ttl(self, app):
+        """The account status is fetched once within SD_STATUS_TTL"""
+        with app.app_context():
+            client = make_client()
+            with patch.object(client, "get_status", return_value=status_with("2024-01-01T00:00:00Z")) as get_status:
+                SdCacheService.get_status(client, "user")
+                assert SdCacheService.get_status(client, "user")["account"]["maxLineups"] == 4
+                assert get_status.call_count == 1
+
+                account = SdAccountCache.query.filter_by(username="user").one()
+                account.status_fetched_at = datetime.utcnow() - timedelta(hours=1)
+                db.session.commit()
+                SdCacheService.get_status(client, "user")
+                assert get_status.call_count == 2
+
+    def test_lineup_map_cached_until_modified(self, app):
+        """The lineup map is reused until the lineup's modified timestamp changes"""
+        with app.app_context():
+            client = make_client()
+            with patch.object(client, "get_status", return_value=status_with("2024-01-01T00:00:00Z")), patch.object(
+                client, "get_lineup_map", return_value=LINEUP_MAP
+            ) as get_lineup_map:
+                SdCacheService.get_lineup_map(client, "user", "USA-NY12345-X")
+                lineup_map = SdCacheService.get_lineup_map(client, "user", "USA-NY12345-X")
+
+                assert get_lineup_map.call_count == 1
+                assert client.get_lineup_channels("USA-NY12345-X", lineup_map)[0]["callsign"] == "WABC"
+
+            SdCacheService.invalidate_status("user")
+            with patch.object(client, "get_status", return_value=status_with("2024-02-01T00:00:00Z")), patch.object(
+                client, "get_lineup_map", return_value=LINEUP_MAP
+            ) as get_lineup_map:
+                SdCacheService.get_lineup_map(client, "user", "USA-NY12345-X")
+
+                assert get_lineup_map.call_count == 1
+                assert SdLineupMap.query.one().modified == "2024-02-01T00:00:00Z"
+
+    def test_lineup_not_on_account_not_cached(self, app):
+        """Lineups without a modified timestamp are always fetched"""
+        with app.app_context():
+            client = make_client()
+            with patch.object(client, "get_status", return_value={"lineups": []}), patch.object(
+                client, "get_lineup_map", return_value=LINEUP_MAP
+            ) as get_lineup_map:
+                SdCacheService.get_lineup_map(client, "user", "USA-NY12345-X")
+                SdCacheService.get_lineup_map(client, "user", "USA-NY12345-X")
+
+                assert get_lineup_map.call_count == 2
+                assert SdLineupMap.query.count() == 0
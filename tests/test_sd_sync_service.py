@@ -0,0 +1,208 @@
+"""
+Tests for the SdSyncService - incremental Schedules Direct schedule sync.
+"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from models import EpgChannel, EpgProgramme, EpgSource, SdProgram, SdScheduleMd5, db
+from services.schedules_direct import Program
+from services.sd_sync_service import SdSyncService, render_program
+
+
+class FakeSdClient:
+    """In-memory Schedules Direct client recording the schedules and programs requested"""
+
+    def __init__(self, today):
+        self.today = today
+        self.schedule_md5 = {}
+        self.programs = {}
+        self.schedule_requests = []
+        self.program_requests = []
+
+    def day(self, offset):
+        return (self.today + timedelta(days=offset)).strftime("%Y-%m-%d")
+
+    def set_program(self, program_id, title, md5):
+        self.programs[program_id] = {
+            "programID": program_id,
+            "titles": [{"title120": title}],
+            "descriptions": {"description1000": [{"description": f"About {title}", "descriptionLanguage": "en"}]},
+            "genres": ["News"],
+            "entityType": "Show",
+            "md5": md5,
+        }
+
+    def get_schedule_md5s(self, station_ids, dates=None):
+        return {
+            station_id: {
+                date: {"code": 0, "md5": md5} for (sid, date), md5 in self.schedule_md5.items() if sid == station_id
+            }
+            for station_id in station_ids
+        }
+
+    def get_schedules_by_station(self, station_dates):
+        self.schedule_requests.append({station_id: sorted(dates) for station_id, dates in station_dates.items()})
+        schedules = []
+        for station_id, dates in station_dates.items():
+            for date in dates:
+                airings = [
+                    {
+                        "programID": program_id,
+                        "airDateTime": f"{date}T{hour:02d}:00:00Z",
+                        "duration": 3600,
+                        "md5": self.programs[program_id]["md5"],
+                    }
+                    for hour, program_id in enumerate(sorted(self.programs))
+                ]
+                schedules.append({"stationID": station_id, "metadata": {"startDate": date}, "programs": airings})
+        return schedules
+
+    def get_programs(self, program_ids, parse=False):
+        self.program_requests.append(sorted(program_ids))
+        return [self.programs[program_id] for program_id in program_ids]
+
+
+@pytest.fixture
+def sd_source(app):
+    """Create a Schedules Direct source with one lineup station"""
+    with app.app_context():
+        source = EpgSource(name="SD", source_type="schedules_direct", enabled=True)
+        db.session.add(source)
+        db.session.flush()
+        db.session.add(EpgChannel(source_id=source.id, channel_id="I10001.json.schedulesdirect.org", display_name="A"))
+        db.session.commit()
+        yield source.id
+
+
+@pytest.fixture
+def sd_client():
+    """Fake client with two programmes airing on station 10001 for the next two days"""
+    client = FakeSdClient(datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0))
+    client.set_program("EP000000010001", "Morning News", "md5-a")
+    client.set_program("SH000000020000", "Talk Show", "md5-b")
+    client.schedule_md5 = {("10001", client.day(0)): "day0-v1", ("10001", client.day(1)): "day1-v1"}
+    return client
+
+
+class TestSdSyncService:
+    """Tests for SdSyncService.sync_schedules"""
+
+    def test_first_sync_fetches_everything(self, app, sd_source, sd_client):
+        """The first sync downloads every station-day and programme and stores the airings"""
+        with app.app_context():
+            source = db.session.get(EpgSource, sd_source)
+            stats = SdSyncService.sync_schedules(source, sd_client, ["10001"], days=2)
+
+            assert stats["station_days"] == 2
+            assert stats["station_days_changed"] == 2
+            assert stats["programs_fetched"] == 2
+            assert stats["programmes_stored"] == 4
+            assert sd_client.schedule_requests == [{"10001": [sd_client.day(0), sd_client.day(1)]}]
+            assert SdScheduleMd5.query.filter_by(epg_source_id=sd_source).count() == 2
+            assert SdProgram.query.count() == 2
+
+            programme = EpgProgramme.query.filter_by(title="Morning News").first()
+            assert '<desc lang="en">About Morning News</desc>' in programme.body
+            assert '<episode-num system="dd_progid">EP00000001.0001</episode-num>' in programme.body
+
+            channel = EpgChannel.query.filter_by(source_id=sd_source).first()
+            assert channel.program_count == 4
+
+    def test_unchanged_sync_downloads_nothing(self, app, sd_source, sd_client):
+        """A second sync with the same schedule MD5s requests no schedules or programs"""
+        with app.app_context():
+            source = db.session.get(EpgSource, sd_source)
+            SdSyncService.sync_schedules(source, sd_client, ["10001"], days=2)
+            sd_client.schedule_requests.clear()
+            sd_client.program_requests.clear()
+
+            stats = SdSyncService.sync_schedules(source, sd_client, ["10001"], days=2)
+
+            assert stats["station_days_changed"] == 0
+            assert sd_client.schedule_requests == []
+            assert sd_client.program_requests == []
+            assert EpgProgramme.query.count() == 4
+
+    def test_changed_day_refetches_only_that_day(self, app, sd_source, sd_client):
+        """Only the changed station-day and the programmes whose MD5 changed are downloaded"""
+        with app.app_context():
+            source = db.session.get(EpgSource, sd_source)
+            SdSyncService.sync_schedules(source, sd_client, ["10001"], days=2)
+            sd_client.schedule_requests.clear()
+            sd_client.program_requests.clear()
+
+            sd_client.schedule_md5[("10001", sd_client.day(1))] = "day1-v2"
+            sd_client.set_program("SH000000020000", "Late Talk Show", "md5-b2")
+            stats = SdSyncService.sync_schedules(source, sd_client, ["10001"], days=2)
+
+            assert stats["station_days_changed"] == 1
+            assert sd_client.schedule_requests == [{"10001": [sd_client.day(1)]}]
+            assert sd_client.program_requests == [["SH000000020000"]]
+            assert EpgProgramme.query.count() == 4
+            # The unchanged day keeps its previously stored airing
+            assert EpgProgramme.query.filter_by(title="Talk Show").count() == 1
+            assert EpgProgramme.query.filter_by(title="Late Talk Show").count() == 1
+            md5 = SdScheduleMd5.query.filter_by(station_id="10001", date=sd_client.day(1)).one()
+            assert md5.md5 == "day1-v2"
+
+    def test_programs_fetched_in_parallel_chunks(self, app, sd_source, sd_client, monkeypatch):
+        """Programs are requested in chunks of SD_PROGRAMS_PER_FETCH and all are stored"""
+        monkeypatch.setattr("services.sd_sync_service.SD_PROGRAMS_PER_FETCH", 1)
+        with app.app_context():
+            source = db.session.get(EpgSource, sd_source)
+            stats = SdSyncService.sync_schedules(source, sd_client, ["10001"], days=2)
+
+            assert sorted(sd_client.program_requests) == [["EP000000010001"], ["SH000000020000"]]
+            assert stats["programs_fetched"] == 2
+            assert SdScheduleMd5.query.count() == 2
+
+    def test_unavailable_program_retried(self, app, sd_source, sd_client):
+        """A station-day with a queued programme is stored but its MD5 is not recorded"""
+        with app.app_context():
+            source = db.session.get(EpgSource, sd_source)
+            get_programs = sd_client.get_programs
+            sd_client.get_programs = lambda ids, parse=False: [
+                item if item["programID"] != "SH000000020000" else {"programID": item["programID"], "code": 6001}
+                for item in get_programs(ids)
+            ]
+
+            SdSyncService.sync_schedules(source, sd_client, ["10001"], days=2)
+
+            assert SdScheduleMd5.query.count() == 0
+            assert EpgProgramme.query.count() == 2
+
+    def test_delete_source_state(self, app, sd_source, sd_client):
+        """Deleting a source's state drops its stored schedule MD5s"""
+        with app.app_context():
+            source = db.session.get(EpgSource, sd_source)
+            SdSyncService.sync_schedules(source, sd_client, ["10001"], days=2)
+
+            SdSyncService.delete_source_state(sd_source)
+            db.session.commit()
+
+            assert SdScheduleMd5.query.count() == 0
+
+
+class TestRenderProgram:
+    """Tests for rendering SD programmes as XMLTV elements"""
+
+    def test_movie_year_and_season_episode(self):
+        """Movies use their release year; season/episode metadata becomes xmltv_ns"""
+        program = Program.from_api_response(
+            {
+                "programID": "EP012345670002",
+                "titles": [{"title120": "Series"}],
+                "episodeTitle150": "Pilot",
+                "originalAirDate": "2020-05-01",
+                "metadata": [{"Gracenote": {"season": 2, "episode": 3}}],
+                "md5": "x",
+            }
+        )
+
+        title, body = render_program(program)
+
+        assert title == "Series"
+        assert '<sub-title lang="en">Pilot</sub-title>' in body
+        assert "<date>20200501</date>" in body
+        assert '<episode-num system="xmltv_ns">1.2.</episode-num>' in body
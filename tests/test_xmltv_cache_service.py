@@ -0,0 +1,211 @@
+"""
+Tests for the XmltvCacheService - disk-backed provider XMLTV cache.
+"""
+import gzip
+import os
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from models import Account, Category, Channel, db
+from services.epg_service import EpgService
+from services.xmltv_cache_service import XmltvCacheService
+
+SAMPLE_XMLTV = (
+    b'<?xml version="1.0" encoding="UTF-8"?>\n'
+    b"<tv>"
+    b'<channel id="espn.us"><display-name>ESPN</display-name></channel>'
+    b'<programme start="20240101120000 +0000" stop="20240101130000 +0000" channel="espn.us">'
+    b"<title>SportsCenter</title></programme>"
+    b"</tv>"
+)
+
+
+def _download_xmltv(fileobj, etag=None, last_modified=None):
+    """Stand-in for IPTVService.download_xmltv returning a full response"""
+    fileobj.write(SAMPLE_XMLTV)
+    return {"etag": '"v1"', "last_modified": "Mon, 01 Jan 2024 00:00:00 GMT"}
+
+
+def read_cached(account_id):
+    """Read an account's cached guide, or None if nothing is cached"""
+    try:
+        with open(XmltvCacheService.get_cache_path(account_id), "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+@pytest.fixture
+def test_account(app):
+    """Create a test account"""
+    with app.app_context():
+        account = Account(
+            name="Cache Account",
+            username="test_user",
+            password="test_pass",
+            server="example.com",
+            enabled=True,
+        )
+        db.session.add(account)
+        db.session.commit()
+        yield account.id
+
+
+@pytest.fixture
+def mock_iptv():
+    """Patch the IPTVService used to download provider XMLTV"""
+    with patch("services.sync_service.IPTVService") as MockIPTV:
+        service = MagicMock()
+        service.download_xmltv.side_effect = _download_xmltv
+        MockIPTV.return_value = service
+        yield service
+
+
+class TestRefreshAccount:
+    """Tests for refreshing the cached XMLTV file"""
+
+    def test_refresh_writes_file_and_metadata(self, app, test_account, mock_iptv):
+        """A refresh stores the guide and its validators"""
+        with app.app_context():
+            account = db.session.get(Account, test_account)
+            result = XmltvCacheService.refresh_account(account)
+
+            assert result == {"account_id": test_account, "status": "updated", "size": len(SAMPLE_XMLTV)}
+            assert read_cached(test_account) == SAMPLE_XMLTV
+
+            info = XmltvCacheService.get_cache_info(test_account)
+            assert info["etag"] == '"v1"'
+            assert info["last_modified"] == "Mon, 01 Jan 2024 00:00:00 GMT"
+            assert info["size"] == len(SAMPLE_XMLTV)
+
+    def test_refresh_sends_stored_validators(self, app, test_account, mock_iptv):
+        """The second refresh is a conditional GET and keeps the file on 304"""
+        with app.app_context():
+            account = db.session.get(Account, test_account)
+            XmltvCacheService.refresh_account(account)
+
+            mock_iptv.download_xmltv.side_effect = lambda fileobj, etag=None, last_modified=None: None
+            result = XmltvCacheService.refresh_account(account)
+
+            assert result["status"] == "not_modified"
+            _, kwargs = mock_iptv.download_xmltv.call_args
+            assert kwargs == {"etag": '"v1"', "last_modified": "Mon, 01 Jan 2024 00:00:00 GMT"}
+            assert read_cached(test_account) == SAMPLE_XMLTV
+
+    def test_failed_refresh_keeps_previous_copy(self, app, test_account, mock_iptv, xmltv_cache_dir):
+        """A download error leaves the old file in place and no temp files behind"""
+        with app.app_context():
+            account = db.session.get(Account, test_account)
+            XmltvCacheService.refresh_account(account)
+
+            def failing_download(fileobj, etag=None, last_modified=None):
+                fileobj.write(b"<tv><chan")
+                raise ConnectionError("connection reset")
+
+            mock_iptv.download_xmltv.side_effect = failing_download
+            with pytest.raises(ConnectionError):
+                XmltvCacheService.refresh_account(account)
+
+            assert read_cached(test_account) == SAMPLE_XMLTV
+            assert sorted(os.listdir(xmltv_cache_dir)) == [
+                f"provider_{test_account}.idx.json",
+                f"provider_{test_account}.json",
+                f"provider_{test_account}.xml",
+            ]
+
+
+class TestIndexedCache:
+    """Tests for the uncompressed, indexed cache file"""
+
+    def test_gzip_download_stored_decompressed(self, app, test_account, mock_iptv):
+        """Gzip-compressed guides are decompressed before they are cached"""
+        mock_iptv.download_xmltv.side_effect = lambda fileobj, etag=None, last_modified=None: (
+            fileobj.write(gzip.compress(SAMPLE_XMLTV)) and {"etag": None, "last_modified": None}
+        )
+        with app.app_context():
+            result = XmltvCacheService.refresh_account(db.session.get(Account, test_account))
+
+        assert result["size"] == len(SAMPLE_XMLTV)
+        assert read_cached(test_account) == SAMPLE_XMLTV
+
+    def test_open_index_extracts_channel(self, app, test_account, mock_iptv):
+        """The index opened after a refresh copies out the requested channel's elements"""
+        with app.app_context():
+            account = db.session.get(Account, test_account)
+            XmltvCacheService.refresh_account(account)
+
+            with XmltvCacheService.open_account_index(account) as xmltv_index:
+                assert b"<display-name>ESPN</display-name>" in xmltv_index.extract(["espn.us"])
+                assert b"SportsCenter" in xmltv_index.extract(["espn.us"], programmes=True)
+                assert b"SportsCenter" not in xmltv_index.extract(["cnn.us"], programmes=True)
+
+    def test_stale_index_rebuilt(self, app, test_account, mock_iptv):
+        """A cache file changed behind the index's back gets a fresh index"""
+        with app.app_context():
+            account = db.session.get(Account, test_account)
+            XmltvCacheService.refresh_account(account)
+
+            with open(XmltvCacheService.get_cache_path(test_account), "wb") as f:
+                f.write(SAMPLE_XMLTV.replace(b"SportsCenter", b"Baseball Tonight"))
+
+            with XmltvCacheService.open_account_index(account) as xmltv_index:
+                assert b"Baseball Tonight" in xmltv_index.extract(["espn.us"], programmes=True)
+
+
+class TestReadCache:
+    """Tests for reading the cached XMLTV file"""
+
+    def test_not_cached(self, app, test_account):
+        """Nothing is returned before the first refresh"""
+        assert read_cached(test_account) is None
+        assert XmltvCacheService.get_cache_info(test_account) is None
+
+    def test_open_streams_from_disk(self, app, test_account, mock_iptv):
+        """open_account_xmltv fetches a cold cache once and returns the cached file"""
+        with app.app_context():
+            account = db.session.get(Account, test_account)
+            for _ in range(2):
+                with XmltvCacheService.open_account_xmltv(account) as f:
+                    assert f.read() == SAMPLE_XMLTV
+            assert mock_iptv.download_xmltv.call_count == 1
+
+            mock_iptv.download_xmltv.side_effect = ConnectionError("down")
+            XmltvCacheService.delete_account(test_account)
+            assert XmltvCacheService.open_account_xmltv(account) is None
+
+    def test_delete_account(self, app, test_account, mock_iptv):
+        """Deleting removes the file and metadata"""
+        with app.app_context():
+            XmltvCacheService.refresh_account(db.session.get(Account, test_account))
+        XmltvCacheService.delete_account(test_account)
+        XmltvCacheService.delete_account(test_account)
+        assert read_cached(test_account) is None
+
+
+class TestEpgGenerationUsesCache:
+    """EPG generation reads the local copy instead of downloading per request"""
+
+    def test_generate_epg_reads_cache(self, app, test_account, mock_iptv):
+        """Repeated EPG generation downloads the provider guide at most once"""
+        with app.app_context():
+            category = Category(account_id=test_account, category_id="1", category_name="Sports")
+            db.session.add(category)
+            db.session.flush()
+            channel = Channel(
+                account_id=test_account,
+                stream_id="100",
+                name="ESPN",
+                category_id="1",
+                epg_channel_id="espn.us",
+            )
+            db.session.add(channel)
+            db.session.commit()
+
+            XmltvCacheService.refresh_account(db.session.get(Account, test_account))
+            for _ in range(3):
+                xml = b"".join(EpgService.iter_epg_for_channels([channel]))
+                assert f"ch-{test_account}-100".encode() in xml
+                assert b"SportsCenter" in xml
+
+            assert mock_iptv.download_xmltv.call_count == 1
@@ -333,6 +333,127 @@ class TestXmltvGrabberServiceRun:
         assert channels[1]["name"] == "Channel Two"
 
 
+class TestXmltvGrabberServiceStreaming:
+    """Test streamed grabber runs against a real (shell script) grabber"""
+
+    @staticmethod
+    def _make_grabber(tmp_path, script):
+        path = tmp_path / "tv_grab_test"
+        path.write_text("#!/bin/sh\n" + script)
+        path.chmod(0o755)
+        return XmltvGrabber("tv_grab_test", "Test", str(path), [])
+
+    def test_streams_output_into_consumer(self, tmp_path):
+        """The consumer parses stdout while the grabber runs and progress is reported"""
+        from services.epg_service import EpgService
+
+        grabber = self._make_grabber(
+            tmp_path,
+            "echo '<tv><channel id=\"ch1\"><display-name>One</display-name></channel>'\n"
+            'echo \'<programme start="20250101000000 +0000" channel="ch1"><title>A</title></programme></tv>\'\n',
+        )
+        progress = []
+
+        with patch.object(XmltvGrabberService, "get_grabber_by_name", return_value=grabber):
+            success, events, error = XmltvGrabberService.run_grabber_streaming(
+                "tv_grab_test",
+                consume=lambda output: list(EpgService.parse_xmltv_streaming(output)),
+                days=2,
+                progress=progress.append,
+            )
+
+        assert success is True
+        assert error == ""
+        assert [element_type for element_type, _ in events] == ["channel", "programme"]
+        assert progress and progress[-1] > 0
+
+    def test_grabber_failure_reports_stderr(self, tmp_path):
+        """A non-zero exit returns the grabber's stderr"""
+        grabber = self._make_grabber(tmp_path, "echo 'Error: invalid configuration' >&2\nexit 1\n")
+
+        with patch.object(XmltvGrabberService, "get_grabber_by_name", return_value=grabber):
+            success, result, error = XmltvGrabberService.run_grabber_streaming(
+                "tv_grab_test", consume=lambda f: f.read()
+            )
+
+        assert success is False
+        assert result is None
+        assert "invalid configuration" in error
+
+    def test_failed_run_leaves_sync_uncommitted(self, app, tmp_path):
+        """Output written while the grabber runs is not committed when it then exits with an error"""
+        from models import EpgChannel, EpgSource, db
+        from services.epg_service import EpgService
+
+        grabber = self._make_grabber(
+            tmp_path,
+            "echo '<tv><channel id=\"ch1\"><display-name>One</display-name></channel>'\n"
+            'echo \'<programme start="20250101000000 +0000" channel="ch1"><title>A</title></programme></tv>\'\n'
+            "exit 1\n",
+        )
+
+        with app.app_context():
+            source = EpgSource(name="Grabber", source_type="xmltv_grabber", xmltv_grabber="tv_grab_test")
+            db.session.add(source)
+            db.session.commit()
+
+            with patch.object(XmltvGrabberService, "get_grabber_by_name", return_value=grabber):
+                success, stats, error = XmltvGrabberService.run_grabber_streaming(
+                    "tv_grab_test", consume=lambda output: EpgService.sync_epg_source(source, output, commit=False)
+                )
+            db.session.rollback()
+
+            assert success is False
+            assert stats is None
+            assert EpgChannel.query.count() == 0
+
+    def test_invalid_output(self, tmp_path):
+        """Output the consumer can't process fails the run"""
+        from services.epg_service import EpgService
+
+        grabber = self._make_grabber(tmp_path, "echo '<tv><broken'\n")
+
+        with patch.object(XmltvGrabberService, "get_grabber_by_name", return_value=grabber):
+            success, _, error = XmltvGrabberService.run_grabber_streaming(
+                "tv_grab_test", consume=lambda output: list(EpgService.parse_xmltv_streaming(output))
+            )
+
+        assert success is False
+        assert "Invalid grabber output" in error
+
+    def test_timeout_kills_grabber(self, tmp_path):
+        """A grabber running past the timeout is killed"""
+        grabber = self._make_grabber(tmp_path, "exec sleep 30\n")
+
+        with patch.object(XmltvGrabberService, "get_grabber_by_name", return_value=grabber):
+            success, _, error = XmltvGrabberService.run_grabber_streaming(
+                "tv_grab_test", consume=lambda f: f.read(), timeout=1
+            )
+
+        assert success is False
+        assert "timed out" in error.lower()
+
+    def test_source_grabber_args(self):
+        """EPG source settings map to grabber arguments, ignoring invalid extra args"""
+        source = MagicMock(
+            xmltv_grabber="tv_grab_test",
+            xmltv_config_name="cfg",
+            xmltv_days=None,
+            xmltv_offset=1,
+            xmltv_extra_args='["--fast"]',
+        )
+        assert XmltvGrabberService.get_source_grabber_args(source) == {
+            "grabber_name": "tv_grab_test",
+            "config_name": "cfg",
+            "days": 7,
+            "offset": 1,
+            "extra_args": ["--fast"],
+        }
+
+        source.xmltv_extra_args = "not json"
+        assert XmltvGrabberService.get_source_grabber_args(source)["extra_args"] is None
+
+
 class TestXmltvGrabberServiceTest:
     """Test the test_grabber method"""
 
@@ -0,0 +1,86 @@
+"""
+Tests for the XMLTV byte-offset index.
+"""
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from services.xmltv_index import XmltvIndex, build_xmltv_index, load_xmltv_index, save_xmltv_index
+
+GUIDE = """<?xml version="1.0" encoding="UTF-8"?>
+<tv generator-info-name="test">
+  <channel id="ESPN.us"><display-name>ESPN</display-name></channel>
+  <channel id="cnn.us"><display-name>CNN – Café</display-name></channel>
+  <programme start="20240101120000 +0000" channel="ESPN.us"><title>SportsCenter</title></programme>
+  <programme start="20240101130000 +0000" channel="ESPN.us"/>
+  <programme start="20240101120000 +0000" channel="cnn.us"><title>Newsroom</title></programme>
+  <programme start="20240101140000 +0000" channel="ESPN.us"><title>NFL Live</title></programme>
+</tv>
+"""
+
+
+@pytest.fixture
+def guide_path(tmp_path):
+    """Write the sample guide to disk"""
+    path = tmp_path / "guide.xml"
+    path.write_bytes(GUIDE.encode("utf-8"))
+    return str(path)
+
+
+class TestBuildXmltvIndex:
+    """Tests for build_xmltv_index"""
+
+    def test_ranges_merged_per_channel_run(self, guide_path):
+        """Consecutive programmes of a channel share one range"""
+        index = build_xmltv_index(guide_path)
+
+        assert set(index["channels"]) == {"espn.us", "cnn.us"}
+        assert len(index["programmes"]["espn.us"]) == 2
+        assert len(index["programmes"]["cnn.us"]) == 1
+
+    def test_unindexable_files(self, tmp_path):
+        """Empty, gzipped and entity-declaring files are not indexed"""
+        empty = tmp_path / "empty.xml"
+        empty.write_bytes(b"")
+        gzipped = tmp_path / "guide.xml.gz"
+        gzipped.write_bytes(b"\x1f\x8b\x08\x00")
+        doctype = tmp_path / "doctype.xml"
+        doctype.write_bytes(b'<!DOCTYPE tv [<!ENTITY x "y">]><tv><channel id="a"/></tv>')
+
+        assert build_xmltv_index(str(empty)) is None
+        assert build_xmltv_index(str(gzipped)) is None
+        assert build_xmltv_index(str(doctype)) is None
+
+    def test_stale_sidecar_ignored(self, guide_path, tmp_path):
+        """A sidecar is only loaded while the file size and mtime match"""
+        index_path = str(tmp_path / "guide.idx.json")
+        save_xmltv_index(build_xmltv_index(guide_path), index_path)
+        assert load_xmltv_index(index_path, guide_path) is not None
+
+        with open(guide_path, "ab") as f:
+            f.write(b"\n")
+        assert load_xmltv_index(index_path, guide_path) is None
+
+
+class TestXmltvIndexExtract:
+    """Tests for XmltvIndex.extract"""
+
+    def test_extract_channels(self, guide_path):
+        """Channel elements are copied byte-for-byte, including non-ASCII text"""
+        with XmltvIndex(guide_path, build_xmltv_index(guide_path)) as xmltv_index:
+            root = ET.fromstring(xmltv_index.extract(["cnn.us"]))
+
+        assert [c.get("id") for c in root] == ["cnn.us"]
+        assert root.find("channel/display-name").text == "CNN – Café"
+
+    def test_extract_programmes_in_file_order(self, guide_path):
+        """Programmes of several channels keep their source order"""
+        with XmltvIndex(guide_path, build_xmltv_index(guide_path)) as xmltv_index:
+            root = ET.fromstring(xmltv_index.extract(["espn.us", "cnn.us"], programmes=True))
+
+        assert [(p.get("channel"), p.get("start")[8:12]) for p in root] == [
+            ("ESPN.us", "1200"),
+            ("ESPN.us", "1300"),
+            ("cnn.us", "1200"),
+            ("ESPN.us", "1400"),
+        ]
@@ -0,0 +1,79 @@
+"""
+Tests for the XMLTV parser backends (lxml and standard library).
+"""
+import io
+import xml.etree.ElementTree as ET
+
+import pytest
+
+import services.xmltv_parser as xmltv_parser
+from services.epg_service import EpgService
+from services.xmltv_parser import element_to_string, iterparse_xmltv
+
+GUIDE = b"""<?xml version="1.0" encoding="UTF-8"?>
+<tv>
+  <!-- provider comment -->
+  <channel id="espn.us"><display-name>ESPN</display-name></channel>
+  <extra><channel id="nested"/></extra>
+  <programme start="20240101120000 +0000" channel="espn.us"><title>SportsCenter</title></programme>
+  <programme start="20240101130000 +0000" channel="espn.us"><title>NFL Live</title></programme>
+</tv>
+"""
+
+
+@pytest.fixture(params=["lxml", "stdlib"])
+def backend(request, monkeypatch):
+    """Run a test against each parser backend"""
+    if request.param == "lxml":
+        pytest.importorskip("lxml")
+    else:
+        monkeypatch.setattr(xmltv_parser, "lxml_etree", None)
+    assert (xmltv_parser.lxml_etree is not None) == (request.param == "lxml")
+    return request.param
+
+
+class TestIterparseXmltv:
+    """Tests for iterparse_xmltv"""
+
+    def test_yields_top_level_tags(self, backend):
+        """Only top-level channel/programme elements are yielded, complete"""
+        results = [(elem.tag, elem.get("id") or elem.findtext("title")) for elem in iterparse_xmltv(io.BytesIO(GUIDE))]
+        assert results == [("channel", "espn.us"), ("programme", "SportsCenter"), ("programme", "NFL Live")]
+
+    def test_tag_filter(self, backend):
+        """The tags argument restricts which elements are yielded"""
+        tags = [elem.tag for elem in iterparse_xmltv(io.BytesIO(GUIDE), tags=("programme",))]
+        assert tags == ["programme", "programme"]
+
+    def test_elements_cleared_after_use(self, backend):
+        """Processed elements are emptied when the caller advances"""
+        seen = []
+        for elem in iterparse_xmltv(io.BytesIO(GUIDE)):
+            assert len(elem) == 1
+            seen.append(elem)
+        assert all(len(elem) == 0 for elem in seen[:-1])
+
+    def test_parse_error(self, backend):
+        """Malformed XML raises ElementTree's ParseError for either backend"""
+        with pytest.raises(ET.ParseError):
+            list(iterparse_xmltv(io.BytesIO(b"<tv><channel id='a'></tv>")))
+
+    def test_element_to_string(self, backend):
+        """Elements serialize without their tail text"""
+        elem = next(iterparse_xmltv(io.BytesIO(GUIDE), tags=("programme",)))
+        elem.set("channel", "ch-1-100")
+        assert element_to_string(elem) == (
+            '<programme start="20240101120000 +0000" channel="ch-1-100"><title>SportsCenter</title></programme>'
+        )
+
+
+class TestParseXmltvStreamingBackends:
+    """EPG parsing gives the same results on both backends"""
+
+    def test_parse_with_body(self, backend):
+        """Channels and programme bodies are parsed identically"""
+        items = list(EpgService.parse_xmltv_streaming(GUIDE, include_programme_body=True))
+
+        assert [kind for kind, _ in items] == ["channel", "programme", "programme"]
+        assert items[0][1]["display_names"] == ["ESPN"]
+        assert items[1][1]["body"] == "<title>SportsCenter</title>"
@@ -0,0 +1,64 @@
+"""
+Tests for the XmltvWriter - incremental XMLTV serialization.
+"""
+import xml.etree.ElementTree as ET
+
+from services.xmltv_writer import EMPTY_XMLTV, XmltvWriter
+
+
+def _write_all(writer, elements):
+    chunks = [writer.header()]
+    for elem in elements:
+        chunk = writer.write(elem)
+        if chunk:
+            chunks.append(chunk)
+    chunks.append(writer.close())
+    return chunks
+
+
+class TestXmltvWriter:
+    """Tests for XmltvWriter"""
+
+    def test_empty_document(self):
+        """A writer with no elements produces the minimal document"""
+        assert b"".join(_write_all(XmltvWriter(), [])) == EMPTY_XMLTV
+        root = ET.fromstring(EMPTY_XMLTV)
+        assert root.tag == "tv"
+        assert root.get("generator-info-name") == "iptv-proxy-v2"
+
+    def test_elements_written_in_order(self):
+        """Channels and programmes are serialized in write order"""
+        channel = ET.Element("channel", id="ch-1-100")
+        ET.SubElement(channel, "display-name").text = "News & Weather"
+        programme = ET.Element("programme", start="20240101120000 +0000", channel="ch-1-100")
+        ET.SubElement(programme, "title").text = "Headlines"
+
+        root = ET.fromstring(b"".join(_write_all(XmltvWriter(), [channel, programme])))
+
+        assert [child.tag for child in root] == ["channel", "programme"]
+        assert root.find("channel/display-name").text == "News & Weather"
+        assert root.find("programme/title").text == "Headlines"
+
+    def test_chunks_emitted_when_buffer_full(self):
+        """Output is handed back in chunks once the buffer exceeds chunk_size"""
+        writer = XmltvWriter(chunk_size=100)
+        elements = [ET.Element("programme", channel=f"ch-1-{i}", start="20240101120000 +0000") for i in range(20)]
+
+        chunks = _write_all(writer, elements)
+
+        assert len(chunks) > 3
+        assert len(ET.fromstring(b"".join(chunks))) == 20
+
+    def test_rewrite_mutated_element(self):
+        """The same element can be re-written with different attributes"""
+        writer = XmltvWriter()
+        programme = ET.Element("programme", start="20240101120000 +0000")
+        programme.tail = "\n  "
+        chunks = [writer.header()]
+        for channel_id in ("ch-1-1", "ch-1-2"):
+            programme.set("channel", channel_id)
+            writer.write(programme)
+        chunks.append(writer.close())
+
+        root = ET.fromstring(b"".join(chunks))
+        assert [p.get("channel") for p in root] == ["ch-1-1", "ch-1-2"]